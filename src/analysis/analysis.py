@@ -0,0 +1,212 @@
+"""Compute signal metrics of raw data files."""
+
+import bisect
+import itertools
+import logging
+import math
+import multiprocessing
+import operator
+import os
+import time
+
+from data import data
+
+
+class AnalysisOptions(object): # pylint:disable=R0903
+  """Options to analyze a file."""
+  def __init__(self, chunk_frames=65536, silence_threshold_db=-60.0):
+    """Creates an AnalysisOptions.
+
+    @param chunk_frames: Number of samples per channel read at a time.
+    @param silence_threshold_db: A sample is silent if its absolute value
+                                 is not larger than this level in dBFS.
+
+    """
+    self.chunk_frames = chunk_frames
+    self.silence_threshold_db = silence_threshold_db
+
+
+def to_dbfs(value, full_scale):
+  """Converts a value to dBFS.
+
+  @param value: A non-negative value.
+  @param full_scale: The full scale value.
+
+  @returns: The level in dBFS. None for value 0.
+  """
+  if value <= 0:
+    return None
+  return 20 * math.log10(float(value) / full_scale)
+
+
+class ChannelStats(object):
+  """Accumulates metrics of samples in one channel chunk by chunk.
+
+  Each chunk is sorted once so minimum, maximum, clipped samples and silent
+  samples are all found by bisection, and the sums are computed by builtin
+  functions, so no Python-level loop runs per sample.
+  """
+  def __init__(self, data_range, silence_threshold):
+    """Creates a ChannelStats.
+
+    @param data_range: (min, max) of sample value range.
+    @param silence_threshold: A sample is silent if its absolute value is
+                              not larger than this value.
+
+    """
+    self._data_range = data_range
+    self._silence_threshold = silence_threshold
+    self.count = 0
+    self.min_value = None
+    self.max_value = None
+    self.total = 0
+    self.total_square = 0
+    self.clipped = 0
+    self.silent = 0
+
+
+  def add(self, samples):
+    """Adds a chunk of samples.
+
+    @param samples: A sequence of samples.
+
+    """
+    if not samples:
+      return
+    ordered = sorted(samples)
+    length = len(ordered)
+    min_range, max_range = self._data_range
+    self.count += length
+    if self.min_value is None or ordered[0] < self.min_value:
+      self.min_value = ordered[0]
+    if self.max_value is None or ordered[-1] > self.max_value:
+      self.max_value = ordered[-1]
+    self.total += sum(samples)
+    self.total_square += sum(itertools.imap(operator.mul, samples, samples))
+    self.clipped += (bisect.bisect_right(ordered, min_range) +
+                     length - bisect.bisect_left(ordered, max_range))
+    self.silent += (bisect.bisect_right(ordered, self._silence_threshold) -
+                    bisect.bisect_left(ordered, -self._silence_threshold))
+
+
+  def get_result(self):
+    """Gets the metrics.
+
+    @returns: A dict containing peak, rms, dc_offset, clipped samples and
+              silence ratio. Peak and RMS are also given in dBFS.
+    """
+    if not self.count:
+      return {'samples': 0}
+    full_scale = self._data_range[1]
+    peak = max(abs(self.min_value), abs(self.max_value))
+    rms = math.sqrt(float(self.total_square) / self.count)
+    return {
+        'samples': self.count,
+        'peak': peak,
+        'peak_dbfs': to_dbfs(peak, full_scale),
+        'rms': rms,
+        'rms_dbfs': to_dbfs(rms, full_scale),
+        'dc_offset': float(self.total) / self.count,
+        'clipped_samples': self.clipped,
+        'silence_ratio': float(self.silent) / self.count,
+    }
+
+
+def analyze_file(path, data_format, options):
+  """Computes metrics of each channel in a file.
+
+  @param path: The path to the raw data file.
+  @param data_format: A data.DataFormat object.
+  @param options: An AnalysisOptions object.
+
+  @returns: A dict containing the path, size, processing time, throughput
+            and a list of metrics of each channel.
+  """
+  start = time.time()
+  full_scale = data_format.data_range[1]
+  silence_threshold = full_scale * 10 ** (options.silence_threshold_db / 20.0)
+  channel_stats = [ChannelStats(data_format.data_range, silence_threshold)
+                   for _ in xrange(data_format.num_channels)]
+  for chunk in data.read_chunks(path, data_format, options.chunk_frames):
+    for stats, samples in zip(channel_stats, chunk):
+      stats.add(samples)
+  elapsed = time.time() - start
+  size = os.path.getsize(path)
+  return {
+      'path': path,
+      'bytes': size,
+      'duration_secs': (float(channel_stats[0].count) /
+                        data_format.sampling_rate),
+      'elapsed_secs': elapsed,
+      'throughput_mb_per_sec': get_throughput(size, elapsed),
+      'channels': [stats.get_result() for stats in channel_stats],
+  }
+
+
+def get_throughput(size, elapsed):
+  """Gets throughput in MB/s.
+
+  @param size: Number of bytes processed.
+  @param elapsed: Time in seconds.
+
+  @returns: Throughput in MB/s. None if elapsed time is 0.
+  """
+  if elapsed <= 0:
+    return None
+  return size / elapsed / (1 << 20)
+
+
+def _analyze_file_task(task):
+  """Analyzes a file in a worker process.
+
+  @param task: A tuple of arguments to analyze_file.
+
+  @returns: The result of analyze_file, or a dict containing the error.
+  """
+  path = task[0]
+  try:
+    return analyze_file(*task)
+  except IOError as error:
+    logging.error('Can not analyze %s: %s', path, error)
+    return {'path': path, 'error': str(error)}
+
+
+def analyze(paths, data_format, options, jobs=None):
+  """Analyzes files in parallel.
+
+  @param paths: A list of paths to files or directories. All the files in
+                a directory are analyzed.
+  @param data_format: A data.DataFormat object.
+  @param options: An AnalysisOptions object.
+  @param jobs: Number of worker processes. Default is number of CPUs.
+
+  @returns: A dict containing the report of each file in the order of
+            paths, and the total size, time and throughput.
+  """
+  start = time.time()
+  tasks = [(input_file, data_format, options)
+           for path in paths for input_file in data.find_input_files(path)]
+  logging.info('Analyze %r files', len(tasks))
+  if len(tasks) == 1 or jobs == 1:
+    results = [_analyze_file_task(task) for task in tasks]
+  else:
+    pool = multiprocessing.Pool(jobs)
+    try:
+      results = pool.map(_analyze_file_task, tasks)
+    finally:
+      pool.close()
+      pool.join()
+  elapsed = time.time() - start
+  total_bytes = sum(result.get('bytes', 0) for result in results)
+  return {
+      'data_format': {
+          'num_channels': data_format.num_channels,
+          'length_bits': data_format.length_bits,
+          'sampling_rate': data_format.sampling_rate,
+      },
+      'silence_threshold_db': options.silence_threshold_db,
+      'files': results,
+      'total_bytes': total_bytes,
+      'elapsed_secs': elapsed,
+      'throughput_mb_per_sec': get_throughput(total_bytes, elapsed),
+  }
@@ -0,0 +1,158 @@
+#!/usr/bin/python
+"""Unit tests for analysis."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+from analysis import analysis
+from data import data
+
+
+_DATA_FORMAT = data.DataFormat(2, 16, 8000)
+
+
+def _make_samples(seed, length):
+  """Makes random samples with clipped and silent samples.
+
+  @param seed: The seed of random numbers.
+  @param length: The number of samples.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(seed)
+  choices = (-32768, 32767, 0, 1, -1, 30, -30)
+  return array.array('h', (
+      generator.choice(choices) if generator.random() < 0.3 else
+      generator.randint(-32768, 32767) for _ in xrange(length)))
+
+
+def _get_expected(samples, silence_threshold):
+  """Computes the metrics of samples one by one.
+
+  @param samples: A sequence of samples.
+  @param silence_threshold: The largest absolute value of silent samples.
+
+  @returns: A tuple of (peak, rms, dc_offset, clipped, silence_ratio).
+  """
+  count = float(len(samples))
+  return (max(abs(sample) for sample in samples),
+          math.sqrt(sum(sample * sample for sample in samples) / count),
+          sum(samples) / count,
+          len([sample for sample in samples
+               if sample in _DATA_FORMAT.data_range]),
+          len([sample for sample in samples
+               if abs(sample) <= silence_threshold]) / count)
+
+
+class ChannelStatsTest(unittest.TestCase):
+  """Compares ChannelStats with metrics computed sample by sample."""
+
+  def _check(self, result, samples, silence_threshold):
+    """Checks the metrics of samples.
+
+    @param result: The result of ChannelStats.get_result.
+    @param samples: The sequence of all the added samples.
+    @param silence_threshold: The largest absolute value of silent samples.
+
+    """
+    peak, rms, dc_offset, clipped, silence_ratio = _get_expected(
+        samples, silence_threshold)
+    self.assertEqual(result['samples'], len(samples))
+    self.assertEqual(result['peak'], peak)
+    self.assertAlmostEqual(result['rms'], rms)
+    self.assertAlmostEqual(result['dc_offset'], dc_offset)
+    self.assertEqual(result['clipped_samples'], clipped)
+    self.assertAlmostEqual(result['silence_ratio'], silence_ratio)
+    self.assertAlmostEqual(result['peak_dbfs'],
+                           20 * math.log10(peak / 32767.0))
+
+
+  def test_chunks(self):
+    """Tests adding samples in chunks of different sizes."""
+    samples = _make_samples(1, 5000)
+    for silence_threshold in (0, 1, 30.5):
+      stats = analysis.ChannelStats(_DATA_FORMAT.data_range,
+                                    silence_threshold)
+      for start, stop in ((0, 1), (1, 1), (1, 1000), (1000, 5000)):
+        stats.add(samples[start:stop])
+      self._check(stats.get_result(), samples, silence_threshold)
+
+
+  def test_no_samples(self):
+    """Tests the result of a channel without samples."""
+    stats = analysis.ChannelStats(_DATA_FORMAT.data_range, 0)
+    stats.add(array.array('h'))
+    self.assertEqual(stats.get_result(), {'samples': 0})
+
+
+  def test_silent(self):
+    """Tests the levels of all zero samples are None."""
+    stats = analysis.ChannelStats(_DATA_FORMAT.data_range, 0)
+    stats.add(array.array('h', [0] * 10))
+    result = stats.get_result()
+    self.assertIsNone(result['peak_dbfs'])
+    self.assertIsNone(result['rms_dbfs'])
+    self.assertEqual(result['silence_ratio'], 1.0)
+
+
+class AnalyzeTest(unittest.TestCase):
+  """Tests analyzing files."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'capture.raw')
+    interleaved = _make_samples(2, 2 * 3001)
+    self.channels = data.deinterleave(interleaved, 2)
+    if sys.byteorder == 'big':
+      interleaved.byteswap()
+    with open(self.path, 'wb') as raw_file:
+      raw_file.write(interleaved.tostring())
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_analyze_file(self):
+    """Tests the metrics do not depend on the chunk size."""
+    silence_threshold = 32767 * 10 ** (-60 / 20.0)
+    results = []
+    for chunk_frames in (1000, 65536):
+      options = analysis.AnalysisOptions(chunk_frames=chunk_frames)
+      result = analysis.analyze_file(self.path, _DATA_FORMAT, options)
+      self.assertEqual(result['bytes'], 4 * 3001)
+      self.assertAlmostEqual(result['duration_secs'], 3001 / 8000.0)
+      results.append(result['channels'])
+    self.assertEqual(results[0], results[1])
+    for result, samples in zip(results[0], self.channels):
+      peak, rms, _, clipped, silence_ratio = _get_expected(samples,
+                                                           silence_threshold)
+      self.assertEqual((result['peak'], result['clipped_samples']),
+                       (peak, clipped))
+      self.assertAlmostEqual(result['rms'], rms)
+      self.assertAlmostEqual(result['silence_ratio'], silence_ratio)
+
+
+  def test_analyze(self):
+    """Tests files in a directory, and a missing file."""
+    missing = os.path.join(self.directory, 'missing.raw')
+    for jobs in (1, 2):
+      report = analysis.analyze([self.directory, missing], _DATA_FORMAT,
+                                analysis.AnalysisOptions(), jobs=jobs)
+      files = report['files']
+      self.assertEqual([result['path'] for result in files],
+                       [self.path, missing])
+      self.assertIn('error', files[1])
+      self.assertEqual(report['total_bytes'], 4 * 3001)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+"""The entry point of batch analysis."""
+
+import argparse
+import json
+import logging
+import sys
+
+from analysis import analysis
+from data import data
+
+
+def parse_args():
+  """Parse command line arguments.
+
+  @returns: populated namespace containing parsed arguments.
+  """
+  parser = argparse.ArgumentParser(
+      description='Compute peak, RMS, DC offset, clipping and silence of\n'
+                  'each channel in raw data files, and write a JSON report.',
+      formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument('--debug', '-d', action='store_true', default=False,
+                      help='Print debug messages.')
+  parser.add_argument('input_files', action='store', nargs='+',
+                      help='Raw data files or directories to analyze.\n'
+                           'They must be little-endian raw data.')
+  parser.add_argument('--channel', '-c', action='store', default=1, type=int,
+                      help='Total number of channel. Default is 1.\n')
+  parser.add_argument('--rate', '-r', action='store', default=48000, type=int,
+                      help='Samping rate. Default is 48000.\n')
+  parser.add_argument('--bit', '-b', action='store', default=16, type=int,
+                      help='Sample size in bits. Default is 16.\n')
+  parser.add_argument('--silence-threshold', action='store', default=-60.0,
+                      type=float,
+                      help='Silence threshold in dBFS. Default is -60.\n')
+  parser.add_argument('--chunk-frames', action='store', default=65536,
+                      type=int,
+                      help='Number of samples per channel read at a time.\n'
+                           'Default is 65536.\n')
+  parser.add_argument('--jobs', '-j', action='store', default=None,
+                      type=int,
+                      help='Number of worker processes.\n'
+                           'Default is number of CPUs.\n')
+  parser.add_argument('--output', '-o', action='store', default=None,
+                      help='Report file. Default is stdout.\n')
+
+  args = parser.parse_args()
+  level = logging.DEBUG if args.debug else logging.INFO
+  logging.basicConfig(level=level)
+  return args
+
+
+def main():
+  """Main entry point."""
+  args = parse_args()
+  data_format = data.DataFormat(
+      num_channels=args.channel,
+      length_bits=args.bit,
+      sampling_rate=args.rate)
+  options = analysis.AnalysisOptions(
+      chunk_frames=args.chunk_frames,
+      silence_threshold_db=args.silence_threshold)
+  report = analysis.analyze(args.input_files, data_format, options, args.jobs)
+  logging.info('Analyzed %r bytes in %.3f secs, %.1f MB/s',
+               report['total_bytes'], report['elapsed_secs'],
+               report['throughput_mb_per_sec'] or 0)
+  if args.output:
+    with open(args.output, 'w') as output:
+      json.dump(report, output, indent=2, sort_keys=True)
+  else:
+    json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+  main()
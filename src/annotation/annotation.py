@@ -0,0 +1,208 @@
+"""Load annotations of events from a marker file and index them by time."""
+
+import array
+import bisect
+import logging
+import math
+
+from summary import summary
+from tracing import tracing
+
+
+class AnnotationError(Exception):
+  """Error in annotation."""
+  pass
+
+
+class Annotation(object): # pylint:disable=R0903
+  """An event or an interval with a label."""
+  def __init__(self, start, stop, label):
+    """Creates an Annotation.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the annotation. It is start + 1
+                 for an event.
+    @param label: The label.
+
+    """
+    self.start = start
+    self.stop = stop
+    self.label = label
+
+
+  def __repr__(self):
+    return 'Annotation(%r, %r, %r)' % (self.start, self.stop, self.label)
+
+
+def parse_time(text):
+  """Parses a time stamp.
+
+  @param text: A string like '2700', '45:00' or '0:45:00.5'.
+
+  @returns: The time in seconds.
+
+  @raises: AnnotationError if the text is not a valid time stamp.
+  """
+  fields = text.strip().split(':')
+  if len(fields) > 3:
+    raise AnnotationError('Too many fields in time %r' % text)
+  seconds = 0.0
+  for field in fields:
+    try:
+      seconds = seconds * 60 + float(field)
+    except ValueError:
+      raise AnnotationError('Invalid time %r' % text)
+  # inf and nan can not be converted to a sample index.
+  if math.isinf(seconds) or math.isnan(seconds):
+    raise AnnotationError('Invalid time %r' % text)
+  if seconds < 0:
+    raise AnnotationError('Negative time %r' % text)
+  return seconds
+
+
+def parse_line(line, sampling_rate):
+  """Parses a line of a marker file.
+
+  A line is START [END] LABEL, where START and END are time stamps from the
+  first sample, e.g. '90.5' or '1:30.5'. Fields are separated by white
+  spaces or commas. Empty lines and lines starting with # are neglected.
+
+  @param line: A line.
+  @param sampling_rate: The sampling rate to convert time to sample index.
+
+  @returns: An Annotation. None if the line has no annotation.
+
+  @raises: AnnotationError if the line can not be parsed.
+  """
+  line = line.strip()
+  if not line or line.startswith('#'):
+    return None
+  fields = line.replace(',', ' ', 2).split(None, 2)
+  start = int(parse_time(fields[0]) * sampling_rate)
+  stop = start + 1
+  label = ' '.join(fields[1:])
+  if len(fields) > 1:
+    try:
+      stop = max(stop, int(parse_time(fields[1]) * sampling_rate))
+      label = ' '.join(fields[2:])
+    except AnnotationError:
+      # The second field is a part of the label.
+      pass
+  return Annotation(start, stop, label)
+
+
+def load_annotations(path, sampling_rate):
+  """Loads annotations from a marker file.
+
+  @param path: The path to the marker file. See parse_line for the format.
+  @param sampling_rate: The sampling rate to convert time to sample index.
+
+  @returns: An AnnotationIndex.
+
+  @raises: AnnotationError if a line can not be parsed.
+  """
+  annotations = []
+  with tracing.span('annotations'):
+    with open(path) as marker_file:
+      for line_number, line in enumerate(marker_file, 1):
+        try:
+          annotation = parse_line(line, sampling_rate)
+        except AnnotationError as error:
+          raise AnnotationError('%s:%d: Invalid marker %r: %s' %
+                                (path, line_number, line.strip(), error))
+        if annotation:
+          annotations.append(annotation)
+    index = AnnotationIndex(annotations)
+  logging.info('Loaded %r annotations from %s', len(annotations), path)
+  return index
+
+
+class AnnotationIndex(object):
+  """Annotations sorted by start, with an interval index of their stops.
+
+  Annotations overlapping a range are the ones starting in the range, found
+  by bisection, and the ones starting before the range and stopping in or
+  after it. For the latter, a BlockSummary of the stops in start order skips
+  nodes of annotations stopping before the range, so a query takes
+  O(log n + k) steps for k annotations, and events take no step at all.
+  """
+  _BLOCK_LENGTH = 16
+
+  def __init__(self, annotations):
+    """Creates an AnnotationIndex.
+
+    @param annotations: A list of Annotation objects.
+
+    """
+    self._annotations = sorted(annotations, key=lambda item: item.start)
+    self._starts = array.array('l', [item.start
+                                     for item in self._annotations])
+    self._stops = summary.BlockSummary(
+        array.array('l', [item.stop for item in self._annotations]),
+        block_length=self._BLOCK_LENGTH, fanout=self._BLOCK_LENGTH)
+
+
+  def __len__(self):
+    return len(self._annotations)
+
+
+  def __getitem__(self, index):
+    return self._annotations[index]
+
+
+  def count(self, start, stop):
+    """Counts the annotations starting in a range.
+
+    @param start: The first sample index of the range.
+    @param stop: The sample index after the range.
+
+    @returns: The number of annotations.
+    """
+    return (bisect.bisect_left(self._starts, stop) -
+            bisect.bisect_left(self._starts, start))
+
+
+  def find(self, start, stop):
+    """Finds the annotations overlapping a range.
+
+    @param start: The first sample index of the range.
+    @param stop: The sample index after the range.
+
+    @returns: A list of Annotation objects sorted by start.
+    """
+    first = bisect.bisect_left(self._starts, start)
+    last = bisect.bisect_left(self._starts, stop)
+    found = []
+    if first and self._stops.is_complete:
+      block = self._stops.find_block(0, lambda _, maximum: maximum > start)
+      while block is not None and block * self._BLOCK_LENGTH < first:
+        block_start, block_stop = self._stops.get_block_range(block)
+        found.extend(item for item in
+                     self._annotations[block_start:min(block_stop, first)]
+                     if item.stop > start)
+        block = self._stops.find_block(block + 1,
+                                       lambda _, maximum: maximum > start)
+    found.extend(self._annotations[first:last])
+    return found
+
+
+  def find_next(self, sample_index):
+    """Finds the first annotation starting after a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the annotation. None if there is no annotation.
+    """
+    index = bisect.bisect_right(self._starts, sample_index)
+    return index if index < len(self._starts) else None
+
+
+  def find_previous(self, sample_index):
+    """Finds the last annotation starting before a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the annotation. None if there is no annotation.
+    """
+    index = bisect.bisect_left(self._starts, sample_index) - 1
+    return index if index >= 0 else None
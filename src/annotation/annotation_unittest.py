@@ -0,0 +1,127 @@
+#!/usr/bin/python
+"""Unit tests for annotation."""
+
+from __future__ import absolute_import
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from annotation import annotation
+
+
+class AnnotationIndexTest(unittest.TestCase):
+  """Compares AnnotationIndex with a check of every annotation."""
+
+  def setUp(self):
+    generator = random.Random(1)
+    self.annotations = []
+    for index in xrange(3000):
+      start = generator.randint(0, 100000)
+      length = generator.choice((1, 1, 1, 10, 500, 20000))
+      self.annotations.append(annotation.Annotation(
+          start, start + length, 'event %d' % index))
+    self.index = annotation.AnnotationIndex(self.annotations)
+
+
+  def test_find(self):
+    """Tests find of ranges."""
+    generator = random.Random(2)
+    ordered = sorted(self.annotations, key=lambda item: item.start)
+    for _ in xrange(200):
+      start = generator.randint(-100, 110000)
+      stop = start + generator.choice((1, 50, 3000, 50000))
+      expected = [item for item in ordered
+                  if item.start < stop and item.stop > start]
+      found = self.index.find(start, stop)
+      self.assertEqual([item.label for item in found],
+                       [item.label for item in expected])
+      self.assertEqual(self.index.count(start, stop),
+                       len([item for item in ordered
+                            if start <= item.start < stop]))
+
+
+  def test_find_next_and_previous(self):
+    """Tests find_next and find_previous."""
+    starts = sorted(item.start for item in self.annotations)
+    for sample_index in xrange(-1, 101000, 997):
+      following = [i for i, start in enumerate(starts) if start > sample_index]
+      preceding = [i for i, start in enumerate(starts) if start < sample_index]
+      self.assertEqual(self.index.find_next(sample_index),
+                       following[0] if following else None)
+      self.assertEqual(self.index.find_previous(sample_index),
+                       preceding[-1] if preceding else None)
+
+
+  def test_empty(self):
+    """Tests an index without annotations."""
+    index = annotation.AnnotationIndex([])
+    self.assertEqual(index.find(0, 100), [])
+    self.assertIsNone(index.find_next(0))
+    self.assertIsNone(index.find_previous(0))
+
+
+class ParseTest(unittest.TestCase):
+  """Tests parsing marker files."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_parse_time(self):
+    """Tests parse_time."""
+    self.assertEqual(annotation.parse_time('2700'), 2700)
+    self.assertEqual(annotation.parse_time('45:00'), 2700)
+    self.assertEqual(annotation.parse_time('0:45:00.5'), 2700.5)
+    for text in ('', 'x', '1:2:3:4', '-1', 'inf', '1:nan', '1e308:0'):
+      with self.assertRaises(annotation.AnnotationError):
+        annotation.parse_time(text)
+
+
+  def test_parse_line(self):
+    """Tests events and intervals in seconds and in M:SS."""
+    for line, expected in (('1.5 start', (150, 151, 'start')),
+                           ('1:30, 1:31.5, long one', (9000, 9150,
+                                                       'long one')),
+                           ('2 3 x', (200, 300, 'x')),
+                           ('2 label only', (200, 201, 'label only')),
+                           ('2 inf label', (200, 201, 'inf label')),
+                           ('  # comment', None),
+                           ('', None)):
+      item = annotation.parse_line(line, 100)
+      self.assertEqual(item and (item.start, item.stop, item.label),
+                       expected)
+
+
+  def test_load_annotations(self):
+    """Tests load_annotations reports the line which can not be parsed."""
+    path = os.path.join(self.directory, 'markers.txt')
+    with open(path, 'w') as marker_file:
+      marker_file.write('# time label\n0:01 a\n2 3 b\n')
+    index = annotation.load_annotations(path, 10)
+    self.assertEqual([(item.start, item.stop) for item in index.find(0, 100)],
+                     [(10, 11), (20, 30)])
+    with open(path, 'a') as marker_file:
+      marker_file.write('1:2:3:4 bad\n')
+    with self.assertRaisesRegexp(annotation.AnnotationError, ':4:'):
+      annotation.load_annotations(path, 10)
+
+
+  def test_load_non_finite(self):
+    """Tests a marker at a time which is not finite is invalid."""
+    path = os.path.join(self.directory, 'markers.txt')
+    for line in ('inf a\n', 'nan a\n', '-inf a\n'):
+      with open(path, 'w') as marker_file:
+        marker_file.write('0:01 a\n' + line)
+      with self.assertRaisesRegexp(annotation.AnnotationError, ':2:'):
+        annotation.load_annotations(path, 10)
+
+
+if __name__ == '__main__':
+  unittest.main()
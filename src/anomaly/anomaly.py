@@ -0,0 +1,312 @@
+"""Detect anomalies in samples in a background thread."""
+
+import functools
+import itertools
+import logging
+import math
+import operator
+import re
+import threading
+
+from tracing import tracing
+
+
+class AnomalyKind(object): # pylint:disable=R0903
+  """Kinds of anomalies."""
+  def __init__(self):
+    pass
+
+  CLIPPING = 'clipping'
+  DC_STEP = 'DC step'
+  DROPOUT = 'dropout'
+  SILENCE = 'silence'
+
+
+# The mark of each kind of anomaly shown in the view.
+MARKS = {
+    AnomalyKind.CLIPPING: 'C',
+    AnomalyKind.DC_STEP: 'D',
+    AnomalyKind.DROPOUT: 'X',
+    AnomalyKind.SILENCE: 'S',
+}
+
+
+class Anomaly(object): # pylint:disable=R0903
+  """An anomaly in samples.
+
+  @property kind: A kind defined in AnomalyKind.
+  @property start: The first sample index.
+  @property stop: The sample index after the anomaly.
+  """
+  def __init__(self, kind, start, stop):
+    self.kind = kind
+    self.start = start
+    self.stop = stop
+
+
+  @property
+  def mark(self):
+    """The mark of the anomaly."""
+    return MARKS[self.kind]
+
+
+class AnomalyOptions(object): # pylint:disable=R0903
+  """Options to detect anomalies."""
+  def __init__(self, min_clipped_run=3, min_dropout_run=32,
+               min_silence_ms=200.0, silence_threshold_db=-60.0,
+               dc_window_ms=1000.0, dc_step_ratio=0.05):
+    """Creates an AnomalyOptions.
+
+    @param min_clipped_run: The minimum number of consecutive samples at the
+                            minimum or maximum of data range.
+    @param min_dropout_run: The minimum number of consecutive identical
+                            samples. Runs of clipped or silent samples are
+                            not dropouts.
+    @param min_silence_ms: The minimum length of silence in milliseconds.
+    @param silence_threshold_db: A sample is silent if its absolute value
+                                 is not larger than this level in dBFS.
+    @param dc_window_ms: The length of windows whose means are compared to
+                         find DC steps. A window of 1 second averages out
+                         signals of 1Hz and above.
+    @param dc_step_ratio: A DC step is a change of mean between adjacent
+                          windows larger than this ratio of full scale.
+
+    """
+    self.min_clipped_run = min_clipped_run
+    self.min_dropout_run = min_dropout_run
+    self.min_silence_ms = min_silence_ms
+    self.silence_threshold_db = silence_threshold_db
+    self.dc_window_ms = dc_window_ms
+    self.dc_step_ratio = dc_step_ratio
+
+
+class _RunDetector(object):
+  """Finds runs of 1 in a mask which is fed chunk by chunk.
+
+  Runs in a chunk are found by a regular expression. A run at the end of a
+  chunk is kept open and joined with the run at the start of next chunk, so
+  runs of any length are found with one chunk in memory.
+  """
+  def __init__(self, min_length):
+    """Creates a _RunDetector.
+
+    @param min_length: The minimum length of a run.
+
+    """
+    self._min_length = max(1, min_length)
+    self._pattern = re.compile('\x01{%d,}' % self._min_length)
+    self._open_start = None
+
+
+  def feed(self, mask, start):
+    """Finds the runs which end in a chunk of mask.
+
+    @param mask: A str of '\\x00' and '\\x01'.
+    @param start: The sample index of the first byte of mask.
+
+    @returns: A list of (start, stop) of runs.
+    """
+    runs = []
+    search_start = 0
+    if self._open_start is not None:
+      lead = len(mask) - len(mask.lstrip('\x01'))
+      if lead == len(mask):
+        return runs
+      self._close(start + lead, runs)
+      search_start = lead
+    trail = len(mask) - len(mask.rstrip('\x01'))
+    search_stop = max(search_start, len(mask) - trail)
+    for match in self._pattern.finditer(mask, search_start, search_stop):
+      runs.append((start + match.start(), start + match.end()))
+    if trail:
+      self._open_start = start + search_stop
+    return runs
+
+
+  def finish(self, stop):
+    """Closes the open run at the end of samples.
+
+    @param stop: The number of samples.
+
+    @returns: A list of (start, stop) of the last run.
+    """
+    runs = []
+    if self._open_start is not None:
+      self._close(stop, runs)
+    return runs
+
+
+  def _close(self, stop, runs):
+    """Closes the open run and appends it to runs if it is long enough.
+
+    @param stop: The sample index after the run.
+    @param runs: A list of (start, stop) of runs.
+
+    """
+    if stop - self._open_start >= self._min_length:
+      runs.append((self._open_start, stop))
+    self._open_start = None
+
+
+class AnomalyScanner(object):
+  """Scans samples for anomalies chunk by chunk.
+
+  Each chunk is converted to masks of clipped, silent and repeated samples
+  by itertools.imap, and runs in the masks are found by regular expressions,
+  so no Python-level loop runs per sample. Means of DC windows are computed
+  by builtin sum.
+
+  start runs the scan in a daemon thread. Found anomalies are appended to
+  anomalies and progress is updated after each chunk, so the interactive
+  loop can poll them without waiting. The scan also builds a BlockSummary
+  from the chunks it reads, so the samples are decoded only once.
+  """
+  _CHUNK_LENGTH = 65536
+
+  def __init__(self, samples, data_range, sampling_rate, options=None,
+               block_summary=None):
+    """Creates an AnomalyScanner.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param data_range: (min, max) of sample value range.
+    @param sampling_rate: The sampling rate.
+    @param options: An AnomalyOptions. Default options are used if None.
+    @param block_summary: An empty summary.BlockSummary to build from the
+                          scanned samples. It is complete when the scan is
+                          done.
+
+    """
+    options = options or AnomalyOptions()
+    self._samples = samples
+    self._data_range = data_range
+    self._options = options
+    self.block_summary = block_summary
+    full_scale = data_range[1]
+    self._silence_threshold = int(
+        full_scale * math.pow(10, options.silence_threshold_db / 20))
+    self._dc_window = max(1, int(options.dc_window_ms * sampling_rate / 1000))
+    self._dc_step = options.dc_step_ratio * full_scale
+    self._min_silence = max(1, int(options.min_silence_ms * sampling_rate /
+                                   1000))
+    # Chunks are aligned to DC windows.
+    self._chunk_length = self._dc_window * max(
+        1, self._CHUNK_LENGTH / self._dc_window)
+    # A list of Anomaly objects in the order they are found.
+    self.anomalies = []
+    # The ratio of scanned samples from 0 to 1.
+    self.progress = 0.0
+    self.done = False
+    self._stopped = False
+    self._thread = None
+
+
+  def start(self):
+    """Starts scanning in a background thread."""
+    self._thread = threading.Thread(target=self.scan, name='anomaly')
+    self._thread.daemon = True
+    self._thread.start()
+
+
+  def stop(self):
+    """Stops scanning after the current chunk."""
+    self._stopped = True
+    if self._thread:
+      self._thread.join()
+
+
+  def scan(self):
+    """Scans all samples. Returns after the scan is done or stopped."""
+    low, high = self._data_range
+    clipped = _RunDetector(self._options.min_clipped_run)
+    silent = _RunDetector(self._min_silence)
+    # A mask of samples equal to the previous sample has one 1 less than
+    # the number of identical samples in a run.
+    repeated = _RunDetector(self._options.min_dropout_run - 1)
+    previous_sample = None
+    previous_mean = None
+    number_of_samples = len(self._samples)
+
+    for start in xrange(0, number_of_samples, self._chunk_length):
+      if self._stopped:
+        return
+      with tracing.span('scan'):
+        chunk = self._samples[start:start + self._chunk_length]
+        if self.block_summary:
+          self.block_summary.add_samples(chunk)
+        clipped_mask = itertools.imap(
+            operator.or_,
+            itertools.imap(functools.partial(operator.ge, low), chunk),
+            itertools.imap(functools.partial(operator.le, high), chunk))
+        self._add(AnomalyKind.CLIPPING,
+                  clipped.feed(str(bytearray(clipped_mask)), start))
+
+        silent_mask = itertools.imap(
+            functools.partial(operator.ge, self._silence_threshold),
+            itertools.imap(abs, chunk))
+        self._add(AnomalyKind.SILENCE,
+                  silent.feed(str(bytearray(silent_mask)), start))
+
+        shifted = ([chunk[0] if previous_sample is None else previous_sample]
+                   + list(chunk[:-1]))
+        repeated_mask = itertools.imap(operator.eq, chunk, shifted)
+        self._add_dropouts(repeated.feed(str(bytearray(repeated_mask)),
+                                         start))
+        previous_sample = chunk[-1]
+
+        for window_start in xrange(0, len(chunk), self._dc_window):
+          window = chunk[window_start:window_start + self._dc_window]
+          mean = float(sum(window)) / len(window)
+          if (previous_mean is not None and
+              abs(mean - previous_mean) > self._dc_step):
+            self._add(AnomalyKind.DC_STEP,
+                      [(start + window_start, start + window_start)])
+          previous_mean = mean
+      self.progress = float(start + len(chunk)) / number_of_samples
+
+    self._add(AnomalyKind.CLIPPING, clipped.finish(number_of_samples))
+    self._add(AnomalyKind.SILENCE, silent.finish(number_of_samples))
+    self._add_dropouts(repeated.finish(number_of_samples))
+    if self.block_summary:
+      self.block_summary.finish()
+    self.progress = 1.0
+    self.done = True
+    logging.info('Found %r anomalies', len(self.anomalies))
+
+
+  def _add(self, kind, runs):
+    """Adds anomalies.
+
+    @param kind: A kind defined in AnomalyKind.
+    @param runs: A list of (start, stop).
+
+    """
+    for start, stop in runs:
+      self.anomalies.append(Anomaly(kind, start, stop))
+
+
+  def _add_dropouts(self, runs):
+    """Adds runs of identical samples which are not clipped or silent.
+
+    @param runs: A list of (start, stop) in the mask of repeated samples.
+
+    """
+    low, high = self._data_range
+    dropouts = []
+    for start, stop in runs:
+      # The run of identical samples starts one sample earlier.
+      start = max(0, start - 1)
+      value = self._samples[start]
+      if low < value < high and abs(value) > self._silence_threshold:
+        dropouts.append((start, stop))
+    self._add(AnomalyKind.DROPOUT, dropouts)
+
+
+  def get_counts(self):
+    """Counts the anomalies found so far.
+
+    @returns: A dict from kind to number of anomalies.
+    """
+    counts = dict((kind, 0) for kind in MARKS)
+    for anomaly in list(self.anomalies):
+      counts[anomaly.kind] += 1
+    return counts
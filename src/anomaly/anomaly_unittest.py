@@ -0,0 +1,155 @@
+#!/usr/bin/python
+"""Unit tests for anomaly."""
+
+from __future__ import absolute_import
+
+import array
+import itertools
+import random
+import time
+import unittest
+
+from anomaly import anomaly
+
+
+_DATA_RANGE = (-32768, 32767)
+_SAMPLING_RATE = 1000
+
+
+class _SmallChunkScanner(anomaly.AnomalyScanner):
+  """An AnomalyScanner with short chunks, so runs cross chunks."""
+  _CHUNK_LENGTH = 250
+
+
+def _make_samples():
+  """Makes noise with runs of each kind of anomaly.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(1)
+  samples = array.array('h', (generator.randint(-2000, 2000)
+                              for _ in xrange(5000)))
+  for start, length, value in (
+      # Clipped runs, also across chunks of 200 samples.
+      (50, 2, 32767), (198, 3, -32768), (395, 10, 32767), (600, 40, 32767),
+      # Silent runs.
+      (1000, 150, 0), (1390, 250, 3), (4800, 200, -1),
+      # Dropouts.
+      (2000, 30, 1000), (2190, 31, -1500), (2500, 100, 1500),
+      # DC steps.
+      (3000, 500, 8000)):
+    samples[start:start + length] = array.array('h', [value] * length)
+  return samples
+
+
+def _find_runs(mask, min_length):
+  """Finds runs of True one by one.
+
+  @param mask: A list of booleans.
+  @param min_length: The minimum length of a run.
+
+  @returns: A list of (start, stop) of runs.
+  """
+  runs = []
+  index = 0
+  for value, group in itertools.groupby(mask):
+    length = len(list(group))
+    if value and length >= min_length:
+      runs.append((index, index + length))
+    index += length
+  return runs
+
+
+def _scan(samples, options):
+  """Finds anomalies sample by sample.
+
+  @param samples: A sequence of samples.
+  @param options: An anomaly.AnomalyOptions object.
+
+  @returns: A sorted list of (kind, start, stop).
+  """
+  low, high = _DATA_RANGE
+  threshold = int(high * 10 ** (options.silence_threshold_db / 20))
+  min_silence = int(options.min_silence_ms * _SAMPLING_RATE / 1000)
+  found = []
+  for start, stop in _find_runs([not low < value < high
+                                 for value in samples],
+                                options.min_clipped_run):
+    found.append((anomaly.AnomalyKind.CLIPPING, start, stop))
+  for start, stop in _find_runs([abs(value) <= threshold
+                                 for value in samples], min_silence):
+    found.append((anomaly.AnomalyKind.SILENCE, start, stop))
+  index = 0
+  for value, group in itertools.groupby(samples):
+    length = len(list(group))
+    if (length >= options.min_dropout_run and low < value < high and
+        abs(value) > threshold):
+      found.append((anomaly.AnomalyKind.DROPOUT, index, index + length))
+    index += length
+  window = int(options.dc_window_ms * _SAMPLING_RATE / 1000)
+  means = [float(sum(samples[start:start + window])) /
+           len(samples[start:start + window])
+           for start in xrange(0, len(samples), window)]
+  for index in xrange(1, len(means)):
+    if abs(means[index] - means[index - 1]) > options.dc_step_ratio * high:
+      found.append((anomaly.AnomalyKind.DC_STEP, index * window,
+                    index * window))
+  return sorted(found)
+
+
+class AnomalyScannerTest(unittest.TestCase):
+  """Compares AnomalyScanner with a scan sample by sample."""
+
+  def setUp(self):
+    self.samples = _make_samples()
+    self.options = anomaly.AnomalyOptions(dc_window_ms=100.0)
+
+
+  def test_scan(self):
+    """Tests runs in and across chunks of all kinds of anomalies."""
+    scanner = _SmallChunkScanner(self.samples, _DATA_RANGE, _SAMPLING_RATE,
+                                 self.options)
+    scanner.scan()
+    self.assertTrue(scanner.done)
+    self.assertEqual(scanner.progress, 1.0)
+    found = sorted((item.kind, item.start, item.stop)
+                   for item in scanner.anomalies)
+    self.assertEqual(found, _scan(self.samples, self.options))
+    # The clipped run at 600 and the dropout at 2500 also move the means of
+    # their windows.
+    self.assertEqual(scanner.get_counts(), {
+        anomaly.AnomalyKind.CLIPPING: 3,
+        anomaly.AnomalyKind.SILENCE: 2,
+        anomaly.AnomalyKind.DROPOUT: 2,
+        anomaly.AnomalyKind.DC_STEP: 6,
+    })
+
+
+  def test_chunk_length(self):
+    """Tests the result does not depend on the chunk length."""
+    results = []
+    for scanner_class in (anomaly.AnomalyScanner, _SmallChunkScanner):
+      scanner = scanner_class(self.samples, _DATA_RANGE, _SAMPLING_RATE,
+                              self.options)
+      scanner.scan()
+      results.append(sorted((item.kind, item.start, item.stop)
+                            for item in scanner.anomalies))
+    self.assertEqual(results[0], results[1])
+
+
+  def test_thread(self):
+    """Tests scanning in a background thread."""
+    scanner = anomaly.AnomalyScanner(self.samples, _DATA_RANGE,
+                                     _SAMPLING_RATE, self.options)
+    scanner.start()
+    deadline = time.time() + 10
+    while not scanner.done and time.time() < deadline:
+      time.sleep(0.01)
+    scanner.stop()
+    self.assertTrue(scanner.done)
+    self.assertEqual(set(item.mark for item in scanner.anomalies),
+                     set('CDSX'))
+
+
+if __name__ == '__main__':
+  unittest.main()
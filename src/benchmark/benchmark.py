@@ -0,0 +1,296 @@
+"""Benchmark the hot paths of the wave view pipeline.
+
+The pipeline is benchmarked stage by stage on synthetic signals:
+
+  decode:       RawData._read_binary decodes raw data into samples.
+  waveform:     Waveform.__init__ and down-sampling one view of subsamples.
+  draw_view:    WaveView.draw_view rasterizes subsamples into view content.
+  draw_content: WaveViewDisplay._draw_content draws view content into a
+                FakeWindow, alternating two views one column apart as in
+                scrolling.
+
+Each stage runs in a forked process after its setup, so the time and the
+peak memory of a stage are measured without the cost of its setup.
+"""
+
+import json
+import logging
+import multiprocessing
+import resource
+import time
+
+from data import data
+from screen import fake_window
+from screen import wave_view_display
+from signals import signals
+from waveform import waveform
+from waveview import waveview
+
+
+# Signal durations in seconds.
+SIZES = {
+    'short': 10,
+    'medium': 600,
+    'long': 3600,
+}
+
+# Number of view positions drawn in one run of draw_view.
+_DRAW_VIEW_POSITIONS = 16
+
+
+class BenchmarkOptions(object): # pylint:disable=R0903
+  """Options of a benchmark."""
+  def __init__(self, width=200, height=51, time_scale=1.0, repeat=5,
+               rate=48000):
+    """Creates a BenchmarkOptions.
+
+    @param width: The width of the wave view.
+    @param height: The height of the wave view. It should be an odd number.
+    @param time_scale: The time scale of the wave view.
+    @param repeat: Number of runs of each stage.
+    @param rate: The sampling rate of signals.
+
+    """
+    self.width = width
+    self.height = height
+    self.time_scale = time_scale
+    self.repeat = repeat
+    self.rate = rate
+    self.data_format = data.DataFormat(
+        num_channels=1, length_bits=16, sampling_rate=rate)
+
+
+def _decode(binary, options):
+  """Decodes binary into one channel raw data."""
+  return data.OneChannelRawData(data.RawData(binary, options.data_format), 0)
+
+
+def _create_wave(one_channel_raw_data, options):
+  """Creates a Waveform at the time scale of options."""
+  sample_length = min(int(options.time_scale * options.width),
+                      len(one_channel_raw_data.samples))
+  return waveform.Waveform(one_channel_raw_data, sample_length,
+                           options.height)
+
+
+def _setup_decode(binary, options):
+  """Sets up decode stage."""
+  return binary, options
+
+
+def _run_decode(state):
+  """Runs decode stage."""
+  binary, options = state
+  return data.RawData(binary, options.data_format)
+
+
+def _setup_waveform(binary, options):
+  """Sets up waveform stage."""
+  return _decode(binary, options), options
+
+
+def _run_waveform(state):
+  """Runs waveform stage."""
+  one_channel_raw_data, options = state
+  wave = _create_wave(one_channel_raw_data, options)
+  wave_samples = wave.wave_samples
+  return [wave_samples[index] for index in xrange(options.width)]
+
+
+def _setup_draw_view(binary, options):
+  """Sets up draw_view stage."""
+  wave = _create_wave(_decode(binary, options), options)
+  view = waveview.WaveView(wave.wave_samples, options.width, options.height)
+  last_x = max(1, len(wave.wave_samples) - options.width)
+  positions = [last_x * index / _DRAW_VIEW_POSITIONS
+               for index in xrange(_DRAW_VIEW_POSITIONS)]
+  return view, positions
+
+
+def _run_draw_view(state):
+  """Runs draw_view stage."""
+  view, positions = state
+  for start_x in positions:
+    view.draw_view(start_x, 0)
+
+
+def _setup_draw_content(binary, options):
+  """Sets up draw_content stage."""
+  # Add 1 row and 1 column which WaveViewDisplay does not use.
+  window = fake_window.FakeWindow(options.height + 1, options.width + 1)
+  one_channel_raw_data = _decode(binary, options)
+  display = wave_view_display.WaveViewDisplay(window, [one_channel_raw_data])
+  display.init_display()
+  wave = _create_wave(one_channel_raw_data, options)
+  contents = []
+  for start_x in (0, 1):
+    view = waveview.WaveView(wave.wave_samples, options.width,
+                             options.height)
+    view.draw_view(start_x, 0)
+    contents.append(view.get_view())
+  return display, contents
+
+
+def _run_draw_content(state):
+  """Runs draw_content stage."""
+  display, contents = state
+  # Swap the contents so every run draws the changed rows.
+  contents.reverse()
+  display._draw_content(contents[0]) # pylint:disable=W0212
+
+
+# Stages in pipeline order. Each one is (name, setup, run).
+STAGES = [
+    ('decode', _setup_decode, _run_decode),
+    ('waveform', _setup_waveform, _run_waveform),
+    ('draw_view', _setup_draw_view, _run_draw_view),
+    ('draw_content', _setup_draw_content, _run_draw_content),
+]
+
+
+def _get_max_rss():
+  """Gets the peak resident memory of this process in KB."""
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(run, state, repeat, queue):
+  """Measures a stage. This runs in a forked process.
+
+  A forked process starts with its peak memory at the current memory, so
+  the increase of peak memory is the peak memory used by the stage.
+
+  @param run: The run function of the stage.
+  @param state: The state returned by the setup function of the stage.
+  @param repeat: Number of runs.
+  @param queue: A multiprocessing.Queue to put the result into.
+
+  """
+  max_rss_before = _get_max_rss()
+  times = []
+  for _ in xrange(repeat):
+    start = time.time()
+    run(state)
+    times.append(time.time() - start)
+  queue.put({
+      'best_secs': min(times),
+      'mean_secs': sum(times) / len(times),
+      'peak_memory_kb': _get_max_rss() - max_rss_before,
+  })
+
+
+def measure_stage(stage, binary, options):
+  """Measures a stage in a forked process.
+
+  @param stage: A tuple (name, setup, run) in STAGES.
+  @param binary: A string containing raw data.
+  @param options: A BenchmarkOptions object.
+
+  @returns: A dict containing best and mean time in seconds and peak memory
+            in KB.
+  """
+  _, setup, run = stage
+  state = setup(binary, options)
+  queue = multiprocessing.Queue()
+  process = multiprocessing.Process(
+      target=_measure, args=(run, state, options.repeat, queue))
+  process.start()
+  result = queue.get()
+  process.join()
+  return result
+
+
+def get_key(stage_name, signal_name, size_name):
+  """Gets the key of a result in a report and a baseline."""
+  return '%s/%s/%s' % (stage_name, signal_name, size_name)
+
+
+def run_benchmark(signal_names, size_names, stage_names, options):
+  """Runs benchmark.
+
+  @param signal_names: A list of signal names in signals.SIGNALS.
+  @param size_names: A list of size names in SIZES.
+  @param stage_names: A list of stage names in STAGES.
+  @param options: A BenchmarkOptions object.
+
+  @returns: A dict mapping key from get_key to the result of
+            measure_stage.
+  """
+  report = {}
+  for signal_name in signal_names:
+    for size_name in size_names:
+      samples = signals.SIGNALS[signal_name](SIZES[size_name], options.rate)
+      binary = signals.to_binary(samples)
+      del samples
+      for stage in STAGES:
+        if stage[0] not in stage_names:
+          continue
+        key = get_key(stage[0], signal_name, size_name)
+        logging.info('Benchmark %s', key)
+        report[key] = measure_stage(stage, binary, options)
+  return report
+
+
+def compare(report, baseline, threshold):
+  """Compares a report with a baseline.
+
+  @param report: A dict returned by run_benchmark.
+  @param baseline: A dict returned by run_benchmark earlier.
+  @param threshold: A result is a regression if its best time is larger
+                    than threshold times the best time in baseline.
+
+  @returns: A dict mapping key to the ratio of best time to baseline, and
+            a list of keys of regressions.
+  """
+  ratios = {}
+  regressions = []
+  for key, result in report.iteritems():
+    if key not in baseline or not baseline[key]['best_secs']:
+      continue
+    ratio = result['best_secs'] / baseline[key]['best_secs']
+    ratios[key] = ratio
+    if ratio > threshold:
+      regressions.append(key)
+  return ratios, sorted(regressions)
+
+
+def format_report(report, ratios=None):
+  """Formats a report into lines of text.
+
+  @param report: A dict returned by run_benchmark.
+  @param ratios: A dict returned by compare.
+
+  @returns: A list of strings.
+  """
+  ratios = ratios or {}
+  lines = ['%-34s %12s %12s %12s %10s' % (
+      'stage/signal/size', 'best (ms)', 'mean (ms)', 'peak (KB)',
+      'baseline')]
+  for key in sorted(report):
+    result = report[key]
+    ratio = ratios.get(key)
+    lines.append('%-34s %12.3f %12.3f %12d %10s' % (
+        key, result['best_secs'] * 1000, result['mean_secs'] * 1000,
+        result['peak_memory_kb'],
+        '%.2fx' % ratio if ratio is not None else '-'))
+  return lines
+
+
+def load_baseline(path):
+  """Loads a baseline saved by save_baseline.
+
+  @param path: The path to the baseline file.
+
+  @returns: A dict returned by run_benchmark.
+  """
+  with open(path) as handle:
+    return json.load(handle)
+
+
+def save_baseline(report, path):
+  """Saves a report as a baseline.
+
+  @param report: A dict returned by run_benchmark.
+  @param path: The path to the baseline file.
+  """
+  with open(path, 'w') as handle:
+    json.dump(report, handle, indent=2, sort_keys=True)
@@ -0,0 +1,278 @@
+"""Measure the delay between two signals by cross-correlation."""
+
+import cmath
+import itertools
+import logging
+import math
+import operator
+
+from tracing import tracing
+
+
+class CorrelationError(Exception):
+  """Error in correlation."""
+  pass
+
+
+def get_next_power_of_two(number):
+  """Gets the smallest power of two not less than a number.
+
+  @param number: A positive integer.
+
+  @returns: A power of two.
+  """
+  return 1 << max(0, number - 1).bit_length()
+
+
+def fft(values, inverse=False):
+  """Computes the discrete Fourier transform by radix-2 FFT.
+
+  Each stage of butterflies is done by slices and builtin map. A stage with
+  many small groups processes the same butterfly of all groups in one
+  strided slice, and a stage with few large groups processes a group in one
+  slice, so the Python-level loop of a stage is at most sqrt(n) long.
+
+  @param values: A list of complex numbers. The length is a power of two.
+  @param inverse: True to compute the inverse transform.
+
+  @returns: A list of complex numbers.
+
+  @raises: CorrelationError if the length is not a power of two.
+  """
+  length = len(values)
+  if length & (length - 1):
+    raise CorrelationError('Length %r is not a power of two' % length)
+  bits = length.bit_length() - 1
+  reversed_indices = [0] * length
+  for index in xrange(1, length):
+    reversed_indices[index] = ((reversed_indices[index >> 1] >> 1) |
+                               ((index & 1) << (bits - 1)))
+  result = [complex(values[index]) for index in reversed_indices]
+
+  sign = 1 if inverse else -1
+  # Builtin map runs the butterflies several times faster than a list
+  # comprehension.
+  # pylint:disable=W0141
+  size = 2
+  while size <= length:
+    half = size >> 1
+    twiddles = [cmath.exp(sign * 2j * math.pi * index / size)
+                for index in xrange(half)]
+    if half < length / size:
+      for index in xrange(half):
+        low = result[index::size]
+        high = map(twiddles[index].__mul__, result[index + half::size])
+        result[index::size] = map(operator.add, low, high)
+        result[index + half::size] = map(operator.sub, low, high)
+    else:
+      for start in xrange(0, length, size):
+        low = result[start:start + half]
+        high = map(operator.mul, twiddles, result[start + half:start + size])
+        result[start:start + half] = map(operator.add, low, high)
+        result[start + half:start + size] = map(operator.sub, low, high)
+    size <<= 1
+
+  if inverse:
+    result = [value / length for value in result]
+  return result
+
+
+class CorrelationResult(object): # pylint:disable=R0903
+  """The result of cross-correlation.
+
+  @property lag: The lag in samples. A positive lag means the second signal
+                 is delayed, that is, second[i + lag] matches first[i]. None
+                 if no lag matches.
+  @property coefficient: The normalized correlation at the lag, from -1 to
+                         1. A negative value means inverted polarity. It is
+                         the best one if no lag matches.
+  @property sampling_rate: The sampling rate.
+  """
+  def __init__(self, lag, coefficient, sampling_rate):
+    self.lag = lag
+    self.coefficient = coefficient
+    self.sampling_rate = sampling_rate
+
+
+  @property
+  def delay_ms(self):
+    """The lag in milliseconds. None if no lag matches."""
+    if self.lag is None:
+      return None
+    return 1000.0 * self.lag / self.sampling_rate
+
+
+  def __str__(self):
+    if self.lag is None:
+      return 'No match, best correlation %.3f' % self.coefficient
+    return 'Lag %d samples (%.3f ms), correlation %.3f' % (
+        self.lag, self.delay_ms, self.coefficient)
+
+
+def _remove_mean(samples):
+  """Converts samples to floats with zero mean.
+
+  @param samples: A sequence of samples.
+
+  @returns: A list of floats.
+  """
+  if not samples:
+    return []
+  mean = float(sum(samples)) / len(samples)
+  return [sample - mean for sample in samples]
+
+
+def _get_energy(samples, start, stop, chunk_length):
+  """Computes the energy of samples with the mean of each chunk removed.
+
+  @param samples: A sequence of samples.
+  @param start: The first sample index. It can be negative.
+  @param stop: The sample index after the range.
+  @param chunk_length: Number of samples in a chunk.
+
+  @returns: The sum of squares.
+  """
+  energy = 0.0
+  for chunk_start in xrange(start, stop, chunk_length):
+    chunk = _remove_mean(samples[max(0, chunk_start):
+                                 max(0, min(chunk_start + chunk_length, stop))])
+    energy += sum(itertools.imap(operator.mul, chunk, chunk))
+  return energy
+
+
+def cross_correlate(first, second, sampling_rate, max_lag, start=0,
+                    stop=None, min_coefficient=0.2):
+  """Finds the lag of the best match of two signals.
+
+  The range of first is split into chunks. For a chunk, the matching range
+  of second extended by max_lag at both sides is correlated by FFT, and the
+  cross spectra of all chunks are summed, so one inverse FFT gives the
+  correlation of the full range. The FFT size depends only on max_lag, so
+  the time is linear in the length of the range and memory is constant.
+
+  Both signals are packed in one complex FFT as real and imaginary parts.
+
+  @param first: A sequence of samples, e.g. array.array.
+  @param second: A sequence of samples.
+  @param sampling_rate: The sampling rate of both signals.
+  @param max_lag: The maximum lag to search in samples.
+  @param start: The first sample index of the range in first.
+  @param stop: The sample index after the range. Default is the end of
+               first.
+  @param min_coefficient: The least absolute coefficient of a match. The
+                          best lag of a constant signal or of uncorrelated
+                          signals is arbitrary, so it is not reported.
+
+  @returns: A CorrelationResult object. Its lag is None if no lag matches.
+
+  @raises: CorrelationError if the range is empty.
+  """
+  stop = len(first) if stop is None else min(stop, len(first))
+  if start >= stop:
+    raise CorrelationError('Empty range [%r, %r)' % (start, stop))
+  fft_length = get_next_power_of_two(4 * max_lag + 1)
+  chunk_length = fft_length - 2 * max_lag
+  logging.debug('Correlate [%r, %r) with FFT length %r', start, stop,
+                fft_length)
+
+  with tracing.span('correlate'):
+    spectrum = [0j] * fft_length
+    for chunk_start in xrange(start, stop, chunk_length):
+      chunk = _remove_mean(
+          first[chunk_start:min(chunk_start + chunk_length, stop)])
+      # The range of second which can match the chunk with a lag.
+      window_start = chunk_start - max_lag
+      window = second[max(0, window_start):
+                      chunk_start + len(chunk) + max_lag]
+      window = ([0] * max(0, -window_start) +
+                _remove_mean(window))
+
+      padding = [0.0] * (fft_length - len(chunk))
+      transformed = fft([complex(real, imaginary) for real, imaginary in zip(
+          chunk + padding, window + padding[:fft_length - len(window)])])
+      # Separate the spectra of the real and imaginary parts.
+      mirrored = [transformed[0].conjugate()] + [
+          value.conjugate() for value in transformed[:0:-1]]
+      # conj(X) * Y, where X = (Z + Z*') / 2 and Y = (Z - Z*') / 2j.
+      spectrum = [total + (value + mirror).conjugate() * (value - mirror) *
+                  -0.25j
+                  for total, value, mirror in zip(spectrum, transformed,
+                                                  mirrored)]
+
+    # Index max_lag + lag is the correlation at lag.
+    correlation = fft(spectrum, inverse=True)[:2 * max_lag + 1]
+    best_index = max(xrange(len(correlation)),
+                     key=lambda index: abs(correlation[index].real))
+
+    lag = best_index - max_lag
+    norm = math.sqrt(
+        _get_energy(first, start, stop, chunk_length) *
+        _get_energy(second, start + lag, stop + lag, chunk_length))
+  coefficient = correlation[best_index].real / norm if norm else 0.0
+  if abs(coefficient) < min_coefficient:
+    logging.debug('No match, best lag %r correlation %r', lag, coefficient)
+    lag = None
+  return CorrelationResult(lag, coefficient, sampling_rate)
+
+
+class AlignedSamples(object):
+  """Samples of a signal shifted by a lag, computed lazily.
+
+  Sample i is samples[i + lag]. Samples before the start of the signal are
+  0, so a negative lag pads the start.
+  """
+  def __init__(self, samples, lag):
+    """Creates an AlignedSamples.
+
+    @param samples: A sequence of samples.
+    @param lag: The lag in samples to remove.
+
+    """
+    self._samples = samples
+    self._lag = lag
+    self._length = max(0, len(samples) - lag)
+
+
+  def __len__(self):
+    return self._length
+
+
+  def __getitem__(self, key):
+    """Gets a sample or a sequence of samples in a slice."""
+    if isinstance(key, slice):
+      start, stop, step = key.indices(self._length)
+      if step < 0:
+        return list(self[stop + 1:start + 1])[::-1][::-step]
+      # Number of selected samples before the start of the signal.
+      padding = len(xrange(start, min(stop, -self._lag), step))
+      start += padding * step
+      samples = self._samples[start + self._lag:stop + self._lag:step]
+      if not padding:
+        return samples
+      return [0] * padding + list(samples)
+    if key < 0:
+      key += self._length
+    if not 0 <= key < self._length:
+      raise IndexError('Sample index %r out of range' % key)
+    return self._samples[key + self._lag] if key + self._lag >= 0 else 0
+
+
+class AlignedChannel(object): # pylint:disable=R0903
+  """A 1-channel raw data shifted by a lag.
+
+  It has the same properties as data.OneChannelRawData so it can be shown as
+  a trace.
+  """
+  def __init__(self, one_channel_raw_data, lag):
+    """Creates an AlignedChannel.
+
+    @param one_channel_raw_data: A data.OneChannelRawData object.
+    @param lag: The lag in samples to remove.
+
+    """
+    self.original = one_channel_raw_data
+    self.lag = lag
+    self.name = '%s%+d' % (one_channel_raw_data.name, -lag)
+    self.samples = AlignedSamples(one_channel_raw_data.samples, lag)
+    self.sampling_rate = one_channel_raw_data.sampling_rate
+    self.data_range = one_channel_raw_data.data_range
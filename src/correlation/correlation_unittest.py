@@ -0,0 +1,91 @@
+#!/usr/bin/python
+"""Unit tests for correlation."""
+
+from __future__ import absolute_import
+
+import array
+import cmath
+import random
+import unittest
+
+from correlation import correlation
+
+
+def _make_noise(seed, length, amplitude=10000):
+  """Makes uniform noise.
+
+  @param seed: The seed of random numbers.
+  @param length: The number of samples.
+  @param amplitude: The largest absolute value.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(seed)
+  return array.array('h', (generator.randint(-amplitude, amplitude)
+                           for _ in xrange(length)))
+
+
+class FftTest(unittest.TestCase):
+  """Compares fft with the definition of the discrete Fourier transform."""
+
+  def test_fft(self):
+    """Tests forward and inverse transforms."""
+    generator = random.Random(1)
+    for length in (1, 2, 8, 64, 256):
+      values = [complex(generator.random(), generator.random())
+                for _ in xrange(length)]
+      expected = [sum(value * cmath.exp(-2j * cmath.pi * k * n / length)
+                      for n, value in enumerate(values))
+                  for k in xrange(length)]
+      transformed = correlation.fft(values)
+      for result, value in zip(transformed, expected):
+        self.assertAlmostEqual(result, value, delta=1e-9 * length)
+      for result, value in zip(correlation.fft(transformed, inverse=True),
+                               values):
+        self.assertAlmostEqual(result, value, delta=1e-9)
+    with self.assertRaises(correlation.CorrelationError):
+      correlation.fft([0j] * 3)
+
+
+class CrossCorrelateTest(unittest.TestCase):
+  """Tests cross_correlate finds known delays and reports no match."""
+
+  def setUp(self):
+    self.first = _make_noise(1, 20000)
+
+
+  def test_delays(self):
+    """Tests delayed and inverted copies with noise."""
+    noise = _make_noise(2, len(self.first), 3000)
+    for lag, sign in ((0, 1), (37, 1), (-120, 1), (5, -1)):
+      # second[i + lag] matches first[i].
+      second = array.array('h', [
+          sign * self.first[(index - lag) % len(self.first)] / 2 +
+          noise[index] for index in xrange(len(self.first))])
+      result = correlation.cross_correlate(self.first, second, 48000, 150,
+                                           1000, 15000)
+      self.assertEqual(result.lag, lag)
+      # The correlation of the copy with noise is 5 / sqrt(5 ** 2 + 3 ** 2).
+      self.assertGreater(sign * result.coefficient, 0.8)
+
+
+  def test_no_match(self):
+    """Tests constant and uncorrelated signals have no lag."""
+    for second in (array.array('h', [7] * 20000), _make_noise(3, 20000)):
+      result = correlation.cross_correlate(self.first, second, 48000, 10,
+                                           0, 5000)
+      self.assertIsNone(result.lag)
+      self.assertIsNone(result.delay_ms)
+      self.assertLess(abs(result.coefficient), 0.2)
+      self.assertTrue(str(result).startswith('No match'))
+
+
+  def test_empty_range(self):
+    """Tests an empty range raises CorrelationError."""
+    with self.assertRaises(correlation.CorrelationError):
+      correlation.cross_correlate(self.first, self.first, 48000, 10, 500,
+                                  500)
+
+
+if __name__ == '__main__':
+  unittest.main()
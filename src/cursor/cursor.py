@@ -0,0 +1,139 @@
+"""Read samples at a cursor and measure the samples between two markers."""
+
+from analysis import analysis
+from tracing import tracing
+
+
+class CursorError(Exception):
+  """Error in cursor."""
+  pass
+
+
+class Readout(object): # pylint:disable=R0903
+  """The raw sample at a sample index."""
+  def __init__(self, sample_index, seconds, value):
+    """Creates a Readout.
+
+    @param sample_index: The sample index.
+    @param seconds: The time of the sample.
+    @param value: The raw sample value.
+
+    """
+    self.sample_index = sample_index
+    self.seconds = seconds
+    self.value = value
+
+
+  def __str__(self):
+    return '%.6f s #%d = %d' % (self.seconds, self.sample_index, self.value)
+
+
+def read_sample(trace, sample_index):
+  """Reads a sample from the sample store of a trace.
+
+  Only the sample itself is read, so it takes constant time for any length
+  of data, and no waveform is computed.
+
+  @param trace: A data.OneChannelRawData object.
+  @param sample_index: The sample index.
+
+  @returns: A Readout.
+
+  @raises: CursorError if the sample is not in the trace.
+  """
+  if not 0 <= sample_index < len(trace.samples):
+    raise CursorError('Sample %r is not in %s' % (sample_index, trace.name))
+  return Readout(sample_index,
+                 float(sample_index) / trace.sampling_rate,
+                 trace.samples[sample_index])
+
+
+class Measurement(object):
+  """The difference between two markers and the statistics between them."""
+  def __init__(self, first, second, stats):
+    """Creates a Measurement.
+
+    @param first: The Readout at marker A.
+    @param second: The Readout at marker B.
+    @param stats: The result of analysis.ChannelStats of the samples
+                  between the markers, both included.
+
+    """
+    self.first = first
+    self.second = second
+    self.stats = stats
+
+
+  @property
+  def delta_seconds(self):
+    """The time from marker A to marker B."""
+    return self.second.seconds - self.first.seconds
+
+
+  @property
+  def delta_value(self):
+    """The value at marker B minus the value at marker A."""
+    return self.second.value - self.first.value
+
+
+  @property
+  def frequency(self):
+    """The frequency of a period from marker A to marker B. None if the
+    markers are at the same sample."""
+    if not self.delta_seconds:
+      return None
+    return 1.0 / abs(self.delta_seconds)
+
+
+  def get_delta_text(self):
+    """Gets a text of the difference between markers.
+
+    @returns: A string.
+    """
+    frequency = self.frequency
+    return 'dt %.3f ms dv %d f %s' % (
+        self.delta_seconds * 1000, self.delta_value,
+        '%.2f Hz' % frequency if frequency else '-')
+
+
+  def get_stats_text(self):
+    """Gets a text of the statistics between markers.
+
+    @returns: A string.
+    """
+    return ('A-B %d samples: min %d max %d mean %.2f rms %.2f '
+            'clipped %d' % (
+                self.stats['samples'], self.stats['min'],
+                self.stats['max'], self.stats['dc_offset'],
+                self.stats['rms'], self.stats['clipped_samples']))
+
+
+def measure(trace, first_index, second_index, chunk_length=65536):
+  """Measures the samples between two markers.
+
+  The samples between the markers are read chunk by chunk from the sample
+  store, and accumulated by analysis.ChannelStats.
+
+  @param trace: A data.OneChannelRawData object.
+  @param first_index: The sample index of marker A.
+  @param second_index: The sample index of marker B.
+  @param chunk_length: Number of samples read at a time.
+
+  @returns: A Measurement.
+
+  @raises: CursorError if a marker is not in the trace.
+  """
+  first = read_sample(trace, first_index)
+  second = read_sample(trace, second_index)
+  start = min(first_index, second_index)
+  stop = max(first_index, second_index) + 1
+  # Statistics do not depend on the silence threshold.
+  stats = analysis.ChannelStats(trace.data_range, 0)
+  with tracing.span('measure'):
+    for chunk_start in xrange(start, stop, chunk_length):
+      stats.add(trace.samples[chunk_start:min(stop,
+                                              chunk_start + chunk_length)])
+  result = stats.get_result()
+  result['min'] = stats.min_value
+  result['max'] = stats.max_value
+  return Measurement(first, second, result)
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+"""Unit tests for cursor."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import random
+import sys
+import unittest
+
+from cursor import cursor
+from data import data
+
+
+def _make_trace(length):
+  """Makes a trace of random samples with clipped samples.
+
+  @param length: The number of samples.
+
+  @returns: A data.OneChannelRawData object.
+  """
+  generator = random.Random(1)
+  samples = array.array('h', (
+      generator.choice((-32768, 32767)) if generator.random() < 0.01 else
+      generator.randint(-20000, 20000) for _ in xrange(length)))
+  if sys.byteorder == 'big':
+    samples.byteswap()
+  raw_data = data.RawData(samples.tostring(), data.DataFormat(1, 16, 8000))
+  return data.OneChannelRawData(raw_data, 0, 'noise')
+
+
+class ReadSampleTest(unittest.TestCase):
+  """Tests reading samples at a cursor."""
+
+  def test_read_sample(self):
+    """Tests the readout of samples in and out of the trace."""
+    trace = _make_trace(1000)
+    for index in (0, 1, 999):
+      readout = cursor.read_sample(trace, index)
+      self.assertEqual(readout.value, trace.samples[index])
+      self.assertEqual(readout.seconds, index / 8000.0)
+    self.assertEqual(str(cursor.read_sample(trace, 800)),
+                     '0.100000 s #800 = %d' % trace.samples[800])
+    for index in (-1, 1000):
+      with self.assertRaises(cursor.CursorError):
+        cursor.read_sample(trace, index)
+
+
+class MeasureTest(unittest.TestCase):
+  """Compares measure with statistics computed sample by sample."""
+
+  def setUp(self):
+    self.trace = _make_trace(10000)
+
+
+  def test_measure(self):
+    """Tests markers in both orders and chunks of different lengths."""
+    for first, second, chunk_length in ((100, 9000, 1000), (9000, 100, 7),
+                                        (5000, 5000, 65536),
+                                        (0, 9999, 65536)):
+      measurement = cursor.measure(self.trace, first, second, chunk_length)
+      samples = self.trace.samples[min(first, second):
+                                   max(first, second) + 1]
+      stats = measurement.stats
+      self.assertEqual(stats['samples'], len(samples))
+      self.assertEqual((stats['min'], stats['max']),
+                       (min(samples), max(samples)))
+      self.assertAlmostEqual(stats['dc_offset'],
+                             float(sum(samples)) / len(samples))
+      self.assertAlmostEqual(stats['rms'], math.sqrt(
+          float(sum(value * value for value in samples)) / len(samples)))
+      self.assertEqual(stats['clipped_samples'], len(
+          [value for value in samples if value in (-32768, 32767)]))
+      self.assertEqual(measurement.delta_value,
+                       self.trace.samples[second] - self.trace.samples[first])
+      self.assertAlmostEqual(measurement.delta_seconds,
+                             (second - first) / 8000.0)
+
+
+  def test_texts(self):
+    """Tests the texts of the difference and the statistics."""
+    measurement = cursor.measure(self.trace, 100, 180)
+    self.assertTrue(measurement.get_delta_text().startswith('dt 10.000 ms'))
+    self.assertTrue(measurement.get_delta_text().endswith('f 100.00 Hz'))
+    self.assertTrue(
+        measurement.get_stats_text().startswith('A-B 81 samples: min '))
+    measurement = cursor.measure(self.trace, 100, 100)
+    self.assertIsNone(measurement.frequency)
+    self.assertTrue(measurement.get_delta_text().endswith('dv 0 f -'))
+    with self.assertRaises(cursor.CursorError):
+      cursor.measure(self.trace, 0, 10000)
+
+
+if __name__ == '__main__':
+  unittest.main()
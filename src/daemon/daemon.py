@@ -0,0 +1,406 @@
+"""Share decoded samples of files between viewers through a local daemon.
+
+The daemon decodes each file once into one file per channel in shared
+memory, e.g. /dev/shm, and keeps a summary.BlockSummary of each channel.
+Viewers map the channel files read-only, so the samples are in memory only
+once however many viewers show them, and ask the daemon for envelopes over
+a Unix socket.
+
+Requests and responses are JSON objects, one per line:
+
+  {"request": "open", "path": PATH, "channels": N, "bits": B, "rate": R}
+  -> {"key": KEY, "length": SAMPLES, "files": [PATH OF CHANNEL, ...]}
+
+  {"request": "envelope", "key": KEY, "channel": C, "start": S, "stop": E,
+   "width": W, "height": H}
+  -> {"envelope": [[MIN, MAX], ...]}
+
+height is optional. With height, MIN and MAX are rows from 0 at the
+minimum of the data range to height - 1 at the maximum.
+
+A failed request gets {"error": MESSAGE}.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import socket
+import SocketServer
+import sys
+import tempfile
+import threading
+
+from data import data
+from summary import summary
+from tracing import tracing
+
+
+class DaemonError(Exception):
+  """Error in daemon."""
+  pass
+
+
+def get_shm_dir():
+  """Gets the directory of shared memory files.
+
+  @returns: /dev/shm if it exists, otherwise the temporary directory.
+  """
+  if os.path.isdir('/dev/shm'):
+    return '/dev/shm'
+  return tempfile.gettempdir()
+
+
+def _map_channel_file(path, data_format):
+  """Maps a channel file of the daemon read-only.
+
+  @param path: The path to the channel file.
+  @param data_format: The DataFormat of the input file.
+
+  @returns: A data.MappedRawData object with one channel.
+  """
+  with open(path, 'rb') as handle:
+    mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+  return data.MappedRawData(
+      mapped, data.DataFormat(1, data_format.length_bits,
+                              data_format.sampling_rate))
+
+
+class _Dataset(object): # pylint:disable=R0903
+  """The decoded channels of a file and their summaries in the daemon."""
+  def __init__(self, path, data_format, key, shm_dir, chunk_frames):
+    """Decodes a file into channel files, or reuses existing ones.
+
+    Channel files are written to temporary names and renamed when they are
+    complete, so a complete file of the same key is reused.
+
+    @param path: The path to the raw data file.
+    @param data_format: A data.DataFormat object.
+    @param key: The key of the file and its format.
+    @param shm_dir: The directory of channel files.
+    @param chunk_frames: Number of samples per channel decoded at a time.
+
+    """
+    self.key = key
+    self.data_range = data_format.data_range
+    self.files = [os.path.join(shm_dir, 'wave_view-%s-%d' % (key, channel))
+                  for channel in xrange(data_format.num_channels)]
+    sample_size = data_format.length_bits >> 3
+    expected_size = (os.path.getsize(path) / data_format.frame_size *
+                     sample_size)
+    if not all(os.path.isfile(name) and
+               os.path.getsize(name) == expected_size
+               for name in self.files):
+      self._decode(path, data_format, chunk_frames)
+    self.channels = [_map_channel_file(name, data_format).channel_data[0]
+                     for name in self.files]
+    self.length = len(self.channels[0])
+    with tracing.span('summary'):
+      self.summaries = [summary.BlockSummary(channel)
+                        for channel in self.channels]
+    logging.info('Serving %r as %r with %r samples', path, key, self.length)
+
+
+  def _decode(self, path, data_format, chunk_frames):
+    """Decodes a file into channel files.
+
+    @param path: The path to the raw data file.
+    @param data_format: A data.DataFormat object.
+    @param chunk_frames: Number of samples per channel decoded at a time.
+
+    """
+    temporary_files = ['%s.%d.tmp' % (name, os.getpid())
+                       for name in self.files]
+    handles = [open(name, 'wb') for name in temporary_files]
+    try:
+      for channels in data.read_chunks(path, data_format, chunk_frames):
+        for handle, samples in zip(handles, channels):
+          # Channel files are little endian like raw data files.
+          if sys.byteorder == 'big':
+            samples.byteswap()
+          samples.tofile(handle)
+    finally:
+      for handle in handles:
+        handle.close()
+    for temporary_name, name in zip(temporary_files, self.files):
+      os.rename(temporary_name, name)
+
+
+  def get_envelope(self, channel, start, stop, width, height=None):
+    """Gets the minimum and maximum of samples in columns.
+
+    @param channel: The index of the channel.
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+    @param width: The number of columns.
+    @param height: The number of rows to quantize values to, or None.
+
+    @returns: A list of (minimum, maximum) of each column. It is None for a
+              column without samples.
+    """
+    envelope = summary.get_envelope(self.channels[channel], start, stop,
+                                    width, self.summaries[channel])
+    if height:
+      low, high = self.data_range
+      span = high - low + 1
+      envelope = [values and tuple((value - low) * height / span
+                                   for value in values)
+                  for values in envelope]
+    return envelope
+
+
+class Daemon(object):
+  """Serves decoded samples of files to viewers over a Unix socket.
+
+  Each client connection is handled in a thread. A file is decoded by the
+  first client which opens it, and the other clients of the same file wait
+  for it and share the result.
+  """
+  def __init__(self, socket_path, shm_dir=None, chunk_frames=1 << 20):
+    """Creates a Daemon listening on a Unix socket.
+
+    @param socket_path: The path of the Unix socket.
+    @param shm_dir: The directory of channel files. Default is get_shm_dir.
+    @param chunk_frames: Number of samples per channel decoded at a time.
+
+    @raises: DaemonError if another daemon is listening on the socket.
+    """
+    if os.path.exists(socket_path):
+      try:
+        DaemonClient(socket_path).close()
+      except socket.error:
+        os.unlink(socket_path)
+      else:
+        raise DaemonError('A daemon is listening on %r' % socket_path)
+    self._shm_dir = shm_dir or get_shm_dir()
+    self._chunk_frames = chunk_frames
+    # Datasets by key, and locks of keys being opened.
+    self._datasets = {}
+    self._opening = {}
+    self._lock = threading.Lock()
+    daemon = self
+
+    class Handler(SocketServer.StreamRequestHandler):
+      """Handles requests of a client connection."""
+      def handle(self):
+        for line in iter(self.rfile.readline, ''):
+          self.wfile.write(json.dumps(daemon.handle_request(line)) + '\n')
+          self.wfile.flush()
+
+    self._server = SocketServer.ThreadingUnixStreamServer(socket_path,
+                                                          Handler)
+    self._server.daemon_threads = True
+    self._socket_path = socket_path
+
+
+  def serve_forever(self):
+    """Serves requests until shutdown is called from another thread."""
+    logging.info('Daemon listening on %r', self._socket_path)
+    self._server.serve_forever()
+
+
+  def shutdown(self):
+    """Stops serve_forever."""
+    self._server.shutdown()
+
+
+  def close(self):
+    """Closes the socket and removes the channel files.
+
+    Viewers which mapped the channel files can still read them.
+    """
+    self._server.server_close()
+    os.unlink(self._socket_path)
+    for dataset in self._datasets.itervalues():
+      for name in dataset.files:
+        os.unlink(name)
+
+
+  def handle_request(self, line):
+    """Handles a request.
+
+    @param line: A JSON object of the request.
+
+    @returns: An object of the response.
+    """
+    try:
+      request = json.loads(line)
+      kind = request.get('request')
+      if kind == 'open':
+        dataset = self._open(request['path'], data.DataFormat(
+            request['channels'], request['bits'], request['rate']))
+        return {'key': dataset.key, 'length': dataset.length,
+                'files': dataset.files}
+      if kind == 'envelope':
+        dataset = self._datasets.get(request['key'])
+        if dataset is None:
+          raise DaemonError('Unknown key %r' % request['key'])
+        envelope = dataset.get_envelope(
+            request['channel'], request['start'], request['stop'],
+            request['width'], request.get('height'))
+        return {'envelope': envelope}
+      raise DaemonError('Unknown request %r' % kind)
+    except (DaemonError, data.DataFormatError, KeyError, ValueError,
+            IndexError, TypeError, EnvironmentError) as error:
+      logging.warning('Request %r failed: %s', line, error)
+      return {'error': str(error)}
+
+
+  def _open(self, path, data_format):
+    """Gets the dataset of a file, decoding it if it is not opened yet.
+
+    @param path: The path to the raw data file.
+    @param data_format: A data.DataFormat object.
+
+    @returns: A _Dataset object.
+    """
+    path = os.path.realpath(path)
+    status = os.stat(path)
+    key = hashlib.sha1(repr((
+        path, status.st_size, status.st_mtime, data_format.num_channels,
+        data_format.length_bits))).hexdigest()[:16]
+    with self._lock:
+      if key in self._datasets:
+        return self._datasets[key]
+      opening = self._opening.setdefault(key, threading.Lock())
+    with opening:
+      with self._lock:
+        if key in self._datasets:
+          return self._datasets[key]
+      dataset = _Dataset(path, data_format, key, self._shm_dir,
+                         self._chunk_frames)
+      with self._lock:
+        self._datasets[key] = dataset
+        del self._opening[key]
+    return dataset
+
+
+class DaemonClient(object):
+  """A connection of a viewer to a Daemon."""
+  def __init__(self, socket_path):
+    """Connects to a daemon.
+
+    @param socket_path: The path of the Unix socket of the daemon.
+
+    @raises: socket.error if no daemon is listening.
+    """
+    self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._socket.connect(socket_path)
+    self._file = self._socket.makefile('r+b')
+    self._lock = threading.Lock()
+
+
+  def close(self):
+    """Closes the connection."""
+    self._file.close()
+    self._socket.close()
+
+
+  def _request(self, request):
+    """Sends a request and waits for the response.
+
+    @param request: An object of the request.
+
+    @returns: An object of the response.
+
+    @raises: DaemonError if the request failed.
+    """
+    with self._lock:
+      self._file.write(json.dumps(request) + '\n')
+      self._file.flush()
+      line = self._file.readline()
+    if not line:
+      raise DaemonError('Daemon closed the connection')
+    response = json.loads(line)
+    if 'error' in response:
+      raise DaemonError(response['error'])
+    return response
+
+
+  def open(self, path, data_format):
+    """Opens a file in the daemon and maps its channels.
+
+    @param path: The path to the raw data file.
+    @param data_format: A data.DataFormat object.
+
+    @returns: A tuple (key, raw_data). raw_data is a SharedRawData object.
+    """
+    response = self._request({
+        'request': 'open', 'path': path,
+        'channels': data_format.num_channels,
+        'bits': data_format.length_bits, 'rate': data_format.sampling_rate})
+    return response['key'], SharedRawData(response['files'], data_format)
+
+
+  def get_envelope(self, key, channel, start, stop, width, height=None):
+    """Gets the minimum and maximum of samples in columns.
+
+    @param key: The key of the file from open.
+    @param channel: The index of the channel.
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+    @param width: The number of columns.
+    @param height: The number of rows to quantize values to, or None.
+
+    @returns: A list of (minimum, maximum) of each column. It is None for a
+              column without samples.
+    """
+    envelope = self._request({
+        'request': 'envelope', 'key': key, 'channel': channel,
+        'start': start, 'stop': stop, 'width': width,
+        'height': height})['envelope']
+    return [tuple(values) if values else None for values in envelope]
+
+
+class SharedRawData(object): # pylint:disable=R0903
+  """The abstraction of raw data decoded by a daemon.
+
+  It has the same properties as data.RawData, but channel_data is a list of
+  data.MappedChannel objects of the mapped channel files.
+  """
+  def __init__(self, files, data_format):
+    """Maps channel files of a daemon.
+
+    @param files: A list of paths to the channel files.
+    @param data_format: The data.DataFormat of the input file.
+    """
+    self.data_format = data_format
+    self.channel_data = [_map_channel_file(name, data_format).channel_data[0]
+                         for name in files]
+    self.num_of_samples = len(self.channel_data[0])
+
+
+class RemoteSummary(object): # pylint:disable=R0903
+  """The envelope of a channel in a daemon, for the overview.
+
+  It has get_envelope of summary.BlockSummary. Envelopes are cached by
+  size, since the overview gets the same one again to check for changes.
+  """
+  def __init__(self, client, key, channel):
+    """Creates a RemoteSummary.
+
+    @param client: A DaemonClient object.
+    @param key: The key of the file from DaemonClient.open.
+    @param channel: The index of the channel.
+
+    """
+    self._client = client
+    self._key = key
+    self._channel = channel
+    self._envelopes = {}
+
+
+  def get_envelope(self, number_of_samples, columns):
+    """Gets the minimum and maximum of equal parts of samples.
+
+    @param number_of_samples: The total number of samples.
+    @param columns: The number of parts.
+
+    @returns: A list of (minimum, maximum) of each part.
+    """
+    size = (number_of_samples, columns)
+    if size not in self._envelopes:
+      self._envelopes[size] = self._client.get_envelope(
+          self._key, self._channel, 0, number_of_samples, columns)
+    return self._envelopes[size]
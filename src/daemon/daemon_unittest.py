@@ -0,0 +1,169 @@
+#!/usr/bin/python
+"""Unit tests for daemon."""
+
+from __future__ import absolute_import
+
+import array
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from daemon import daemon
+from data import data
+
+
+_DATA_FORMAT = data.DataFormat(2, 16, 8000)
+
+
+def _get_envelope(samples, start, stop, width, height=None):
+  """Gets the minimum and maximum of samples in columns one by one.
+
+  @param samples: A sequence of samples.
+  @param start: The first sample index.
+  @param stop: The sample index after the range.
+  @param width: The number of columns.
+  @param height: The number of rows to quantize values to, or None.
+
+  @returns: A list of (minimum, maximum) of each column, or None.
+  """
+  stop = min(stop, len(samples))
+  envelope = []
+  for column in xrange(width):
+    values = samples[start + (stop - start) * column / width:
+                     start + (stop - start) * (column + 1) / width]
+    if not values:
+      envelope.append(None)
+    elif height:
+      envelope.append(tuple((value + 32768) * height / 65536
+                            for value in (min(values), max(values))))
+    else:
+      envelope.append((min(values), max(values)))
+  return envelope
+
+
+class DaemonTest(unittest.TestCase):
+  """Tests a daemon and its clients over a Unix socket."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.shm_dir = os.path.join(self.directory, 'shm')
+    os.mkdir(self.shm_dir)
+    self.socket_path = os.path.join(self.directory, 'socket')
+    self.path = os.path.join(self.directory, 'capture.raw')
+    generator = random.Random(1)
+    interleaved = array.array('h', (generator.randint(-32768, 32767)
+                                    for _ in xrange(2 * 100003)))
+    self.channels = data.deinterleave(interleaved, 2)
+    if sys.byteorder == 'big':
+      interleaved.byteswap()
+    with open(self.path, 'wb') as raw_file:
+      raw_file.write(interleaved.tostring())
+    self.daemon = None
+    self.thread = None
+    self._start_daemon()
+
+
+  def tearDown(self):
+    self._stop_daemon()
+    shutil.rmtree(self.directory)
+
+
+  def _start_daemon(self):
+    """Starts a daemon serving in a thread."""
+    self.daemon = daemon.Daemon(self.socket_path, shm_dir=self.shm_dir,
+                                chunk_frames=10000)
+    self.thread = threading.Thread(target=self.daemon.serve_forever)
+    self.thread.start()
+
+
+  def _stop_daemon(self):
+    """Stops the daemon and removes its socket and channel files."""
+    if self.daemon:
+      self.daemon.shutdown()
+      self.thread.join()
+      self.daemon.close()
+      self.daemon = None
+
+
+  def test_open(self):
+    """Tests clients share the decoded channels of a file."""
+    clients = [daemon.DaemonClient(self.socket_path) for _ in xrange(2)]
+    try:
+      opened = [client.open(self.path, _DATA_FORMAT) for client in clients]
+    finally:
+      for client in clients:
+        client.close()
+    self.assertEqual(opened[0][0], opened[1][0])
+    for _, raw_data in opened:
+      self.assertEqual(raw_data.num_of_samples, 100003)
+      for channel, expected in zip(raw_data.channel_data, self.channels):
+        self.assertEqual(list(channel[::997]), list(expected[::997]))
+        self.assertEqual(channel[-1], expected[-1])
+    self.assertEqual(len(os.listdir(self.shm_dir)), 2)
+
+
+  def test_envelope(self):
+    """Tests envelopes from the summaries against the samples."""
+    client = daemon.DaemonClient(self.socket_path)
+    try:
+      key, _ = client.open(self.path, _DATA_FORMAT)
+      for channel, start, stop, width, height in (
+          (0, 0, 100003, 80, None), (1, 12345, 67890, 7, None),
+          (1, 0, 100003, 100, 41), (0, 100000, 200000, 5, None)):
+        self.assertEqual(
+            client.get_envelope(key, channel, start, stop, width, height),
+            _get_envelope(self.channels[channel], start, stop, width,
+                          height))
+      remote = daemon.RemoteSummary(client, key, 1)
+      self.assertEqual(remote.get_envelope(100003, 10),
+                       _get_envelope(self.channels[1], 0, 100003, 10))
+      with self.assertRaises(daemon.DaemonError):
+        client.get_envelope('unknown', 0, 0, 10, 10)
+    finally:
+      client.close()
+
+
+  def test_invalid_requests(self):
+    """Tests invalid requests get errors."""
+    missing = os.path.join(self.directory, 'missing.raw')
+    for request in ('not json', '{"request": "unknown"}',
+                    '{"request": "open"}',
+                    json.dumps({'request': 'open', 'path': missing,
+                                'channels': 2, 'bits': 16, 'rate': 8000}),
+                    json.dumps({'request': 'open', 'path': self.path,
+                                'channels': 2, 'bits': 12, 'rate': 8000})):
+      self.assertIn('error', self.daemon.handle_request(request))
+
+
+  def test_restart(self):
+    """Tests a restarted daemon reuses the channel files."""
+    with self.assertRaises(daemon.DaemonError):
+      daemon.Daemon(self.socket_path, shm_dir=self.shm_dir)
+    key = self.daemon.handle_request(json.dumps({
+        'request': 'open', 'path': self.path, 'channels': 2, 'bits': 16,
+        'rate': 8000}))['key']
+    mtimes = [os.path.getmtime(os.path.join(self.shm_dir, name))
+              for name in sorted(os.listdir(self.shm_dir))]
+    # A daemon which is killed leaves the socket file and channel files.
+    self.daemon.shutdown()
+    self.thread.join()
+    self.daemon._server.server_close() # pylint:disable=W0212
+    self.daemon = None
+    self._start_daemon()
+    response = self.daemon.handle_request(json.dumps({
+        'request': 'open', 'path': self.path, 'channels': 2, 'bits': 16,
+        'rate': 8000}))
+    self.assertEqual(response['key'], key)
+    self.assertEqual([os.path.getmtime(name) for name in response['files']],
+                     mtimes)
+    self._stop_daemon()
+    self.assertEqual(os.listdir(self.shm_dir), [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,9 +1,14 @@
 """Read and parse data"""
 
-import contextlib
+import array
 import logging
-import struct
-import StringIO
+import mmap
+import multiprocessing.pool
+import os
+import sys
+import threading
+
+from tracing import tracing
 
 
 class IntFormat(object): # pylint:disable=R0903
@@ -29,6 +34,17 @@ _STRUCT_UNPACK_FORMAT = {
     (32, IntFormat.SIGNED, Endian.LITTLE_ENDIAN): '<i',
 }
 
+# Type codes used in array.array.
+_ARRAY_TYPECODE = {
+    (16, IntFormat.SIGNED): 'h',
+    (32, IntFormat.SIGNED): 'i',
+}
+
+
+class DataFormatError(Exception):
+  """Error in DataFormat."""
+  pass
+
 
 class DataFormat(object): # pylint:disable=R0903
   """Data format of a raw file."""
@@ -45,6 +61,16 @@ class DataFormat(object): # pylint:disable=R0903
     self.sampling_rate = sampling_rate
     self.struct_format = _STRUCT_UNPACK_FORMAT[
         (length_bits, IntFormat.SIGNED, Endian.LITTLE_ENDIAN)]
+    self.array_typecode = _ARRAY_TYPECODE[(length_bits, IntFormat.SIGNED)]
+    if array.array(self.array_typecode).itemsize != length_bits >> 3:
+      raise DataFormatError(
+          'No array type code for %r bits on this platform' % length_bits)
+
+
+  @property
+  def frame_size(self):
+    """The number of bytes of one sample in all channels."""
+    return self.num_channels * (self.length_bits >> 3)
 
 
   @property
@@ -55,16 +81,158 @@ class DataFormat(object): # pylint:disable=R0903
 
     """
     half_length_bits = self.length_bits - 1
-    logging.debug('half length of bits = %r', half_length_bits)
     return (-(1 << half_length_bits), (1 << half_length_bits) - 1)
 
 
+def decode_samples(binary, data_format):
+  """Decodes interleaved samples of all channels from binary.
+
+  Decoding is done by array.array in one pass, which is much faster than
+  unpacking samples one by one. Incomplete frame in the tail is neglected.
+
+  @param binary: A string containing binary data.
+  @param data_format: A DataFormat object.
+
+  @returns: An array.array containing interleaved samples.
+  """
+  length = len(binary) - len(binary) % data_format.frame_size
+  samples = array.array(data_format.array_typecode)
+  samples.fromstring(binary[:length])
+  # The raw data is little endian.
+  if sys.byteorder == 'big':
+    samples.byteswap()
+  return samples
+
+
+def deinterleave(samples, num_channels):
+  """Splits interleaved samples into channels.
+
+  @param samples: An array.array containing interleaved samples.
+  @param num_channels: Number of channels.
+
+  @returns: A list of array.array containing samples in each channel.
+  """
+  if num_channels == 1:
+    return [samples]
+  return [samples[index::num_channels] for index in xrange(num_channels)]
+
+
+def read_file(path, data_format):
+  """Reads a raw data file.
+
+  @param path: The path to the raw data file.
+  @param data_format: A DataFormat object.
+
+  @returns: A RawData object.
+  """
+  with tracing.span('load'):
+    with open(path, 'rb') as handle:
+      binary = handle.read()
+  return RawData(binary, data_format)
+
+
+def read_chunks(path, data_format, chunk_frames):
+  """Reads a raw data file chunk by chunk.
+
+  Only one chunk is kept in memory at a time, so files of any size can be
+  processed.
+
+  @param path: The path to the raw data file.
+  @param data_format: A DataFormat object.
+  @param chunk_frames: Number of samples per channel in a chunk.
+
+  @yields: A list of array.array containing samples of a chunk in each
+           channel.
+  """
+  with open(path, 'rb') as handle:
+    while True:
+      with tracing.span('load'):
+        binary = handle.read(chunk_frames * data_format.frame_size)
+      if not binary:
+        break
+      with tracing.span('decode'):
+        samples = decode_samples(binary, data_format)
+      if not samples:
+        break
+      yield deinterleave(samples, data_format.num_channels)
+
+
+def read_files(paths, data_format, jobs=None):
+  """Reads raw data files concurrently.
+
+  Files are read by a pool of threads. Reading files releases the global
+  interpreter lock, and threads return decoded samples without the copying
+  a process pool would need.
+
+  @param paths: A list of paths to raw data files.
+  @param data_format: A DataFormat object.
+  @param jobs: Number of threads. Default is number of files.
+
+  @returns: A list of RawData objects in the order of paths.
+  """
+  if len(paths) == 1:
+    return [read_file(paths[0], data_format)]
+  pool = multiprocessing.pool.ThreadPool(jobs or len(paths))
+  try:
+    return pool.map(lambda path: read_file(path, data_format), paths)
+  finally:
+    pool.close()
+    pool.join()
+
+
+def map_file(path, data_format):
+  """Maps a raw data file into memory without reading it.
+
+  Samples are decoded from the mapped file when they are sliced, so only the
+  pages that are viewed are read from the file.
+
+  @param path: The path to the raw data file.
+  @param data_format: A DataFormat object.
+
+  @returns: A MappedRawData object.
+  """
+  with open(path, 'rb') as handle:
+    mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+  return MappedRawData(mapped, data_format)
+
+
+def load_file(path, data_format, chunk_frames=1 << 20):
+  """Maps a raw data file to read it into memory in background.
+
+  Samples can be read at once from the mapped file. Call start of the
+  returned object to read the file into memory in a thread, and the read
+  samples are then taken from memory.
+
+  @param path: The path to the raw data file.
+  @param data_format: A DataFormat object.
+  @param chunk_frames: Number of samples per channel read at a time.
+
+  @returns: A LoadingRawData object.
+  """
+  return LoadingRawData(path, map_file(path, data_format), chunk_frames)
+
+
+def find_input_files(path):
+  """Finds input files.
+
+  @param path: A path to a file or a directory.
+
+  @returns: A sorted list of paths. If path is a directory, it contains all
+            the files in the directory. Otherwise it contains only path.
+  """
+  if not os.path.isdir(path):
+    return [path]
+  return sorted(
+      os.path.join(path, name) for name in os.listdir(path)
+      if os.path.isfile(os.path.join(path, name)))
+
+
 class RawData(object): # pylint:disable=R0903
   """The abstraction of raw data.
 
-  @property channel_data: A list of lists containing samples in each channel.
-                          E.g., The third sample in the second channel is
-                          channel_data[1][2].
+  @property channel_data: A list of array.array containing samples in each
+                          channel. E.g., The third sample in the second
+                          channel is channel_data[1][2].
   @property data_format: A DataFormat.
   @property num_of_samples: The number of samples in a channel.
   """
@@ -77,55 +245,243 @@ class RawData(object): # pylint:disable=R0903
     logging.info('data format = %r', data_format.__dict__)
     logging.info('data range = %r', data_format.data_range)
     self.data_format = data_format
-    self.channel_data = [[] for _ in xrange(self.data_format.num_channels)]
+    self.channel_data = None
     self._read_binary(binary)
     self.num_of_samples = len(self.channel_data[0])
     logging.info('data duration = %r secs',
                  float(self.num_of_samples) / data_format.sampling_rate)
 
 
-  def _read_one_sample(self, handle):
-    """Reads one sample from handle.
+  def _read_binary(self, binary):
+    """Reads samples from binary and fills channel_data.
 
-    @param handle: A handle that supports read() method.
+    Decodes all samples at once and splits them into channels.
 
-    @return: A number read from file handle based on sample format.
-             None if there is no data to read.
+    @param binary: A string containing binary data.
     """
-    data = handle.read(self.data_format.length_bits >> 3)
-    if data == '':
-      return None
-    number, = struct.unpack(self.data_format.struct_format, data)
-    return number
+    with tracing.span('decode'):
+      self.channel_data = deinterleave(
+          decode_samples(binary, self.data_format),
+          self.data_format.num_channels)
 
 
-  def _read_binary(self, binary):
-    """Reads samples from binary and fills channel_data.
+class MappedRawData(object): # pylint:disable=R0903
+  """The abstraction of raw data in a mapped file.
 
-    Reads one sample for each channel and repeats until the end of
-    binary.
+  It has the same properties as RawData, but channel_data is a list of
+  MappedChannel objects.
+  """
+  def __init__(self, mapped, data_format):
+    """Initializes a MappedRawData.
 
-    @param binary: A string containing binary data.
+    @param mapped: A mmap.mmap object of a raw data file.
+    @param data_format: A DataFormat object.
+    """
+    logging.info('data format = %r', data_format.__dict__)
+    self.data_format = data_format
+    self.channel_data = [MappedChannel(mapped, data_format, index)
+                         for index in xrange(data_format.num_channels)]
+    self.num_of_samples = len(self.channel_data[0])
+    logging.info('data duration = %r secs',
+                 float(self.num_of_samples) / data_format.sampling_rate)
+
+
+class MappedChannel(object):
+  """Samples of a channel in a mapped file.
+
+  It can be indexed and sliced like an array.array. A slice decodes only
+  the selected samples. The bytes of the samples are gathered by extended
+  slices of the mapped file, one slice for each byte of a sample, so a
+  strided slice does not touch the samples in between.
+  """
+  def __init__(self, mapped, data_format, channel_index):
+    """Initializes a MappedChannel.
+
+    @param mapped: A mmap.mmap object of a raw data file.
+    @param data_format: A DataFormat object.
+    @param channel_index: The index of the channel.
     """
-    channel_index = 0
-    with contextlib.closing(StringIO.StringIO(binary)) as handle:
-      number = self._read_one_sample(handle)
-      while number is not None:
-        self.channel_data[channel_index].append(number)
-        channel_index = ((channel_index + 1) %
-                         self.data_format.num_channels)
-        number = self._read_one_sample(handle)
+    self._mapped = mapped
+    self._data_format = data_format
+    self._sample_size = data_format.length_bits >> 3
+    self._offset = channel_index * self._sample_size
+    self._length = len(mapped) / data_format.frame_size
+
+
+  def __len__(self):
+    return self._length
+
+
+  def __getitem__(self, key):
+    """Gets a sample or an array.array of samples in a slice."""
+    if isinstance(key, slice):
+      start, stop, step = key.indices(self._length)
+      if step < 0:
+        samples = self[stop + 1:start + 1][::-1]
+        return samples[::-step]
+      return self._decode(start, len(xrange(start, stop, step)), step)
+    if key < 0:
+      key += self._length
+    if not 0 <= key < self._length:
+      raise IndexError('Sample index %r out of range' % key)
+    return self._decode(key, 1, 1)[0]
+
+
+  def _decode(self, start, count, step):
+    """Decodes samples from the mapped file.
+
+    @param start: The index of the first sample.
+    @param count: The number of samples.
+    @param step: The distance between samples.
+
+    @returns: An array.array containing the samples.
+    """
+    samples = array.array(self._data_format.array_typecode)
+    if not count:
+      return samples
+    frame_size = self._data_format.frame_size
+    first = start * frame_size + self._offset
+    byte_step = step * frame_size
+    if byte_step == self._sample_size:
+      binary = self._mapped[first:first + count * self._sample_size]
+    else:
+      gathered = bytearray(count * self._sample_size)
+      last = first + (count - 1) * byte_step + 1
+      for index in xrange(self._sample_size):
+        gathered[index::self._sample_size] = self._mapped[
+            first + index:last + index:byte_step]
+      binary = str(gathered)
+    samples.fromstring(binary)
+    if sys.byteorder == 'big':
+      samples.byteswap()
+    return samples
+
+
+class LoadingRawData(object):
+  """The abstraction of raw data in a mapped file being read into memory.
+
+  It has the same properties as RawData, but channel_data is a list of
+  LoadingChannel objects. The file is read chunk by chunk in a thread.
+  Reading a file releases the global interpreter lock, so the viewer keeps
+  responding while it is read.
+
+  @property progress: The ratio of samples read into memory.
+  @property done: True if all the samples are read into memory.
+  """
+  def __init__(self, path, mapped_raw_data, chunk_frames):
+    """Initializes a LoadingRawData.
+
+    @param path: The path to the raw data file.
+    @param mapped_raw_data: A MappedRawData object of the file.
+    @param chunk_frames: Number of samples per channel read at a time.
+    """
+    self._path = path
+    self._chunk_frames = chunk_frames
+    self.data_format = mapped_raw_data.data_format
+    self.num_of_samples = mapped_raw_data.num_of_samples
+    # Samples of each channel read so far, and the number of them.
+    self.arrays = [array.array(self.data_format.array_typecode)
+                   for _ in xrange(self.data_format.num_channels)]
+    self.loaded = 0
+    self.done = False
+    self.channel_data = [LoadingChannel(mapped_channel, self, index)
+                         for index, mapped_channel in enumerate(
+                             mapped_raw_data.channel_data)]
+    self._stopped = False
+    self._thread = None
+
+
+  @property
+  def progress(self):
+    """The ratio of samples read into memory."""
+    return float(self.loaded) / max(1, self.num_of_samples)
+
+
+  def start(self):
+    """Starts reading the file in a thread."""
+    self._thread = threading.Thread(target=self._load, name='load')
+    self._thread.daemon = True
+    self._thread.start()
+
+
+  def stop(self):
+    """Stops reading and waits for the thread."""
+    self._stopped = True
+    if self._thread:
+      self._thread.join()
+
+
+  def _load(self):
+    """Reads the file chunk by chunk."""
+    try:
+      for channels in read_chunks(self._path, self.data_format,
+                                  self._chunk_frames):
+        if self._stopped:
+          return
+        for samples, channel in zip(self.arrays, channels):
+          samples.extend(channel)
+        # Update the count at last since it is read by other threads.
+        self.loaded = min(len(samples) for samples in self.arrays)
+    except EnvironmentError as error:
+      # The samples are still read from the mapped file.
+      logging.warning('Failed to read %r: %s', self._path, error)
+      return
+    self.loaded = self.num_of_samples
+    self.done = True
+    logging.info('Read %r samples of %r', self.loaded, self._path)
+
+
+class LoadingChannel(object):
+  """Samples of a channel in a mapped file being read into memory.
+
+  It can be indexed and sliced like an array.array. Samples already read
+  into memory are taken from memory, and the others from the mapped file,
+  so the values are the same while the file is being read.
+  """
+  def __init__(self, mapped_channel, loading_raw_data, channel_index):
+    """Initializes a LoadingChannel.
+
+    @param mapped_channel: A MappedChannel object of the channel.
+    @param loading_raw_data: The LoadingRawData reading the file.
+    @param channel_index: The index of the channel.
+    """
+    self._mapped = mapped_channel
+    self._raw_data = loading_raw_data
+    self._channel_index = channel_index
+
+
+  def __len__(self):
+    return len(self._mapped)
+
+
+  def __getitem__(self, key):
+    """Gets a sample or an array.array of samples in a slice."""
+    raw_data = self._raw_data
+    loaded = raw_data.loaded
+    samples = raw_data.arrays[self._channel_index]
+    if raw_data.done:
+      return samples[key]
+    if isinstance(key, slice):
+      start, stop, step = key.indices(len(self))
+      if step > 0 and (start >= stop or stop <= loaded):
+        return samples[key]
+      return self._mapped[key]
+    if 0 <= key < loaded:
+      return samples[key]
+    return self._mapped[key]
 
 
 class OneChannelRawData(object): # pylint:disable=R0903
   """A 1-channel raw data."""
-  def __init__(self, raw_data, channel_index):
+  def __init__(self, raw_data, channel_index, name=None):
     """Creates a OneChannelRawData from RawData.
 
     @param raw_data: A RawData object.
     @channel_index: The selected channel. 0 for the first channel.
+    @param name: The name shown in the view. Default is the channel index.
 
     """
+    self.name = name if name is not None else str(channel_index)
     self.samples = raw_data.channel_data[channel_index]
     self.sampling_rate = raw_data.data_format.sampling_rate
     self.data_range = raw_data.data_format.data_range
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+"""Unit tests for data."""
+
+from __future__ import absolute_import
+
+import array
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from data import data
+
+
+class LoadingChannelTest(unittest.TestCase):
+  """Compares LoadingChannel with the decoded samples of a file."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'capture.raw')
+    self.data_format = data.DataFormat(2, 16, 48000)
+    generator = random.Random(1)
+    interleaved = array.array('h', (generator.randint(-32768, 32767)
+                                    for _ in xrange(2 * 10007)))
+    self.channels = data.deinterleave(interleaved, 2)
+    if sys.byteorder == 'big':
+      interleaved.byteswap()
+    with open(self.path, 'wb') as raw_file:
+      raw_file.write(interleaved.tostring())
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def _check(self, raw_data):
+    """Checks samples, slices and strided slices of each channel.
+
+    @param raw_data: A LoadingRawData object.
+
+    """
+    for channel, expected in zip(raw_data.channel_data, self.channels):
+      self.assertEqual(len(channel), len(expected))
+      for index in (0, 1, 4095, 4096, 4097, 10006, -1, -10007):
+        self.assertEqual(channel[index], expected[index])
+      for key in (slice(None), slice(0, 4096), slice(4000, 4200),
+                  slice(4096, 10007, 3), slice(5000, 5000), slice(100, 0),
+                  slice(None, None, -5), slice(-300, None)):
+        self.assertEqual(list(channel[key]), list(expected[key]))
+      with self.assertRaises(IndexError):
+        channel[len(expected)] # pylint:disable=W0104
+
+
+  def test_before_loading(self):
+    """Tests samples are read from the mapped file before loading."""
+    self._check(data.load_file(self.path, self.data_format))
+
+
+  def test_partly_loaded(self):
+    """Tests samples from memory and from the mapped file together."""
+    raw_data = data.load_file(self.path, self.data_format)
+    for samples, channel in zip(raw_data.arrays, self.channels):
+      samples.extend(channel[:4096])
+    raw_data.loaded = 4096
+    self._check(raw_data)
+
+
+  def test_loaded(self):
+    """Tests loading in chunks to the end."""
+    raw_data = data.load_file(self.path, self.data_format, chunk_frames=1000)
+    raw_data.start()
+    deadline = time.time() + 10
+    while not raw_data.done and time.time() < deadline:
+      time.sleep(0.01)
+    raw_data.stop()
+    self.assertTrue(raw_data.done)
+    self.assertEqual(raw_data.progress, 1.0)
+    self._check(raw_data)
+
+
+if __name__ == '__main__':
+  unittest.main()
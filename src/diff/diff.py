@@ -0,0 +1,178 @@
+"""Compute the difference of two captures."""
+
+import bisect
+import logging
+import operator
+
+from tracing import tracing
+
+
+class DifferenceError(Exception):
+  """Error in difference."""
+  pass
+
+
+class DifferenceSamples(object):
+  """Sample-wise difference of two sample sequences.
+
+  The difference is computed lazily when it is indexed or sliced, so a
+  Waveform only computes the difference of the subsamples it shows. With
+  samples of mapped files, neither capture is loaded into memory.
+
+  The offset aligns the captures. Sample i of the difference is
+  first[i + lead] - second[i + lead + offset], where lead is -offset for a
+  negative offset and 0 otherwise. The length is the length of the overlap.
+  """
+  def __init__(self, first, second, offset=0):
+    """Creates a DifferenceSamples.
+
+    @param first: A sequence of samples, e.g. array.array or
+                  data.MappedChannel.
+    @param second: A sequence of samples to subtract from first.
+    @param offset: The sample in second aligned to the first sample of first.
+
+    """
+    self._first = first
+    self._second = second
+    self._lead = max(0, -offset)
+    self._offset = offset
+    self._length = max(0, min(len(first) - self._lead,
+                              len(second) - self._lead - offset))
+
+
+  def __len__(self):
+    return self._length
+
+
+  def __getitem__(self, key):
+    """Gets a difference or a list of differences in a slice."""
+    if isinstance(key, slice):
+      start, stop, step = key.indices(self._length)
+      if step < 0:
+        return self[stop + 1:start + 1][::-1][::-step]
+      first_start = start + self._lead
+      second_start = first_start + self._offset
+      count = len(xrange(start, stop, step))
+      # Slice the same count from both so the step never runs past the end.
+      first = self._first[first_start:first_start + count * step:step]
+      second = self._second[second_start:second_start + count * step:step]
+      # map is faster than a list comprehension for slices read every frame.
+      return map(operator.sub, first, second) # pylint:disable=W0141
+    if key < 0:
+      key += self._length
+    if not 0 <= key < self._length:
+      raise IndexError('Sample index %r out of range' % key)
+    index = key + self._lead
+    return self._first[index] - self._second[index + self._offset]
+
+
+class DifferenceChannel(object): # pylint:disable=R0903
+  """The difference of two 1-channel raw data.
+
+  It has the same properties as data.OneChannelRawData so it can be shown as
+  a trace. The data range is the range of the first capture, so the
+  difference is drawn in the same scale as the captures.
+  """
+  def __init__(self, first, second, offset=0, name=None):
+    """Creates a DifferenceChannel.
+
+    @param first: A data.OneChannelRawData object.
+    @param second: A data.OneChannelRawData object to subtract from first.
+    @param offset: The sample in second aligned to the first sample of first.
+    @param name: The name shown in the view. Default is 'diff'.
+
+    @raises: DifferenceError if the sampling rates are different, or the
+             captures do not overlap.
+    """
+    if first.sampling_rate != second.sampling_rate:
+      raise DifferenceError('Different sampling rates %r and %r' %
+                            (first.sampling_rate, second.sampling_rate))
+    self.name = name if name is not None else 'diff'
+    self.samples = DifferenceSamples(first.samples, second.samples, offset)
+    self.sampling_rate = first.sampling_rate
+    self.data_range = first.data_range
+    if not self.samples:
+      raise DifferenceError('No overlap with offset %r' % offset)
+
+
+class RegionIndex(object):
+  """A coarse index of regions where two captures differ.
+
+  The difference is scanned chunk by chunk. It is split into blocks and a
+  block is marked if the absolute difference of any sample in it exceeds
+  the threshold. Adjacent marked blocks are merged into a region, so a
+  region is accurate to a block. Only one chunk of difference is kept in
+  memory at a time.
+  """
+  _CHUNK_BLOCKS = 16
+
+  def __init__(self, samples, threshold, block_length=4096):
+    """Builds a RegionIndex.
+
+    @param samples: A DifferenceSamples object.
+    @param threshold: A region differs by more than this absolute value.
+    @param block_length: Number of samples in a block.
+
+    """
+    self._block_length = block_length
+    # A sorted list of (start, stop) sample index of regions.
+    self.regions = []
+    # Start sample index of each region for bisection.
+    self._starts = []
+    with tracing.span('index'):
+      self._build(samples, threshold)
+    logging.info('%r regions differ by more than %r',
+                 len(self.regions), threshold)
+
+
+  def _build(self, samples, threshold):
+    """Scans samples and fills regions.
+
+    @param samples: A DifferenceSamples object.
+    @param threshold: A region differs by more than this absolute value.
+
+    """
+    chunk_length = self._block_length * self._CHUNK_BLOCKS
+    for chunk_start in xrange(0, len(samples), chunk_length):
+      chunk = samples[chunk_start:chunk_start + chunk_length]
+      for block_start in xrange(0, len(chunk), self._block_length):
+        block = chunk[block_start:block_start + self._block_length]
+        if max(block) > threshold or -min(block) > threshold:
+          self._mark(chunk_start + block_start,
+                     chunk_start + block_start + len(block))
+    self._starts = [start for start, _ in self.regions]
+
+
+  def _mark(self, start, stop):
+    """Marks a block. It extends the last region if they are adjacent.
+
+    @param start: The first sample index of the block.
+    @param stop: The sample index after the block.
+
+    """
+    if self.regions and self.regions[-1][1] == start:
+      self.regions[-1] = (self.regions[-1][0], stop)
+    else:
+      self.regions.append((start, stop))
+
+
+  def get_next(self, sample_index):
+    """Finds the first region starting after a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the region in regions. None if there is none.
+    """
+    index = bisect.bisect_right(self._starts, sample_index)
+    return index if index < len(self._starts) else None
+
+
+  def get_previous(self, sample_index):
+    """Finds the last region starting before a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the region in regions. None if there is none.
+    """
+    index = bisect.bisect_left(self._starts, sample_index) - 1
+    return index if index >= 0 else None
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+"""Unit tests for diff."""
+
+from __future__ import absolute_import
+
+import array
+import random
+import unittest
+
+from diff import diff
+
+
+class DifferenceSamplesTest(unittest.TestCase):
+  """Compares DifferenceSamples with differences of every sample."""
+
+  def setUp(self):
+    generator = random.Random(1)
+    self.first = array.array('h', (generator.randint(-1000, 1000)
+                                   for _ in xrange(5000)))
+    self.second = array.array('h', (generator.randint(-1000, 1000)
+                                    for _ in xrange(4000)))
+
+
+  def test_offsets(self):
+    """Tests the aligned difference for positive and negative offsets."""
+    for offset in (0, 7, -13, 3999, -4999):
+      lead = max(0, -offset)
+      expected = [self.first[index] - self.second[index + offset]
+                  for index in xrange(lead, len(self.first))
+                  if 0 <= index + offset < len(self.second)]
+      samples = diff.DifferenceSamples(self.first, self.second, offset)
+      self.assertEqual(len(samples), len(expected))
+      self.assertEqual(list(samples[:]), expected)
+      self.assertEqual(list(samples[5:900:7]), expected[5:900:7])
+      self.assertEqual(list(samples[::-3]), expected[::-3])
+      self.assertEqual(samples[-1], expected[-1])
+
+
+  def test_no_overlap(self):
+    """Tests offsets without overlap."""
+    self.assertEqual(len(diff.DifferenceSamples(self.first, self.second,
+                                                4000)), 0)
+    self.assertEqual(len(diff.DifferenceSamples(self.first, self.second,
+                                                -5000)), 0)
+
+
+class RegionIndexTest(unittest.TestCase):
+  """Compares RegionIndex with a check of every block."""
+
+  def setUp(self):
+    generator = random.Random(2)
+    self.samples = array.array('h', [0] * 100000)
+    for _ in xrange(40):
+      start = generator.randint(0, len(self.samples) - 1)
+      for index in xrange(start, min(len(self.samples),
+                                     start + generator.randint(1, 3000))):
+        self.samples[index] = generator.randint(-200, 200)
+
+
+  def _scan(self, threshold, block_length):
+    """Finds the regions by checking every block.
+
+    @param threshold: A region differs by more than this absolute value.
+    @param block_length: Number of samples in a block.
+
+    @returns: A list of (start, stop).
+    """
+    regions = []
+    for start in xrange(0, len(self.samples), block_length):
+      stop = min(len(self.samples), start + block_length)
+      if any(abs(value) > threshold for value in self.samples[start:stop]):
+        if regions and regions[-1][1] == start:
+          regions[-1] = (regions[-1][0], stop)
+        else:
+          regions.append((start, stop))
+    return regions
+
+
+  def test_regions(self):
+    """Tests regions for thresholds and block lengths."""
+    for threshold in (0, 150, 199, 200):
+      for block_length in (1000, 4096):
+        index = diff.RegionIndex(self.samples, threshold, block_length)
+        self.assertEqual(index.regions, self._scan(threshold, block_length))
+
+
+  def test_step(self):
+    """Tests get_next and get_previous."""
+    index = diff.RegionIndex(self.samples, 100, 1000)
+    starts = [start for start, _ in index.regions]
+    for sample_index in range(-1, 101000, 777) + starts:
+      following = [i for i, start in enumerate(starts) if start > sample_index]
+      preceding = [i for i, start in enumerate(starts) if start < sample_index]
+      self.assertEqual(index.get_next(sample_index),
+                       following[0] if following else None)
+      self.assertEqual(index.get_previous(sample_index),
+                       preceding[-1] if preceding else None)
+
+
+if __name__ == '__main__':
+  unittest.main()
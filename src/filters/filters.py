@@ -0,0 +1,341 @@
+"""Filter samples lazily in chunks before they are shown."""
+
+import array
+import bisect
+import collections
+import functools
+import itertools
+import logging
+import math
+import operator
+
+from tracing import tracing
+
+
+class FilterError(Exception):
+  """Error in filters."""
+  pass
+
+
+class DcBlocker(object):
+  """A one-pole DC blocker, y[n] = x[n] - x[n - 1] + pole * y[n - 1]."""
+  def __init__(self, sampling_rate, cutoff=5.0):
+    """Creates a DcBlocker.
+
+    @param sampling_rate: The sampling rate.
+    @param cutoff: The -3 dB frequency in Hz.
+
+    @raises: FilterError if the cutoff is invalid.
+    """
+    if not 0 < cutoff < sampling_rate / 2.0:
+      raise FilterError('Invalid cutoff %g Hz' % cutoff)
+    self.description = 'dc %g' % cutoff
+    self._pole = math.exp(-2 * math.pi * cutoff / sampling_rate)
+    self.initial_state = (0.0, 0.0)
+
+
+  def process(self, values, state):
+    """Filters a chunk of values.
+
+    @param values: A sequence of values following the last chunk.
+    @param state: The state after the last chunk.
+
+    @returns: A tuple (list of filtered values, state after the chunk).
+    """
+    pole = self._pole
+    last_input, last_output = state
+    output = []
+    append = output.append
+    for value in values:
+      last_output = value - last_input + pole * last_output
+      last_input = value
+      append(last_output)
+    return output, (last_input, last_output)
+
+
+class Biquad(object):
+  """A second order low-pass, high-pass or band-pass filter.
+
+  Coefficients follow the Audio EQ Cookbook. The filter is computed in
+  transposed direct form II, so its state is two values.
+  """
+  LOW_PASS = 'lp'
+  HIGH_PASS = 'hp'
+  BAND_PASS = 'bp'
+
+  def __init__(self, kind, sampling_rate, frequency, q=math.sqrt(0.5)):
+    """Creates a Biquad.
+
+    @param kind: LOW_PASS, HIGH_PASS or BAND_PASS.
+    @param sampling_rate: The sampling rate.
+    @param frequency: The cutoff or centre frequency in Hz.
+    @param q: The quality factor.
+
+    @raises: FilterError if the parameters are invalid.
+    """
+    if not 0 < frequency < sampling_rate / 2.0 or q <= 0:
+      raise FilterError('Invalid frequency %g Hz or Q %g' % (frequency, q))
+    self.description = '%s %g' % (kind, frequency)
+    omega = 2 * math.pi * frequency / sampling_rate
+    cos_omega = math.cos(omega)
+    alpha = math.sin(omega) / (2 * q)
+    if kind == self.LOW_PASS:
+      numerator = ((1 - cos_omega) / 2, 1 - cos_omega, (1 - cos_omega) / 2)
+    elif kind == self.HIGH_PASS:
+      numerator = ((1 + cos_omega) / 2, -(1 + cos_omega), (1 + cos_omega) / 2)
+    elif kind == self.BAND_PASS:
+      numerator = (alpha, 0.0, -alpha)
+    else:
+      raise FilterError('Unknown biquad %r' % kind)
+    a0 = 1 + alpha
+    self._b = [coefficient / a0 for coefficient in numerator]
+    self._a = [-2 * cos_omega / a0, (1 - alpha) / a0]
+    self.initial_state = (0.0, 0.0)
+
+
+  def process(self, values, state):
+    """Filters a chunk of values.
+
+    @param values: A sequence of values following the last chunk.
+    @param state: The state after the last chunk.
+
+    @returns: A tuple (list of filtered values, state after the chunk).
+    """
+    b0, b1, b2 = self._b
+    a1, a2 = self._a
+    z1, z2 = state
+    output = []
+    append = output.append
+    for value in values:
+      result = b0 * value + z1
+      z1 = b1 * value - a1 * result + z2
+      z2 = b2 * value - a2 * result
+      append(result)
+    return output, (z1, z2)
+
+
+class Gain(object):
+  """A constant gain. It has no state, so chunks are independent."""
+  # Any gain beyond it clips or rounds every sample of 32-bit data.
+  MAX_GAIN_DB = 200.0
+
+  def __init__(self, gain_db):
+    """Creates a Gain.
+
+    @param gain_db: The gain in dB.
+
+    @raises: FilterError if the gain is out of +/-MAX_GAIN_DB.
+    """
+    if not -self.MAX_GAIN_DB <= gain_db <= self.MAX_GAIN_DB:
+      raise FilterError('Invalid gain %g dB, it must be within +/-%g dB' %
+                        (gain_db, self.MAX_GAIN_DB))
+    self.description = 'gain %g' % gain_db
+    self._factor = math.pow(10, gain_db / 20.0)
+    self.initial_state = None
+
+
+  def process(self, values, state):
+    """Multiplies a chunk of values.
+
+    @param values: A sequence of values.
+    @param state: Not used.
+
+    @returns: A tuple (list of values, state).
+    """
+    factor = self._factor
+    return [value * factor for value in values], state
+
+
+def parse_filters(text, sampling_rate):
+  """Parses a filter chain.
+
+  Stages are separated by commas and applied in order, e.g.
+  'dc, hp 100, lp 4000, gain 6'. A stage is one of:
+    dc [CUTOFF_HZ]       A DC blocker. Default cutoff is 5 Hz.
+    lp FREQUENCY_HZ [Q]  A biquad low-pass filter.
+    hp FREQUENCY_HZ [Q]  A biquad high-pass filter.
+    bp FREQUENCY_HZ [Q]  A biquad band-pass filter.
+    gain DB              A gain.
+
+  @param text: The filter chain. Empty or 'off' for no filter.
+  @param sampling_rate: The sampling rate.
+
+  @returns: A list of stages.
+
+  @raises: FilterError if the text can not be parsed.
+  """
+  stages = []
+  if text.strip().lower() == 'off':
+    return stages
+  for stage_text in text.split(','):
+    fields = stage_text.split()
+    if not fields:
+      continue
+    kind = fields[0].lower()
+    try:
+      arguments = [float(field) for field in fields[1:]]
+    except ValueError:
+      raise FilterError('Invalid filter %r' % stage_text.strip())
+    if any(math.isinf(argument) or math.isnan(argument)
+           for argument in arguments):
+      raise FilterError('Invalid number in filter %r' % stage_text.strip())
+    if kind == 'dc' and len(arguments) <= 1:
+      stages.append(DcBlocker(sampling_rate, *arguments))
+    elif (kind in (Biquad.LOW_PASS, Biquad.HIGH_PASS, Biquad.BAND_PASS) and
+          1 <= len(arguments) <= 2):
+      stages.append(Biquad(kind, sampling_rate, *arguments))
+    elif kind == 'gain' and len(arguments) == 1:
+      stages.append(Gain(*arguments))
+    else:
+      raise FilterError('Invalid filter %r' % stage_text.strip())
+  return stages
+
+
+class FilteredSamples(object):
+  """Samples filtered by a chain of stages, computed lazily in chunks.
+
+  A chunk is filtered when a sample in it is indexed or sliced. Stages keep
+  their state across chunks, so the state at the start of each filtered
+  chunk is kept as a checkpoint, and a chunk is filtered from the nearest
+  checkpoint before it. Filtered chunks are kept in a LRU cache, so
+  scrolling and zooming do not filter them again. Filtered values are
+  rounded and clipped to the data range.
+  """
+  def __init__(self, samples, stages, data_range, chunk_length=65536,
+               cache_chunks=64):
+    """Creates a FilteredSamples.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param stages: A list of stages from parse_filters.
+    @param data_range: (min, max) of sample value range.
+    @param chunk_length: Number of samples filtered at a time.
+    @param cache_chunks: Number of filtered chunks kept in the cache.
+
+    """
+    self._samples = samples
+    self._stages = stages
+    self._data_range = data_range
+    self._chunk_length = chunk_length
+    self._cache_chunks = cache_chunks
+    self._length = len(samples)
+    self._cache = collections.OrderedDict()
+    # Sorted chunk indices of checkpoints, and the states of the stages at
+    # the start of each of them.
+    self._checkpoint_indices = [0]
+    self._checkpoints = {0: [stage.initial_state for stage in stages]}
+    self.hits = 0
+    self.misses = 0
+
+
+  def __len__(self):
+    return self._length
+
+
+  def _filter_chunk(self, chunk_index, states):
+    """Filters a chunk and keeps the states after it as a checkpoint.
+
+    @param chunk_index: The index of the chunk.
+    @param states: The states of the stages at the start of the chunk.
+
+    @returns: An array.array of the filtered chunk.
+    """
+    low, high = self._data_range
+    start = chunk_index * self._chunk_length
+    values = self._samples[start:start + self._chunk_length]
+    states = list(states)
+    with tracing.span('filter'):
+      for index, stage in enumerate(self._stages):
+        values, states[index] = stage.process(values, states[index])
+      values = array.array('l', itertools.imap(
+          functools.partial(min, high),
+          itertools.imap(functools.partial(max, low),
+                         itertools.imap(int, itertools.imap(round, values)))))
+    if chunk_index + 1 not in self._checkpoints:
+      bisect.insort(self._checkpoint_indices, chunk_index + 1)
+      self._checkpoints[chunk_index + 1] = states
+    return values
+
+
+  def _get_chunk(self, chunk_index):
+    """Gets a filtered chunk from the cache, or filters it.
+
+    @param chunk_index: The index of the chunk.
+
+    @returns: An array.array of the filtered chunk.
+    """
+    chunk = self._cache.pop(chunk_index, None)
+    if chunk is not None:
+      self.hits += 1
+      self._cache[chunk_index] = chunk
+      return chunk
+    self.misses += 1
+    checkpoint = self._checkpoint_indices[
+        bisect.bisect_right(self._checkpoint_indices, chunk_index) - 1]
+    if checkpoint < chunk_index:
+      logging.debug('Filter chunks %r to %r', checkpoint, chunk_index)
+    for index in xrange(checkpoint, chunk_index + 1):
+      chunk = self._cache.get(index)
+      if chunk is None or index == chunk_index:
+        chunk = self._filter_chunk(index, self._checkpoints[index])
+      self._cache[index] = chunk
+      while len(self._cache) > self._cache_chunks:
+        self._cache.popitem(last=False)
+    return chunk
+
+
+  def __getitem__(self, key):
+    """Gets a sample or an array.array of samples in a slice."""
+    if isinstance(key, slice):
+      start, stop, step = key.indices(self._length)
+      if step < 0:
+        samples = self[stop + 1:start + 1][::-1]
+        return samples[::-step]
+      samples = array.array('l')
+      while start < stop:
+        chunk_index, offset = divmod(start, self._chunk_length)
+        chunk_stop = min(stop, (chunk_index + 1) * self._chunk_length)
+        samples.extend(self._get_chunk(chunk_index)[
+            offset:chunk_stop - chunk_index * self._chunk_length:step])
+        start += len(xrange(start, chunk_stop, step)) * step
+      return samples
+    if key < 0:
+      key += self._length
+    if not 0 <= key < self._length:
+      raise IndexError('Sample index %r out of range' % key)
+    chunk_index, offset = divmod(key, self._chunk_length)
+    return self._get_chunk(chunk_index)[offset]
+
+
+class FilteredChannel(object): # pylint:disable=R0903
+  """A 1-channel raw data filtered by a chain of stages.
+
+  It has the same properties as data.OneChannelRawData so it can be shown as
+  a trace.
+  """
+  def __init__(self, one_channel_raw_data, stages):
+    """Creates a FilteredChannel.
+
+    @param one_channel_raw_data: A data.OneChannelRawData object.
+    @param stages: A list of stages from parse_filters.
+
+    """
+    self.original = one_channel_raw_data
+    self.stages = stages
+    self.name = '%s[%s]' % (one_channel_raw_data.name, ','.join(
+        stage.description for stage in stages))
+    self.samples = FilteredSamples(one_channel_raw_data.samples, stages,
+                                   one_channel_raw_data.data_range)
+    self.sampling_rate = one_channel_raw_data.sampling_rate
+    self.data_range = one_channel_raw_data.data_range
+
+
+def get_unfiltered(trace):
+  """Gets the trace before filters.
+
+  @param trace: A trace. It may be a FilteredChannel.
+
+  @returns: The trace before filters.
+  """
+  while isinstance(trace, FilteredChannel):
+    trace = trace.original
+  return trace
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+"""Unit tests for filters."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import random
+import unittest
+
+from filters import filters
+
+
+_DATA_RANGE = (-32768, 32767)
+
+
+class FilteredSamplesTest(unittest.TestCase):
+  """Compares FilteredSamples with filtering all the samples at once."""
+
+  def setUp(self):
+    generator = random.Random(1)
+    self.samples = array.array('h', (
+        int(3000 + 20000 * math.sin(index / 7.0) +
+            generator.randint(-3000, 3000)) for index in xrange(10000)))
+
+
+  def _filter_all(self, stages):
+    """Filters all the samples in one pass.
+
+    @param stages: A list of stages from parse_filters.
+
+    @returns: A list of filtered samples.
+    """
+    values = list(self.samples)
+    for stage in stages:
+      values, _ = stage.process(values, stage.initial_state)
+    low, high = _DATA_RANGE
+    return [min(high, max(low, int(round(value)))) for value in values]
+
+
+  def test_random_access(self):
+    """Tests chunks filtered out of order from checkpoints."""
+    generator = random.Random(2)
+    for text in ('dc', 'dc 50, hp 100, lp 4000 2, gain 6', 'bp 1000 5',
+                 'gain 40'):
+      stages = filters.parse_filters(text, 48000)
+      expected = self._filter_all(stages)
+      filtered = filters.FilteredSamples(self.samples, stages, _DATA_RANGE,
+                                         chunk_length=512, cache_chunks=3)
+      for _ in xrange(50):
+        start = generator.randint(0, len(self.samples))
+        stop = start + generator.randint(0, 2000)
+        step = generator.choice((1, 1, 3, 100))
+        self.assertEqual(list(filtered[start:stop:step]),
+                         expected[start:stop:step])
+        index = generator.randint(-len(self.samples), len(self.samples) - 1)
+        self.assertEqual(filtered[index], expected[index])
+      self.assertEqual(list(filtered[::-7]), expected[::-7])
+      self.assertGreater(filtered.hits, 0)
+
+
+  def test_out_of_range(self):
+    """Tests indexing out of range."""
+    filtered = filters.FilteredSamples(
+        self.samples, filters.parse_filters('dc', 48000), _DATA_RANGE)
+    with self.assertRaises(IndexError):
+      filtered[len(self.samples)] # pylint:disable=W0104
+
+
+class ParseFiltersTest(unittest.TestCase):
+  """Tests parse_filters."""
+
+  def test_parse(self):
+    """Tests valid filter chains."""
+    self.assertEqual(filters.parse_filters('off', 48000), [])
+    self.assertEqual(filters.parse_filters('', 48000), [])
+    stages = filters.parse_filters('dc, HP 100, lp 4000 2, gain -6', 48000)
+    self.assertEqual([stage.description for stage in stages],
+                     ['dc 5', 'hp 100', 'lp 4000', 'gain -6'])
+
+
+  def test_invalid(self):
+    """Tests invalid filters raise FilterError."""
+    for text in ('dc 0', 'dc -1', 'dc 30000', 'lp', 'lp 0', 'lp 30000',
+                 'lp 1000 0', 'lp 1000 nan', 'hp inf', 'gain', 'gain x',
+                 'gain inf', 'gain nan', 'gain 1e308', 'gain -1e308',
+                 'echo 5'):
+      with self.assertRaises(filters.FilterError):
+        filters.parse_filters(text, 48000)
+
+
+if __name__ == '__main__':
+  unittest.main()
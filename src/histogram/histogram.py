@@ -0,0 +1,153 @@
+"""Count the amplitude distribution of samples in a range incrementally."""
+
+import bisect
+import logging
+import math
+
+from tracing import tracing
+
+
+class HistogramError(Exception):
+  """Error in histogram."""
+  pass
+
+
+class AmplitudeHistogram(object):
+  """Counts of sample values in bins over the data range, for a range of
+  samples.
+
+  When the range moves, only the samples entering the range are added and
+  the samples leaving it are removed, so scrolling does not count the whole
+  range again. Samples are counted in bulk: they are sorted by builtin
+  sorted, and the count of each bin is the distance between bisections at
+  the bin edges, only over the bins between the minimum and maximum.
+
+  When the range is longer than max_counted, only samples at multiples of
+  a stride are counted. The stride is a power of two, so samples entering
+  and leaving the range are on the same grid until the stride changes.
+  """
+  def __init__(self, samples, data_range, number_of_bins=4096,
+               max_counted=1 << 20):
+    """Creates an AmplitudeHistogram.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param data_range: (min, max) of sample value range.
+    @param number_of_bins: Number of bins over the data range.
+    @param max_counted: The maximum number of samples counted in a range.
+
+    """
+    low, high = data_range
+    if number_of_bins < 1 or high < low:
+      raise HistogramError('Invalid bins %r or data range %r' %
+                           (number_of_bins, data_range))
+    self._samples = samples
+    self._low = low
+    self._span = high - low + 1
+    self._number_of_bins = number_of_bins
+    self._max_counted = max_counted
+    self.counts = [0] * number_of_bins
+    self.stride = None
+    self._range = None
+
+
+  def get_bin(self, value):
+    """Gets the bin of a value.
+
+    @param value: A value in the data range.
+
+    @returns: The index of the bin.
+    """
+    value = min(max(value, self._low), self._low + self._span - 1)
+    return (value - self._low) * self._number_of_bins / self._span
+
+
+  def _get_bin_start(self, index):
+    """Gets the smallest value in a bin.
+
+    @param index: The index of the bin.
+
+    @returns: The value.
+    """
+    return self._low + -(-index * self._span / self._number_of_bins)
+
+
+  def _count(self, start, stop, sign):
+    """Adds or removes the samples on the stride grid in a range.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+    @param sign: 1 to add the samples, -1 to remove them.
+
+    """
+    first = -(-start / self.stride) * self.stride
+    if first >= stop:
+      return
+    values = sorted(self._samples[first:stop:self.stride])
+    counts = self.counts
+    position = 0
+    for index in xrange(self.get_bin(values[0]), self.get_bin(values[-1])):
+      end = bisect.bisect_left(values, self._get_bin_start(index + 1),
+                               position)
+      counts[index] += sign * (end - position)
+      position = end
+    counts[self.get_bin(values[-1])] += sign * (len(values) - position)
+
+
+  def set_range(self, start, stop):
+    """Counts the samples in a range.
+
+    If the range overlaps the last one with the same stride, only the
+    samples entering and leaving are counted.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+
+    """
+    start = max(0, start)
+    stop = min(len(self._samples), stop)
+    stride = 1
+    while (stop - start) / stride > self._max_counted:
+      stride <<= 1
+    with tracing.span('histogram'):
+      if (stride != self.stride or self._range is None or
+          start >= self._range[1] or stop <= self._range[0]):
+        logging.debug('Count histogram of %r to %r by %r', start, stop,
+                      stride)
+        self.counts = [0] * self._number_of_bins
+        self.stride = stride
+        self._count(start, stop, 1)
+      else:
+        last_start, last_stop = self._range
+        if start < last_start:
+          self._count(start, last_start, 1)
+        elif start > last_start:
+          self._count(last_start, start, -1)
+        if stop > last_stop:
+          self._count(last_stop, stop, 1)
+        elif stop < last_stop:
+          self._count(stop, last_stop, -1)
+    self._range = (start, stop)
+
+
+  def get_counts(self, value_ranges):
+    """Sums the counts of bins in value ranges.
+
+    @param value_ranges: A list of (min_value, max_value). A bin is in the
+                         range if its smallest value is in
+                         [min_value, max_value).
+
+    @returns: A list of counts.
+    """
+    high = self._low + self._span - 1
+    counts = []
+    for min_value, max_value in value_ranges:
+      min_value = int(math.ceil(min_value))
+      max_value = int(math.ceil(max_value)) - 1
+      if max_value < max(min_value, self._low) or min_value > high:
+        counts.append(0)
+        continue
+      first = self.get_bin(min_value)
+      if self._get_bin_start(first) < min_value:
+        first += 1
+      counts.append(sum(self.counts[first:self.get_bin(max_value) + 1]))
+    return counts
@@ -0,0 +1,87 @@
+#!/usr/bin/python
+"""Unit tests for histogram."""
+
+from __future__ import absolute_import
+
+import array
+import random
+import unittest
+
+from histogram import histogram
+
+
+_DATA_RANGE = (-32768, 32767)
+
+
+class AmplitudeHistogramTest(unittest.TestCase):
+  """Compares AmplitudeHistogram with counts of every sample."""
+
+  def setUp(self):
+    generator = random.Random(1)
+    self.samples = array.array('h', (
+        int(generator.gauss(0, 6000)) if index % 5 else
+        generator.choice(_DATA_RANGE) for index in xrange(40000)))
+
+
+  def _count(self, histogram_object, start, stop):
+    """Counts the samples on the stride grid in a range by every sample.
+
+    @param histogram_object: An AmplitudeHistogram object.
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+
+    @returns: A list of counts of bins.
+    """
+    counts = [0] * len(histogram_object.counts)
+    stride = histogram_object.stride
+    for index in xrange(max(0, start), min(len(self.samples), stop)):
+      if index % stride == 0:
+        counts[histogram_object.get_bin(self.samples[index])] += 1
+    return counts
+
+
+  def test_set_range(self):
+    """Tests counts after moving, growing and shrinking the range."""
+    histogram_object = histogram.AmplitudeHistogram(
+        self.samples, _DATA_RANGE, number_of_bins=100, max_counted=5000)
+    for start, stop in ((0, 1000), (500, 1500), (300, 1400), (320, 1380),
+                        (2000, 3000), (2000, 9000), (5000, 14000),
+                        (6000, 13000), (-50, 40100), (39990, 40000)):
+      histogram_object.set_range(start, stop)
+      self.assertEqual(histogram_object.counts,
+                       self._count(histogram_object, start, stop))
+
+
+  def test_stride(self):
+    """Tests the stride is a power of two bounding the counted samples."""
+    histogram_object = histogram.AmplitudeHistogram(
+        self.samples, _DATA_RANGE, max_counted=5000)
+    histogram_object.set_range(0, 30000)
+    self.assertEqual(histogram_object.stride, 8)
+    self.assertEqual(sum(histogram_object.counts), 3750)
+
+
+  def test_get_counts(self):
+    """Tests get_counts of value ranges against the samples."""
+    histogram_object = histogram.AmplitudeHistogram(
+        self.samples, _DATA_RANGE, number_of_bins=65536)
+    histogram_object.set_range(1000, 21000)
+    values = self.samples[1000:21000]
+    value_ranges = [(-40000, -32768), (-32768, -32767), (-100.5, 100.5),
+                    (0, 1), (32767, 32768), (32768, 40000), (5, 5)]
+    self.assertEqual(
+        histogram_object.get_counts(value_ranges),
+        [len([value for value in values if low <= value < high])
+         for low, high in value_ranges])
+
+
+  def test_invalid(self):
+    """Tests invalid parameters."""
+    with self.assertRaises(histogram.HistogramError):
+      histogram.AmplitudeHistogram(self.samples, _DATA_RANGE, 0)
+    with self.assertRaises(histogram.HistogramError):
+      histogram.AmplitudeHistogram(self.samples, (1, 0))
+
+
+if __name__ == '__main__':
+  unittest.main()
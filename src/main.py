@@ -4,94 +4,677 @@
 import argparse
 import curses
 import logging
+import math
 import os
+import sys
+import time
 
+from annotation import annotation
+from anomaly import anomaly
+from correlation import correlation
+from daemon import daemon
 from data import data
+from diff import diff
+from profiler import profiler
+from record import record
+from screen import data_view_display
+from screen import fake_window
 from screen import screen
+from screen import wave_view_display
+from snapshot import snapshot
+from summary import summary
+from tracing import tracing
 
 
 LOG_FILE = '/tmp/wave-view.log'
 
+# The default maximum lag to search in correlation.
+_DEFAULT_MAX_LAG_MS = 200.0
 
-def wave_view(stdscr, input_file, args):
-  """View wave form."""
-  raw_data = read_raw_data(input_file, args)
-  one_channel_raw_data = data.OneChannelRawData(raw_data, args.selected_channel)
+# The time to wait for a key before polling background work.
+_POLL_MS = 200
 
-  curses.curs_set(0)
-  top_screen = screen.Screen(stdscr, one_channel_raw_data)
+# The key code of Esc.
+_ESCAPE = 27
+
+
+def wave_view(stdscr, input_files, args, clock=time.time):
+  """View wave form.
+
+  @param stdscr: A curses window, or a record.ReplayWindow in replay.
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+  @param clock: A function returning wall time in seconds for playback.
+
+  @returns: A list of (key_code, latency in seconds) of handled keys.
+  """
+  diff_regions = None
+  overview_summary = None
+  loaders = None
+  if args.diff:
+    traces, diff_regions = read_diff_traces(input_files, args)
+  elif args.daemon:
+    traces, overview_summary = read_shared_traces(input_files, args)
+  else:
+    traces, loaders = load_traces(input_files, args)
+  annotations = None
+  if args.markers:
+    try:
+      annotations = annotation.load_annotations(args.markers,
+                                                traces[0].sampling_rate)
+    except (EnvironmentError, annotation.AnnotationError) as e:
+      sys.exit('Can not load markers: %s' % e)
+
+  if args.record:
+    stdscr = record.RecordingWindow(stdscr, args.record)
+  try:
+    return run_view(stdscr, traces, args, diff_regions, overview_summary,
+                    loaders, annotations, clock)
+  finally:
+    for loader in loaders or []:
+      loader.stop()
+    if args.record:
+      stdscr.close()
+
+
+def run_view(stdscr, traces, args, diff_regions=None, overview_summary=None,
+             loaders=None, annotations=None, clock=time.time):
+  """Runs the interactive loop until user quits.
+
+  @param stdscr: A curses window.
+  @param traces: A list of data.OneChannelRawData objects.
+  @param args: The parsed args from command line.
+  @param diff_regions: A diff.RegionIndex object in diff mode.
+  @param overview_summary: A daemon.RemoteSummary of the first trace drawn
+                           in the overview. Default is the summary built by
+                           the scan.
+  @param loaders: A list of data.LoadingRawData objects of the traces. They
+                  are started after the first frame is drawn.
+  @param annotations: An annotation.AnnotationIndex loaded from --markers.
+  @param clock: A function returning wall time in seconds for playback.
+
+  @returns: A list of (key_code, latency in seconds) of handled keys.
+  """
+  try:
+    curses.curs_set(0)
+  except curses.error:
+    # There is no terminal in replay.
+    pass
+  try:
+    curses.mousemask(curses.BUTTON1_CLICKED | curses.BUTTON1_PRESSED)
+  except curses.error:
+    pass
+  top_screen = screen.Screen(stdscr, traces, args.layout, clock)
   top_screen.clear()
   top_screen.init_display()
+  if loaders:
+    for loader in loaders:
+      loader.start()
+    top_screen.set_loaders(loaders)
+  if diff_regions:
+    top_screen.set_diff_regions(diff_regions)
+  if annotations is not None:
+    top_screen.set_annotations(annotations)
+  if args.filter:
+    top_screen.wave_view_filter(args.filter)
+
+  if overview_summary:
+    top_screen.set_overview_summary(overview_summary)
+
+  scanner = None
+  if not args.no_scan:
+    # The scan builds the summary drawn in the overview, unless the daemon
+    # has one.
+    scanner = anomaly.AnomalyScanner(
+        traces[0].samples, traces[0].data_range, traces[0].sampling_rate,
+        block_summary=None if overview_summary else summary.BlockSummary())
+    scanner.start()
+    top_screen.set_anomaly_scanner(scanner)
 
-  # TODO: constraint cursor in view window.
-  # TODO: show time stamp and value at cursor.
-
-  while True:
-    input_char = stdscr.getch()
-    logging.debug('input char = %r', input_char)
-    direction = None
-    time_level_direction = None
-    value_level_direction = None
-    reset_view = None
-    if 0 < input_char < 256:
-      python_char = chr(input_char)
-      if python_char in 'Qq':
+  latencies = []
+  try:
+    while True:
+      stdscr.timeout(get_wait_ms(top_screen))
+      input_char = stdscr.getch()
+      if input_char == -1:
+        # Wake up without a key to play and to show the scan progress.
+        top_screen.play_frame()
+        top_screen.poll_loading()
+        top_screen.poll_anomalies()
+        continue
+      logging.debug('input char = %r', input_char)
+      profiler.frame_begin()
+      if not handle_input(top_screen, input_char):
         break
-      elif python_char in 'O':
-        time_level_direction = screen.ScaleDirection.UP
-      elif python_char in 'o':
-        time_level_direction = screen.ScaleDirection.DOWN
-      elif python_char in 'P':
-        value_level_direction = screen.ScaleDirection.UP
-      elif python_char in 'p':
-        value_level_direction = screen.ScaleDirection.DOWN
-      elif python_char in 'Rr':
-        reset_view = True
-      # Ignore incorrect keys
-      else:
-        pass
-    elif input_char == curses.KEY_UP:
-      direction = screen.Direction.UP
-    elif input_char == curses.KEY_DOWN:
-      direction = screen.Direction.DOWN
-    elif input_char == curses.KEY_LEFT:
-      direction = screen.Direction.LEFT
-    elif input_char == curses.KEY_RIGHT:
-      direction = screen.Direction.RIGHT
+      latencies.append((input_char, profiler.frame_end()))
+      top_screen.sync_playback()
+      top_screen.update_profile_overlay()
+      top_screen.update_readout()
+      top_screen.poll_loading()
+      top_screen.poll_anomalies()
+  finally:
+    if scanner:
+      scanner.stop()
+
+  if args.profile:
+    for line in profiler.get_profiler().format_histograms():
+      logging.info(line)
+  return latencies
+
+
+def get_wait_ms(top_screen):
+  """Gets the time to wait for a key before the loop wakes up.
+
+  @param top_screen: A screen.Screen object.
+
+  @returns: The time in milliseconds. -1 to wait for a key.
+  """
+  delay = top_screen.get_frame_delay()
+  if delay is not None:
+    return int(math.ceil(delay * 1000))
+  if top_screen.is_scanning or top_screen.is_loading:
+    return _POLL_MS
+  return -1
+
+
+# Keys to move the view by one step.
+_DIRECTION_KEYS = {
+    curses.KEY_UP: wave_view_display.Direction.UP,
+    curses.KEY_DOWN: wave_view_display.Direction.DOWN,
+    curses.KEY_LEFT: wave_view_display.Direction.LEFT,
+    curses.KEY_RIGHT: wave_view_display.Direction.RIGHT,
+}
+
+# Keys to move the view by one page.
+_PAGE_KEYS = {
+    curses.KEY_SR: wave_view_display.Direction.UP,
+    curses.KEY_SF: wave_view_display.Direction.DOWN,
+    curses.KEY_PPAGE: wave_view_display.Direction.LEFT,
+    curses.KEY_NPAGE: wave_view_display.Direction.RIGHT,
+}
+
+
+def handle_input(top_screen, input_char):
+  """Handles one input key.
+
+  @param top_screen: A screen.Screen object.
+  @param input_char: The key code returned by getch.
+
+  @returns: False if user wants to quit. True otherwise.
+  """
+  if top_screen.in_overview_focus:
+    if input_char in (ord('q'), ord('Q')):
+      return False
+    top_screen.overview_focus_key(input_char)
+    return True
+  if 0 < input_char < 256:
+    python_char = chr(input_char)
+    if python_char in 'Qq':
+      return False
+    elif python_char in 'O':
+      top_screen.wave_view_change_time_level(
+          wave_view_display.ScaleDirection.UP)
+    elif python_char in 'o':
+      top_screen.wave_view_change_time_level(
+          wave_view_display.ScaleDirection.DOWN)
+    elif python_char in 'P':
+      top_screen.wave_view_change_value_level(
+          wave_view_display.ScaleDirection.UP)
+    elif python_char in 'p':
+      top_screen.wave_view_change_value_level(
+          wave_view_display.ScaleDirection.DOWN)
+    elif python_char in 'z':
+      time_scale = prompt_scale(top_screen, 'Zoom in time to (x): ')
+      if time_scale:
+        top_screen.wave_view_set_time_scale(time_scale)
+    elif python_char in 'Z':
+      value_scale = prompt_scale(top_screen, 'Zoom in value to (x): ')
+      if value_scale:
+        top_screen.wave_view_set_value_scale(value_scale)
+    elif python_char in 'g':
+      seconds = prompt_time(top_screen, 'Go to time ([hh:]mm:ss or secs): ')
+      if seconds is not None:
+        top_screen.wave_view_seek_time(seconds)
+    elif python_char in 'Rr':
+      top_screen.wave_view_reset()
+    elif python_char in 'f':
+      top_screen.toggle_profile_overlay()
+    elif python_char in 'v':
+      top_screen.wave_view_toggle_layout()
+    elif python_char in 'H':
+      top_screen.toggle_histogram()
+    elif python_char in 'F':
+      top_screen.toggle_pitch()
+    elif python_char in '?':
+      top_screen.show_next_help()
+    elif python_char in ']':
+      top_screen.wave_view_jump_to_diff(forward=True)
+    elif python_char in '[':
+      top_screen.wave_view_jump_to_diff(forward=False)
+    elif python_char in 'x':
+      max_lag_ms = prompt_max_lag(top_screen)
+      if max_lag_ms:
+        top_screen.wave_view_correlate(max_lag_ms)
+    elif python_char in 'X':
+      top_screen.wave_view_toggle_align()
+    elif python_char in '>':
+      value = prompt_number(top_screen, 'Find sample above: ')
+      if value is not None:
+        top_screen.wave_view_find_above(value)
+    elif python_char in 'c':
+      top_screen.wave_view_find_clipped()
+    elif python_char in 's':
+      min_ms = prompt_silence_ms(top_screen)
+      if min_ms:
+        top_screen.wave_view_find_silence(min_ms)
+    elif python_char in '0':
+      top_screen.wave_view_find_zero_crossing()
+    elif python_char in 'n':
+      top_screen.wave_view_find_again()
+    elif python_char in 'm':
+      top_screen.overview_focus()
+    elif python_char in 'h':
+      top_screen.wave_view_move_cursor(columns=-1)
+    elif python_char in 'l':
+      top_screen.wave_view_move_cursor(columns=1)
+    elif python_char in ',':
+      top_screen.wave_view_move_cursor(samples=-1)
+    elif python_char in '.':
+      top_screen.wave_view_move_cursor(samples=1)
+    elif python_char in 'ab':
+      top_screen.wave_view_set_marker(python_char.upper())
+    elif python_char in '}':
+      top_screen.wave_view_jump_to_annotation(forward=True)
+    elif python_char in '{':
+      top_screen.wave_view_jump_to_annotation(forward=False)
+    elif python_char in ' ':
+      top_screen.toggle_playback()
+    elif python_char in '+=':
+      top_screen.change_playback_speed(2.0)
+    elif python_char in '-':
+      top_screen.change_playback_speed(0.5)
+    elif python_char in 't':
+      text = top_screen.prompt('Trigger LEVEL [r|f] [HYSTERESIS] or off: ')
+      if text:
+        top_screen.wave_view_set_trigger(text)
+    elif python_char in 'e':
+      top_screen.wave_view_step_trigger(forward=True)
+    elif python_char in 'E':
+      top_screen.wave_view_step_trigger(forward=False)
+    elif python_char in '~':
+      text = top_screen.prompt('Filter (dc, lp/hp/bp HZ [Q], gain DB, off): ')
+      if text:
+        top_screen.wave_view_filter(text)
+    # Ignore incorrect keys
     else:
-      # Ignore incorrect keys
       pass
+  elif input_char in _DIRECTION_KEYS:
+    top_screen.wave_view_move(_DIRECTION_KEYS[input_char])
+  elif input_char in _PAGE_KEYS:
+    top_screen.wave_view_page(_PAGE_KEYS[input_char])
+  elif input_char == curses.KEY_HOME:
+    top_screen.wave_view_jump_to_start()
+  elif input_char == curses.KEY_END:
+    top_screen.wave_view_jump_to_end()
+  elif input_char == curses.KEY_RESIZE:
+    top_screen.resize()
+  elif input_char == curses.KEY_MOUSE:
+    try:
+      _, col, row, _, _ = curses.getmouse()
+    except curses.error:
+      return True
+    top_screen.wave_view_click(row, col)
+  else:
+    # Ignore incorrect keys
+    pass
+  return True
+
+
+def prompt_scale(top_screen, message):
+  """Prompts user to input a zoom scale.
+
+  @param top_screen: A screen.Screen object.
+  @param message: The prompt message.
+
+  @returns: A positive finite float. None if the input is cancelled or
+            invalid.
+  """
+  text = top_screen.prompt(message)
+  if not text:
+    return None
+  try:
+    scale = float(text.rstrip('xX'))
+  except ValueError:
+    scale = None
+  if scale is None or math.isinf(scale) or math.isnan(scale):
+    top_screen.show_status('Invalid scale: %s' % text)
+    return None
+  if scale <= 0:
+    top_screen.show_status('Scale should be positive: %s' % text)
+    return None
+  return scale
+
+
+def prompt_number(top_screen, message):
+  """Prompts user to input a number.
+
+  @param top_screen: A screen.Screen object.
+  @param message: The prompt message.
+
+  @returns: A finite float. None if the input is cancelled or invalid.
+  """
+  text = top_screen.prompt(message)
+  if not text:
+    return None
+  try:
+    value = float(text)
+  except ValueError:
+    value = None
+  if value is None or math.isinf(value) or math.isnan(value):
+    top_screen.show_status('Invalid number: %s' % text)
+    return None
+  return value
+
+
+def prompt_silence_ms(top_screen):
+  """Prompts user to input the minimum length of silence to find.
+
+  @param top_screen: A screen.Screen object.
+
+  @returns: The length in milliseconds. None if the input is cancelled or
+            invalid.
+  """
+  text = top_screen.prompt('Find silence longer than (ms): ')
+  if not text:
+    return None
+  try:
+    min_ms = float(text)
+  except ValueError:
+    min_ms = None
+  if min_ms is None or math.isinf(min_ms) or math.isnan(min_ms):
+    top_screen.show_status('Invalid length: %s' % text)
+    return None
+  if min_ms <= 0:
+    top_screen.show_status('Length should be positive: %s' % text)
+    return None
+  return min_ms
+
+
+def prompt_max_lag(top_screen):
+  """Prompts user to input the maximum lag of correlation.
+
+  @param top_screen: A screen.Screen object.
+
+  @returns: The maximum lag in milliseconds. Empty input uses the default.
+            None if the input is cancelled or invalid.
+  """
+  text = top_screen.prompt(
+      'Max lag in ms (default %g): ' % _DEFAULT_MAX_LAG_MS)
+  if text is None:
+    return None
+  if not text:
+    return _DEFAULT_MAX_LAG_MS
+  try:
+    max_lag_ms = float(text)
+  except ValueError:
+    max_lag_ms = None
+  if max_lag_ms is None or math.isinf(max_lag_ms) or math.isnan(max_lag_ms):
+    top_screen.show_status('Invalid lag: %s' % text)
+    return None
+  if max_lag_ms <= 0:
+    top_screen.show_status('Lag should be positive: %s' % text)
+    return None
+  return max_lag_ms
+
+
+def prompt_time(top_screen, message):
+  """Prompts user to input a time stamp.
+
+  @param top_screen: A screen.Screen object.
+  @param message: The prompt message.
+
+  @returns: The time in seconds. None if the input is cancelled or invalid.
+  """
+  text = top_screen.prompt(message)
+  if not text:
+    return None
+  try:
+    return annotation.parse_time(text)
+  except annotation.AnnotationError:
+    top_screen.show_status('Invalid time: %s' % text)
+    return None
+
+
+def read_traces(input_files, args):
+  """Reads files concurrently and selects channels as traces.
+
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+
+  @returns: A list of data.OneChannelRawData objects. Each selected channel
+            of each file is a trace.
+  """
+  raw_data_list = data.read_files(input_files, get_data_format(args),
+                                  args.jobs)
+  traces = []
+  for input_file, raw_data in zip(input_files, raw_data_list):
+    for channel in args.selected_channel:
+      traces.append(data.OneChannelRawData(
+          raw_data, channel, get_trace_name(input_file, channel, args)))
+  return traces
 
-    if direction:
-      # Move view.
-      top_screen.wave_view_move(direction)
-    elif time_level_direction:
-      top_screen.wave_view_change_time_level(time_level_direction)
-    elif value_level_direction:
-      top_screen.wave_view_change_value_level(value_level_direction)
-    elif reset_view:
-      top_screen.wave_view_reset()
 
+def load_traces(input_files, args):
+  """Maps files to read them in background and selects channels as traces.
 
-def read_raw_data(input_file, args):
-  """Read a file.
+  The first frame is drawn from the mapped files, which reads only the
+  samples in it, so it is shown without waiting for the files to be read.
 
-  The file data format is fixed to 1 channel, 16 bit signed int,
-  48000 Hz sampling rate.
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+
+  @returns: A tuple (traces, loaders). traces is a list of
+            data.OneChannelRawData objects. loaders is a list of
+            data.LoadingRawData objects to start.
+  """
+  data_format = get_data_format(args)
+  loaders = [data.load_file(input_file, data_format)
+             for input_file in input_files]
+  traces = []
+  for input_file, raw_data in zip(input_files, loaders):
+    for channel in args.selected_channel:
+      traces.append(data.OneChannelRawData(
+          raw_data, channel, get_trace_name(input_file, channel, args)))
+  return traces, loaders
+
+
+def read_shared_traces(input_files, args):
+  """Opens files in a daemon and selects channels as traces.
+
+  Samples are mapped from the shared memory of the daemon, so they are not
+  read, decoded or copied by this process.
+
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+
+  @returns: A tuple (traces, overview_summary). traces is a list of
+            data.OneChannelRawData objects. overview_summary is a
+            daemon.RemoteSummary of the first trace.
+  """
+  client = daemon.DaemonClient(args.daemon)
+  data_format = get_data_format(args)
+  traces = []
+  overview_summary = None
+  for input_file in input_files:
+    key, raw_data = client.open(input_file, data_format)
+    for channel in args.selected_channel:
+      traces.append(data.OneChannelRawData(
+          raw_data, channel, get_trace_name(input_file, channel, args)))
+      if overview_summary is None:
+        overview_summary = daemon.RemoteSummary(client, key, channel)
+  return traces, overview_summary
+
+
+def get_trace_name(input_file, channel, args):
+  """Gets the name of a trace shown in the view.
 
   @param input_file: The path to the input raw data file.
+  @param channel: The selected channel.
+  @param args: The parsed args from command line.
+
+  @returns: The file name, with the channel if several are selected.
+  """
+  name = os.path.basename(input_file)
+  if len(args.selected_channel) > 1:
+    name = '%s:%d' % (name, channel)
+  return name
+
+
+def get_data_format(args):
+  """Gets data format from args.
+
   @param args: The parsed args from command line.
 
-  @returns: A RawData object.
+  @returns: A data.DataFormat object.
   """
-  content = None
-  with open(input_file) as handle:
-    content = handle.read()
-  data_format = data.DataFormat(
+  return data.DataFormat(
       num_channels=args.channel,
       length_bits=args.bit,
       sampling_rate=args.rate)
-  return data.RawData(content, data_format)
+
+
+def read_diff_traces(input_files, args):
+  """Maps two files and computes their difference lazily.
+
+  Files are mapped rather than read, so captures of any length can be
+  compared. Only the first selected channel is compared.
+
+  @param input_files: A list of paths to two raw data files.
+  @param args: The parsed args from command line.
+
+  @returns: A tuple (traces, diff_regions). traces is a list of the two
+            captures and their difference. diff_regions is a
+            diff.RegionIndex object.
+  """
+  data_format = get_data_format(args)
+  channel = args.selected_channel[0]
+  traces = [
+      data.OneChannelRawData(data.map_file(input_file, data_format), channel,
+                             os.path.basename(input_file))
+      for input_file in input_files]
+  difference = diff.DifferenceChannel(traces[0], traces[1], args.diff_offset)
+  diff_regions = diff.RegionIndex(difference.samples, args.diff_threshold)
+  return traces + [difference], diff_regions
+
+
+def run_daemon(args):
+  """Serves decoded files to viewers until interrupted.
+
+  @param args: The parsed args from command line.
+  """
+  server = daemon.Daemon(args.serve)
+  print 'Serving on %s, press Ctrl-C to stop.' % args.serve
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.close()
+
+
+def run_replay(input_files, args):
+  """Replays recorded keys in a fake window and prints key latencies.
+
+  Keys are replayed at their recorded times on a fake clock, so playback
+  draws as many frames between keys as it did while recording.
+
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+  """
+  events = record.load(args.replay)
+  # Quit after all the keys are replayed. Esc first cancels a prompt which
+  # is still open.
+  end = events[-1][0] if events else 0.0
+  events.extend([(end, _ESCAPE), (end, ord('q'))])
+  height, width = args.replay_window
+  window = record.ReplayWindow(fake_window.FakeWindow(height, width), events)
+  latencies = wave_view(window, input_files, args, window.clock)
+  for line in record.format_latency_report(latencies):
+    print line
+
+
+def parse_time_arg(text):
+  """Parses a time stamp argument.
+
+  @param text: A string like '2700', '45:00' or '0:45:00.5'.
+
+  @returns: The time in seconds.
+
+  @raises: argparse.ArgumentTypeError if the text is not valid.
+  """
+  try:
+    return annotation.parse_time(text)
+  except annotation.AnnotationError as error:
+    raise argparse.ArgumentTypeError(str(error))
+
+
+def parse_window_size(text):
+  """Parses a window size.
+
+  @param text: A string like '40x160'.
+
+  @returns: A tuple (height, width).
+
+  @raises: argparse.ArgumentTypeError if the text is not valid.
+  """
+  try:
+    height, width = [int(field) for field in text.lower().split('x')]
+  except ValueError:
+    raise argparse.ArgumentTypeError('Invalid window size %r' % text)
+  return height, width
+
+
+def run_snapshot(input_files, args):
+  """Renders snapshots to a file or stdout without curses.
+
+  The first selected channel is rendered.
+
+  @param input_files: A list of paths to raw data files or directories.
+  @param args: The parsed args from command line.
+  """
+  options = snapshot.SnapshotOptions(
+      width=args.width, height=args.height, start_time=args.start,
+      end_time=args.end, time_scale=args.zoom, value_scale=args.value_zoom)
+  data_format = get_data_format(args)
+  output = open(args.output, 'w') if args.output else sys.stdout
+  try:
+    for input_file in input_files:
+      snapshot.snapshot(input_file, data_format, args.selected_channel[0],
+                        options, output, args.jobs)
+  finally:
+    if args.output:
+      output.close()
+
+
+def run_correlate(input_files, args):
+  """Prints the lag of the second trace to the first trace.
+
+  The range is selected by --start and --end.
+
+  @param input_files: A list of paths to the input raw data files.
+  @param args: The parsed args from command line.
+  """
+  traces = read_traces(input_files, args)
+  if len(traces) < 2:
+    sys.exit('Correlation needs two files or two selected channels.')
+  sampling_rate = traces[0].sampling_rate
+  start = int(args.start * sampling_rate)
+  stop = int(args.end * sampling_rate) if args.end is not None else None
+  max_lag = int(args.max_lag * sampling_rate / 1000)
+  result = correlation.cross_correlate(
+      traces[0].samples, traces[1].samples, sampling_rate, max_lag,
+      start, stop)
+  print '%s vs %s: %s' % (traces[0].name, traces[1].name, result)
 
 
 def parse_args():
@@ -105,41 +688,160 @@ def parse_args():
       formatter_class=argparse.RawTextHelpFormatter)
   parser.add_argument('--debug', '-d', action='store_true', default=False,
                       help='Print debug messages.')
-  parser.add_argument('input_file', action='store', default=None, nargs='?',
+  parser.add_argument('input_files', action='store', default=None,
+                      nargs='*', metavar='input_file',
                       help='Raw data to view. It must be a little-endian\n'
                            'raw data. Default file is a 5 seconds 1Hz\n'
-                           'sine wave.')
+                           'sine wave. Several files are read concurrently\n'
+                           'and shown with a shared time axis.')
   parser.add_argument('--channel', '-c', action='store', default=1, type=int,
                       help='Total number of channel. Default is 1.\n')
-  parser.add_argument('--selected-channel', '-s', action='store', default=0,
-                      type=int,
+  parser.add_argument('--selected-channel', '-s', action='append',
+                      default=None, type=int,
                       help='The Selected channel. Default is 0,\n'
-                           'which is the first channel.\n')
+                           'which is the first channel. Repeat it to\n'
+                           'view several channels.\n')
+  parser.add_argument('--layout', action='store',
+                      default=data_view_display.Layout.STACKED,
+                      choices=[data_view_display.Layout.STACKED,
+                               data_view_display.Layout.OVERLAY],
+                      help='Show traces in stacked bands or overlaid in\n'
+                           'one view. Default is stacked.\n')
+  parser.add_argument('--diff', action='store_true', default=False,
+                      help='Show two files and their difference, and index\n'
+                           'regions where they differ. Use [ and ] to go\n'
+                           'to the previous and next region.\n')
+  parser.add_argument('--diff-offset', action='store', default=0, type=int,
+                      help='The sample in the second file aligned to the\n'
+                           'first sample of the first file. Default is 0.\n')
+  parser.add_argument('--diff-threshold', action='store', default=0,
+                      type=int,
+                      help='Index regions where the absolute difference is\n'
+                           'larger than this value. Default is 0.\n')
+  parser.add_argument('--markers', action='store', default=None,
+                      help='A marker file of events to show under the\n'
+                           'time axis. Each line is START [END] LABEL in\n'
+                           'seconds. Use { and } to go to the previous\n'
+                           'and next marker.\n')
+  parser.add_argument('--filter', action='store', default=None,
+                      help='Filter all traces, e.g. "dc, hp 100, gain 6".\n'
+                           'Stages are dc [HZ], lp HZ [Q], hp HZ [Q],\n'
+                           'bp HZ [Q] and gain DB. Use ~ to change it.\n')
+  parser.add_argument('--no-scan', action='store_true', default=False,
+                      help='Do not scan the first trace for clipping,\n'
+                           'DC steps, dropouts and silence in background.\n')
+  parser.add_argument('--serve', action='store', default=None,
+                      metavar='SOCKET',
+                      help='Run a daemon on a Unix socket without curses.\n'
+                           'It decodes files into shared memory once for\n'
+                           'all viewers started with --daemon.\n')
+  parser.add_argument('--daemon', action='store', default=None,
+                      metavar='SOCKET',
+                      help='Open files in the daemon on a Unix socket and\n'
+                           'map its decoded samples, so another viewer of\n'
+                           'the same file starts without decoding it.\n')
   parser.add_argument('--rate', '-r', action='store', default=48000, type=int,
                       help='Samping rate. Default is 48000.\n')
   parser.add_argument('--bit', '-b', action='store', default=16, type=int,
                       help='Sample size in bits. Default is 16.\n')
+  parser.add_argument('--profile', action='store_true', default=False,
+                      help='Write histograms of stage timings to the log\n'
+                           'on exit.\n')
+  parser.add_argument('--trace', action='store', default=None,
+                      help='Write Chrome trace events of pipeline stages\n'
+                           'to a JSON file on exit. Load it in\n'
+                           'chrome://tracing or Perfetto.\n')
+  parser.add_argument('--record', action='store', default=None,
+                      help='Record keys with time stamps to a file.\n')
+  parser.add_argument('--replay', action='store', default=None,
+                      help='Replay keys recorded by --record in a fake\n'
+                           'window without curses, and print latency\n'
+                           'percentiles of each key. Time between keys is\n'
+                           'replayed on a fake clock without waiting.\n')
+  parser.add_argument('--replay-window', action='store', default=(40, 160),
+                      type=parse_window_size,
+                      help='Fake window size ROWSxCOLS in replay.\n'
+                           'Default is 40x160.\n')
+  parser.add_argument('--snapshot', action='store_true', default=False,
+                      help='Print wave view as text without curses.\n'
+                           'input_file can be a directory to render all\n'
+                           'files in it.\n')
+  parser.add_argument('--correlate', action='store_true', default=False,
+                      help='Print the lag of the second file or selected\n'
+                           'channel to the first one by cross-correlation\n'
+                           'without curses. --start and --end select the\n'
+                           'range.\n')
+  parser.add_argument('--max-lag', action='store',
+                      default=_DEFAULT_MAX_LAG_MS, type=float,
+                      help='Maximum lag of correlation in ms. Default is\n'
+                           '%g.\n' % _DEFAULT_MAX_LAG_MS)
+  parser.add_argument('--width', action='store', default=80, type=int,
+                      help='Snapshot width. Default is 80.\n')
+  parser.add_argument('--height', action='store', default=21, type=int,
+                      help='Snapshot height. Default is 21.\n')
+  parser.add_argument('--start', action='store', default=0.0,
+                      type=parse_time_arg,
+                      help='Snapshot start time. Default is 0.\n')
+  parser.add_argument('--end', action='store', default=None,
+                      type=parse_time_arg,
+                      help='Snapshot end time. It overrides --zoom.\n')
+  parser.add_argument('--zoom', action='store', default=1.0, type=float,
+                      help='Snapshot time scale. Default is 1.\n')
+  parser.add_argument('--value-zoom', action='store', default=1.0,
+                      type=float,
+                      help='Snapshot value scale. Default is 1.\n')
+  parser.add_argument('--output', '-o', action='store', default=None,
+                      help='Snapshot output file. Default is stdout.\n')
+  parser.add_argument('--jobs', '-j', action='store', default=None,
+                      type=int,
+                      help='Number of snapshot worker processes.\n'
+                           'Default is number of CPUs.\n')
 
   args = parser.parse_args()
+  args.selected_channel = args.selected_channel or [0]
+  if args.diff and len(args.input_files) != 2:
+    parser.error('--diff needs two input files.')
+  if args.diff and args.daemon:
+    parser.error('--diff can not be used with --daemon.')
   level = logging.DEBUG if args.debug else logging.INFO
   logging.basicConfig(filename=LOG_FILE, level=level)
   return args
 
 
-def get_input_file(args):
-  """Gets input file from args, or use default test data."""
-  if args.input_file:
-    return args.input_file
+def get_input_files(args):
+  """Gets input files from args, or use default test data."""
+  if args.input_files:
+    return args.input_files
   else:
     src_folder = os.path.dirname(os.path.realpath(__file__))
-    return os.path.join(src_folder, '..', 'test_data', '1hz.raw')
+    return [os.path.join(src_folder, '..', 'test_data', '1hz.raw')]
 
 
 def main():
   """Main entry point."""
   args = parse_args()
-  input_file = get_input_file(args)
-  curses.wrapper(wave_view, input_file, args)
+  input_files = get_input_files(args)
+  recorder = None
+  if args.trace:
+    recorder = tracing.ChromeTraceRecorder()
+    tracing.add_sink(recorder)
+  if args.profile:
+    profiler.enable()
+  try:
+    if args.serve:
+      run_daemon(args)
+    elif args.snapshot:
+      run_snapshot(input_files, args)
+    elif args.correlate:
+      run_correlate(input_files, args)
+    elif args.replay:
+      run_replay(input_files, args)
+    else:
+      curses.wrapper(wave_view, input_files, args)
+  finally:
+    if recorder:
+      tracing.remove_sink(recorder)
+      recorder.save(args.trace)
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,248 @@
+"""Estimate the dominant frequency of samples in a range."""
+
+import collections
+import itertools
+import logging
+import math
+import operator
+
+from tracing import tracing
+from trigger import trigger
+
+
+class PitchError(Exception):
+  """Error in pitch."""
+  pass
+
+
+class PitchEstimate(object): # pylint:disable=R0903
+  """The estimated dominant frequency of samples in a range.
+
+  frequency is the autocorrelation estimate, or the zero-crossing estimate
+  if the range is too short for the autocorrelation or the period is too
+  short to refine. It is None if the samples do not cross their mean.
+  clarity is the autocorrelation at the period relative to that at lag 0,
+  from 0 for noise to 1 for a pure tone.
+  """
+  def __init__(self, frequency, zero_crossing_frequency, clarity):
+    self.frequency = frequency
+    self.zero_crossing_frequency = zero_crossing_frequency
+    self.clarity = clarity
+
+
+  def __str__(self):
+    if self.frequency is None:
+      return 'no pitch'
+    text = '%.6g Hz (zc %.6g Hz' % (self.frequency,
+                                   self.zero_crossing_frequency)
+    if self.clarity is not None:
+      text += ', clarity %.2f' % self.clarity
+    return text + ')'
+
+
+class PitchEstimator(object):
+  """Estimates the dominant frequency of samples in ranges.
+
+  The period is first estimated from the rising crossings of the mean,
+  found by trigger.TriggerIndex with hysteresis so noise does not cross
+  again. It is then refined by climbing the autocorrelation from that lag
+  to its peak, and interpolating the peak by a parabola. Each
+  autocorrelation is one builtin sum over map, so there is no Python-level
+  loop per sample.
+
+  At most max_samples contiguous samples in the centre of the range are
+  analysed. If they cross the mean too few times for a low frequency,
+  samples at a stride over the whole range are analysed instead.
+
+  Estimates are kept in a LRU cache by range, so scrolling back and forth
+  does not estimate again.
+  """
+  # The least number of periods to estimate from.
+  _MIN_PERIODS = 2
+  # The hysteresis of crossings relative to the RMS of samples.
+  _HYSTERESIS = 0.5
+  # The autocorrelation is climbed by steps of _CLIMB_STEP of the lag,
+  # halved down to 1, at most _MAX_CLIMB steps of each size. The smallest
+  # lag is _MIN_LAG_RATIO of the zero-crossing period.
+  _CLIMB_STEP = 0.02
+  _MAX_CLIMB = 64
+  _MIN_LAG_RATIO = 0.75
+  # The autocorrelation at the period relative to that at lag 0, under
+  # which longer lags are scanned, up to _SCAN_RATIO times the
+  # zero-crossing period at a ratio of _SCAN_STEP, each one from samples at
+  # _SCAN_STRIDE. The first lag with _OCTAVE_THRESHOLD of the highest
+  # correlation is taken, so a multiple of the period is not.
+  _MIN_CLARITY = 0.5
+  _SCAN_RATIO = 8
+  _SCAN_STEP = 1.04
+  _SCAN_STRIDE = 4
+  _OCTAVE_THRESHOLD = 0.9
+  # Near Nyquist, a period is a few lags, so the interpolated peak is
+  # coarse and may be a multiple of the period. If the zero-crossing
+  # period is shorter than _MIN_REFINED_PERIOD samples and the refined one
+  # is off by more than _MAX_DRIFT of it, the zero-crossing period, which
+  # averages many periods, is taken.
+  _MIN_REFINED_PERIOD = 8
+  _MAX_DRIFT = 0.005
+
+  def __init__(self, samples, sampling_rate, max_samples=16384,
+               cache_size=64):
+    """Creates a PitchEstimator.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param sampling_rate: The sampling rate of samples.
+    @param max_samples: The maximum number of samples analysed.
+    @param cache_size: Number of estimates kept in the cache. 0 disables it.
+
+    @raises: PitchError if max_samples is too small.
+    """
+    if max_samples < 16:
+      raise PitchError('max_samples %r is too small' % max_samples)
+    self.samples = samples
+    self._sampling_rate = sampling_rate
+    self._max_samples = max_samples
+    self._cache_size = cache_size
+    self._cache = collections.OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+
+  def estimate(self, start, stop):
+    """Estimates the dominant frequency of samples in a range.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+
+    @returns: A PitchEstimate.
+    """
+    start = max(0, start)
+    stop = min(len(self.samples), stop)
+    key = (start, stop)
+    if key in self._cache:
+      self.hits += 1
+      estimate = self._cache.pop(key)
+    else:
+      self.misses += 1
+      with tracing.span('pitch'):
+        estimate = self._estimate(start, stop)
+      logging.debug('Pitch of %r to %r: %s', start, stop, estimate)
+    self._cache[key] = estimate
+    while len(self._cache) > self._cache_size:
+      self._cache.popitem(last=False)
+    return estimate
+
+
+  def _estimate(self, start, stop):
+    """Estimates the dominant frequency of samples in a range.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+
+    @returns: A PitchEstimate.
+    """
+    centre = (start + stop) / 2
+    first = max(start, centre - self._max_samples / 2)
+    values = self.samples[first:min(stop, first + self._max_samples)]
+    stride = 1
+    estimate = self._estimate_values(values)
+    if estimate is None and stop - start > len(values):
+      stride = -(-(stop - start) / self._max_samples)
+      estimate = self._estimate_values(self.samples[start:stop:stride])
+    if estimate is None:
+      return PitchEstimate(None, None, None)
+    period, zero_crossing_period, clarity = estimate
+    rate = float(self._sampling_rate) / stride
+    return PitchEstimate(rate / period, rate / zero_crossing_period, clarity)
+
+
+  def _estimate_values(self, values):
+    """Estimates the period of values.
+
+    @param values: A sequence of values.
+
+    @returns: (period, zero_crossing_period, clarity) in samples, or None if
+              values cross their mean too few times.
+    """
+    length = len(values)
+    if length < 4:
+      return None
+    mean = float(sum(values)) / length
+    centred = [value - mean for value in values]
+    power = sum(itertools.imap(operator.mul, centred, centred)) / length
+    crossings = trigger.TriggerIndex(
+        values, mean, trigger.Edge.RISING,
+        hysteresis=self._HYSTERESIS * math.sqrt(power)).edges
+    if len(crossings) < self._MIN_PERIODS + 1:
+      return None
+    zero_crossing_period = (float(crossings[-1] - crossings[0]) /
+                            (len(crossings) - 1))
+    max_lag = length / self._MIN_PERIODS
+    if zero_crossing_period >= max_lag or not power:
+      return zero_crossing_period, zero_crossing_period, None
+
+    correlations = {}
+    def correlate(lag, step=1):
+      """Gets the mean product of values lag samples apart."""
+      if (lag, step) not in correlations:
+        first = centred[:-lag:step]
+        correlations[lag, step] = sum(itertools.imap(
+            operator.mul, first, centred[lag::step])) / len(first)
+      return correlations[lag, step]
+
+    # Extra crossings of noise or harmonics shorten the zero-crossing
+    # period, so the period is not much shorter than that.
+    min_lag = max(2, int(zero_crossing_period * self._MIN_LAG_RATIO))
+    lag = self._climb(correlate, int(round(zero_crossing_period)), min_lag,
+                      max_lag)
+    if lag == min_lag or correlate(lag) < self._MIN_CLARITY * power:
+      # Noise adds crossings, so the period is longer. Scan longer lags
+      # coarsely for the first lag near the highest correlation.
+      lags = []
+      scan_lag = zero_crossing_period
+      while scan_lag < min(max_lag, self._SCAN_RATIO * zero_crossing_period):
+        lags.append(int(scan_lag))
+        scan_lag *= self._SCAN_STEP
+      if lags:
+        scanned = [correlate(each_lag, self._SCAN_STRIDE)
+                   for each_lag in lags]
+        threshold = max(scanned) * self._OCTAVE_THRESHOLD
+        lag = self._climb(correlate, lags[[correlation >= threshold
+                                           for correlation in scanned
+                                          ].index(True)], min_lag, max_lag)
+    before, peak, after = (correlate(lag - 1), correlate(lag),
+                           correlate(lag + 1))
+    if not before <= peak >= after or peak <= 0:
+      # There is no peak near the zero-crossing period.
+      return zero_crossing_period, zero_crossing_period, None
+    curvature = before - 2 * peak + after
+    offset = 0.5 * (before - after) / curvature if curvature < 0 else 0
+    if (zero_crossing_period < self._MIN_REFINED_PERIOD and
+        abs(lag + offset - zero_crossing_period) >
+        self._MAX_DRIFT * zero_crossing_period):
+      return zero_crossing_period, zero_crossing_period, None
+    return lag + offset, zero_crossing_period, min(1.0, peak / power)
+
+
+  def _climb(self, correlate, lag, min_lag, max_lag):
+    """Climbs the autocorrelation from a lag to a peak.
+
+    @param correlate: A function to get the autocorrelation at a lag.
+    @param lag: The lag to start from.
+    @param min_lag: The smallest lag.
+    @param max_lag: The lag after the largest lag.
+
+    @returns: The lag of the peak.
+    """
+    lag = min(max_lag - 2, max(min_lag, lag))
+    step = max(1, int(lag * self._CLIMB_STEP))
+    while step:
+      for _ in xrange(self._MAX_CLIMB):
+        if (lag + step + 1 < max_lag and
+            correlate(lag + step) > correlate(lag)):
+          lag += step
+        elif lag - step >= min_lag and correlate(lag - step) > correlate(lag):
+          lag -= step
+        else:
+          break
+      step /= 2
+    return lag
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+"""Unit tests for pitch."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import random
+import unittest
+
+from pitch import pitch
+
+
+def _make_tone(frequency, sampling_rate, noise=0, length=40000):
+  """Makes samples of a sine wave.
+
+  @param frequency: The frequency in Hz.
+  @param sampling_rate: The sampling rate.
+  @param noise: The amplitude of uniform noise.
+  @param length: The number of samples.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(1)
+  return array.array('h', (
+      int(10000 * math.sin(2 * math.pi * frequency * index / sampling_rate))
+      + generator.randint(-noise, noise) for index in xrange(length)))
+
+
+class PitchEstimatorTest(unittest.TestCase):
+  """Tests estimates of tones."""
+
+  def _check(self, frequency, sampling_rate, noise=0, tolerance=0.002):
+    """Checks the estimate of a tone is within a tolerance.
+
+    @param frequency: The frequency in Hz.
+    @param sampling_rate: The sampling rate.
+    @param noise: The amplitude of uniform noise.
+    @param tolerance: The tolerance relative to the frequency.
+
+    """
+    samples = _make_tone(frequency, sampling_rate, noise)
+    estimator = pitch.PitchEstimator(samples, sampling_rate)
+    for start, stop in ((0, len(samples)), (1000, 3000)):
+      estimate = estimator.estimate(start, stop)
+      self.assertAlmostEqual(estimate.frequency / frequency, 1.0,
+                             delta=tolerance, msg='%g Hz at %r: %s' % (
+                                 frequency, sampling_rate, estimate))
+
+
+  def test_tones(self):
+    """Tests tones from low frequencies to near Nyquist."""
+    for frequency, sampling_rate in ((60, 8000), (440, 48000), (1000, 8000),
+                                     (2000, 8000), (2700, 8000),
+                                     (3000, 8000), (3500, 8000),
+                                     (15000, 44100), (20000, 48000)):
+      self._check(frequency, sampling_rate)
+
+
+  def test_noisy_tone(self):
+    """Tests a tone with noise which adds zero crossings."""
+    self._check(440, 48000, noise=3000, tolerance=0.01)
+
+
+  def test_no_pitch(self):
+    """Tests samples which do not cross their mean."""
+    estimator = pitch.PitchEstimator(array.array('h', [5] * 1000), 8000)
+    self.assertEqual(str(estimator.estimate(0, 1000)), 'no pitch')
+
+
+  def test_cache(self):
+    """Tests repeated estimates hit the cache, and a cache of size 0."""
+    samples = _make_tone(440, 8000)
+    for cache_size, hits in ((2, 2), (1, 1), (0, 0)):
+      estimator = pitch.PitchEstimator(samples, 8000, cache_size=cache_size)
+      for start in (0, 1000, 1000, 0):
+        estimator.estimate(start, start + 2000)
+      self.assertEqual((estimator.hits, estimator.misses), (hits, 4 - hits))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,119 @@
+"""Pace frames to advance the view in real time."""
+
+import math
+import time
+
+
+class PlaybackError(Exception):
+  """Error in playback."""
+  pass
+
+
+class Playback(object):
+  """A clock which maps wall time to a sample position and paces frames.
+
+  The position advances by speed times the sampling rate each second of
+  wall time, so it does not drift when frames take different time to draw.
+  Frames are due at fixed periods. When drawing a frame takes longer than a
+  period, the frames that are already late are dropped instead of drawn
+  later, so playback never falls behind the clock.
+  """
+  MIN_SPEED = 1.0 / 64
+  MAX_SPEED = 1024.0
+
+  def __init__(self, sampling_rate, fps=25.0, clock=time.time):
+    """Creates a Playback.
+
+    @param sampling_rate: The sampling rate.
+    @param fps: The target number of frames per second.
+    @param clock: A function returning wall time in seconds.
+
+    @raises: PlaybackError if fps is not positive.
+    """
+    if fps <= 0:
+      raise PlaybackError('Invalid frame rate %r' % fps)
+    self._sampling_rate = sampling_rate
+    self._period = 1.0 / fps
+    self._clock = clock
+    self.speed = 1.0
+    self.playing = False
+    self.frames = 0
+    self.dropped = 0
+    self._origin_index = 0
+    self._origin_time = None
+    self._next_frame_time = None
+
+
+  def start(self, sample_index):
+    """Starts playing from a sample.
+
+    @param sample_index: The sample index at the start.
+
+    """
+    self.playing = True
+    self.frames = 0
+    self.dropped = 0
+    self.seek(sample_index)
+    self._next_frame_time = self._origin_time
+
+
+  def stop(self):
+    """Stops playing."""
+    self.playing = False
+
+
+  def seek(self, sample_index):
+    """Continues playing from a sample.
+
+    @param sample_index: The sample index.
+
+    """
+    self._origin_index = sample_index
+    self._origin_time = self._clock()
+
+
+  def set_speed(self, speed):
+    """Changes the speed. The position continues from the current one.
+
+    @param speed: The number of times of real time. It is limited to
+                  [MIN_SPEED, MAX_SPEED].
+
+    """
+    if self.playing:
+      self.seek(self.get_position())
+    self.speed = max(self.MIN_SPEED, min(self.MAX_SPEED, speed))
+
+
+  def get_position(self):
+    """Gets the sample index at current time.
+
+    @returns: The sample index.
+    """
+    return self._origin_index + int(
+        (self._clock() - self._origin_time) * self._sampling_rate *
+        self.speed)
+
+
+  def get_delay(self):
+    """Gets the time to wait for the next frame.
+
+    @returns: The time in seconds. 0 if the frame is due. None if it is not
+              playing.
+    """
+    if not self.playing:
+      return None
+    return max(0.0, self._next_frame_time - self._clock())
+
+
+  def end_frame(self):
+    """Marks a frame drawn, and schedules the next frame.
+
+    Frames which are due before now are dropped.
+    """
+    self.frames += 1
+    self._next_frame_time += self._period
+    late = self._clock() - self._next_frame_time
+    if late > 0:
+      missed = int(math.ceil(late / self._period))
+      self.dropped += missed
+      self._next_frame_time += missed * self._period
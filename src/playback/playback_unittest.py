@@ -0,0 +1,86 @@
+#!/usr/bin/python
+"""Unit tests for playback."""
+
+from __future__ import absolute_import
+
+import unittest
+
+from playback import playback
+
+
+class _FakeClock(object):
+  """A clock which advances only when it is told to."""
+  def __init__(self):
+    self.now = 0.0
+
+
+  def __call__(self):
+    return self.now
+
+
+class PlaybackTest(unittest.TestCase):
+  """Tests positions and frame pacing with a fake clock."""
+
+  def setUp(self):
+    self.clock = _FakeClock()
+    self.playback = playback.Playback(1000, fps=4.0, clock=self.clock)
+
+
+  def _end_frame_at(self, now):
+    """Ends a frame when the clock is at a time.
+
+    @param now: The time in seconds.
+
+    @returns: A tuple of (frames, dropped, delay).
+    """
+    self.clock.now = now
+    self.playback.end_frame()
+    return (self.playback.frames, self.playback.dropped,
+            self.playback.get_delay())
+
+
+  def test_frames(self):
+    """Tests late frames are dropped, and a frame due now is not."""
+    self.assertIsNone(self.playback.get_delay())
+    self.playback.start(0)
+    self.assertEqual(self.playback.get_delay(), 0.0)
+    self.assertEqual(self._end_frame_at(0.125), (1, 0, 0.125))
+    self.assertEqual(self._end_frame_at(0.375), (2, 0, 0.125))
+    # The frame due at 0.75 is dropped, and the frame due at 1.0 is drawn.
+    self.assertEqual(self._end_frame_at(1.0), (3, 1, 0.0))
+    self.assertEqual(self._end_frame_at(1.0), (4, 1, 0.25))
+    # The frames due at 1.5, 1.75 and 2.0 are dropped.
+    self.assertEqual(self._end_frame_at(2.125), (5, 4, 0.125))
+    self.playback.stop()
+    self.assertIsNone(self.playback.get_delay())
+    self.playback.start(0)
+    self.assertEqual((self.playback.frames, self.playback.dropped), (0, 0))
+
+
+  def test_position(self):
+    """Tests the position follows the clock at the speed."""
+    self.clock.now = 10.0
+    self.playback.start(500)
+    self.clock.now = 10.5
+    self.assertEqual(self.playback.get_position(), 1000)
+    self.playback.set_speed(4.0)
+    self.clock.now = 11.0
+    self.assertEqual(self.playback.get_position(), 3000)
+    self.playback.seek(0)
+    self.clock.now = 11.25
+    self.assertEqual(self.playback.get_position(), 1000)
+    for speed, limited in ((1e9, playback.Playback.MAX_SPEED),
+                           (0, playback.Playback.MIN_SPEED)):
+      self.playback.set_speed(speed)
+      self.assertEqual(self.playback.speed, limited)
+
+
+  def test_invalid_fps(self):
+    """Tests a frame rate which is not positive."""
+    for fps in (0, -1):
+      with self.assertRaises(playback.PlaybackError):
+        playback.Playback(1000, fps=fps)
+
+
+if __name__ == '__main__':
+  unittest.main()
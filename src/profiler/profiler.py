@@ -0,0 +1,260 @@
+"""Measure per-frame timings of pipeline stages.
+
+The module keeps one Profiler used by the whole program, like logging.
+Stages are the spans traced by tracing.span. The Profiler receives them
+while it is enabled as a tracing sink, and the main loop marks frames by
+frame_begin and frame_end.
+"""
+
+import math
+import time
+
+from tracing import tracing
+
+
+class Histogram(object):
+  """A histogram of durations in power-of-two buckets of microseconds.
+
+  Bucket k counts durations in [2^(k-1), 2^k) microseconds, and bucket 0
+  counts durations shorter than 1 microsecond.
+  """
+  def __init__(self):
+    """Creates an empty Histogram."""
+    self.buckets = {}
+    self.count = 0
+    self.total = 0.0
+    self.max_value = 0.0
+
+
+  def add(self, secs):
+    """Adds a duration.
+
+    @param secs: The duration in seconds.
+
+    """
+    micros = secs * 1e6
+    bucket = int(math.log(micros, 2)) + 1 if micros >= 1 else 0
+    self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+    self.count += 1
+    self.total += secs
+    self.max_value = max(self.max_value, secs)
+
+
+  def get_percentile(self, percent):
+    """Gets the upper bound of the bucket containing a percentile.
+
+    @param percent: A number in [0, 100].
+
+    @returns: The upper bound in seconds. 0 if there is no duration.
+    """
+    target = self.count * percent / 100.0
+    accumulated = 0
+    for bucket in sorted(self.buckets):
+      accumulated += self.buckets[bucket]
+      if accumulated >= target:
+        return (1 << bucket) / 1e6
+    return 0.0
+
+
+  def format(self):
+    """Formats the histogram.
+
+    @returns: A list of strings.
+    """
+    if not self.count:
+      return ['  no samples']
+    lines = ['  count %d, mean %.3f ms, p50 < %.3f ms, p90 < %.3f ms, '
+             'max %.3f ms' % (
+                 self.count, self.total / self.count * 1000,
+                 self.get_percentile(50) * 1000,
+                 self.get_percentile(90) * 1000, self.max_value * 1000)]
+    for bucket in sorted(self.buckets):
+      lines.append('  < %10.3f ms: %d' % ((1 << bucket) / 1e3,
+                                          self.buckets[bucket]))
+    return lines
+
+
+class Profiler(object):
+  """Profiler collects stage timings per frame and in histograms.
+
+  A frame starts when a key is received and ends when the screen is
+  refreshed. Stages measured outside of a frame, e.g. loading, are kept
+  in histograms and in the last frame timings.
+  """
+  FRAME = 'frame'
+
+  def __init__(self):
+    """Creates a Profiler."""
+    self._histograms = {}
+    self._frame_start = None
+    self._current_frame = {}
+    self.last_frame = {}
+    self._hits = {}
+    self._misses = {}
+
+
+  def add(self, name, secs):
+    """Adds a duration of a stage.
+
+    @param name: The name of the stage.
+    @param secs: The duration in seconds.
+
+    """
+    self._histograms.setdefault(name, Histogram()).add(secs)
+    if self._frame_start is None:
+      self.last_frame[name] = secs
+    else:
+      self._current_frame[name] = self._current_frame.get(name, 0) + secs
+
+
+  def add_span(self, name, start, end):
+    """Adds a span traced by tracing.span as a stage.
+
+    @param name: The name of the stage.
+    @param start: The start time from time.time().
+    @param end: The end time from time.time().
+
+    """
+    self.add(name, end - start)
+
+
+  def frame_begin(self):
+    """Marks the start of a frame."""
+    self._frame_start = time.time()
+    self._current_frame = {}
+
+
+  def frame_end(self):
+    """Marks the end of a frame. Frame latency is added as a stage.
+
+    @returns: The frame latency in seconds. None if no frame is started.
+
+    """
+    if self._frame_start is None:
+      return None
+    latency = time.time() - self._frame_start
+    self._frame_start = None
+    self.last_frame = self._current_frame
+    self._current_frame = {}
+    self.add(self.FRAME, latency)
+    return latency
+
+
+  def count(self, name, hits, misses):
+    """Counts cache hits and misses.
+
+    @param name: The name of the cache.
+    @param hits: Number of hits.
+    @param misses: Number of misses.
+
+    """
+    self._hits[name] = self._hits.get(name, 0) + hits
+    self._misses[name] = self._misses.get(name, 0) + misses
+
+
+  def get_hit_rates(self):
+    """Gets hit rates of caches.
+
+    @returns: A dict mapping cache name to hit rate in [0, 1].
+    """
+    rates = {}
+    for name, hits in self._hits.iteritems():
+      total = hits + self._misses[name]
+      if total:
+        rates[name] = float(hits) / total
+    return rates
+
+
+  def get_histograms(self):
+    """Gets the histograms.
+
+    @returns: A dict mapping stage name to Histogram.
+    """
+    return self._histograms
+
+
+  def format_overlay(self, stage_names):
+    """Formats the last frame timings and cache hit rates.
+
+    @param stage_names: Stage names in display order.
+
+    @returns: A list of strings.
+    """
+    lines = []
+    for name in [self.FRAME] + list(stage_names):
+      secs = self.last_frame.get(name)
+      lines.append('%-13s %s' % (
+          name, '%9.3f ms' % (secs * 1000) if secs is not None else
+          '        -'))
+    for name, rate in sorted(self.get_hit_rates().iteritems()):
+      lines.append('%-13s %8.1f %%' % (name[:13], rate * 100))
+    return lines
+
+
+  def format_histograms(self):
+    """Formats the histograms of all stages.
+
+    @returns: A list of strings.
+    """
+    lines = []
+    for name in sorted(self._histograms):
+      lines.append('%s:' % name)
+      lines.extend(self._histograms[name].format())
+    for name, rate in sorted(self.get_hit_rates().iteritems()):
+      lines.append('%s hit rate: %.1f %% of %d' % (
+          name, rate * 100, self._hits[name] + self._misses[name]))
+    return lines
+
+
+_PROFILER = Profiler()
+
+
+def get_profiler():
+  """Returns the Profiler of the program."""
+  return _PROFILER
+
+
+# Number of users which enabled the Profiler of the program.
+_ENABLE_COUNT = [0]
+
+
+def enable():
+  """Makes the Profiler of the program receive traced spans.
+
+  Each call should be paired with a call to disable.
+
+  """
+  _ENABLE_COUNT[0] += 1
+  tracing.add_sink(_PROFILER)
+
+
+def disable():
+  """Stops receiving traced spans when all users have called disable."""
+  _ENABLE_COUNT[0] = max(0, _ENABLE_COUNT[0] - 1)
+  if not _ENABLE_COUNT[0]:
+    tracing.remove_sink(_PROFILER)
+
+
+def count(name, hits, misses):
+  """Counts cache hits and misses in the Profiler of the program.
+
+  @param name: The name of the cache.
+  @param hits: Number of hits.
+  @param misses: Number of misses.
+
+  """
+  _PROFILER.count(name, hits, misses)
+
+
+def frame_begin():
+  """Marks the start of a frame in the Profiler of the program."""
+  _PROFILER.frame_begin()
+
+
+def frame_end():
+  """Marks the end of a frame in the Profiler of the program.
+
+  @returns: The frame latency in seconds.
+
+  """
+  return _PROFILER.frame_end()
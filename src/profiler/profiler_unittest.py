@@ -0,0 +1,98 @@
+#!/usr/bin/python
+"""Unit tests for profiler."""
+
+from __future__ import absolute_import
+
+import unittest
+
+from profiler import profiler
+from tracing import tracing
+
+
+class HistogramTest(unittest.TestCase):
+  """Tests buckets and percentiles of durations."""
+
+  def test_buckets(self):
+    """Tests durations are counted in power-of-two buckets."""
+    histogram = profiler.Histogram()
+    self.assertEqual(histogram.get_percentile(50), 0.0)
+    self.assertEqual(histogram.format(), ['  no samples'])
+    for micros in (0.5, 1, 1.5, 3, 100, 100, 100, 5000):
+      histogram.add(micros / 1e6)
+    self.assertEqual(histogram.buckets, {0: 1, 1: 2, 2: 1, 7: 3, 13: 1})
+    self.assertEqual(histogram.count, 8)
+    self.assertAlmostEqual(histogram.max_value, 0.005)
+    self.assertEqual(histogram.get_percentile(50), 4 / 1e6)
+    self.assertEqual(histogram.get_percentile(60), 128 / 1e6)
+    self.assertEqual(histogram.get_percentile(100), 8192 / 1e6)
+    lines = histogram.format()
+    self.assertTrue(lines[0].startswith('  count 8, mean '))
+    self.assertEqual(lines[-1], '  <      8.192 ms: 1')
+
+
+class ProfilerTest(unittest.TestCase):
+  """Tests stage timings in and out of frames."""
+
+  def setUp(self):
+    self.profiler = profiler.Profiler()
+
+
+  def test_frames(self):
+    """Tests stages are summed per frame and kept in histograms."""
+    self.assertIsNone(self.profiler.frame_end())
+    self.profiler.add('load', 0.5)
+    self.assertEqual(self.profiler.last_frame, {'load': 0.5})
+    self.profiler.frame_begin()
+    self.profiler.add_span('render', 1.0, 1.25)
+    self.profiler.add('render', 0.25)
+    self.assertEqual(self.profiler.last_frame, {'load': 0.5})
+    latency = self.profiler.frame_end()
+    self.assertEqual(self.profiler.last_frame,
+                     {'render': 0.5, 'frame': latency})
+    histograms = self.profiler.get_histograms()
+    self.assertEqual(sorted(histograms), ['frame', 'load', 'render'])
+    self.assertEqual(histograms['render'].count, 2)
+    lines = self.profiler.format_overlay(['render', 'load'])
+    self.assertEqual(lines[1], 'render          500.000 ms')
+    self.assertEqual(lines[2], 'load                  -')
+
+
+  def test_hit_rates(self):
+    """Tests hit rates are accumulated per cache."""
+    self.profiler.count('envelope', 3, 1)
+    self.profiler.count('envelope', 0, 4)
+    self.profiler.count('empty', 0, 0)
+    self.assertEqual(self.profiler.get_hit_rates(), {'envelope': 0.375})
+    self.assertIn('envelope hit rate: 37.5 % of 8',
+                  self.profiler.format_histograms())
+    self.assertIn('envelope          37.5 %',
+                  self.profiler.format_overlay([]))
+
+
+class EnableTest(unittest.TestCase):
+  """Tests the Profiler of the program receives traced spans."""
+
+  def test_enable(self):
+    """Tests spans are received until all users disable."""
+    histograms = profiler.get_profiler().get_histograms()
+    profiler.enable()
+    profiler.enable()
+    try:
+      profiler.disable()
+      with tracing.span('profiler_unittest'):
+        pass
+      self.assertEqual(histograms['profiler_unittest'].count, 1)
+    finally:
+      profiler.disable()
+    self.assertFalse(tracing.is_enabled())
+    with tracing.span('profiler_unittest'):
+      pass
+    self.assertEqual(histograms['profiler_unittest'].count, 1)
+    profiler.disable()
+    profiler.enable()
+    profiler.disable()
+    self.assertFalse(tracing.is_enabled())
+
+
+if __name__ == '__main__':
+  unittest.main()
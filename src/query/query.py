@@ -0,0 +1,249 @@
+"""Query summaries of a raw data file from Python without curses.
+
+E.g., in a notebook or a test script:
+
+  from data import data
+  from query import query
+
+  session = query.Session('capture.raw', data.DataFormat(2, 16, 48000))
+  envelope = session.envelope(1.0, 2.0, 100)
+  stats = session.stats(1.0, 2.0, channel=1)
+  print '\\n'.join(session.render(1.0, 2.0, 80, 21))
+
+Times are in seconds. The same engines as the viewer are used: samples are
+decoded lazily from the mapped file, envelopes of long ranges read a
+summary.BlockSummary, stats are accumulated by analysis.ChannelStats and
+frames are rendered by the Waveform and WaveView pipeline of snapshot.
+"""
+
+import collections
+import logging
+
+from analysis import analysis
+from data import data
+from snapshot import snapshot
+from summary import summary
+from tracing import tracing
+
+
+class QueryError(Exception):
+  """Error in query."""
+  pass
+
+
+class Session(object):
+  """A raw data file opened for queries.
+
+  The file is mapped, so opening it takes constant time and a query reads
+  only the samples it needs. The summary of a channel is built at the first
+  envelope query whose columns contain whole blocks, and is reused by the
+  following queries. Results are kept in a LRU cache, so repeated queries
+  do not read samples again.
+
+  @property hits: Number of queries found in the cache.
+  @property misses: Number of queries which were computed.
+  """
+  def __init__(self, path, data_format, cache_size=256,
+               block_length=4096, chunk_length=65536):
+    """Opens a file.
+
+    @param path: The path to the raw data file.
+    @param data_format: A data.DataFormat object.
+    @param cache_size: Number of results kept in the cache. 0 disables it.
+    @param block_length: Number of samples in a block of the summaries.
+    @param chunk_length: Number of samples read at a time for stats.
+
+    """
+    self.path = path
+    self.data_format = data_format
+    self._raw_data = data.map_file(path, data_format)
+    self._traces = {}
+    self._summaries = {}
+    self._cache_size = cache_size
+    self._cache = collections.OrderedDict()
+    self._block_length = block_length
+    self._chunk_length = chunk_length
+    self.hits = 0
+    self.misses = 0
+
+
+  @property
+  def number_of_samples(self):
+    """The number of samples in a channel."""
+    return self._raw_data.num_of_samples
+
+
+  @property
+  def duration(self):
+    """The duration of the file in seconds."""
+    return float(self.number_of_samples) / self.data_format.sampling_rate
+
+
+  def get_trace(self, channel=0):
+    """Gets a channel as a trace, e.g. to use with other modules.
+
+    @param channel: The index of the channel.
+
+    @returns: A data.OneChannelRawData object.
+
+    @raises: QueryError if there is no such channel.
+    """
+    if channel not in self._traces:
+      if not 0 <= channel < self.data_format.num_channels:
+        raise QueryError('No channel %r in %r channels' % (
+            channel, self.data_format.num_channels))
+      self._traces[channel] = data.OneChannelRawData(self._raw_data, channel)
+    return self._traces[channel]
+
+
+  def get_sample_range(self, start_time, end_time=None):
+    """Gets the samples in a time range.
+
+    @param start_time: The start time in seconds.
+    @param end_time: The end time in seconds. Default is the end of data.
+
+    @returns: (first_sample_index, stop_sample_index).
+
+    @raises: QueryError if the range is empty.
+    """
+    rate = self.data_format.sampling_rate
+    start = max(0, int(round(start_time * rate)))
+    stop = self.number_of_samples
+    if end_time is not None:
+      stop = min(stop, int(round(end_time * rate)))
+    if start >= stop:
+      raise QueryError('No sample in %r to %r secs' % (start_time, end_time))
+    return start, stop
+
+
+  def _get_summary(self, channel):
+    """Gets the summary of a channel, building it at the first call.
+
+    @param channel: The index of the channel.
+
+    @returns: A summary.BlockSummary object.
+    """
+    if channel not in self._summaries:
+      self._summaries[channel] = summary.BlockSummary(
+          self.get_trace(channel).samples, self._block_length)
+    return self._summaries[channel]
+
+
+  def _query(self, key, compute):
+    """Gets a result from the cache, or computes it.
+
+    @param key: A tuple identifying the query.
+    @param compute: A function to compute the result.
+
+    @returns: The result.
+    """
+    if key in self._cache:
+      self.hits += 1
+      result = self._cache.pop(key)
+    else:
+      self.misses += 1
+      with tracing.span('query'):
+        result = compute()
+      logging.debug('Query %r', key)
+    self._cache[key] = result
+    while len(self._cache) > self._cache_size:
+      self._cache.popitem(last=False)
+    return result
+
+
+  def envelope(self, start_time, end_time, columns, channel=0):
+    """Gets the minimum and maximum of samples in equal columns of a range.
+
+    @param start_time: The start time in seconds.
+    @param end_time: The end time in seconds. None for the end of data.
+    @param columns: The number of columns.
+    @param channel: The index of the channel.
+
+    @returns: A list of (minimum, maximum) of each column. It is None for a
+              column without samples.
+
+    @raises: QueryError if the range is empty or columns is not positive.
+    """
+    if columns < 1:
+      raise QueryError('Invalid columns %r' % columns)
+    start, stop = self.get_sample_range(start_time, end_time)
+    samples = self.get_trace(channel).samples
+
+    def compute():
+      """Reads the summary if a column contains whole blocks."""
+      block_summary = None
+      if (stop - start) / columns >= self._block_length:
+        block_summary = self._get_summary(channel)
+      return summary.get_envelope(samples, start, stop, columns,
+                                  block_summary)
+
+    return self._query(('envelope', channel, start, stop, columns), compute)
+
+
+  def stats(self, start_time, end_time=None, channel=0,
+            silence_threshold=0):
+    """Gets the statistics of samples in a range.
+
+    @param start_time: The start time in seconds.
+    @param end_time: The end time in seconds. None for the end of data.
+    @param channel: The index of the channel.
+    @param silence_threshold: A sample is silent if its absolute value is
+                              not larger than this value.
+
+    @returns: A dict of analysis.ChannelStats.get_result, with 'min' and
+              'max' of the samples.
+
+    @raises: QueryError if the range is empty.
+    """
+    start, stop = self.get_sample_range(start_time, end_time)
+    trace = self.get_trace(channel)
+
+    def compute():
+      """Accumulates the samples chunk by chunk."""
+      stats = analysis.ChannelStats(trace.data_range, silence_threshold)
+      for chunk_start in xrange(start, stop, self._chunk_length):
+        stats.add(trace.samples[chunk_start:min(
+            stop, chunk_start + self._chunk_length)])
+      result = stats.get_result()
+      result['min'] = stats.min_value
+      result['max'] = stats.max_value
+      return result
+
+    return dict(self._query(('stats', channel, start, stop,
+                             silence_threshold), compute))
+
+
+  def render(self, start_time, end_time, width, height, channel=0,
+             value_scale=1.0):
+    """Renders a range as text, like the wave view in the terminal.
+
+    @param start_time: The start time in seconds.
+    @param end_time: The end time in seconds. None for the end of data.
+    @param width: The width of the frame.
+    @param height: The height of the frame. It is adjusted to an odd
+                   number.
+    @param channel: The index of the channel.
+    @param value_scale: The value scale. 1 means the frame contains full
+                        value range.
+
+    @returns: A list of strings. The first one is a header containing time
+              and value range, followed by one string per row.
+
+    @raises: QueryError if the range is empty or the size is invalid.
+    """
+    start, stop = self.get_sample_range(start_time, end_time)
+    rate = float(self.data_format.sampling_rate)
+    trace = self.get_trace(channel)
+
+    def compute():
+      """Renders by the snapshot pipeline."""
+      try:
+        options = snapshot.SnapshotOptions(
+            width, height, start_time=start / rate, end_time=stop / rate,
+            value_scale=value_scale)
+        return snapshot.render(trace, options)
+      except snapshot.SnapshotError as error:
+        raise QueryError(str(error))
+
+    return list(self._query(('render', channel, start, stop, width, height,
+                             value_scale), compute))
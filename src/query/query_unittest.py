@@ -0,0 +1,116 @@
+#!/usr/bin/python
+"""Unit tests for query."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+from data import data
+from query import query
+from snapshot import snapshot
+
+
+class SessionTest(unittest.TestCase):
+  """Compares queries of a file with its decoded samples."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'capture.raw')
+    self.data_format = data.DataFormat(2, 16, 1000)
+    generator = random.Random(1)
+    interleaved = array.array('h', (generator.randint(-32768, 32767)
+                                    for _ in xrange(2 * 20000)))
+    self.channels = data.deinterleave(interleaved, 2)
+    if sys.byteorder == 'big':
+      interleaved.byteswap()
+    with open(self.path, 'wb') as raw_file:
+      raw_file.write(interleaved.tostring())
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_envelope(self):
+    """Tests envelopes with and without the summary."""
+    session = query.Session(self.path, self.data_format, block_length=256)
+    self.assertEqual(session.number_of_samples, 20000)
+    self.assertEqual(session.duration, 20.0)
+    for start_time, end_time, columns, channel in (
+        (0, None, 10, 0), (1.2345, 17.5, 13, 1), (3, 3.1, 7, 0),
+        (19.99, 30, 20, 1)):
+      start = int(round(start_time * 1000))
+      stop = min(20000, int(round((end_time or 20) * 1000)))
+      expected = []
+      for column in xrange(columns):
+        values = self.channels[channel][
+            start + (stop - start) * column / columns:
+            start + (stop - start) * (column + 1) / columns]
+        expected.append((min(values), max(values)) if values else None)
+      self.assertEqual(session.envelope(start_time, end_time, columns,
+                                        channel=channel), expected)
+
+
+  def test_stats(self):
+    """Tests statistics against the samples."""
+    session = query.Session(self.path, self.data_format, chunk_length=1000)
+    for start_time, end_time, channel in ((0, None, 0), (2.5, 7.2505, 1)):
+      start = int(round(start_time * 1000))
+      stop = min(20000, int(round((end_time or 20) * 1000)))
+      samples = self.channels[channel][start:stop]
+      stats = session.stats(start_time, end_time, channel=channel,
+                            silence_threshold=100)
+      self.assertEqual(stats['samples'], len(samples))
+      self.assertEqual((stats['min'], stats['max']),
+                       (min(samples), max(samples)))
+      self.assertAlmostEqual(stats['rms'], math.sqrt(
+          float(sum(value * value for value in samples)) / len(samples)))
+      self.assertAlmostEqual(stats['silence_ratio'], float(len(
+          [value for value in samples if abs(value) <= 100])) / len(samples))
+
+
+  def test_render(self):
+    """Tests rendering is the same as a snapshot of the range."""
+    session = query.Session(self.path, self.data_format)
+    trace = data.OneChannelRawData(
+        data.read_file(self.path, self.data_format), 1)
+    self.assertEqual(
+        session.render(2, 4, 60, 11, channel=1, value_scale=2.0),
+        snapshot.render(trace, snapshot.SnapshotOptions(
+            60, 11, start_time=2, end_time=4, value_scale=2.0)))
+
+
+  def test_errors(self):
+    """Tests queries of empty ranges, missing channels and invalid
+    sizes."""
+    session = query.Session(self.path, self.data_format)
+    for start_time, end_time in ((5, 5), (5, 4), (20, None)):
+      with self.assertRaises(query.QueryError):
+        session.stats(start_time, end_time)
+    with self.assertRaises(query.QueryError):
+      session.envelope(0, 1, 0)
+    with self.assertRaises(query.QueryError):
+      session.get_trace(2)
+    with self.assertRaises(query.QueryError):
+      session.render(0, 1, 1, 11)
+
+
+  def test_cache(self):
+    """Tests repeated queries hit the cache, and a cache of size 0."""
+    for cache_size, hits in ((2, 2), (1, 1), (0, 0)):
+      session = query.Session(self.path, self.data_format,
+                              cache_size=cache_size)
+      for start_time in (1, 2, 2, 1):
+        session.stats(start_time, start_time + 1)
+      self.assertEqual((session.hits, session.misses), (hits, 4 - hits))
+
+
+if __name__ == '__main__':
+  unittest.main()
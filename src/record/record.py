@@ -0,0 +1,200 @@
+"""Record and replay key strokes of interactive sessions."""
+
+import collections
+import curses
+import logging
+import time
+
+
+class RecordError(Exception):
+  """Error in record."""
+  pass
+
+
+def _get_key_names():
+  """Gets names of special keys defined in curses module.
+
+  @returns: A dict mapping key code to name, e.g. KEY_LEFT.
+  """
+  return dict((getattr(curses, name), name) for name in dir(curses)
+              if name.startswith('KEY_'))
+
+
+_KEY_NAMES = _get_key_names()
+
+
+def get_key_name(key):
+  """Gets a readable name of a key code.
+
+  curses.keyname needs an initialized terminal, so it can not be used in a
+  headless replay.
+
+  @param key: A key code returned by getch.
+
+  @returns: The name of the key.
+  """
+  if 32 < key < 127:
+    return chr(key)
+  return _KEY_NAMES.get(key, str(key))
+
+
+class RecordingWindow(object):
+  """A window which records keys returned by getch to a file.
+
+  All the other methods are delegated to the wrapped window. Each key is
+  written as a line 'seconds key_code' where seconds is the time since the
+  RecordingWindow is created. No key (-1) is not recorded.
+  """
+  def __init__(self, window, path):
+    """Creates a RecordingWindow.
+
+    @param window: A curses window.
+    @param path: The path to the record file.
+
+    """
+    self._window = window
+    self._start = time.time()
+    self._handle = open(path, 'w')
+
+
+  def __getattr__(self, name):
+    """Delegates other attributes to the wrapped window."""
+    return getattr(self._window, name)
+
+
+  def getch(self):
+    """Gets a key from the wrapped window and records it."""
+    key = self._window.getch()
+    if key != -1:
+      self._handle.write('%.6f %d\n' % (time.time() - self._start, key))
+      self._handle.flush()
+    return key
+
+
+  def close(self):
+    """Closes the record file."""
+    self._handle.close()
+
+
+class ReplayWindow(object):
+  """A window which returns recorded keys at their recorded times.
+
+  Time is kept by a fake clock which starts at 0 like a record. When the
+  next key is later than the timeout, getch returns -1 and moves the clock
+  by the timeout, so the main loop plays frames and polls as it did while
+  recording, but without waiting. getch without a timeout moves the clock
+  to the next key. All the other methods are delegated to the wrapped
+  window.
+  """
+  def __init__(self, window, events):
+    """Creates a ReplayWindow.
+
+    @param window: A fake_window.FakeWindow without keys.
+    @param events: A list of (seconds, key_code) sorted by time, e.g. from
+                   load.
+
+    """
+    self._window = window
+    self._events = collections.deque(events)
+    self._now = 0.0
+    self._timeout_ms = -1
+
+
+  def __getattr__(self, name):
+    """Delegates other attributes to the wrapped window."""
+    return getattr(self._window, name)
+
+
+  def clock(self):
+    """Returns the time of the fake clock in seconds."""
+    return self._now
+
+
+  def timeout(self, delay):
+    """Sets the time getch waits for a key.
+
+    @param delay: The time in milliseconds. Negative to wait for a key.
+
+    """
+    self._timeout_ms = delay
+
+
+  def getch(self):
+    """Gets the next key if it is due within the timeout.
+
+    @returns: The key code. -1 if the next key is later than the timeout,
+              or there is no more key.
+    """
+    if not self._events:
+      return -1
+    key_time, key = self._events[0]
+    timeout = self._timeout_ms / 1000.0
+    if 0 <= timeout and self._now + timeout < key_time:
+      # A zero timeout still moves the clock, so the loop can not spin.
+      self._now += max(1, self._timeout_ms) / 1000.0
+      return -1
+    self._now = max(self._now, key_time)
+    self._events.popleft()
+    return key
+
+
+def load(path):
+  """Loads a record file.
+
+  @param path: The path to a file written by RecordingWindow.
+
+  @returns: A list of (seconds, key_code).
+
+  @raises: RecordError if the file is not valid.
+  """
+  events = []
+  with open(path) as handle:
+    for line_number, line in enumerate(handle, 1):
+      if not line.strip():
+        continue
+      try:
+        seconds, key = line.split()
+        events.append((float(seconds), int(key)))
+      except ValueError:
+        raise RecordError('Invalid line %d in %s: %r' % (
+            line_number, path, line))
+  logging.info('Loaded %d keys from %s', len(events), path)
+  return events
+
+
+def get_percentile(values, percent):
+  """Gets a percentile by nearest rank.
+
+  @param values: A sorted list of numbers.
+  @param percent: A number in [0, 100].
+
+  @returns: The percentile. None if values is empty.
+  """
+  if not values:
+    return None
+  rank = int(round(percent / 100.0 * (len(values) - 1)))
+  return values[rank]
+
+
+def format_latency_report(latencies):
+  """Formats latency percentiles of all keys and of each key.
+
+  @param latencies: A list of (key_code, latency in seconds).
+
+  @returns: A list of strings.
+  """
+  groups = {'all': []}
+  for key, latency in latencies:
+    groups['all'].append(latency)
+    groups.setdefault(get_key_name(key), []).append(latency)
+  lines = ['%-12s %6s %10s %10s %10s %10s' % (
+      'key', 'count', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)')]
+  for name in ['all'] + sorted(name for name in groups if name != 'all'):
+    values = sorted(groups[name])
+    if not values:
+      continue
+    lines.append('%-12s %6d %10.3f %10.3f %10.3f %10.3f' % (
+        name, len(values), get_percentile(values, 50) * 1000,
+        get_percentile(values, 90) * 1000, get_percentile(values, 99) * 1000,
+        values[-1] * 1000))
+  return lines
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+"""Unit tests for record."""
+
+from __future__ import absolute_import
+
+import array
+import curses
+import math
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import main
+from data import data
+from record import record
+from screen import fake_window
+from screen import screen
+
+
+class RecordTest(unittest.TestCase):
+  """Tests recording, loading and the latency report."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'keys.txt')
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_record_and_load(self):
+    """Tests keys are recorded in order and no key is not recorded."""
+    keys = [ord('O'), curses.KEY_LEFT, ord('q')]
+    window = record.RecordingWindow(fake_window.FakeWindow(10, 20, keys),
+                                    self.path)
+    self.assertEqual([window.getch() for _ in xrange(4)], keys + [-1])
+    self.assertEqual(window.getmaxyx(), (10, 20))
+    window.close()
+    events = record.load(self.path)
+    self.assertEqual([key for _, key in events], keys)
+    self.assertEqual(sorted(events), events)
+
+
+  def test_load_invalid(self):
+    """Tests load reports the invalid line."""
+    with open(self.path, 'w') as record_file:
+      record_file.write('0.1 79\n\n0.2\n')
+    with self.assertRaisesRegexp(record.RecordError, 'line 3'):
+      record.load(self.path)
+
+
+  def test_latency_report(self):
+    """Tests percentiles of all keys and of each key."""
+    self.assertIsNone(record.get_percentile([], 50))
+    self.assertEqual(record.get_percentile(range(101), 90), 90)
+    lines = record.format_latency_report(
+        [(ord('O'), 0.001), (ord('O'), 0.003), (curses.KEY_LEFT, 0.002)])
+    self.assertEqual([line.split()[:2] for line in lines[1:]],
+                     [['all', '3'], ['KEY_LEFT', '1'], ['O', '2']])
+    self.assertEqual(lines[3].split()[-1], '3.000')
+
+
+class ReplayWindowTest(unittest.TestCase):
+  """Tests keys are returned at their times on the fake clock."""
+
+  def test_getch(self):
+    """Tests getch with and without a timeout."""
+    window = record.ReplayWindow(fake_window.FakeWindow(10, 20),
+                                 [(0.5, ord('a')), (0.5, ord('b')),
+                                  (2.0, ord('c'))])
+    self.assertEqual(window.getch(), ord('a'))
+    self.assertEqual(window.clock(), 0.5)
+    window.timeout(200)
+    self.assertEqual(window.getch(), ord('b'))
+    for expected in (0.7, 0.9, 1.1, 1.3, 1.5, 1.7, 1.9):
+      self.assertEqual(window.getch(), -1)
+      self.assertAlmostEqual(window.clock(), expected)
+    self.assertEqual(window.getch(), ord('c'))
+    self.assertEqual(window.clock(), 2.0)
+    self.assertEqual(window.getch(), -1)
+
+
+  def test_zero_timeout(self):
+    """Tests a zero timeout still moves the clock."""
+    window = record.ReplayWindow(fake_window.FakeWindow(10, 20),
+                                 [(0.01, ord('a'))])
+    window.timeout(0)
+    keys = [window.getch() for _ in xrange(11)]
+    self.assertEqual(keys, [-1] * 10 + [ord('a')])
+
+
+  def test_wait_for_key(self):
+    """Tests getch without a timeout moves the clock to the next key."""
+    window = record.ReplayWindow(fake_window.FakeWindow(10, 20),
+                                 [(30.0, ord('a'))])
+    window.timeout(-1)
+    self.assertEqual(window.getch(), ord('a'))
+    self.assertEqual(window.clock(), 30.0)
+
+
+  def test_playback(self):
+    """Tests playback draws frames for the recorded time between keys."""
+    samples = array.array('h', (int(10000 * math.sin(index / 10.0))
+                                for index in xrange(80000)))
+    if sys.byteorder == 'big':
+      samples.byteswap()
+    trace = data.OneChannelRawData(
+        data.RawData(samples.tostring(), data.DataFormat(1, 16, 8000)), 0,
+        'a')
+    window = record.ReplayWindow(
+        fake_window.FakeWindow(40, 120),
+        [(0.5, ord(' ')), (2.5, ord(' ')), (2.5, ord('q'))])
+    top_screen = screen.Screen(window, [trace], clock=window.clock)
+    top_screen.clear()
+    top_screen.init_display()
+    # The main loop of main.run_view without polling.
+    while True:
+      window.timeout(main.get_wait_ms(top_screen))
+      input_char = window.getch()
+      if input_char == -1:
+        top_screen.play_frame()
+        continue
+      if not main.handle_input(top_screen, input_char):
+        break
+    self.assertIn('Paused after 50 frames, 0 dropped.',
+                  '\n'.join(window.get_lines()))
+
+
+if __name__ == '__main__':
+  unittest.main()
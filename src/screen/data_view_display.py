@@ -0,0 +1,643 @@
+"""The subwindows of the traces, their axes and the overview."""
+
+from __future__ import absolute_import
+
+import bisect
+import logging
+
+from histogram import histogram
+from screen import histogram_display
+from screen import overview_display
+from screen import time_display
+from screen import value_display
+from screen import wave_view_display
+
+
+class Layout(object):
+  """Layouts of several traces in the data view."""
+  STACKED = 'stacked'
+  OVERLAY = 'overlay'
+
+
+class DataViewDisplay(object):
+  """DataViewDisplay controls value, wave view and time displays.
+
+   ----------------------------------------
+  |   |                                    |
+  |   |             Wave view              |
+  |   |                                    |
+  |val|                                    |
+  |   |                                    |
+  |   |                                    |
+  |   |                                    |
+  |   |                                    |
+  |---|------------------------------------|
+  |   |  time                              |
+  |   |  marks                             |
+  |   |  annotations                       |
+  |----------------------------------------|
+  |   |  overview                          |
+  |----------------------------------------|
+
+  Several traces share the time axis. In stacked layout, each trace has
+  its own band of value display and wave view:
+
+   ----------------------------------------
+  |val|          Wave view of trace 0      |
+  |---|------------------------------------|
+  |val|          Wave view of trace 1      |
+  |---|------------------------------------|
+  |   |  time                              |
+  |----------------------------------------|
+  |   |  overview                          |
+  |----------------------------------------|
+
+  In overlay layout, all traces are drawn in one wave view with different
+  marks. Scrolling and zooming apply to all wave views together.
+
+  The overview shows the envelope of the first trace over the full data.
+
+  The histogram panel, when shown, is between the value display and the
+  wave view of each band. It shows the amplitude distribution of the
+  samples in the view of the first trace in the band.
+
+  """
+  _VALUE_WIDTH = 10
+  _HISTOGRAM_WIDTH = 10
+  _TIME_HEIGHT = 3
+  _OVERVIEW_HEIGHT = 3
+  # The smallest height of a band in stacked layout.
+  _MIN_BAND_HEIGHT = 4
+
+  def __init__(self, window, traces, layout=Layout.STACKED):
+    """Creates a DataViewDisplay object.
+
+    @param window: A subwindow.
+    @param traces: A list of data.OneChannelRawData objects.
+    @param layout: A layout defined in Layout.
+
+    """
+    self._window = window
+    self._traces = traces
+    self._layout = layout
+    # All traces share the time axis of the longest trace.
+    self._number_of_samples = max(len(trace.samples) for trace in traces)
+    self._height, self._width = None, None
+    self._wave_displays = []
+    self._value_displays = []
+    self._time_display = None
+    self._overview_display = None
+    # Sorted sample indices and marks shown under the time axis.
+    self._marker_indices = []
+    self._marker_marks = []
+    # The state of the overview which is kept when it is recreated.
+    self._overview_summary = None
+    self._overview_label = ''
+    # The sample index at the cursor. None if the cursor is not shown.
+    self._cursor_index = None
+    # Sample indices of markers 'A' and 'B' to measure between.
+    self._measure_markers = {}
+    # An annotation.AnnotationIndex shown under the marks.
+    self._annotations = None
+    # Whether the histogram panel is shown, and one
+    # histogram.AmplitudeHistogram for each band.
+    self._show_histogram = False
+    self._histograms = []
+    self._histogram_displays = []
+    self._create_displays()
+
+
+  @property
+  def traces(self):
+    """The list of traces in the data view."""
+    return self._traces
+
+
+  @property
+  def number_of_samples(self):
+    """The number of samples of the time axis."""
+    return self._number_of_samples
+
+
+  def set_trace(self, index, trace):
+    """Replaces a trace. Keeps the time range and zoom of wave views.
+
+    @param index: The index of the trace.
+    @param trace: A data.OneChannelRawData object.
+
+    """
+    self._traces[index] = trace
+    self._number_of_samples = max(len(trace.samples)
+                                  for trace in self._traces)
+    self._recreate_displays()
+
+
+  def _get_bands(self):
+    """Gets the traces drawn in each band of the current layout.
+
+    @returns: A list of lists of traces, one list for each band.
+
+    """
+    band_height = ((self._height - self._TIME_HEIGHT - self._OVERVIEW_HEIGHT) /
+                   len(self._traces))
+    if (self._layout == Layout.STACKED and
+        band_height >= self._MIN_BAND_HEIGHT):
+      return [[trace] for trace in self._traces]
+    if self._layout == Layout.STACKED:
+      logging.warning('Window too small to stack %r traces',
+                      len(self._traces))
+    return [self._traces]
+
+
+  def _create_displays(self):
+    """Creates subwindows and displays using current window size."""
+    self._height, self._width = self._window.getmaxyx()
+    bands = self._get_bands()
+    time_top = self._height - self._TIME_HEIGHT - self._OVERVIEW_HEIGHT
+    band_height = time_top / len(bands)
+
+    wave_left = self._VALUE_WIDTH
+    if self._show_histogram:
+      wave_left += self._HISTOGRAM_WIDTH
+
+    self._wave_displays = []
+    self._value_displays = []
+    self._histograms = []
+    self._histogram_displays = []
+    for index, band_traces in enumerate(bands):
+      top = index * band_height
+      subwindow_value = self._window.subwin(
+          band_height, self._VALUE_WIDTH, top, 0)
+      subwindow_wave = self._window.subwin(
+          band_height, self._width - wave_left, top, wave_left)
+      wave_display = wave_view_display.WaveViewDisplay(
+          subwindow_wave, band_traces, self._number_of_samples)
+      wave_height, _ = wave_display.draw_size
+      self._wave_displays.append(wave_display)
+      self._value_displays.append(value_display.ValueDisplay(
+          subwindow_value, wave_height))
+      if self._show_histogram:
+        subwindow_histogram = self._window.subwin(
+            band_height, self._HISTOGRAM_WIDTH, top, self._VALUE_WIDTH)
+        self._histogram_displays.append(
+            histogram_display.HistogramDisplay(subwindow_histogram,
+                                               wave_height))
+        self._histograms.append(histogram.AmplitudeHistogram(
+            band_traces[0].samples, band_traces[0].data_range))
+
+    subwindow_time = self._window.subwin(
+        self._TIME_HEIGHT, self._width - wave_left, time_top, wave_left)
+    _, wave_width = self._wave_displays[0].draw_size
+    self._time_display = time_display.TimeDisplay(subwindow_time, wave_width)
+
+    subwindow_overview = self._window.subwin(
+        self._OVERVIEW_HEIGHT, self._width,
+        self._height - self._OVERVIEW_HEIGHT, 0)
+    self._overview_display = overview_display.OverviewDisplay(
+        subwindow_overview, self._number_of_samples, wave_width)
+    self._overview_display.set_markers(zip(self._marker_indices,
+                                           self._marker_marks))
+    self._overview_display.show_label(self._overview_label)
+    if self._overview_summary:
+      self._overview_display.set_summary(self._overview_summary,
+                                         self._traces[0].data_range)
+
+
+  def _recreate_displays(self):
+    """Recreates displays. Keeps the time range and zoom of wave views."""
+    view_state = self._wave_displays[0].get_view_state()
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
+    self._create_displays()
+    for wave_display in self._wave_displays:
+      wave_display.set_view_state(view_state)
+    self._update_time_value()
+
+
+  def resize(self, window):
+    """Uses a resized window. Keeps the time range and zoom of wave views.
+
+    @param window: A subwindow.
+
+    """
+    self._window = window
+    self._recreate_displays()
+
+
+  def toggle_layout(self):
+    """Switches between stacked and overlay layouts."""
+    if self._layout == Layout.STACKED:
+      self._layout = Layout.OVERLAY
+    else:
+      self._layout = Layout.STACKED
+    self._recreate_displays()
+
+
+  def toggle_histogram(self):
+    """Shows or hides the histogram panel."""
+    self._show_histogram = not self._show_histogram
+    self._recreate_displays()
+
+
+  def init_display(self):
+    """Initializes display."""
+    self._for_each_wave_display('init_display')
+
+
+  def _for_each_wave_display(self, method_name, *args):
+    """Calls a method of all wave displays. Also update time and value.
+
+    @param method_name: The name of a WaveViewDisplay method.
+    @param args: The arguments to the method.
+
+    """
+    for wave_display in self._wave_displays:
+      getattr(wave_display, method_name)(*args)
+    self._update_time_value()
+
+
+  def set_markers(self, markers):
+    """Sets marks shown under the time axis and in the overview.
+
+    @param markers: A list of (sample_index, mark) sorted by sample index.
+
+    """
+    self._marker_indices = [sample_index for sample_index, _ in markers]
+    self._marker_marks = [mark for _, mark in markers]
+    self._overview_display.set_markers(markers)
+    self._update_time_value()
+
+
+  def set_overview_summary(self, block_summary):
+    """Sets the summary of the first trace drawn in the overview.
+
+    @param block_summary: A summary.BlockSummary object. It may be still
+                          being built.
+
+    """
+    self._overview_summary = block_summary
+    self._overview_display.set_summary(block_summary,
+                                       self._traces[0].data_range)
+
+
+  def update_overview_envelope(self):
+    """Draws the envelope of the overview if more of it is summarized."""
+    self._overview_display.update_envelope()
+
+
+  def show_overview_label(self, label):
+    """Shows a label in the overview.
+
+    @param label: A string.
+
+    """
+    self._overview_label = label
+    self._overview_display.show_label(label)
+
+
+  @property
+  def overview_width(self):
+    """The number of columns of the overview."""
+    return self._overview_display.strip_width
+
+
+  def get_overview_column(self):
+    """Gets the column of the overview at the centre of the view.
+
+    @returns: The column in overview strip coordinate.
+
+    """
+    start, stop = self._wave_displays[0].get_sample_range()
+    return (self._overview_display.get_column((start + stop) / 2) -
+            self._VALUE_WIDTH)
+
+
+  def centre_on_overview_column(self, column):
+    """Moves the view so a column of the overview is at the centre.
+
+    @param column: The column in overview strip coordinate.
+
+    """
+    self.centre_on(self._overview_display.get_sample(
+        column + self._VALUE_WIDTH))
+
+
+  def click(self, row, col):
+    """Handles a click. A click in the overview centres the view there.
+
+    @param row: The row in window coordinate.
+    @param col: The column in window coordinate.
+
+    @returns: True if the click is handled.
+
+    """
+    if (row < self._height - self._OVERVIEW_HEIGHT or row >= self._height or
+        col < self._VALUE_WIDTH or
+        col >= self._VALUE_WIDTH + self.overview_width):
+      return False
+    self.centre_on(self._overview_display.get_sample(col))
+    return True
+
+
+  def set_annotations(self, annotations):
+    """Sets annotations shown under the marks.
+
+    @param annotations: An annotation.AnnotationIndex object.
+
+    """
+    self._annotations = annotations
+    self._update_time_value()
+
+
+  def _get_visible_annotations(self):
+    """Gets the annotations in the view.
+
+    When there are more annotations than columns, only the columns having
+    annotations are found, by one bisection for each column, so the time
+    does not depend on the number of annotations.
+
+    @returns: A list of (first_column, last_column, label) in wave view
+              coordinate.
+
+    """
+    if not self._annotations:
+      return []
+    wave_display = self._wave_displays[0]
+    start, stop = wave_display.get_sample_range()
+    _, wave_width = wave_display.draw_size
+    if self._annotations.count(start, stop) > wave_width:
+      return [(column, column, '') for column in xrange(wave_width)
+              if self._annotations.count(
+                  *wave_display.get_column_range(column))]
+    return [(wave_display.get_column(item.start),
+             wave_display.get_column(item.stop - 1), item.label)
+            for item in self._annotations.find(start, stop)]
+
+
+  def _get_visible_markers(self):
+    """Gets the marks in the view.
+
+    Marks are found by bisection, so the time does not depend on the total
+    number of marks.
+
+    @returns: A list of (column, mark) in wave view coordinate.
+
+    """
+    wave_display = self._wave_displays[0]
+    start, stop = wave_display.get_sample_range()
+    first = bisect.bisect_left(self._marker_indices, start)
+    last = bisect.bisect_left(self._marker_indices, stop)
+    return [(wave_display.get_column(self._marker_indices[index]),
+             self._marker_marks[index]) for index in xrange(first, last)]
+
+
+  @property
+  def cursor_index(self):
+    """The sample index at the cursor. None if the cursor is not shown."""
+    return self._cursor_index
+
+
+  def get_measure_marker(self, name):
+    """Gets the sample index of a measure marker.
+
+    @param name: 'A' or 'B'.
+
+    @returns: The sample index. None if the marker is not set.
+
+    """
+    return self._measure_markers.get(name)
+
+
+  def move_cursor(self, columns=0, samples=0):
+    """Moves the cursor. Moves the view if the cursor leaves it.
+
+    The cursor is shown at the centre of the view at the first move.
+
+    @param columns: The number of columns to move.
+    @param samples: The number of samples to move.
+
+    """
+    start, stop = self._wave_displays[0].get_sample_range()
+    if self._cursor_index is None:
+      sample_index = (start + stop) / 2
+    else:
+      sample_index = (self._cursor_index + samples +
+                      columns * self._wave_displays[0].down_sample_factor)
+    self._cursor_index = max(0, min(self._number_of_samples - 1,
+                                    sample_index))
+    if start <= self._cursor_index < stop:
+      self._update_time_value()
+    else:
+      self.centre_on(self._cursor_index)
+
+
+  def set_measure_marker(self, name):
+    """Sets a measure marker at the cursor.
+
+    @param name: 'A' or 'B'.
+
+    """
+    if self._cursor_index is None:
+      self.move_cursor()
+    self._measure_markers[name] = self._cursor_index
+    self._update_time_value()
+
+
+  def _update_cursor(self):
+    """Keeps the cursor in the view and shows it.
+
+    @returns: A list of (column, mark) of the cursor and measure markers in
+              wave view coordinate.
+
+    """
+    wave_display = self._wave_displays[0]
+    start, stop = wave_display.get_sample_range()
+    if self._cursor_index is not None:
+      # The view may go past the end of the data, so the cursor is kept on
+      # the data as well as in the view.
+      self._cursor_index = max(start, min(stop - 1, self._cursor_index))
+      self._cursor_index = max(0, min(self._number_of_samples - 1,
+                                      self._cursor_index))
+    cursor_column = None
+    if self._cursor_index is not None:
+      cursor_column = wave_display.get_column(self._cursor_index)
+    for each_wave_display in self._wave_displays:
+      each_wave_display.show_cursor(cursor_column)
+    markers = [(wave_display.get_column(sample_index), name)
+               for name, sample_index in sorted(
+                   self._measure_markers.iteritems())]
+    if cursor_column is not None:
+      markers.append((cursor_column, '^'))
+    return markers
+
+
+  def _update_histograms(self):
+    """Counts the samples in the view and shows the histograms.
+
+    Each row of a histogram panel shows the count of the values drawn in
+    the same row of the wave view.
+
+    """
+    start, stop = self._wave_displays[0].get_sample_range()
+    for wave_display, amplitude_histogram, histogram_display in zip(
+        self._wave_displays, self._histograms, self._histogram_displays):
+      amplitude_histogram.set_range(start, stop)
+      wave_height, _ = wave_display.draw_size
+      min_value, max_value = wave_display.get_value_range()
+      half_step = float(max_value - min_value) / max(1, wave_height - 1) / 2
+      value_ranges = []
+      for row in xrange(wave_height):
+        value = max_value - row * half_step * 2
+        value_ranges.append((value - half_step, value + half_step))
+      histogram_display.update(amplitude_histogram.get_counts(value_ranges),
+                               amplitude_histogram.stride)
+
+
+  def _update_time_value(self):
+    """Updates time and value."""
+    for wave_display, value_display in zip(self._wave_displays,
+                                           self._value_displays):
+      value_display.update(wave_display.get_value_range(),
+                           wave_display.get_legend())
+    self._update_histograms()
+    self._time_display.update(self._wave_displays[0].get_time_range(),
+                              self._get_visible_markers() +
+                              self._update_cursor(),
+                              self._get_visible_annotations())
+    start, stop = self._wave_displays[0].get_sample_range()
+    self._overview_display.show_view(
+        self._overview_display.get_column(start),
+        self._overview_display.get_column(max(start, stop - 1)))
+
+
+  def move(self, direction):
+    """Move view toward a direction. Also update time and value.
+
+    @param direction: A direcition defined in Direction.
+
+    """
+    self._for_each_wave_display('move', direction)
+
+
+  def page(self, direction):
+    """Move view by one page toward a direction. Also update time and value.
+
+    @param direction: A direcition defined in Direction.
+
+    """
+    self._for_each_wave_display('page', direction)
+
+
+  def seek_time(self, seconds):
+    """Move view to start at a time. Also update time and value.
+
+    @param seconds: The time in seconds.
+
+    """
+    self._for_each_wave_display('seek_time', seconds)
+
+
+  def start_on(self, sample_index):
+    """Move view to start at a sample. Also update time and value.
+
+    @param sample_index: The sample index.
+
+    """
+    self._for_each_wave_display('start_on', sample_index)
+
+
+  @property
+  def down_sample_factor(self):
+    """The number of samples in a column."""
+    return self._wave_displays[0].down_sample_factor
+
+
+  def jump_to_start(self):
+    """Move view to the start of data. Also update time and value."""
+    self._for_each_wave_display('jump_to_start')
+
+
+  def get_sample_range(self):
+    """Gets the samples in the wave views.
+
+    @returns: (first_sample_index, stop_sample_index).
+
+    """
+    return self._wave_displays[0].get_sample_range()
+
+
+  def get_centre_range(self):
+    """Gets the samples in the centre column of the wave views.
+
+    @returns: (first_sample_index, last_sample_index) of the column.
+
+    """
+    return self._wave_displays[0].get_centre_range()
+
+
+  def centre_on(self, sample_index):
+    """Move view so a sample is in the centre. Also update time and value.
+
+    @param sample_index: The sample index.
+
+    """
+    self._for_each_wave_display('centre_on', sample_index)
+
+
+  def jump_to_end(self):
+    """Move view to the end of data. Also update time and value."""
+    self._for_each_wave_display('jump_to_end')
+
+
+  def _get_time_anchor(self):
+    """Gets the column and the sample which stay in place when zooming in
+    time.
+
+    @returns: (column in view coordinate, sample index) of the cursor.
+              (None, None) for the view centre if the cursor is not shown.
+
+    """
+    if self._cursor_index is None:
+      return None, None
+    _, width = self._wave_displays[0].draw_size
+    column = self._wave_displays[0].get_column(self._cursor_index)
+    if not 0 <= column < width:
+      return None, None
+    return column, self._cursor_index
+
+
+  def change_time_level(self, direction):
+    """Change wave view time level. The cursor stays at the same time.
+
+    @param direction: ScaleDirection.UP or ScaleDirection.DOWN
+    """
+    self._for_each_wave_display('change_time_level', direction,
+                                *self._get_time_anchor())
+
+
+  def change_value_level(self, direction):
+    """Change wave view value level.
+
+    @param direction: ScaleDirection.UP or ScaleDirection.DOWN
+    """
+    self._for_each_wave_display('change_value_level', direction)
+
+
+  def set_time_scale(self, time_scale):
+    """Zoom wave view in time to time_scale times the default view.
+
+    The cursor stays at the same time.
+
+    @param time_scale: A number. 1 means the view contains full data range.
+    """
+    self._for_each_wave_display('set_time_scale', time_scale,
+                                *self._get_time_anchor())
+
+
+  def set_value_scale(self, value_scale):
+    """Zoom wave view in value to value_scale times the default view.
+
+    @param value_scale: A number. 1 means the view contains full value range.
+    """
+    self._for_each_wave_display('set_value_scale', value_scale)
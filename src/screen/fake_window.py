@@ -0,0 +1,169 @@
+"""A fake curses window which draws into memory."""
+
+
+class FakeWindowError(Exception):
+  """Error in FakeWindow."""
+  pass
+
+
+class FakeWindow(object):
+  """FakeWindow implements the curses window methods used by Screen.
+
+  The content is kept in a 2D array shared by a window and its subwindows,
+  so Screen can run without a terminal, e.g. in benchmarks and tests.
+  Input keys are taken from a list given at creation.
+
+  Like curses, drawing outside of the window raises an error.
+  """
+  def __init__(self, height, width, keys=None):
+    """Creates a FakeWindow as the top window.
+
+    @param height: The height of the window.
+    @param width: The width of the window.
+    @param keys: A list of key codes returned by getch. getch returns -1
+                 when the list is exhausted.
+
+    """
+    self._height, self._width = height, width
+    self._begin_y, self._begin_x = 0, 0
+    self._root = self
+    self._row, self._col = 0, 0
+    self._storage = None
+    self._keys = list(keys or [])
+    self.resize(height, width)
+
+
+  def resize(self, height, width):
+    """Resizes a top window and clears it, like curses.resizeterm.
+
+    @param height: The new height.
+    @param width: The new width.
+
+    """
+    if self._root is not self:
+      raise FakeWindowError('Only top window can be resized')
+    self._height, self._width = height, width
+    self._storage = [[' '] * width for _ in xrange(height)]
+
+
+  def getmaxyx(self):
+    """Returns (height, width) of the window."""
+    return self._height, self._width
+
+
+  def subwin(self, height, width, begin_y, begin_x):
+    """Creates a subwindow sharing content with this window.
+
+    @param height: The height of the subwindow.
+    @param width: The width of the subwindow.
+    @param begin_y: The top row in the top window.
+    @param begin_x: The left column in the top window.
+
+    @returns: A FakeWindow object.
+
+    """
+    root_height, root_width = self._root.getmaxyx()
+    if (begin_y < 0 or begin_x < 0 or begin_y + height > root_height or
+        begin_x + width > root_width):
+      raise FakeWindowError('Subwindow %r is out of window' % (
+          (height, width, begin_y, begin_x),))
+    window = FakeWindow.__new__(FakeWindow)
+    window._height, window._width = height, width # pylint:disable=W0212
+    window._begin_y, window._begin_x = begin_y, begin_x # pylint:disable=W0212
+    window._root = self._root # pylint:disable=W0212
+    window._row, window._col = 0, 0 # pylint:disable=W0212
+    return window
+
+
+  def _put(self, row, col, python_char):
+    """Puts a character at (row, col) in window coordinate.
+
+    @param row: row in window coordinate.
+    @param col: col in window coordinate.
+    @param python_char: A one-length string.
+
+    """
+    if not (0 <= row < self._height and 0 <= col < self._width):
+      raise FakeWindowError('(%r, %r) is out of window' % (row, col))
+    self._root._storage[self._begin_y + row][ # pylint:disable=W0212
+        self._begin_x + col] = python_char
+
+
+  def addch(self, row, col, char, attr=0): # pylint:disable=W0613
+    """Draws a character. char can be a key code or a one-length string."""
+    self._put(row, col, chr(char) if isinstance(char, int) else char)
+
+
+  def addstr(self, row, col, string, attr=0): # pylint:disable=W0613
+    """Draws a string."""
+    for index, python_char in enumerate(string):
+      self._put(row, col + index, python_char)
+
+
+  def chgat(self, row, col, num, attr): # pylint:disable=W0613
+    """Changes attributes. Attributes are not kept by FakeWindow."""
+    pass
+
+
+  def move(self, row, col):
+    """Moves the cursor."""
+    self._row, self._col = row, col
+
+
+  def clrtoeol(self):
+    """Clears from the cursor to the end of line."""
+    for col in xrange(self._col, self._width):
+      self._put(self._row, col, ' ')
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      for col in xrange(self._width):
+        self._put(row, col, ' ')
+
+
+  def erase(self):
+    """Clears the window."""
+    self.clear()
+
+
+  def refresh(self):
+    """Does nothing since there is no terminal."""
+    pass
+
+
+  def timeout(self, delay): # pylint:disable=W0613
+    """Does nothing since getch never blocks."""
+    pass
+
+
+  def keypad(self, flag): # pylint:disable=W0613
+    """Does nothing since keys are already key codes."""
+    pass
+
+
+  def getch(self):
+    """Returns the next key code, or -1 if there is no more key."""
+    keys = self._root._keys # pylint:disable=W0212
+    return keys.pop(0) if keys else -1
+
+
+  def push_keys(self, keys):
+    """Appends keys to be returned by getch.
+
+    @param keys: A list of key codes.
+
+    """
+    self._root._keys.extend(keys) # pylint:disable=W0212
+
+
+  def get_lines(self):
+    """Gets the content of the window.
+
+    @returns: A list of strings, one for each row.
+
+    """
+    return [''.join(row[self._begin_x:self._begin_x + self._width])
+            for row in self._root._storage[ # pylint:disable=W0212
+                self._begin_y:self._begin_y + self._height]]
@@ -0,0 +1,57 @@
+"""The subwindow of the amplitude histogram."""
+
+
+class HistogramDisplay(object):
+  """Histogram display shows the amplitude distribution in the view.
+
+ ------------------------------
+ | Count of values in row 0   | --> 0
+ |                            |
+ |                            |
+ | Count of values in row N   | --> wave_height - 1
+ | Stride of counted samples  |
+ -----------------------------
+
+  Each row has a bar as long as the count of values drawn in the same row
+  of the wave view, relative to the largest count. A row with any value
+  has a bar, so rare values like clipping are not hidden.
+
+  """
+  def __init__(self, window, wave_height):
+    """Creates a HistogramDisplay object.
+
+    @param window: A subwindow.
+    @param wave_height: The height of wave view.
+
+    """
+    self._window = window
+    self._height, self._width = self._window.getmaxyx()
+    self._wave_height = wave_height
+    # Leave the last column empty as the gap to wave view.
+    self._bar_width = self._width - 1
+
+
+  def update(self, counts, stride):
+    """Updates the display with new counts.
+
+    @param counts: A list of counts, one for each row of wave view.
+    @param stride: Samples at multiples of stride are counted.
+
+    """
+    self.clear()
+    max_count = max(counts) if counts else 0
+    for row, count in enumerate(counts[:self._wave_height]):
+      if count:
+        length = max(1, count * self._bar_width / max_count)
+        self._window.addstr(row, 0, '#' * length)
+    if stride > 1 and self._wave_height < self._height:
+      self._window.addstr(self._wave_height, 0,
+                          ('1/%d' % stride)[:self._bar_width])
+    self._window.refresh()
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
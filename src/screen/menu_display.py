@@ -0,0 +1,172 @@
+"""The subwindow of the status, readout and help."""
+
+import logging
+
+
+class MenuDisplay(object):
+  """This class controls a subwindow for menu.
+
+   ----------------------------------------
+  | Status                                 |
+  |   Menu, or cursor readout              |
+  |   Help   Help                          |
+  |   Help   Help                          |
+  |   ...                                  |
+   ----------------------------------------
+
+  """
+  _HELP = [
+      'Arrow key to move around.',
+      'PgUp/PgDn to move by a page.',
+      'Home/End to go to start/end.',
+      'g to go to a time.',
+      'Q to quit.',
+      'O o to scale up/down in time.',
+      'z to zoom to N x in time.',
+      'P p to scale up/down in value.',
+      'Z to zoom to N x in value.',
+      'R to reset view.',
+      'f to show frame timings.',
+      'v to toggle stacked/overlay.',
+      '[ ] to go to prev/next diff.',
+      'x to measure lag, X to align.',
+      '> c s 0 to find, n for next.',
+      'm to move in overview.',
+      'h l , . cursor, a b markers.',
+      '{ } to go to prev/next marker.',
+      '~ to filter, e.g. dc, lp 1000.',
+      'Space to play, + - for speed.',
+      't to trigger, e E to step.',
+      'H to show histogram.',
+      'F to show pitch.',
+      # The legend is the last entry so nothing is shown right after it.
+      'Marks: C clip D DC X drop S sil',
+  ]
+  # The last entry of each page if the help does not fit in the menu.
+  _MORE_HELP = '? for more help (%d/%d).'
+  _HELP_ROW = 2
+  _HELP_COLUMN_WIDTH = 32
+  _OVERLAY_WIDTH = 26
+  _PROGRESS_WIDTH = 32
+
+  def __init__(self, window):
+    """Creates a MenuDisplay object.
+
+    @param window: A subwindow.
+
+    """
+    self._window = window
+    self._height, self._width = self._window.getmaxyx()
+    logging.debug('Menu height, width = %r, %r', self._height, self._width)
+    self._help_page = 0
+
+  def init_display(self):
+    """Initializes a menu."""
+    self.clear()
+    self._window.addstr(1, 2, 'Menu')
+    self._show_help()
+
+
+  def _get_help_pages(self):
+    """Splits the help into pages which fit in the menu.
+
+    @returns: A list of lists of help entries.
+    """
+    help_rows = self._height - self._HELP_ROW
+    # Do not write to the last column to prevent scroll.
+    help_columns = (self._width - 3) / self._HELP_COLUMN_WIDTH
+    entries = max(1, help_rows * help_columns)
+    if len(self._HELP) <= entries:
+      return [self._HELP]
+    # An entry of each page tells how to see the next page.
+    entries = max(1, entries - 1)
+    pages = [self._HELP[start:start + entries]
+             for start in xrange(0, len(self._HELP), entries)]
+    return [page + [self._MORE_HELP % (number, len(pages))]
+            for number, page in enumerate(pages, 1)]
+
+
+  def _show_help(self):
+    """Shows the current page of help."""
+    help_rows = self._height - self._HELP_ROW
+    for row in xrange(self._HELP_ROW, self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
+    pages = self._get_help_pages()
+    for index, line in enumerate(pages[self._help_page % len(pages)]):
+      row = self._HELP_ROW + index % help_rows
+      col = 2 + index / help_rows * self._HELP_COLUMN_WIDTH
+      if col + len(line) < self._width:
+        self._window.addstr(row, col, line)
+    self._window.refresh()
+
+
+  def show_next_help(self):
+    """Shows the next page of help if it does not fit in one page."""
+    self._help_page = (self._help_page + 1) % len(self._get_help_pages())
+    self._show_help()
+
+
+  def show_overlay(self, lines):
+    """Shows lines at the right side of the menu over the help.
+
+    @param lines: A list of strings. Lines which do not fit are neglected.
+
+    """
+    col = self._width - self._OVERLAY_WIDTH - 1
+    if col < 0:
+      return
+    for row, line in enumerate(lines[:self._height - 1]):
+      self._window.move(row + 1, col)
+      self._window.clrtoeol()
+      self._window.addstr(row + 1, col, line[:self._OVERLAY_WIDTH])
+    self._window.refresh()
+
+
+  def show_readout(self, message):
+    """Shows a message in the title line of the menu.
+
+    @param message: The message. The title is shown if it is empty.
+
+    """
+    self._window.move(1, 0)
+    self._window.clrtoeol()
+    self._window.addstr(1, 2, (message or 'Menu')[:max(0, self._width - 3)])
+    self._window.refresh()
+
+
+  def show_progress(self, label, ratio):
+    """Shows a progress bar at the right end of the status line.
+
+    @param label: The label before the bar.
+    @param ratio: The progress from 0 to 1.
+
+    """
+    bar_width = self._PROGRESS_WIDTH - len(label) - 8
+    filled = int(min(1, max(0, ratio)) * bar_width)
+    text = '%s %3d%% [%s%s]' % (label, ratio * 100, '#' * filled,
+                                ' ' * (bar_width - filled))
+    col = self._width - len(text) - 1
+    if col < 0:
+      return
+    self._window.addstr(0, col, text)
+    self._window.refresh()
+
+
+  def show_status(self, message):
+    """Shows a message in the status line.
+
+    @param message: The message.
+
+    """
+    self._window.move(0, 0)
+    self._window.clrtoeol()
+    self._window.addstr(0, 2, message[:max(0, self._width - 3)])
+    self._window.refresh()
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
@@ -0,0 +1,183 @@
+"""The subwindow of the overview of the full data."""
+
+import curses
+
+
+class OverviewDisplay(object):
+  """This class controls a subwindow for the overview of the full data.
+
+   ----------------------------------------
+  |     |  Envelope above zero             |
+  |     |  Envelope below zero             |
+  |label|  Marks of the full data          |
+   ----------------------------------------
+
+  Each column of the strip is an equal part of the full data, aligned with
+  the columns of the wave view. The envelope is drawn from a coarse
+  summary, so it does not read samples. The part of the data in the wave
+  view is shown in reverse video.
+
+  """
+  _LABEL_WIDTH = 10
+  _ENVELOPE_ROWS = 2
+  _MARK_ROW = 2
+  # Marks which are more important are shown when marks share a column.
+  _PRIORITY = 'SDXC'
+  # Characters for a third, two thirds and all of the half of value range.
+  _UPPER_CHARS = '.:|'
+  _LOWER_CHARS = "':|"
+
+  def __init__(self, window, number_of_samples, strip_width):
+    """Creates an OverviewDisplay object.
+
+    @param window: A subwindow.
+    @param number_of_samples: The number of samples of the full data.
+    @param strip_width: The number of columns of the strip.
+
+    """
+    self._window = window
+    self._height, self._width = self._window.getmaxyx()
+    self.number_of_samples = number_of_samples
+    # Do not write to the last column to prevent scroll.
+    self.strip_width = max(
+        0, min(strip_width, self._width - self._LABEL_WIDTH - 1))
+    self._summary = None
+    self._data_range = None
+    self._envelope = None
+    # The first and last columns of the wave view in the strip.
+    self._view_columns = None
+
+
+  def get_column(self, sample_index):
+    """Gets the column of a sample in the strip.
+
+    @param sample_index: The sample index.
+
+    @returns: The column in window coordinate.
+
+    """
+    column = sample_index * self.strip_width / max(1, self.number_of_samples)
+    return self._LABEL_WIDTH + min(column, self.strip_width - 1)
+
+
+  def get_sample(self, column):
+    """Gets the sample at the middle of a column of the strip.
+
+    @param column: The column in window coordinate.
+
+    @returns: The sample index.
+
+    """
+    column = max(0, min(self.strip_width - 1, column - self._LABEL_WIDTH))
+    return ((2 * column + 1) * self.number_of_samples /
+            (2 * max(1, self.strip_width)))
+
+
+  def set_summary(self, block_summary, data_range):
+    """Sets the summary whose envelope is drawn.
+
+    @param block_summary: A summary.BlockSummary object of the full data.
+                          It may be still being built.
+    @param data_range: (min, max) of sample value range.
+
+    """
+    self._summary = block_summary
+    self._data_range = data_range
+    self._envelope = None
+    self.update_envelope()
+
+
+  def _get_char(self, value, full_scale, chars):
+    """Gets the character for a value in a half of the value range.
+
+    @param value: The value. Not positive values are drawn as space.
+    @param full_scale: The largest value of the half.
+    @param chars: Characters for each third of the half.
+
+    @returns: A character.
+
+    """
+    if value <= 0:
+      return ' '
+    level = min(len(chars) - 1, value * len(chars) / max(1, full_scale))
+    return chars[level]
+
+
+  def update_envelope(self):
+    """Draws the envelope of the summary if it is changed."""
+    if self._summary is None or not self.strip_width:
+      return
+    envelope = self._summary.get_envelope(self.number_of_samples,
+                                          self.strip_width)
+    if envelope == self._envelope:
+      return
+    self._envelope = envelope
+    low, high = self._data_range
+    for index, values in enumerate(envelope):
+      if values is None:
+        upper, lower = ' ', ' '
+      else:
+        minimum, maximum = values
+        upper = self._get_char(maximum, high, self._UPPER_CHARS)
+        lower = self._get_char(-minimum, -low, self._LOWER_CHARS)
+      self._window.addch(0, self._LABEL_WIDTH + index, ord(upper))
+      self._window.addch(1, self._LABEL_WIDTH + index, ord(lower))
+    # Drawing resets the attributes, so the view is shown again.
+    view_columns, self._view_columns = self._view_columns, None
+    if view_columns:
+      self.show_view(*view_columns)
+    self._window.refresh()
+
+
+  def show_view(self, first_column, last_column):
+    """Shows the part of the data in the wave view in reverse video.
+
+    @param first_column: The first column in window coordinate.
+    @param last_column: The last column in window coordinate.
+
+    """
+    if not self.strip_width or (
+        self._view_columns == (first_column, last_column)):
+      return
+    for row in xrange(self._ENVELOPE_ROWS):
+      if self._view_columns:
+        previous_first, previous_last = self._view_columns
+        self._window.chgat(row, previous_first,
+                           previous_last - previous_first + 1,
+                           curses.A_NORMAL)
+      self._window.chgat(row, first_column, last_column - first_column + 1,
+                         curses.A_REVERSE)
+    self._view_columns = (first_column, last_column)
+    self._window.refresh()
+
+
+  def set_markers(self, markers):
+    """Shows marks in the strip.
+
+    @param markers: A list of (sample_index, mark).
+
+    """
+    if not self.strip_width:
+      return
+    strip = {}
+    for sample_index, mark in markers:
+      column = self.get_column(sample_index)
+      if (self._PRIORITY.find(mark) >=
+          self._PRIORITY.find(strip.get(column, ' '))):
+        strip[column] = mark
+    self._window.move(self._MARK_ROW, self._LABEL_WIDTH)
+    self._window.clrtoeol()
+    for column, mark in strip.iteritems():
+      self._window.addch(self._MARK_ROW, column, ord(mark))
+    self._window.refresh()
+
+
+  def show_label(self, label):
+    """Shows a label at the left of the marks.
+
+    @param label: A string. It is cut to the label width.
+
+    """
+    self._window.addstr(self._MARK_ROW, 0, label[:self._LABEL_WIDTH - 1].ljust(
+        self._LABEL_WIDTH - 1))
+    self._window.refresh()
@@ -1,77 +1,28 @@
 """The module to control content on the sreen."""
 
-import logging
-
-from waveform import waveform
-from waveview import waveview
-
-
-class ScaleDirection(object):
-  """Scale direction."""
-  UP = 'UP'
-  DOWN = 'DOWN'
-
-
-class Direction(object):
-  """Directions."""
-  LEFT = 'LEFT'
-  RIGHT = 'RIGHT'
-  UP = 'UP'
-  DOWN = 'DOWN'
-
-
-def get_next(current_x, current_y, direction):
-  """Gets the next location given the current point and direction.
-
-  @param current_x: The x coordinate in sample coordinate.
-  @param current_y: The y coordinate in sample coordinate.
-  @param direction: A direcition defined in Direction.
-
-  @returns: The new (x, y) in sample coordinate.
-
-  """
-  if direction == Direction.LEFT:
-    current_x -= 1
-  elif direction == Direction.RIGHT:
-    current_x += 1
-  elif direction == Direction.UP:
-    current_y += 1
-  elif direction == Direction.DOWN:
-    current_y -= 1
-  else:
-    raise WaveViewDisplayError('Not a valid direction: %r' % direction)
-
-  return current_x, current_y
+from __future__ import absolute_import
 
+import curses
+import logging
+import time
 
-def format_value(value, width):
-  """Format the value into a string of length width.
-
-  @param value: The value.
-  @param width: The width of returned string.
+from correlation import correlation
+from cursor import cursor
+from filters import filters
+from pitch import pitch
+from playback import playback
+from profiler import profiler
+from search import search
+from summary import summary
+from trigger import trigger
+from screen import data_view_display
+from screen import menu_display
+from screen import wave_view_display
 
-  @returns: A strnig of length width representing the number.
 
-  """
-  full_string = '%s' % value
-  dot_index = full_string.find('.')
-  error = False
-  # 1234.56 can not be shown in 3 digits.
-  if dot_index > width:
-    error = True
-  # 1234 can not be shown show in 3 digits.
-  elif dot_index == -1:
-    if len(full_string) > width:
-      error = True
-  else:
-    pass
-  if error:
-    logging.error('width %r is not long enough for value %r',
-                  width, value)
-  if len(full_string) < width:
-    return ' ' * (width - len(full_string)) + full_string
-  else:
-    return full_string[0:width]
+# Key codes not defined in curses module.
+_ESCAPE = 27
+_DELETE = 127
 
 
 class Screen(object):
@@ -102,28 +53,102 @@ class Screen(object):
   top left corner of the window.
 
   """
-  _MENU_HEIGHT = 8
-  def __init__(self, window, raw_data):
+  _MENU_HEIGHT = 10
+  # The smallest window which can show a data view.
+  _MIN_HEIGHT = _MENU_HEIGHT + 10
+  _MIN_WIDTH = 30
+  # Traced stages shown in profile overlay in pipeline order.
+  _PROFILE_STAGES = ['decode', 'downsample', 'quantize', 'rasterize', 'draw']
+
+  def __init__(self, window, traces,
+               layout=data_view_display.Layout.STACKED, clock=time.time):
     """Create a Screen object.
 
     @param window: A curses.window object.
-    @param raw_data: A data.OneChannelRawData object.
+    @param traces: A list of data.OneChannelRawData objects.
+    @param layout: A layout defined in data_view_display.Layout.
+    @param clock: A function returning wall time in seconds for playback,
+                  e.g. the fake clock of a replay.
 
     """
     window.clear()
-    window_height, window_width = window.getmaxyx()
+    self._window = window
+    self._show_profile = False
+    self._sampling_rate = traces[0].sampling_rate
+    # A diff.RegionIndex of differences to jump to.
+    self._diff_regions = None
+    # The last correlation.CorrelationResult of the first two traces.
+    self._correlation = None
+    # A search.EventSearch of the first trace. It is built at first search.
+    self._event_search = None
+    # The last search as (description, function of (event_search, position)).
+    self._last_find = None
+    # An anomaly.AnomalyScanner of the first trace while it is scanning.
+    self._scanner = None
+    # The number of anomalies shown.
+    self._shown_anomalies = 0
+    # A summary.BlockSummary of the first trace.
+    self._block_summary = None
+    # The cursor.Measurement between the markers.
+    self._measurement = None
+    # An annotation.AnnotationIndex loaded from a marker file.
+    self._annotations = None
+    self._playback = playback.Playback(self._sampling_rate, clock=clock)
+    # A trigger.TriggerIndex of the first trace in trigger mode.
+    self._trigger = None
+    # A pitch.PitchEstimator of the first trace while pitch is shown.
+    self._pitch = None
+    # data.LoadingRawData objects of the traces while they are being read,
+    # and the time reading started.
+    self._loaders = []
+    self._load_start_time = None
+    # True while keys move the data view by columns of the overview.
+    self._overview_focus = False
+
+    subwindow_menu, subwindow_data = self._create_subwindows()
+    self._menu_display = menu_display.MenuDisplay(subwindow_menu)
+    self._data_display = data_view_display.DataViewDisplay(
+        subwindow_data, traces, layout)
+
+
+  def _create_subwindows(self):
+    """Creates subwindows for menu and data view using current window size.
+
+    @returns: A tuple (subwindow_menu, subwindow_data).
+
+    """
+    window_height, window_width = self._window.getmaxyx()
     logging.debug('window_height, window_width = %r, %r',
                   window_height, window_width)
 
-    self._window = window
-
     subwindow_menu = self._window.subwin(
         self._MENU_HEIGHT, window_width, window_height - self._MENU_HEIGHT, 0)
     subwindow_data = self._window.subwin(
         window_height - self._MENU_HEIGHT, window_width, 0, 0)
+    return subwindow_menu, subwindow_data
+
 
-    self._menu_display = MenuDisplay(subwindow_menu)
-    self._data_display = DataViewDisplay(subwindow_data, raw_data)
+  def resize(self):
+    """Rebuilds the subwindows after the terminal is resized.
+
+    The data, the time range and the zoom of the data view are kept.
+    Nothing is changed if the window is too small to show a data view.
+
+    """
+    window_height, window_width = self._window.getmaxyx()
+    if (window_height < self._MIN_HEIGHT or
+        window_width < self._MIN_WIDTH):
+      logging.warning('Window size %r x %r is too small',
+                      window_height, window_width)
+      return
+
+    self._window.clear()
+    subwindow_menu, subwindow_data = self._create_subwindows()
+    self._menu_display = menu_display.MenuDisplay(subwindow_menu)
+    self._menu_display.init_display()
+    self._data_display.resize(subwindow_data)
+    self.update_profile_overlay()
+    self._window.refresh()
 
 
   def clear(self):
@@ -146,10 +171,51 @@ class Screen(object):
     @param direction: A direction defined in Direction
 
     """
+    if self._trigger and direction in (wave_view_display.Direction.LEFT,
+                                       wave_view_display.Direction.RIGHT):
+      self.wave_view_step_trigger(
+          forward=direction == wave_view_display.Direction.RIGHT)
+      return
     self._data_display.move(direction)
     self._window.refresh()
 
 
+  def wave_view_page(self, direction):
+    """Move the data view by one page.
+
+    @param direction: A direction defined in Direction
+
+    """
+    self._data_display.page(direction)
+    if self._trigger and direction == wave_view_display.Direction.RIGHT:
+      self._snap_to_trigger(forward=True)
+    elif self._trigger and direction == wave_view_display.Direction.LEFT:
+      self._snap_to_trigger(forward=False)
+    self._window.refresh()
+
+
+  def wave_view_seek_time(self, seconds):
+    """Move the data view so it starts at a time.
+
+    @param seconds: The time in seconds.
+
+    """
+    self._data_display.seek_time(seconds)
+    self._window.refresh()
+
+
+  def wave_view_jump_to_start(self):
+    """Move the data view to the start of data."""
+    self._data_display.jump_to_start()
+    self._window.refresh()
+
+
+  def wave_view_jump_to_end(self):
+    """Move the data view to the end of data."""
+    self._data_display.jump_to_end()
+    self._window.refresh()
+
+
   def wave_view_change_time_level(self, direction):
     """Change wave view time level.
 
@@ -168,530 +234,748 @@ class Screen(object):
     self._window.refresh()
 
 
-  def wave_view_reset(self):
-    """Change wave view to default time and value scale and position."""
-    self._data_display.init_display()
-    self._window.refresh()
+  def wave_view_set_time_scale(self, time_scale):
+    """Zoom wave view in time to time_scale times the default view.
 
+    @param time_scale: A number. 1 means the view contains full data range.
+    """
+    self._data_display.set_time_scale(time_scale)
+    self._window.refresh()
 
-class MenuDisplay(object):
-  """This class controls a subwindow for menu."""
-  def __init__(self, window):
-    """Creates a MenuDisplay object.
 
-    @param window: A subwindow.
+  def wave_view_set_value_scale(self, value_scale):
+    """Zoom wave view in value to value_scale times the default view.
 
+    @param value_scale: A number. 1 means the view contains full value range.
     """
-    self._window = window
-    self._height, self._width = self._window.getmaxyx()
-    logging.debug('Menu height, width = %r, %r', self._height, self._width)
-
-  def init_display(self):
-    """Initializes a menu."""
-    self.clear()
-    self._window.addstr(1, 2, 'Menu')
-    self._window.addstr(2, 2, 'Arrow key to move around.')
-    self._window.addstr(3, 2, 'Q to quit.')
-    self._window.addstr(4, 2, 'O to scale larger in time.')
-    self._window.addstr(5, 2, 'o to scale smaller in time.')
-    self._window.addstr(6, 2, 'P to scale larger in value.')
-    self._window.addstr(7, 2, 'p to scale smaller in value.')
+    self._data_display.set_value_scale(value_scale)
     self._window.refresh()
 
 
-  def clear(self):
-    """Clears the window."""
-    for row in xrange(self._height):
-      self._window.move(row, 0)
-      self._window.clrtoeol()
-
-
-class DataViewDisplay(object):
-  """DataViewDisplay controls 3 displays.
+  def prompt(self, message):
+    """Prompts user to input a line in the menu.
 
-   ----------------------------------------
-  |   |                                    |
-  |   |             Wave view              |
-  |   |                                    |
-  |val|                                    |
-  |   |                                    |
-  |   |                                    |
-  |   |                                    |
-  |   |                                    |
-  |---|------------------------------------|
-  |   |  time                              |
-  |----------------------------------------|
+    Enter finishes the input and Esc cancels it. It waits for each key, so
+    the main loop sets its own timeout again afterwards. getch returns -1
+    only if there is no more input, e.g. at the end of a replay, which
+    cancels the input too.
 
-  """
-  _VALUE_WIDTH = 10
-  _TIME_HEIGHT = 2
+    @param message: The message shown before the input.
 
-  def __init__(self, window, raw_data):
-    """Creates a DataViewDisplay object.
+    @returns: The input string. None if the input is cancelled.
+    """
+    text = ''
+    self._window.timeout(-1)
+    while True:
+      self._menu_display.show_status(message + text)
+      input_char = self._window.getch()
+      if input_char in (ord('\n'), ord('\r'), curses.KEY_ENTER):
+        break
+      elif input_char in (_ESCAPE, -1):
+        text = None
+        break
+      elif input_char in (curses.KEY_BACKSPACE, _DELETE, ord('\b')):
+        text = text[:-1]
+      elif 32 <= input_char < 127:
+        text += chr(input_char)
+    self._menu_display.show_status('')
+    return text
+
+
+  def show_status(self, message):
+    """Shows a status message in the menu.
+
+    @param message: The message.
+    """
+    self._menu_display.show_status(message)
 
-    @param window: A subwindow.
-    @param raw_data: A data.OneChannelRawData object.
 
-    """
-    self._window = window
-    self._raw_data = raw_data
-    self._height, self._width = self._window.getmaxyx()
+  def show_next_help(self):
+    """Shows the next page of help in the menu."""
+    self._menu_display.show_next_help()
+    self.update_profile_overlay()
 
-    subwindow_value = self._window.subwin(
-        self._height - self._TIME_HEIGHT, self._VALUE_WIDTH, 0, 0)
-    subwindow_wave = self._window.subwin(
-        self._height - self._TIME_HEIGHT, self._width - self._VALUE_WIDTH,
-        0, self._VALUE_WIDTH)
-    subwindow_time = self._window.subwin(
-        self._TIME_HEIGHT, self._width - self._VALUE_WIDTH,
-        self._height - self._TIME_HEIGHT, self._VALUE_WIDTH)
 
-    self._wave_display = WaveViewDisplay(subwindow_wave, self._raw_data)
-    wave_height, wave_width = self._wave_display.draw_size
-    self._value_display = ValueDisplay(subwindow_value, wave_height)
-    self._time_display = TimeDisplay(subwindow_time, wave_width)
+  def toggle_profile_overlay(self):
+    """Shows or hides the profile overlay in the menu."""
+    self._show_profile = not self._show_profile
+    if self._show_profile:
+      profiler.enable()
+      self.update_profile_overlay()
+    else:
+      profiler.disable()
+      self._menu_display.init_display()
 
 
-  def init_display(self):
-    """Initializes display."""
-    self._wave_display.init_display()
-    self._update_time_value()
+  def update_profile_overlay(self):
+    """Updates the profile overlay with timings of the last frame."""
+    if not self._show_profile:
+      return
+    self._menu_display.show_overlay(
+        profiler.get_profiler().format_overlay(self._PROFILE_STAGES))
 
 
-  def _update_time_value(self):
-    """Updates time and value."""
-    value_range = self._wave_display.get_value_range()
-    time_range = self._wave_display.get_time_range()
-    self._value_display.update(value_range)
-    self._time_display.update(time_range)
+  def set_diff_regions(self, regions):
+    """Sets the regions where captures differ.
 
+    @param regions: A diff.RegionIndex object.
+    """
+    self._diff_regions = regions
+    self.show_status('%d regions differ' % len(regions.regions))
 
-  def move(self, direction):
-    """Move view toward a direction. Also update time and value.
 
-    @param direction: A direcition defined in Direction.
+  def wave_view_jump_to_diff(self, forward):
+    """Move the data view so the next or previous difference is centred.
 
+    @param forward: True to find the next difference after the view centre.
+                    False to find the previous one.
     """
-    self._wave_display.move(direction)
-    self._update_time_value()
+    if self._diff_regions is None:
+      self.show_status('No difference. Use --diff to compare two files.')
+      return
+    first_sample, last_sample = self._data_display.get_centre_range()
+    if forward:
+      index = self._diff_regions.get_next(last_sample)
+    else:
+      index = self._diff_regions.get_previous(first_sample)
+    if index is None:
+      self.show_status('No more difference.')
+      return
+    start, stop = self._diff_regions.regions[index]
+    self._data_display.centre_on(start)
+    self.show_status('Difference %d/%d at %.3f secs, %.3f secs long' % (
+        index + 1, len(self._diff_regions.regions),
+        float(start) / self._sampling_rate,
+        float(stop - start) / self._sampling_rate))
+    self._window.refresh()
 
 
-  def change_time_level(self, direction):
-    """Change wave view time level.
+  def set_annotations(self, annotations):
+    """Sets the annotations shown under the time axis.
 
-    @param direction: ScaleDirection.UP or ScaleDirection.DOWN
+    @param annotations: An annotation.AnnotationIndex object.
     """
-    self._wave_display.change_time_level(direction)
-    self._update_time_value()
+    self._annotations = annotations
+    self._data_display.set_annotations(annotations)
+    self.show_status('%d markers' % len(annotations))
 
 
-  def change_value_level(self, direction):
-    """Change wave view value level.
+  def wave_view_jump_to_annotation(self, forward):
+    """Move the data view so the next or previous annotation is centred.
 
-    @param direction: ScaleDirection.UP or ScaleDirection.DOWN
+    @param forward: True to find the next annotation after the view centre.
+                    False to find the previous one.
     """
-    self._wave_display.change_value_level(direction)
-    self._update_time_value()
+    if not self._annotations:
+      self.show_status('No marker. Use --markers to load a marker file.')
+      return
+    first_sample, last_sample = self._data_display.get_centre_range()
+    if forward:
+      index = self._annotations.find_next(last_sample)
+    else:
+      index = self._annotations.find_previous(first_sample)
+    if index is None:
+      self.show_status('No more marker.')
+      return
+    item = self._annotations[index]
+    self._data_display.centre_on(item.start)
+    self.show_status('Marker %d/%d at %.3f secs: %s' % (
+        index + 1, len(self._annotations),
+        float(item.start) / self._sampling_rate, item.label))
+    self._window.refresh()
 
 
-class ValueDisplayError(Exception):
-  """Error in WaveViewDisplay."""
-  pass
+  def wave_view_correlate(self, max_lag_ms):
+    """Measures the lag of the second trace to the first trace in the view.
 
+    The range in the view is cross-correlated. The result is shown in the
+    menu and kept for wave_view_toggle_align.
 
-class ValueDisplay(object):
-  """Value display controls display for value.
+    @param max_lag_ms: The maximum lag to search in milliseconds.
+    """
+    traces = self._data_display.traces
+    if len(traces) < 2:
+      self.show_status('Correlation needs two traces.')
+      return
+    # Measure the original trace if it is aligned.
+    first = traces[0]
+    second = getattr(traces[1], 'original', traces[1])
+    start, stop = self._data_display.get_sample_range()
+    # No lag is longer than the traces, and the FFT size grows with it.
+    max_lag = min(int(max_lag_ms * self._sampling_rate / 1000),
+                  max(len(first.samples), len(second.samples)))
+    self.show_status('Correlating %d samples...' % (stop - start))
+    try:
+      self._correlation = correlation.cross_correlate(
+          first.samples, second.samples, self._sampling_rate, max_lag,
+          start, stop)
+    except correlation.CorrelationError as error:
+      self.show_status('Correlation failed: %s' % error)
+      return
+    logging.info('Correlation of %s and %s: %s', first.name, second.name,
+                 self._correlation)
+    self.show_status(str(self._correlation))
+
+
+  def wave_view_toggle_align(self):
+    """Shifts the second trace by the measured lag, or removes the shift."""
+    traces = self._data_display.traces
+    if len(traces) >= 2 and isinstance(traces[1],
+                                       correlation.AlignedChannel):
+      self._data_display.set_trace(1, traces[1].original)
+      self.show_status('Alignment removed.')
+    elif self._correlation is None:
+      self.show_status('Press x to measure the lag first.')
+      return
+    elif self._correlation.lag is None:
+      self.show_status('No match to align by: %s' % self._correlation)
+      return
+    else:
+      self._data_display.set_trace(
+          1, correlation.AlignedChannel(traces[1], self._correlation.lag))
+      self.show_status('Aligned by %d samples.' % self._correlation.lag)
+    self._window.refresh()
 
- ------------------------------
- | Maximum value in this view.| --> 0
- |                            |
- |                            |
- |                            |
- |                            |
- |                            |
- |                            |
- | Minimum value in this view.| --> wave_height - 1
- |                            |
- -----------------------------
 
-  """
-  _VALUE_LENGTH = 8
-  def __init__(self, window, wave_height):
-    """Creates a ValueDisplay object.
+  def _filter_trace(self, trace, stages):
+    """Replaces the filters of a trace. Keeps the alignment.
 
-    @param window: A subwindow.
-    @param wave_height: The height of wave view.
+    @param trace: A trace.
+    @param stages: A list of stages from filters.parse_filters. Empty to
+                   remove the filters.
 
+    @returns: The filtered trace.
     """
-    self._window = window
-    self._height, self._width = self._window.getmaxyx()
-    self._wave_height = wave_height
-    logging.debug('Value display height, width = %r, %r',
-                  self._height, self._width)
-    logging.debug('wave height: %r', wave_height)
-    if self._width < self._VALUE_LENGTH + 1:
-      raise ValueDisplayError('Width %r is not long enough' % self._width)
+    if isinstance(trace, correlation.AlignedChannel):
+      return correlation.AlignedChannel(
+          self._filter_trace(trace.original, stages), trace.lag)
+    trace = filters.get_unfiltered(trace)
+    return filters.FilteredChannel(trace, stages) if stages else trace
 
 
-  def update(self, value_range):
-    """Updates the display with new value range.
+  def wave_view_filter(self, text):
+    """Filters all traces, or removes the filters.
 
-    @param value_range: (min_value, max_value).
+    Samples are filtered lazily in chunks when they are shown.
 
+    @param text: A filter chain for filters.parse_filters.
     """
-    min_value, max_value = value_range
-    min_value_str = format_value(min_value, self._VALUE_LENGTH)
-    max_value_str = format_value(max_value, self._VALUE_LENGTH)
-
-    self.clear()
-    self._window.addstr(0, 0, max_value_str)
-    self._window.addstr(self._wave_height - 1, 0, min_value_str)
+    try:
+      stages = filters.parse_filters(text, self._sampling_rate)
+    except filters.FilterError as error:
+      self.show_status('Invalid filter: %s' % error)
+      return
+    self.show_status('Filtering...')
+    for index, trace in enumerate(list(self._data_display.traces)):
+      self._data_display.set_trace(index, self._filter_trace(trace, stages))
+    # Trigger points are indexed on the samples before this change.
+    self._trigger = None
+    if stages:
+      self.show_status('Filtered by %s.' % ', '.join(
+          stage.description for stage in stages))
+    else:
+      self.show_status('Filters removed.')
     self._window.refresh()
 
 
-  def clear(self):
-    """Clears the window."""
-    for row in xrange(self._height):
-      self._window.move(row, 0)
-      self._window.clrtoeol()
+  def _get_event_search(self):
+    """Gets the event search of the first trace. Builds it if needed.
 
+    @returns: A search.EventSearch object.
+    """
+    if self._event_search is None:
+      # Search the samples before filters, which the summary is built from.
+      trace = filters.get_unfiltered(self._data_display.traces[0])
+      if self._block_summary is None or not self._block_summary.is_complete:
+        # Do not wait for the summary built by the scan.
+        self.show_status('Indexing %s...' % trace.name)
+        self._block_summary = summary.BlockSummary(trace.samples)
+        self._data_display.set_overview_summary(self._block_summary)
+      self._event_search = search.EventSearch(
+          trace.samples, trace.data_range, self._block_summary)
+    return self._event_search
+
+
+  def _find(self, description, find):
+    """Finds an event after the view centre and centres it.
+
+    @param description: The description of the event shown in the menu.
+    @param find: A function of (event_search, position) which returns the
+                 sample index of the event after position, or None.
+    """
+    self._last_find = (description, find)
+    event_search = self._get_event_search()
+    _, last_sample = self._data_display.get_centre_range()
+    sample_index = find(event_search, last_sample + 1)
+    if sample_index is None:
+      self.show_status('%s not found.' % description)
+      return
+    self._data_display.centre_on(sample_index)
+    self.show_status('%s at %.6f secs' % (
+        description, float(sample_index) / self._sampling_rate))
+    self._window.refresh()
 
-class TimeDisplayError(Exception):
-  """Error in WaveViewDisplay."""
-  pass
 
+  def wave_view_find_above(self, value):
+    """Finds the next sample larger than a value in the first trace.
 
-class TimeDisplay(object):
-  """Time display controls display for time.
+    @param value: The value.
+    """
+    self._find('Sample above %g' % value,
+               lambda event_search, position:
+               event_search.find_above(position, value))
 
-  ----------------------------------------------------------
- | Minimum time in this view.    Maximum time in this view.|
- |                                                          |
-  ----------------------------------------------------------
 
-  """
-  _TIME_LENGTH = 8
-  def __init__(self, window, wave_width):
-    """Creates a TimeDisplay object.
+  def wave_view_find_clipped(self):
+    """Finds the next run of clipped samples in the first trace."""
+    self._find('Clipped run',
+               lambda event_search, position:
+               event_search.find_clipped(position))
+
 
-    @param window: A subwindow.
-    @param wave_width: The width of wave view.
+  def wave_view_find_silence(self, min_ms):
+    """Finds the next silence in the first trace.
 
+    @param min_ms: The minimum length of silence in milliseconds.
     """
-    self._window = window
-    self._height, self._width = self._window.getmaxyx()
-    self._wave_width = wave_width
-    logging.debug('Time display height, width = %r, %r',
-                  self._height, self._width)
-    if self._width < 2 * (self._TIME_LENGTH + 1):
-      raise TimeDisplayError('Width %r is not long enough' % self._width)
+    min_length = int(min_ms * self._sampling_rate / 1000)
+    if min_length > len(self._data_display.traces[0].samples):
+      # The pattern of a longer silence would not fit in memory.
+      self.show_status('Silence over %g ms not found.' % min_ms)
+      return
+    self._find('Silence over %g ms' % min_ms,
+               lambda event_search, position:
+               event_search.find_silence(position, min_length))
 
 
-  def update(self, time_range):
-    """Updates the display with new time range.
+  def wave_view_find_zero_crossing(self):
+    """Finds the next zero crossing in the first trace."""
+    self._find('Zero crossing',
+               lambda event_search, position:
+               event_search.find_zero_crossing(position))
 
-    @param time_range: (min_time, max_time).
 
-    """
-    min_time, max_time = time_range
-    min_time_str = format_value(min_time, self._TIME_LENGTH)
-    max_time_str = format_value(max_time, self._TIME_LENGTH)
+  def wave_view_find_again(self):
+    """Repeats the last search from the view centre."""
+    if self._last_find is None:
+      self.show_status('No previous search.')
+      return
+    self._find(*self._last_find)
 
-    self.clear()
-    self._window.addstr(0, 0, min_time_str)
-    # Do not write to the last point
-    self._window.addstr(0, self._wave_width - self._TIME_LENGTH - 2,
-                        max_time_str)
-    self._window.refresh()
 
+  def set_anomaly_scanner(self, scanner):
+    """Sets the scanner of the first trace whose anomalies are shown.
 
-  def clear(self):
-    """Clears the window."""
-    for row in xrange(self._height):
-      self._window.move(row, 0)
-      self._window.clrtoeol()
+    The overview shows the envelope of the summary built by the scanner.
 
+    @param scanner: A started anomaly.AnomalyScanner object.
+    """
+    self._scanner = scanner
+    if scanner.block_summary:
+      self._block_summary = scanner.block_summary
+      # Blocks not scanned yet are drawn from a seek-sampled preview.
+      self._data_display.set_overview_summary(summary.RefiningEnvelope(
+          summary.SparseEnvelope(self._data_display.traces[0].samples),
+          scanner.block_summary))
+    self.poll_anomalies()
 
-class WaveViewDisplayError(Exception):
-  """Error in WaveViewDisplay."""
-  pass
 
+  def set_loaders(self, loaders):
+    """Sets the started loaders of the traces whose progress is shown.
 
-class WaveViewDisplay(object):
-  """This class controls a subwindow for waveview display.
+    @param loaders: A list of data.LoadingRawData objects.
+    """
+    self._loaders = list(loaders)
+    self._load_start_time = time.time()
+    self.poll_loading()
 
-   ----------------------------------------
-  |                                        |
-  |                 Wave view              |
-  |                                        |
-  |                                        |
-  |                                        |
-  |                                        |
-  |                                        |
-  |                                        |
-  |                                        |
-  |                                        |
-  |----------------------------------------|
+
+  @property
+  def is_loading(self):
+    """True if the traces are being read into memory."""
+    return bool(self._loaders)
 
 
-  """
-  def __init__(self, window, raw_data):
-    """Creates a WaveViewDisplay object.
+  def poll_loading(self):
+    """Shows the progress of reading the traces into memory.
 
-    @param window: A subwindow.
-    @param raw_data: A data.OneChannelRawData object.
+    It does not wait for the loaders. Samples are the same before and after
+    they are read, so the view is not changed.
 
+    @returns: True if the traces are still being read.
     """
-    self._window = window
-    self._raw_data = raw_data
-    self._wave = None
-    self._view = None
-    self._start_x, self._start_y = None, None
-    self._width, self._height = None, None
-    self._setup_valid_size()
-    # Time level is an integer to control sample length.
-    # Level 0 means the sample length is the width of this view.
-    # Level 1 means to enlarge the wave view horizontally, that is, increase
-    # the sample length by certain amount. The scale corresponds to each
-    # level is defined in _get_time_scale.
-    self._time_level = None
-    self._sample_length = None
-
-    # Value level is an integer to control number of quantize levels.
-    # Level 0 means the number of quantize levels is the height of this view.
-    # Level 1 means to enlarge the wave view vertically that is, increase
-    # the number of quantize levels by certain amount. The scale corresponds
-    # to each value level is defined in _get_value_scale.
-    self._value_level = None
-    self._quantize_levels = None
+    if not self._loaders:
+      return False
+    loaded = sum(loader.loaded for loader in self._loaders)
+    total = sum(loader.num_of_samples for loader in self._loaders)
+    if all(loader.done for loader in self._loaders):
+      self.show_status('Read %d samples in %.2f secs.' % (
+          total, time.time() - self._load_start_time))
+      self._loaders = []
+    else:
+      self._menu_display.show_progress('Reading',
+                                       float(loaded) / max(1, total))
+    self._window.refresh()
+    return bool(self._loaders)
 
-  @property
-  def draw_size(self):
-    """Return the (height, width) that is used to draw the wave view.
 
-    @returns: (height, width)
+  def set_overview_summary(self, block_summary):
+    """Sets the summary of the first trace drawn in the overview.
 
+    @param block_summary: An object with get_envelope of
+                          summary.BlockSummary, e.g. a
+                          daemon.RemoteSummary.
     """
-    return (self._height, self._width)
+    self._data_display.set_overview_summary(block_summary)
+    self._data_display.update_overview_envelope()
+    self._window.refresh()
 
 
-  def clear(self):
-    """Clears the window."""
-    for row in xrange(self._height):
-      self._window.move(row, 0)
-      self._window.clrtoeol()
+  def poll_anomalies(self):
+    """Shows the progress and anomalies found by the scanner so far.
 
+    It does not wait for the scanner.
+
+    @returns: True if the scanner is still scanning.
+    """
+    if self._scanner is None:
+      return False
+    # Read done before anomalies so no anomaly is missed when it is done.
+    done = self._scanner.done
+    anomalies = list(self._scanner.anomalies)
+    if len(anomalies) != self._shown_anomalies:
+      self._data_display.set_markers(
+          sorted((item.start, item.mark) for item in anomalies))
+      self._shown_anomalies = len(anomalies)
+    self._data_display.update_overview_envelope()
+    if done:
+      self._data_display.show_overview_label('%d found' % len(anomalies))
+      counts = self._scanner.get_counts()
+      self.show_status('Scan done: ' + ', '.join(
+          '%d %s' % (counts[kind], kind) for kind in sorted(counts)))
+      self._scanner = None
+    else:
+      self._data_display.show_overview_label(
+          'scan %3d%%' % (self._scanner.progress * 100))
+    self._window.refresh()
+    return not done
 
-  def _setup_valid_size(self):
-    """Sets up valid view size according to window size."""
-    self._height, self._width = self._window.getmaxyx()
-    # Avoid using the last point to prevent scroll.
-    self._height -= 1
-    # Adjust height to an odd number.
-    if not self._height & 1:
-      self._height -= 1
-    self._width -= 1
 
+  # Keys to move the data view in overview focus. An int moves by columns,
+  # a float by a fraction of the overview width.
+  _OVERVIEW_MOVES = {
+      curses.KEY_LEFT: -1, curses.KEY_RIGHT: 1,
+      curses.KEY_PPAGE: -0.1, curses.KEY_NPAGE: 0.1,
+      curses.KEY_HOME: -1.0, curses.KEY_END: 1.0,
+  }
 
-  def init_display(self):
-    """Initializes the display of a wave view.
 
-    Use full waveform scale and display at (0, 0) in sample coordinate.
+  @property
+  def in_overview_focus(self):
+    """True if keys move the data view by columns of the overview."""
+    return self._overview_focus
 
-    """
-    # Set time level to 0 and sample length to the width of this view.
-    # In default view, full data can be displayed in this view.
-    self._time_level = 0
-    self._sample_length = self._width
 
-    # Set value level to 0 and quantize levels to the height of this view.
-    # In default view, full data can be displayed in this view.
-    self._value_level = 0
-    self._quantize_levels = self._height
+  def overview_focus(self):
+    """Starts moving the data view by columns of the overview.
 
-    self._wave = waveform.Waveform(self._raw_data, self._sample_length,
-                                   self._quantize_levels)
-    self._view = waveview.WaveView(self._wave.wave_samples, self._width,
-                                   self._height)
-    self._start_x, self._start_y = 0, 0
-    self._display()
+    The keys are passed to overview_focus_key by the main loop until user
+    leaves, so playback and polling go on.
+    """
+    self._overview_focus = True
+    self.show_status('Overview: Left/Right/PgUp/PgDn/Home/End to move, '
+                     'Enter to leave.')
 
 
-  def move(self, direction):
-    """Move view toward a direction.
+  def overview_focus_key(self, input_char):
+    """Handles a key in overview focus.
 
-    @param direction: A direcition defined in Direction.
+    Left and Right move by one column, PgUp and PgDn by a tenth of the
+    overview, Home and End to the ends. Enter, Esc or m leaves. Other keys
+    are ignored.
 
+    @param input_char: The key code returned by getch.
     """
-    logging.debug('Move direction: %r', direction)
+    if input_char in (ord('\n'), ord('\r'), curses.KEY_ENTER, _ESCAPE,
+                      ord('m')):
+      self._overview_focus = False
+      self.show_status('')
+      return
+    if input_char not in self._OVERVIEW_MOVES:
+      return
+    move = self._OVERVIEW_MOVES[input_char]
+    width = self._data_display.overview_width
+    column = self._data_display.get_overview_column()
+    if isinstance(move, float):
+      column += int(move * width) if abs(move) < 1 else int(move) * width
+    else:
+      column += move
+    self._data_display.centre_on_overview_column(
+        max(0, min(width - 1, column)))
+    self._window.refresh()
 
-    self._start_x, self._start_y = get_next(self._start_x, self._start_y,
-                                            direction)
-    self._display()
 
+  def wave_view_click(self, row, col):
+    """Handles a mouse click. A click in the overview moves the data view.
 
-  def _display(self):
-    """Display wave view at using current start point in sample coordinate."""
-    self._view.draw_view(self._start_x, self._start_y)
-    self._draw_content(self._view.get_view())
+    @param row: The row in window coordinate.
+    @param col: The column in window coordinate.
+    """
+    if self._data_display.click(row, col):
+      self._window.refresh()
 
 
-  def _draw_char(self, row, col, python_char):
-    """Draws a python character at (row, col) in window coordinate.
+  def wave_view_set_trigger(self, text):
+    """Starts trigger mode on the first trace, or stops it.
 
-    @param row: row in window coordinate.
-    @param col: col in window coordinate.
-    @python python_char: a python character, which is a one-length string.
+    The trigger points are indexed once, so stepping is a bisection.
 
+    @param text: LEVEL [r|f] [HYSTERESIS] for trigger.parse_trigger, or
+                 'off'.
     """
-    # Enable this logging if want to debug to detail.
-    #logging.debug('Draw %r and (row, col) = (%r, %r)',
-    #              python_char, row, col)
-    self._window.addch(row, col, ord(python_char))
+    if text.strip().lower() == 'off':
+      self._trigger = None
+      self.show_status('Trigger off.')
+      return
+    try:
+      level, edge, hysteresis = trigger.parse_trigger(text)
+    except trigger.TriggerError as error:
+      self.show_status(str(error))
+      return
+    trace = self._data_display.traces[0]
+    block_summary = None
+    if filters.get_unfiltered(trace) is trace:
+      block_summary = self._block_summary
+    self.show_status('Indexing %s edges...' % edge)
+    self._trigger = trigger.TriggerIndex(
+        trace.samples, level, edge, hysteresis, block_summary)
+    if not self._trigger:
+      self._trigger = None
+      self.show_status('No %s edge at %d.' % (edge, level))
+      return
+    self._snap_to_trigger(forward=True)
+    self._window.refresh()
+
 
+  def _show_trigger(self, index):
+    """Moves the data view to start on a trigger point.
+
+    @param index: The index of the trigger point.
+    """
+    sample_index = self._trigger.edges[index]
+    self._data_display.start_on(sample_index)
+    self.show_status('Trigger %d/%d at %.6f secs, %s at %d' % (
+        index + 1, len(self._trigger), float(sample_index) /
+        self._sampling_rate, self._trigger.edge, self._trigger.level))
 
-  def _draw_content(self, content):
-    """Draws the content starting from (0, 0) of window.
 
-    @param content: A 2D array where each element is a python char.
+  def _snap_to_trigger(self, forward):
+    """Moves the data view to start on the trigger point nearest to its
+    start in a direction.
 
+    @param forward: True to find the trigger point at or after the start.
+                    False to find the one at or before it.
     """
-    for row in xrange(self._height):
-      for col in xrange(self._width):
-        self._draw_char(row, col, content[row][col])
+    start, _ = self._data_display.get_sample_range()
+    if forward:
+      index = self._trigger.get_next(start - 1)
+      if index is None:
+        index = len(self._trigger) - 1
+    else:
+      index = self._trigger.get_previous(start + 1)
+      if index is None:
+        index = 0
+    self._show_trigger(index)
 
+
+  def wave_view_step_trigger(self, forward):
+    """Moves the data view to start on the next or previous trigger point.
+
+    @param forward: True to step to the next trigger point. False to step
+                    to the previous one.
+    """
+    if self._trigger is None:
+      self.show_status('No trigger. Press t to set a trigger.')
+      return
+    start, _ = self._data_display.get_sample_range()
+    if forward:
+      # The view starts on the column containing the current trigger point.
+      index = self._trigger.get_next(
+          start + self._data_display.down_sample_factor - 1)
+    else:
+      index = self._trigger.get_previous(start)
+    if index is None:
+      self.show_status('No more trigger.')
+      return
+    self._show_trigger(index)
     self._window.refresh()
 
 
-  def get_value_range(self):
-    """Get current value range in the view.
+  def wave_view_move_cursor(self, columns=0, samples=0):
+    """Moves the cursor by columns or samples.
 
-    @return (min_value, max_value)
+    @param columns: The number of columns to move.
+    @param samples: The number of samples to move.
 
     """
-    min_level, max_level = self._view.get_level_range(self._start_y)
-    scale = self._wave.quantization_factor
-    value_range = (min_level * scale, max_level * scale)
-    return value_range
+    self._data_display.move_cursor(columns, samples)
+    self._window.refresh()
 
 
-  def get_time_range(self):
-    """Get current value range in the view.
+  def wave_view_set_marker(self, name):
+    """Sets a measure marker at the cursor, and measures between markers
+    if both are set.
 
-    @return (min_time, max_time)
+    @param name: 'A' or 'B'.
 
     """
-    min_time_index, max_time_index = self._view.get_time_index_range(
-            self._start_x)
-    scale = self._wave.down_sample_factor
-    min_sample_index, max_sample_index = (min_time_index * scale,
-                                          max_time_index * scale)
-    time_range = (
-            float(min_sample_index) / self._raw_data.sampling_rate,
-            float(max_sample_index) / self._raw_data.sampling_rate)
+    self._data_display.set_measure_marker(name)
+    first = self._data_display.get_measure_marker('A')
+    second = self._data_display.get_measure_marker('B')
+    self._measurement = None
+    if first is None or second is None:
+      self.show_status('Marker %s at #%d' % (
+          name, self._data_display.get_measure_marker(name)))
+      return
+    self.show_status('Measuring...')
+    try:
+      self._measurement = cursor.measure(self._data_display.traces[0],
+                                         first, second)
+    except cursor.CursorError as e:
+      self.show_status(str(e))
+      return
+    self.show_status(self._measurement.get_stats_text())
 
-    return time_range
 
+  def toggle_pitch(self):
+    """Shows or hides the pitch of the first trace in the view."""
+    if self._pitch:
+      self._pitch = None
+      self._menu_display.show_readout('')
+    else:
+      trace = self._data_display.traces[0]
+      self._pitch = pitch.PitchEstimator(trace.samples, self._sampling_rate)
+    self.update_readout()
 
-  def change_time_level(self, scale_direction):
-    """Change time level by change it UP or DOWN.
 
-    @param scale_direction: ScaleDirection.UP or ScaleDirection.DOWN to
-                            change time level up or down.
+  def update_readout(self):
+    """Shows the samples at the cursor, the difference between markers and
+    the pitch in the view.
 
+    Samples are read from the sample store of each trace, so it takes
+    constant time. Pitch is cached for each range.
     """
-    logging.debug('Scale time level %r', scale_direction)
-
-    if scale_direction == ScaleDirection.UP:
-      new_time_level = self._time_level + 1
-    else:
-      if self._time_level == 0:
-        logging.warning('Lowest time level already.')
-        return
+    sample_index = self._data_display.cursor_index
+    texts = []
+    if sample_index is not None:
+      readouts = [cursor.read_sample(trace, sample_index)
+                  if sample_index < len(trace.samples) else None
+                  for trace in self._data_display.traces]
+      if readouts[0]:
+        text = 'Cursor %s' % readouts[0]
       else:
-        new_time_level = self._time_level - 1
-    current_time_scale = self._get_time_scale(self._time_level)
-    new_time_scale = self._get_time_scale(new_time_level)
+        text = 'Cursor #%d = n/a' % sample_index
+      if len(readouts) > 1:
+        text += ' (%s)' % ', '.join(
+            '%d' % readout.value if readout else 'n/a'
+            for readout in readouts[1:])
+      if self._measurement:
+        text += '  A-B %s' % self._measurement.get_delta_text()
+      texts.append(text)
+    if self._pitch:
+      samples = self._data_display.traces[0].samples
+      if self._pitch.samples is not samples:
+        # The trace is filtered, so the cached pitch is not valid.
+        self._pitch = pitch.PitchEstimator(samples, self._sampling_rate)
+      texts.append('Pitch %s' % self._pitch.estimate(
+          *self._data_display.get_sample_range()))
+    if texts:
+      self._menu_display.show_readout('  '.join(texts))
 
-    new_sample_length = int(new_time_scale * self._width)
-    if new_sample_length > len(self._raw_data.samples):
-      logging.warning('Highest time level already.')
-      return
 
-    # Update time level, sample length, and start x at new time level.
-    self._time_level = new_time_level
-    self._sample_length = new_sample_length
-    self._start_x = int(self._start_x / current_time_scale * new_time_scale)
+  @property
+  def is_scanning(self):
+    """True if the background scan is running."""
+    return self._scanner is not None
 
-    logging.debug('After scale, new time level: %r, new sample length: %r, '
-                  'new start_x: %r',
-                  self._time_level, self._sample_length, self._start_x)
 
-    # Update wave form and wave view and display it.
-    self._wave = waveform.Waveform(self._raw_data, self._sample_length,
-                                   self._quantize_levels)
-    self._view = waveview.WaveView(self._wave.wave_samples, self._width,
-                                   self._height)
-    self._display()
+  def toggle_playback(self):
+    """Starts playing from the view centre, or pauses."""
+    if self._playback.playing:
+      self._playback.stop()
+      self.show_status('Paused after %d frames, %d dropped.' % (
+          self._playback.frames, self._playback.dropped))
+      return
+    first_sample, _ = self._data_display.get_centre_range()
+    if first_sample >= self._data_display.number_of_samples - 1:
+      first_sample = 0
+    self._playback.start(first_sample)
+    self.play_frame()
 
 
-  def _get_time_scale(self, level):
-    """Return a scale value based on scale_level.
+  def change_playback_speed(self, factor):
+    """Multiplies the playback speed.
 
-    @param level: An integer. 0 means the view contains full data range.
-                  1 means the width of waveform is 1.1 times the width at
-                  level 0.
-                  2 means the width of waveform is 1.2 times the width at
-                  level 0.
+    @param factor: The factor, e.g. 2 to play twice faster.
     """
-    return 1 + level * 0.1
+    self._playback.set_speed(self._playback.speed * factor)
+    self.show_status('Playback speed %gx.' % self._playback.speed)
 
 
-  def change_value_level(self, scale_direction):
-    """Change value level by change it UP or DOWN.
+  def get_frame_delay(self):
+    """Gets the time to wait for the next playback frame.
+
+    @returns: The time in seconds. None if it is not playing.
+    """
+    return self._playback.get_delay()
+
 
-    @param scale_direction: ScaleDirection.UP or ScaleDirection.DOWN to
-                            change value level up or down.
+  def play_frame(self):
+    """Moves the view to the playback position if a frame is due.
 
+    The view is centred on the position. Only the changed rows of the wave
+    views are drawn.
     """
-    logging.debug('Scale value level %r', scale_direction)
+    if self._playback.get_delay() != 0:
+      return
+    position = self._playback.get_position()
+    number_of_samples = self._data_display.number_of_samples
+    if position >= number_of_samples:
+      self._playback.stop()
+      self._data_display.centre_on(number_of_samples - 1)
+      self.show_status('Playback done, %d frames, %d dropped.' % (
+          self._playback.frames, self._playback.dropped))
+      self._window.refresh()
+      return
+    self._data_display.centre_on(position)
+    self.update_readout()
+    self._playback.end_frame()
+    self.show_status('Playing %gx at %.3f secs, %d frames, %d dropped.' % (
+        self._playback.speed, float(position) / self._sampling_rate,
+        self._playback.frames, self._playback.dropped))
+    self._window.refresh()
 
-    if scale_direction == ScaleDirection.UP:
-      new_value_level = self._value_level + 1
-    else:
-      if self._value_level == 0:
-        logging.warning('Lowest value level already.')
-        return
-      else:
-        new_value_level = self._value_level - 1
-    current_value_scale = self._get_value_scale(self._value_level)
-    new_value_scale = self._get_value_scale(new_value_level)
-    new_quantize_levels = int(new_value_scale * self._height)
-
-    # Update value level, quantize levels, and start y at new value level.
-    self._value_level = new_value_level
-    self._quantize_levels = new_quantize_levels
-    self._start_y = int(self._start_y / current_value_scale * new_value_scale)
-
-    logging.debug('After scale, new value level: %r, new quantize levels: %r, '
-                  'new start_y: %r',
-                  self._value_level, self._quantize_levels, self._start_y)
-
-    # Update wave form and wave view and display it.
-    self._wave = waveform.Waveform(self._raw_data, self._sample_length,
-                                   self._quantize_levels)
-    self._view = waveview.WaveView(self._wave.wave_samples, self._width,
-                                   self._height)
-    self._display()
-
-
-  def _get_value_scale(self, level):
-    """Return a scale value based on scale_level.
-
-    @param level: An integer. 0 means the view contains full data range.
-                  1 means the number of levels is 1.1 times the number of
-                  levels at level 0.
-                  2 means the number of levels is 1.2 times the number of
-                  levels at level 0.
-    """
-    return 1 + level * 0.1
+
+  def sync_playback(self):
+    """Continues playing from the view centre after the view is moved."""
+    if self._playback.playing:
+      first_sample, _ = self._data_display.get_centre_range()
+      self._playback.seek(first_sample)
+
+
+  def toggle_histogram(self):
+    """Shows or hides the amplitude histogram panel."""
+    self._data_display.toggle_histogram()
+    self._window.refresh()
+
+
+  def wave_view_toggle_layout(self):
+    """Switches the data view between stacked and overlay layouts."""
+    self._data_display.toggle_layout()
+    self._window.refresh()
+
+
+  def wave_view_reset(self):
+    """Change wave view to default time and value scale and position."""
+    self._data_display.init_display()
+    self._window.refresh()
@@ -0,0 +1,236 @@
+#!/usr/bin/python
+"""Unit tests for screen driven by key sequences in a FakeWindow."""
+
+from __future__ import absolute_import
+
+import array
+import curses
+import math
+import sys
+import unittest
+
+import main
+from data import data
+from screen import fake_window
+from screen import menu_display
+from screen import screen
+
+
+_SAMPLING_RATE = 8000
+
+
+def _make_trace(name, length, frequency=440):
+  """Makes a trace of a sine wave.
+
+  @param name: The name of the trace.
+  @param length: The number of samples.
+  @param frequency: The frequency of the sine wave in Hz.
+
+  @returns: A data.OneChannelRawData object.
+  """
+  samples = array.array('h', (
+      int(10000 * math.sin(2 * math.pi * frequency * index / _SAMPLING_RATE))
+      for index in xrange(length)))
+  if sys.byteorder == 'big':
+    samples.byteswap()
+  raw_data = data.RawData(samples.tostring(),
+                          data.DataFormat(1, 16, _SAMPLING_RATE))
+  return data.OneChannelRawData(raw_data, 0, name)
+
+
+class ScreenKeyTest(unittest.TestCase):
+  """Sends keys to a Screen like the main loop does."""
+
+  def _create_screen(self, traces):
+    """Creates a Screen in a FakeWindow and draws the first frame.
+
+    @param traces: A list of data.OneChannelRawData objects.
+
+    """
+    self.window = fake_window.FakeWindow(40, 120)
+    self.screen = screen.Screen(self.window, traces)
+    self.screen.clear()
+    self.screen.init_display()
+
+
+  def _press(self, keys):
+    """Handles keys, including the keys read by prompts.
+
+    @param keys: A list of strings of characters and key codes.
+
+    @returns: The content of the window.
+    """
+    for key in keys:
+      if isinstance(key, str):
+        self.window.push_keys([ord(char) for char in key])
+      else:
+        self.window.push_keys([key])
+    while True:
+      input_char = self.window.getch()
+      if input_char == -1:
+        break
+      self.assertTrue(main.handle_input(self.screen, input_char))
+    self.screen.update_readout()
+    return '\n'.join(self.window.get_lines())
+
+
+  def test_find(self):
+    """Tests finding samples above a value, clipping, silence and zero
+    crossings."""
+    self._create_screen([_make_trace('a', 200000)])
+    self.assertIn('No previous search.', self._press(['n']))
+    self.assertIn('Sample above 9000 at', self._press(['>9000\n']))
+    self.assertIn('Sample above 9000 at', self._press(['n']))
+    self.assertIn('Sample above 20000 not found.', self._press(['>20000\n']))
+    self.assertIn('Clipped run not found.', self._press(['c']))
+    self.assertIn('Silence over 5 ms not found.', self._press(['s5\n']))
+    self.assertIn('Zero crossing at', self._press(['0']))
+    for text in ('inf', 'nan', '-inf', 'x'):
+      self.assertIn('Invalid number: %s' % text,
+                    self._press(['>%s\n' % text]))
+      self.assertIn('Invalid length: %s' % text,
+                    self._press(['s%s\n' % text]))
+    self.assertIn('Length should be positive: 0', self._press(['s0\n']))
+    self.assertIn('Silence over 1e+300 ms not found.',
+                  self._press(['s1e300\n']))
+    self.assertIn('Sample above -1e+300 at', self._press(['>-1e300\n']))
+
+
+  def test_page_past_end(self):
+    """Tests the cursor and markers stay on the data after the end."""
+    self._create_screen([_make_trace('a', 200000)])
+    self._press(['OOla'])
+    content = self._press([curses.KEY_NPAGE] * 8 + ['bl'])
+    self.assertIn('Cursor 24.999875 s #199999 =', content)
+    self.assertIn('A-B', content)
+    content = self._press([curses.KEY_HOME, 'l'])
+    self.assertNotIn('#199999 =', content)
+    self.assertIn('Cursor', content)
+
+
+  def test_short_trace(self):
+    """Tests the readout of a trace without a sample at the cursor."""
+    self._create_screen([_make_trace('long', 200000),
+                         _make_trace('short', 50000)])
+    content = self._press(['OOl'] + [curses.KEY_NPAGE] * 8 + ['l'])
+    self.assertIn('#199999 =', content)
+    self.assertIn('(n/a)', content)
+    self._create_screen([_make_trace('short', 50000),
+                         _make_trace('long', 200000)])
+    content = self._press(['OOla'] + [curses.KEY_NPAGE] * 8 + ['lb'])
+    self.assertIn('Cursor #199999 = n/a', content)
+    self.assertIn('not in short', content)
+
+
+  def test_filter(self):
+    """Tests ~ applies a filter and reports an invalid one."""
+    self._create_screen([_make_trace('a', 20000)])
+    content = self._press(['~gain inf\n'])
+    self.assertIn('Invalid', content)
+    content = self._press(['~dc, lp 1000\n'])
+    self.assertIn('Filtered by dc 5, lp 1000.', content)
+    content = self._press(['~off\n'])
+    self.assertNotIn('Filtered by', content)
+
+
+  def test_trigger(self):
+    """Tests stepping trigger points, also past both ends."""
+    self._create_screen([_make_trace('a', 200000)])
+    self._press(['t0 r 100\nee', 'E'])
+    self.assertIn('Invalid trigger', self._press(['tinf\n']))
+    self._press(['OO', curses.KEY_END, 'e', curses.KEY_HOME, 'E'])
+
+
+  def test_histogram(self):
+    """Tests H shows and hides the histogram."""
+    self._create_screen([_make_trace('a', 20000)])
+    self.assertIn('#####', self._press(['H']))
+    content = self._press(['OO'] + [curses.KEY_NPAGE] * 8 + ['H'])
+    self.assertNotIn('#####', content)
+
+
+  def test_pitch(self):
+    """Tests F shows and hides the pitch, and both keys have help."""
+    self._create_screen([_make_trace('a', 20000)])
+    content = self._press([])
+    self.assertIn(' H to show histogram.', content)
+    self.assertIn(' F to show pitch.', content)
+    self.assertIn('Pitch 440.0', self._press(['F']))
+    content = self._press(['OO'] + [curses.KEY_NPAGE] * 8 + ['F'])
+    self.assertNotIn('Pitch', content)
+
+
+  def test_correlate(self):
+    """Tests x and X align only traces which match."""
+    self._create_screen([_make_trace('a', 20000),
+                         _make_trace('silent', 20000, frequency=0)])
+    self.assertIn('No match', self._press(['x\n']))
+    self.assertIn('No match to align by', self._press(['X']))
+    self._create_screen([_make_trace('a', 20000), _make_trace('b', 20000)])
+    self.assertIn('Lag 0 samples', self._press(['x10\n']))
+    self.assertIn('Aligned by 0 samples.', self._press(['X']))
+    for text in ('inf', 'nan'):
+      self.assertIn('Invalid lag: %s' % text, self._press(['x%s\n' % text]))
+    self.assertIn('Lag 0 samples', self._press(['x1e300\n']))
+
+
+  def test_overview_focus(self):
+    """Tests keys in overview focus, and q quits from it."""
+    self._create_screen([_make_trace('a', 200000)])
+    content = self._press(['OOm'])
+    self.assertIn('Overview:', content)
+    end_content = self._press([curses.KEY_END])
+    self.assertNotIn(end_content, (content, self._press([curses.KEY_HOME])))
+    self.assertNotIn('Overview:', self._press(['m']))
+    self._press(['m'])
+    self.assertTrue(self.screen.in_overview_focus)
+    self.assertFalse(main.handle_input(self.screen, ord('q')))
+
+
+  def test_prompt_without_keys(self):
+    """Tests a prompt is cancelled when there is no more key."""
+    self._create_screen([_make_trace('a', 20000)])
+    self.assertIsNone(self.screen.prompt('Go to: '))
+
+
+  def test_go_to_time(self):
+    """Tests g goes to a time and reports an invalid one."""
+    self._create_screen([_make_trace('a', 200000)])
+    for text in ('inf', 'nan', '-1', '1:2:3:4'):
+      self.assertIn('Invalid time: %s' % text, self._press(['g%s\n' % text]))
+    self.assertIn(' 24.95', self._press(['OOg1e300\n']))
+    self.assertIn(' 9.98', self._press(['g0:10\n']))
+
+
+  def test_zoom(self):
+    """Tests zooming in time keeps the cursor in place."""
+    self._create_screen([_make_trace('a', 200000)])
+    get_cursor = lambda content: [line for line in content.split('\n')
+                                  if '^' in line or 'Cursor' in line]
+    cursor = get_cursor(self._press(['OOl' + 'h' * 20]))
+    self.assertEqual(len(cursor), 2)
+    for keys in ('O', 'o', 'z100\n', 'Z4\n'):
+      self.assertEqual(get_cursor(self._press([keys])), cursor)
+    for text in ('nan', 'inf', '-inf'):
+      for key in 'zZ':
+        self.assertIn('Invalid scale: %s' % text,
+                      self._press(['%s%s\n' % (key, text)]))
+
+
+  def test_help_pages(self):
+    """Tests ? shows all the help in pages in a small terminal."""
+    self.window = fake_window.FakeWindow(24, 80)
+    self.screen = screen.Screen(self.window, [_make_trace('a', 20000)])
+    self.screen.clear()
+    self.screen.init_display()
+    help_lines = menu_display.MenuDisplay._HELP # pylint:disable=W0212
+    shown = set()
+    for keys in ([], ['?'], ['?']):
+      content = self._press(keys)
+      shown.update(line for line in help_lines if line in content)
+    self.assertIn('? for more help (1/2).', content)
+    self.assertEqual(len(shown), len(help_lines))
+
+
+if __name__ == '__main__':
+  unittest.main()
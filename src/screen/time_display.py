@@ -0,0 +1,96 @@
+"""The subwindow of the time axis."""
+
+from __future__ import absolute_import
+
+import logging
+
+from screen import value_display
+
+
+class TimeDisplayError(Exception):
+  """Error in WaveViewDisplay."""
+  pass
+
+
+class TimeDisplay(object):
+  """Time display controls display for time.
+
+  ----------------------------------------------------------
+ | Minimum time in this view.    Maximum time in this view.|
+ |   Marks at their columns in the wave view.               |
+  ----------------------------------------------------------
+
+  """
+  _TIME_LENGTH = 8
+  def __init__(self, window, wave_width):
+    """Creates a TimeDisplay object.
+
+    @param window: A subwindow.
+    @param wave_width: The width of wave view.
+
+    """
+    self._window = window
+    self._height, self._width = self._window.getmaxyx()
+    self._wave_width = wave_width
+    logging.debug('Time display height, width = %r, %r',
+                  self._height, self._width)
+    if self._width < 2 * (self._TIME_LENGTH + 1):
+      raise TimeDisplayError('Width %r is not long enough' % self._width)
+
+
+  def update(self, time_range, markers=None, annotations=None):
+    """Updates the display with new time range.
+
+    @param time_range: (min_time, max_time).
+    @param markers: A list of (column, mark) in wave view coordinate.
+    @param annotations: A list of (first_column, last_column, label) in wave
+                        view coordinate sorted by first column.
+
+    """
+    min_time, max_time = time_range
+    min_time_str = value_display.format_value(min_time, self._TIME_LENGTH)
+    max_time_str = value_display.format_value(max_time, self._TIME_LENGTH)
+
+    self.clear()
+    self._window.addstr(0, 0, min_time_str)
+    # Do not write to the last point
+    self._window.addstr(0, self._wave_width - self._TIME_LENGTH - 2,
+                        max_time_str)
+    for column, mark in markers or []:
+      if 0 <= column < self._wave_width and self._height > 1:
+        self._window.addch(1, column, ord(mark))
+    if self._height > 2:
+      self._draw_annotations(annotations or [])
+    self._window.refresh()
+
+
+  def _draw_annotations(self, annotations):
+    """Draws annotations in the third row.
+
+    An annotation is drawn as | at its start, and - to its end if it is an
+    interval. Its label follows the | until the next annotation.
+
+    @param annotations: A list of (first_column, last_column, label) in wave
+                        view coordinate sorted by first column.
+
+    """
+    for first_column, last_column, _ in annotations:
+      for column in xrange(max(0, first_column + 1),
+                           min(last_column + 1, self._wave_width)):
+        self._window.addch(2, column, ord('-'))
+      if 0 <= first_column < self._wave_width:
+        self._window.addch(2, first_column, ord('|'))
+    next_columns = [first_column for first_column, _, _ in annotations[1:]]
+    for (first_column, _, label), next_column in zip(
+        annotations, next_columns + [self._wave_width]):
+      label_column = max(0, first_column + 1)
+      length = min(next_column, self._wave_width) - label_column - 1
+      if label and length > 0:
+        self._window.addstr(2, label_column, label[:length])
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
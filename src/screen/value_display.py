@@ -0,0 +1,102 @@
+"""The subwindow of the value axis."""
+
+import logging
+
+
+def format_value(value, width):
+  """Format the value into a string of length width.
+
+  @param value: The value.
+  @param width: The width of returned string.
+
+  @returns: A strnig of length width representing the number.
+
+  """
+  full_string = '%s' % value
+  dot_index = full_string.find('.')
+  error = False
+  # 1234.56 can not be shown in 3 digits.
+  if dot_index > width:
+    error = True
+  # 1234 can not be shown show in 3 digits.
+  elif dot_index == -1:
+    if len(full_string) > width:
+      error = True
+  else:
+    pass
+  if error:
+    logging.error('width %r is not long enough for value %r',
+                  width, value)
+  if len(full_string) < width:
+    return ' ' * (width - len(full_string)) + full_string
+  else:
+    return full_string[0:width]
+
+
+class ValueDisplayError(Exception):
+  """Error in WaveViewDisplay."""
+  pass
+
+
+class ValueDisplay(object):
+  """Value display controls display for value.
+
+ ------------------------------
+ | Maximum value in this view.| --> 0
+ |                            |
+ |                            |
+ |                            |
+ |                            |
+ |                            |
+ |                            |
+ | Minimum value in this view.| --> wave_height - 1
+ |                            |
+ -----------------------------
+
+  """
+  _VALUE_LENGTH = 8
+  def __init__(self, window, wave_height):
+    """Creates a ValueDisplay object.
+
+    @param window: A subwindow.
+    @param wave_height: The height of wave view.
+
+    """
+    self._window = window
+    self._height, self._width = self._window.getmaxyx()
+    self._wave_height = wave_height
+    logging.debug('Value display height, width = %r, %r',
+                  self._height, self._width)
+    logging.debug('wave height: %r', wave_height)
+    if self._width < self._VALUE_LENGTH + 1:
+      raise ValueDisplayError('Width %r is not long enough' % self._width)
+
+
+  def update(self, value_range, legend=None):
+    """Updates the display with new value range.
+
+    @param value_range: (min_value, max_value).
+    @param legend: A list of (mark, name) of traces in the wave view.
+                   Legend is shown between maximum and minimum value.
+
+    """
+    min_value, max_value = value_range
+    min_value_str = format_value(min_value, self._VALUE_LENGTH)
+    max_value_str = format_value(max_value, self._VALUE_LENGTH)
+
+    self.clear()
+    self._window.addstr(0, 0, max_value_str)
+    self._window.addstr(self._wave_height - 1, 0, min_value_str)
+    for row, (mark, name) in enumerate(legend or [], 1):
+      if row >= self._wave_height - 1:
+        break
+      label = ('%s %s' % (mark, name))[:self._VALUE_LENGTH]
+      self._window.addstr(row, 0, label)
+    self._window.refresh()
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
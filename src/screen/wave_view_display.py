@@ -0,0 +1,597 @@
+"""The subwindow of the wave view."""
+
+import curses
+import logging
+
+from profiler import profiler
+from tracing import tracing
+from waveform import waveform
+from waveview import waveview
+
+
+class ScaleDirection(object):
+  """Scale direction."""
+  UP = 'UP'
+  DOWN = 'DOWN'
+
+
+class Direction(object):
+  """Directions."""
+  LEFT = 'LEFT'
+  RIGHT = 'RIGHT'
+  UP = 'UP'
+  DOWN = 'DOWN'
+
+
+
+def get_next(current_x, current_y, direction, step=1):
+  """Gets the next location given the current point and direction.
+
+  @param current_x: The x coordinate in sample coordinate.
+  @param current_y: The y coordinate in sample coordinate.
+  @param direction: A direcition defined in Direction.
+  @param step: The number of points to move.
+
+  @returns: The new (x, y) in sample coordinate.
+
+  """
+  if direction == Direction.LEFT:
+    current_x -= step
+  elif direction == Direction.RIGHT:
+    current_x += step
+  elif direction == Direction.UP:
+    current_y += step
+  elif direction == Direction.DOWN:
+    current_y -= step
+  else:
+    raise WaveViewDisplayError('Not a valid direction: %r' % direction)
+
+  return current_x, current_y
+
+
+class WaveViewDisplayError(Exception):
+  """Error in WaveViewDisplay."""
+  pass
+
+
+class WaveViewDisplay(object):
+  """This class controls a subwindow for waveview display.
+
+   ----------------------------------------
+  |                                        |
+  |                 Wave view              |
+  |                                        |
+  |                                        |
+  |                                        |
+  |                                        |
+  |                                        |
+  |                                        |
+  |                                        |
+  |                                        |
+  |----------------------------------------|
+
+  Several traces can be drawn in the same wave view. Each trace is drawn
+  with a mark in _TRACE_MARKS. The time axis is shared by all traces, and
+  the sampling rate and data range of the first trace are used.
+
+  """
+  _ZOOM_STEP = 2.0
+  _TRACE_MARKS = ['*', '+', 'o', '#', 'x', '@']
+
+  def __init__(self, window, traces, number_of_samples=None):
+    """Creates a WaveViewDisplay object.
+
+    @param window: A subwindow.
+    @param traces: A list of data.OneChannelRawData objects.
+    @param number_of_samples: The number of samples of the time axis.
+                              Default is the length of the longest trace.
+                              Wave views showing different traces use the
+                              same number to share the time axis.
+
+    """
+    self._window = window
+    self._traces = traces
+    self._raw_data = traces[0]
+    self._number_of_samples = (number_of_samples or
+                               max(len(trace.samples) for trace in traces))
+    # One Waveform for each trace. self._wave is the one of first trace.
+    self._waves = []
+    self._wave = None
+    self._view = None
+    self._start_x, self._start_y = None, None
+    self._width, self._height = None, None
+    self._setup_valid_size()
+    # Time scale controls sample length.
+    # Scale 1 means the sample length is the width of this view, that is,
+    # full data can be displayed in this view.
+    # Scale N means to enlarge the wave view horizontally by N times.
+    # Zooming in time multiplies or divides the time scale by _ZOOM_STEP.
+    self._time_scale = None
+    self._sample_length = None
+
+    # Value scale controls number of quantize levels.
+    # Scale 1 means the number of quantize levels is the height of this view.
+    # Scale N means to enlarge the wave view vertically by N times.
+    # Zooming in value multiplies or divides the value scale by _ZOOM_STEP.
+    self._value_scale = None
+    self._quantize_levels = None
+    # The column shown in reverse video.
+    self._cursor_column = None
+    # The rows of the last drawn content. None if the window is cleared.
+    self._drawn_rows = None
+
+  @property
+  def draw_size(self):
+    """Return the (height, width) that is used to draw the wave view.
+
+    @returns: (height, width)
+
+    """
+    return (self._height, self._width)
+
+
+  def clear(self):
+    """Clears the window."""
+    for row in xrange(self._height):
+      self._window.move(row, 0)
+      self._window.clrtoeol()
+
+
+  def _setup_valid_size(self):
+    """Sets up valid view size according to window size."""
+    self._height, self._width = self._window.getmaxyx()
+    # Avoid using the last point to prevent scroll.
+    self._height -= 1
+    # Adjust height to an odd number.
+    if not self._height & 1:
+      self._height -= 1
+    self._width -= 1
+
+
+  def get_legend(self):
+    """Gets the mark and name of each trace in this view.
+
+    @returns: A list of (mark, name).
+
+    """
+    return [(self._get_mark(index), trace.name)
+            for index, trace in enumerate(self._traces)]
+
+
+  def _get_mark(self, index):
+    """Gets the mark of a trace.
+
+    @param index: The index of the trace.
+
+    @returns: A one-length string.
+
+    """
+    return self._TRACE_MARKS[index % len(self._TRACE_MARKS)]
+
+
+  def get_view_state(self):
+    """Gets the state to show the same time and value range in another view.
+
+    @returns: A tuple (first_sample_index, centre_value, time_scale,
+              value_scale).
+
+    """
+    return (self._start_x * self._wave.down_sample_factor,
+            self._start_y * self._wave.quantization_factor,
+            self._time_scale, self._value_scale)
+
+
+  def set_view_state(self, view_state):
+    """Shows the time and value range of a state from get_view_state.
+
+    The wave view keeps the time at its left edge, the value at its centre
+    and the time and value scales. Time scale is limited to the width of
+    this view.
+
+    @param view_state: A tuple returned by get_view_state.
+
+    """
+    first_sample_index, centre_value, time_scale, value_scale = view_state
+    self._time_scale = min(time_scale,
+                           float(self._number_of_samples) / self._width)
+    self._sample_length = min(int(round(self._time_scale * self._width)),
+                              self._number_of_samples)
+    self._value_scale = value_scale
+    self._quantize_levels = int(round(self._value_scale * self._height))
+    self._update_wave()
+    self._start_x = first_sample_index / self._wave.down_sample_factor
+    self._start_y = int(round(centre_value / self._wave.quantization_factor))
+
+    logging.debug('Set view state, size: %r, start: %r',
+                  self.draw_size, (self._start_x, self._start_y))
+    self._display()
+
+
+  def resize(self, window):
+    """Uses a resized window.
+
+    The same time range is shown in the new size. Check set_view_state.
+    Raw data is reused without decoding again.
+
+    @param window: A subwindow.
+
+    """
+    view_state = self.get_view_state()
+    self._window = window
+    self._drawn_rows = None
+    self._setup_valid_size()
+    self.set_view_state(view_state)
+
+
+  def init_display(self):
+    """Initializes the display of a wave view.
+
+    Use full waveform scale and display at (0, 0) in sample coordinate.
+
+    """
+    self._drawn_rows = None
+    # Set time scale to 1 and sample length to the width of this view.
+    # In default view, full data can be displayed in this view.
+    self._time_scale = 1.0
+    self._sample_length = self._width
+
+    # Set value scale to 1 and quantize levels to the height of this view.
+    # In default view, full data can be displayed in this view.
+    self._value_scale = 1.0
+    self._quantize_levels = self._height
+
+    self._update_wave()
+    self._start_x, self._start_y = 0, 0
+    self._display()
+
+
+  def _update_wave(self):
+    """Updates wave form and wave view using current scales.
+
+    Waveform computes subsamples lazily, so this takes constant time.
+    All waveforms use the down-sample factor of the time axis so a column
+    is the same time in all traces.
+
+    """
+    down_sample_factor = waveform.get_down_sample_factor(
+        self._number_of_samples, self._sample_length)
+    self._waves = [
+        waveform.Waveform(trace, self._sample_length, self._quantize_levels,
+                          down_sample_factor)
+        for trace in self._traces]
+    self._wave = self._waves[0]
+    self._view = waveview.WaveView(self._wave.wave_samples, self._width,
+                                   self._height)
+    for index, wave in enumerate(self._waves[1:], 1):
+      self._view.add_samples(wave.wave_samples, self._get_mark(index))
+
+
+  def move(self, direction, step=1):
+    """Move view toward a direction.
+
+    @param direction: A direcition defined in Direction.
+    @param step: The number of points to move.
+
+    """
+    logging.debug('Move direction: %r, step: %r', direction, step)
+
+    self._start_x, self._start_y = get_next(self._start_x, self._start_y,
+                                            direction, step)
+    self._display()
+
+
+  def page(self, direction):
+    """Move view by one page toward a direction.
+
+    A page is the width of this view in time, or the height of this view
+    in value.
+
+    @param direction: A direcition defined in Direction.
+
+    """
+    if direction in (Direction.LEFT, Direction.RIGHT):
+      self.move(direction, self._width)
+    else:
+      self.move(direction, self._height)
+
+
+  def seek_time(self, seconds):
+    """Move view so it starts at a time.
+
+    @param seconds: The time in seconds.
+
+    """
+    sample_index = int(seconds * self._raw_data.sampling_rate)
+    sample_index = min(sample_index, self._number_of_samples - 1)
+    self._start_x = sample_index / self._wave.down_sample_factor
+    logging.debug('Seek to %r secs, new start_x: %r', seconds, self._start_x)
+    self._display()
+
+
+  def start_on(self, sample_index):
+    """Move view so it starts at the column of a sample.
+
+    @param sample_index: The sample index.
+
+    """
+    self._start_x = sample_index / self._wave.down_sample_factor
+    self._display()
+
+
+  def jump_to_start(self):
+    """Move view to the start of data."""
+    self._start_x = 0
+    self._display()
+
+
+  def get_sample_range(self):
+    """Gets the samples in the view.
+
+    @returns: (first_sample_index, stop_sample_index) where stop is the
+              sample index after the view.
+
+    """
+    factor = self._wave.down_sample_factor
+    return (max(0, self._start_x * factor),
+            min(self._number_of_samples,
+                (self._start_x + self._width) * factor))
+
+
+  def get_column(self, sample_index):
+    """Gets the column of a sample in view coordinate.
+
+    @param sample_index: The sample index.
+
+    @returns: The column. It is out of [0, width) if the sample is not in
+              the view.
+
+    """
+    return sample_index / self._wave.down_sample_factor - self._start_x
+
+
+  @property
+  def down_sample_factor(self):
+    """The number of samples in a column."""
+    return self._wave.down_sample_factor
+
+
+  def show_cursor(self, column):
+    """Shows a column in reverse video.
+
+    Only the attributes are changed, so the wave is not drawn again.
+
+    @param column: The column in view coordinate. None to hide it.
+
+    """
+    for attribute, shown_column in ((curses.A_NORMAL, self._cursor_column),
+                                    (curses.A_REVERSE, column)):
+      if shown_column is not None and 0 <= shown_column < self._width:
+        for row in xrange(self._height):
+          self._window.chgat(row, shown_column, 1, attribute)
+    self._cursor_column = column
+    self._window.refresh()
+
+
+  def get_column_range(self, column):
+    """Gets the samples in a column of the view.
+
+    @param column: The column in view coordinate.
+
+    @returns: (first_sample_index, stop_sample_index) of the column.
+
+    """
+    factor = self._wave.down_sample_factor
+    first = (self._start_x + column) * factor
+    return first, first + factor
+
+
+  def get_centre_range(self):
+    """Gets the samples in the centre column of the view.
+
+    @returns: (first_sample_index, last_sample_index) of the column.
+
+    """
+    factor = self._wave.down_sample_factor
+    centre_x = self._start_x + (self._width >> 1)
+    return (centre_x * factor, centre_x * factor + factor - 1)
+
+
+  def centre_on(self, sample_index):
+    """Move view so a sample is in the centre column.
+
+    @param sample_index: The sample index.
+
+    """
+    self._start_x = (sample_index / self._wave.down_sample_factor -
+                     (self._width >> 1))
+    self._display()
+
+
+  def jump_to_end(self):
+    """Move view so the last subsample is at the right edge of the view."""
+    number_of_subsamples = max(len(wave.wave_samples) for wave in self._waves)
+    self._start_x = max(0, number_of_subsamples - self._width)
+    self._display()
+
+
+  def _display(self):
+    """Display wave view at using current start point in sample coordinate."""
+    counts = [(wave.wave_samples.hits, wave.wave_samples.misses)
+              for wave in self._waves]
+    self._view.draw_view(self._start_x, self._start_y)
+    for wave, (hits, misses) in zip(self._waves, counts):
+      profiler.count('subsample', wave.wave_samples.hits - hits,
+                     wave.wave_samples.misses - misses)
+    self._draw_content(self._view.get_view())
+
+
+  def _draw_content(self, content):
+    """Draws the content starting from (0, 0) of window.
+
+    Only the rows which are changed since the last draw are drawn, each by
+    one addstr, so scrolling continuously on a wide window draws a few rows
+    instead of every cell.
+
+    @param content: A 2D array where each element is a python char.
+
+    """
+    with tracing.span('draw'):
+      rows = [''.join(content[row]) for row in xrange(self._height)]
+      drawn_rows = self._drawn_rows or [None] * self._height
+      changed = 0
+      for row, (text, drawn_text) in enumerate(zip(rows, drawn_rows)):
+        if text != drawn_text:
+          self._window.addstr(row, 0, text)
+          changed += 1
+      self._drawn_rows = rows
+      profiler.count('row', self._height - changed, changed)
+
+      self._window.refresh()
+
+
+  def get_value_range(self):
+    """Get current value range in the view.
+
+    @return (min_value, max_value)
+
+    """
+    min_level, max_level = self._view.get_level_range(self._start_y)
+    scale = self._wave.quantization_factor
+    value_range = (min_level * scale, max_level * scale)
+    return value_range
+
+
+  def get_time_range(self):
+    """Get current value range in the view.
+
+    @return (min_time, max_time)
+
+    """
+    min_time_index, max_time_index = self._view.get_time_index_range(
+            self._start_x)
+    scale = self._wave.down_sample_factor
+    min_sample_index, max_sample_index = (min_time_index * scale,
+                                          max_time_index * scale)
+    time_range = (
+            float(min_sample_index) / self._raw_data.sampling_rate,
+            float(max_sample_index) / self._raw_data.sampling_rate)
+
+    return time_range
+
+
+  def change_time_level(self, scale_direction, anchor_x=None,
+                        anchor_sample_index=None):
+    """Change time scale by zooming it UP or DOWN by one step.
+
+    @param scale_direction: ScaleDirection.UP or ScaleDirection.DOWN to
+                            zoom in or zoom out in time.
+    @param anchor_x: The x coordinate in view coordinate which stays at the
+                     same time after zooming. Default is the view centre.
+    @param anchor_sample_index: The sample which stays at anchor_x. Default
+                                is the first sample of the column.
+
+    """
+    logging.debug('Scale time level %r', scale_direction)
+
+    if scale_direction == ScaleDirection.UP:
+      new_time_scale = self._time_scale * self._ZOOM_STEP
+    else:
+      new_time_scale = self._time_scale / self._ZOOM_STEP
+    self.set_time_scale(new_time_scale, anchor_x, anchor_sample_index)
+
+
+  def set_time_scale(self, time_scale, anchor_x=None,
+                     anchor_sample_index=None):
+    """Zoom in time to time_scale times the default view.
+
+    @param time_scale: A number. 1 means the view contains full data range.
+                       N means the width of waveform is N times the width
+                       at scale 1. It is limited to the range where a column
+                       contains at least one sample.
+    @param anchor_x: The x coordinate in view coordinate which stays at the
+                     same time after zooming. Default is the view centre.
+    @param anchor_sample_index: The sample which stays at anchor_x. Default
+                                is the first sample of the column.
+
+    """
+    max_time_scale = float(self._number_of_samples) / self._width
+    if time_scale < 1:
+      logging.warning('Lowest time level already.')
+      time_scale = 1.0
+    if time_scale > max_time_scale:
+      logging.warning('Highest time level already.')
+      time_scale = max_time_scale
+    if time_scale == self._time_scale:
+      return
+    if anchor_x is None:
+      anchor_x = self._width >> 1
+    if anchor_sample_index is None:
+      anchor_sample_index = ((self._start_x + anchor_x) *
+                             self._wave.down_sample_factor)
+
+    # Update time scale, sample length, and start x at new time scale.
+    self._time_scale = time_scale
+    self._sample_length = min(int(round(time_scale * self._width)),
+                              self._number_of_samples)
+    self._update_wave()
+    self._start_x = (anchor_sample_index / self._wave.down_sample_factor -
+                     anchor_x)
+
+    logging.debug('After scale, new time scale: %r, new sample length: %r, '
+                  'new start_x: %r',
+                  self._time_scale, self._sample_length, self._start_x)
+
+    self._display()
+
+
+  def change_value_level(self, scale_direction):
+    """Change value scale by zooming it UP or DOWN by one step.
+
+    @param scale_direction: ScaleDirection.UP or ScaleDirection.DOWN to
+                            zoom in or zoom out in value.
+
+    """
+    logging.debug('Scale value level %r', scale_direction)
+
+    if scale_direction == ScaleDirection.UP:
+      new_value_scale = self._value_scale * self._ZOOM_STEP
+    else:
+      new_value_scale = self._value_scale / self._ZOOM_STEP
+    self.set_value_scale(new_value_scale)
+
+
+  def set_value_scale(self, value_scale):
+    """Zoom in value to value_scale times the default view.
+
+    The value at the centre of the view stays at the centre after zooming.
+
+    @param value_scale: A number. 1 means the view contains full value range.
+                        N means the number of levels is N times the number
+                        of levels at scale 1. It is limited to the range
+                        where a level is at least one value.
+
+    """
+    min_value, max_value = self._raw_data.data_range
+    max_value_scale = float(max_value - min_value + 1) / self._height
+    if value_scale < 1:
+      logging.warning('Lowest value level already.')
+      value_scale = 1.0
+    if value_scale > max_value_scale:
+      logging.warning('Highest value level already.')
+      value_scale = max_value_scale
+    if value_scale == self._value_scale:
+      return
+
+    anchor_value = self._start_y * self._wave.quantization_factor
+
+    # Update value scale, quantize levels, and start y at new value scale.
+    self._value_scale = value_scale
+    self._quantize_levels = int(round(value_scale * self._height))
+    self._update_wave()
+    self._start_y = int(round(anchor_value / self._wave.quantization_factor))
+
+    logging.debug('After scale, new value scale: %r, new quantize levels: %r, '
+                  'new start_y: %r',
+                  self._value_scale, self._quantize_levels, self._start_y)
+
+    self._display()
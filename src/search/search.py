@@ -0,0 +1,156 @@
+"""Search events in samples with a block summary index."""
+
+import functools
+import itertools
+import math
+import operator
+
+from tracing import tracing
+
+
+# A sample is silent if its absolute value is not larger than this level.
+_SILENCE_THRESHOLD_DB = -60.0
+
+
+class EventSearch(object):
+  """Finds the next event after a sample.
+
+  An event is a pattern in a mask of samples, e.g. a run of clipped
+  samples. BlockSummary finds the next block which may contain the event,
+  and the samples from that block are converted to a mask by itertools.imap
+  and searched by bytearray.find, so no Python-level loop runs per sample and
+  blocks which can not contain the event are not decoded.
+  """
+
+  def __init__(self, samples, data_range, summary):
+    """Creates an EventSearch.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param data_range: (min, max) of sample value range.
+    @param summary: A summary.BlockSummary of samples.
+
+    """
+    self._samples = samples
+    self._data_range = data_range
+    self._summary = summary
+    self.silence_threshold = int(
+        data_range[1] * math.pow(10, _SILENCE_THRESHOLD_DB / 20))
+
+
+  def _find_pattern(self, position, predicate, get_mask, pattern):
+    """Finds the first occurrence of a pattern in the mask of samples.
+
+    @param position: The sample index to start with.
+    @param predicate: A function of (minimum, maximum) of a node in the
+                      summary. It returns False if no sample in the node can
+                      be a part of the pattern.
+    @param get_mask: A function which converts a list of samples to an
+                     iterable of 0 and 1.
+    @param pattern: A string of '\\x00' and '\\x01' to find. It can span
+                    chunks, but not a block where predicate is False.
+
+    @returns: The sample index of the start of the pattern. None if not
+              found.
+    """
+    block_length = self._summary.block_length
+    number_of_samples = len(self._samples)
+    carry = bytearray()
+    with tracing.span('search'):
+      while position < number_of_samples:
+        block = self._summary.find_block(position / block_length, predicate)
+        if block is None:
+          return None
+        block_start, stop = self._summary.get_block_range(block)
+        if block_start > position:
+          # Skipped blocks break the pattern.
+          carry = bytearray()
+          position = block_start
+        mask = carry + bytearray(get_mask(self._samples[position:stop]))
+        index = mask.find(pattern)
+        if index >= 0:
+          return position - len(carry) + index
+        carry = mask[max(0, len(mask) - len(pattern) + 1):]
+        position = stop
+    return None
+
+
+  def find_above(self, position, value):
+    """Finds the next sample larger than a value.
+
+    @param position: The sample index to start with.
+    @param value: The value.
+
+    @returns: The sample index. None if not found.
+    """
+    value = int(math.floor(value))
+    return self._find_pattern(
+        position, lambda minimum, maximum: maximum > value,
+        functools.partial(itertools.imap,
+                          functools.partial(operator.lt, value)),
+        '\x01')
+
+
+  def find_clipped(self, position, min_run=3):
+    """Finds the next run of clipped samples.
+
+    A sample is clipped if it is at the minimum or maximum of data range.
+
+    @param position: The sample index to start with.
+    @param min_run: The minimum number of consecutive clipped samples.
+
+    @returns: The sample index of the start of the run. None if not found.
+    """
+    low, high = self._data_range
+    return self._find_pattern(
+        position,
+        lambda minimum, maximum: minimum <= low or maximum >= high,
+        lambda samples: itertools.imap(
+            operator.or_,
+            itertools.imap(functools.partial(operator.ge, low), samples),
+            itertools.imap(functools.partial(operator.le, high), samples)),
+        '\x01' * min_run)
+
+
+  def find_silence(self, position, min_length):
+    """Finds the next run of silent samples.
+
+    A sample is silent if its absolute value is not larger than
+    silence_threshold.
+
+    @param position: The sample index to start with.
+    @param min_length: The minimum number of consecutive silent samples.
+
+    @returns: The sample index of the start of the run. None if not found.
+    """
+    threshold = self.silence_threshold
+    # The mask is 1 for loud samples. A block which has no silent sample
+    # breaks the run, so it can be skipped.
+    return self._find_pattern(
+        position,
+        lambda minimum, maximum: minimum <= threshold and maximum >= -threshold,
+        lambda samples: itertools.imap(
+            functools.partial(operator.lt, threshold),
+            itertools.imap(abs, samples)),
+        '\x00' * max(1, min_length))
+
+
+  def find_zero_crossing(self, position):
+    """Finds the next sample whose sign is different from a sample.
+
+    Zero is positive.
+
+    @param position: The sample index of the sample.
+
+    @returns: The sample index after the crossing. None if not found.
+    """
+    if position >= len(self._samples):
+      return None
+    if self._samples[position] >= 0:
+      return self._find_pattern(
+          position, lambda minimum, maximum: minimum < 0,
+          functools.partial(itertools.imap, functools.partial(operator.le, 0)),
+          '\x00')
+    return self._find_pattern(
+        position, lambda minimum, maximum: maximum >= 0,
+        functools.partial(itertools.imap, functools.partial(operator.gt, 0)),
+        '\x00')
@@ -0,0 +1,116 @@
+#!/usr/bin/python
+"""Unit tests for search."""
+
+from __future__ import absolute_import
+
+import array
+import random
+import unittest
+
+from search import search
+from summary import summary
+
+
+_DATA_RANGE = (-32768, 32767)
+
+
+def _make_samples(seed, length=20000):
+  """Makes samples with noise, silences and clipped runs.
+
+  @param seed: The seed of random numbers.
+  @param length: The number of samples.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(seed)
+  low, high = _DATA_RANGE
+  samples = array.array('h')
+  while len(samples) < length:
+    kind = generator.choice(('noise', 'noise', 'silence', 'clip', 'dc'))
+    run = generator.randint(1, 700)
+    if kind == 'noise':
+      samples.extend(generator.randint(-20000, 20000) for _ in xrange(run))
+    elif kind == 'silence':
+      samples.extend(generator.randint(-30, 30) for _ in xrange(run))
+    elif kind == 'clip':
+      samples.extend(generator.choice((low, high))
+                     for _ in xrange(generator.randint(1, 6)))
+    else:
+      samples.extend([generator.randint(100, 5000)] * run)
+  return samples[:length]
+
+
+class EventSearchTest(unittest.TestCase):
+  """Compares EventSearch with a scan of every sample."""
+
+  def setUp(self):
+    self.samples = _make_samples(1)
+    self.positions = range(0, len(self.samples), 251) + [
+        len(self.samples) - 1, len(self.samples)]
+    self.search = search.EventSearch(
+        self.samples, _DATA_RANGE,
+        summary.BlockSummary(self.samples, block_length=64, fanout=4))
+
+
+  def _scan(self, position, length, is_event):
+    """Finds the first run of events by checking every sample.
+
+    @param position: The sample index to start with.
+    @param length: The minimum length of the run.
+    @param is_event: A function of a sample.
+
+    @returns: The sample index of the start of the run. None if not found.
+    """
+    run = 0
+    for index in xrange(position, len(self.samples)):
+      run = run + 1 if is_event(self.samples[index]) else 0
+      if run == length:
+        return index - length + 1
+    return None
+
+
+  def test_find_above(self):
+    """Tests find_above."""
+    for value in (-1000, 0, 19990.5, 32766, 32767):
+      for position in self.positions:
+        self.assertEqual(
+            self.search.find_above(position, value),
+            self._scan(position, 1, lambda sample: sample > int(value)))
+
+
+  def test_find_clipped(self):
+    """Tests find_clipped."""
+    low, high = _DATA_RANGE
+    for min_run in (1, 3, 5):
+      for position in self.positions:
+        self.assertEqual(
+            self.search.find_clipped(position, min_run),
+            self._scan(position, min_run,
+                       lambda sample: sample <= low or sample >= high))
+
+
+  def test_find_silence(self):
+    """Tests find_silence."""
+    threshold = self.search.silence_threshold
+    for min_length in (1, 50, 400):
+      for position in self.positions:
+        self.assertEqual(
+            self.search.find_silence(position, min_length),
+            self._scan(position, min_length,
+                       lambda sample: abs(sample) <= threshold))
+
+
+  def test_find_zero_crossing(self):
+    """Tests find_zero_crossing."""
+    for position in self.positions:
+      expected = None
+      if position < len(self.samples):
+        positive = self.samples[position] >= 0
+        expected = self._scan(
+            position, 1, lambda sample, positive=positive:
+            (sample >= 0) != positive)
+      self.assertEqual(self.search.find_zero_crossing(position), expected)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,232 @@
+"""Generate deterministic test signals."""
+
+import array
+import fractions
+import math
+import random
+import sys
+
+
+class SignalError(Exception):
+  """Error in signals."""
+  pass
+
+
+# Type codes used in array.array.
+_ARRAY_TYPECODE = {16: 'h', 32: 'i'}
+
+# Number of samples in the block which is repeated to make noise.
+_NOISE_BLOCK_LENGTH = 1 << 16
+
+
+def _get_full_scale(length_bits):
+  """Returns the maximum sample value of a sample size.
+
+  @param length_bits: Sample size in bits.
+
+  """
+  return (1 << (length_bits - 1)) - 1
+
+
+def _new_array(length_bits, values=()):
+  """Creates an array.array for a sample size.
+
+  @param length_bits: Sample size in bits.
+  @param values: The initial values.
+
+  @returns: An array.array.
+
+  @raises: SignalError if the sample size is not supported.
+  """
+  if length_bits not in _ARRAY_TYPECODE:
+    raise SignalError('Not supported sample size %r' % length_bits)
+  return array.array(_ARRAY_TYPECODE[length_bits], values)
+
+
+def _repeat(period, length):
+  """Repeats a period until it has length samples.
+
+  Repeating is done by array multiplication, so long signals are generated
+  as fast as copying memory.
+
+  @param period: An array.array containing one period.
+  @param length: The number of samples of the result.
+
+  @returns: An array.array of length samples.
+  """
+  samples = period * (length / len(period) + 1)
+  del samples[length:]
+  return samples
+
+
+def _get_period_length(frequency, rate, length):
+  """Gets the number of samples after which a periodic signal repeats.
+
+  @param frequency: The frequency in Hz.
+  @param rate: The sampling rate.
+  @param length: The number of samples of the signal.
+
+  @returns: The number of samples of the smallest whole period, which is
+            no more than length.
+  """
+  period = fractions.Fraction(rate) / fractions.Fraction(str(frequency))
+  return min(period.numerator, length)
+
+
+def _generate_periodic(function, frequency, seconds, rate, length_bits):
+  """Generates a periodic signal.
+
+  @param function: A function mapping the phase in [0, 1) to a value in
+                   sample unit.
+  @param frequency: The frequency in Hz.
+  @param seconds: The duration in seconds.
+  @param rate: The sampling rate.
+  @param length_bits: Sample size in bits.
+
+  @returns: An array.array containing the samples.
+  """
+  length = int(seconds * rate)
+  if length <= 0:
+    return _new_array(length_bits)
+  period_length = _get_period_length(frequency, rate, length)
+  step = float(frequency) / rate
+  period = _new_array(
+      length_bits,
+      (function((index * step) % 1.0) for index in xrange(period_length)))
+  return _repeat(period, length)
+
+
+def _clip(value, length_bits):
+  """Clips a value into the range of a sample size.
+
+  @param value: A number.
+  @param length_bits: Sample size in bits.
+
+  @returns: An integer in the range of sample size.
+  """
+  full_scale = _get_full_scale(length_bits)
+  return int(max(-full_scale - 1, min(full_scale, round(value))))
+
+
+def sine(frequency, seconds, rate=48000, amplitude=1.0, length_bits=16):
+  """Generates a sine wave.
+
+  @param frequency: The frequency in Hz.
+  @param seconds: The duration in seconds.
+  @param rate: The sampling rate.
+  @param amplitude: The amplitude relative to full scale. Values larger
+                    than 1 are clipped.
+  @param length_bits: Sample size in bits.
+
+  @returns: An array.array containing the samples.
+  """
+  scale = amplitude * _get_full_scale(length_bits)
+  return _generate_periodic(
+      lambda phase: _clip(scale * math.sin(2 * math.pi * phase),
+                          length_bits),
+      frequency, seconds, rate, length_bits)
+
+
+def square(frequency, seconds, rate=48000, amplitude=1.0, length_bits=16):
+  """Generates a square wave.
+
+  @param frequency: The frequency in Hz.
+  @param seconds: The duration in seconds.
+  @param rate: The sampling rate.
+  @param amplitude: The amplitude relative to full scale.
+  @param length_bits: Sample size in bits.
+
+  @returns: An array.array containing the samples.
+  """
+  high = _clip(amplitude * _get_full_scale(length_bits), length_bits)
+  return _generate_periodic(
+      lambda phase: high if phase < 0.5 else -high,
+      frequency, seconds, rate, length_bits)
+
+
+def clipped_sine(frequency, seconds, rate=48000, gain=2.0, length_bits=16):
+  """Generates a sine wave amplified beyond full scale and clipped.
+
+  @param frequency: The frequency in Hz.
+  @param seconds: The duration in seconds.
+  @param rate: The sampling rate.
+  @param gain: The amplitude relative to full scale before clipping.
+  @param length_bits: Sample size in bits.
+
+  @returns: An array.array containing the samples.
+  """
+  return sine(frequency, seconds, rate, gain, length_bits)
+
+
+def noise(seconds, rate=48000, amplitude=1.0, length_bits=16, seed=0):
+  """Generates uniform white noise.
+
+  A block of pseudo random samples generated from seed is repeated, so the
+  result is the same for the same arguments.
+
+  @param seconds: The duration in seconds.
+  @param rate: The sampling rate.
+  @param amplitude: The amplitude relative to full scale.
+  @param length_bits: Sample size in bits.
+  @param seed: The random seed.
+
+  @returns: An array.array containing the samples.
+  """
+  length = int(seconds * rate)
+  if length <= 0:
+    return _new_array(length_bits)
+  generator = random.Random(seed)
+  scale = amplitude * _get_full_scale(length_bits)
+  block = _new_array(
+      length_bits,
+      (_clip(generator.uniform(-scale, scale), length_bits)
+       for _ in xrange(min(length, _NOISE_BLOCK_LENGTH))))
+  return _repeat(block, length)
+
+
+def interleave(channels):
+  """Interleaves samples of channels.
+
+  @param channels: A list of array.array of the same length and type.
+
+  @returns: An array.array containing interleaved samples.
+  """
+  if len(channels) == 1:
+    return channels[0]
+  samples = channels[0] * len(channels)
+  for index, channel in enumerate(channels):
+    samples[index::len(channels)] = channel
+  return samples
+
+
+def to_binary(samples):
+  """Converts samples to little-endian raw data.
+
+  @param samples: An array.array.
+
+  @returns: A string containing the raw data.
+  """
+  if sys.byteorder == 'big':
+    samples = array.array(samples.typecode, samples)
+    samples.byteswap()
+  return samples.tostring()
+
+
+def write_raw(path, samples):
+  """Writes samples to a little-endian raw data file.
+
+  @param path: The path to the output file.
+  @param samples: An array.array.
+  """
+  with open(path, 'wb') as handle:
+    handle.write(to_binary(samples))
+
+
+# Signals used in tests and benchmarks. Each one maps a duration in
+# seconds and a sampling rate to samples.
+SIGNALS = {
+    'sine': lambda seconds, rate: sine(1000, seconds, rate, 0.5),
+    'square': lambda seconds, rate: square(100, seconds, rate, 0.5),
+    'noise': lambda seconds, rate: noise(seconds, rate, 0.5),
+    'clipping': lambda seconds, rate: clipped_sine(50, seconds, rate, 2.0),
+}
@@ -0,0 +1,152 @@
+"""Render wave view snapshots as text without curses."""
+
+import logging
+import multiprocessing
+
+from data import data
+from waveform import waveform
+from waveview import waveview
+
+
+class SnapshotError(Exception):
+  """Error in snapshot."""
+  pass
+
+
+class SnapshotOptions(object): # pylint:disable=R0903
+  """Options to render a snapshot."""
+  def __init__(self, width, height, start_time=0.0, end_time=None,
+               time_scale=1.0, value_scale=1.0):
+    """Creates a SnapshotOptions.
+
+    @param width: The width of the wave view.
+    @param height: The height of the wave view. It is adjusted to an odd
+                   number.
+    @param start_time: The time at the left edge of the view in seconds.
+    @param end_time: The time at the right edge of the view in seconds.
+                     If it is given, time_scale is computed to fit the time
+                     range in the view.
+    @param time_scale: The time scale. 1 means the view contains full data
+                       range.
+    @param value_scale: The value scale. 1 means the view contains full
+                        value range.
+
+    """
+    if width < 2 or height < 1:
+      raise SnapshotError('Size %r x %r is too small' % (width, height))
+    if end_time is not None and end_time <= start_time:
+      raise SnapshotError('End time %r is not after start time %r' % (
+          end_time, start_time))
+    self.width = width
+    self.height = height if height & 1 else height - 1
+    self.start_time = start_time
+    self.end_time = end_time
+    self.time_scale = time_scale
+    self.value_scale = value_scale
+
+
+def render(one_channel_raw_data, options):
+  """Renders a wave view of one channel raw data.
+
+  The same Waveform and WaveView pipeline as the interactive wave view is
+  used, so the frame looks the same as the view in the terminal.
+
+  @param one_channel_raw_data: A data.OneChannelRawData object.
+  @param options: A SnapshotOptions object.
+
+  @returns: A list of strings. The first one is a header containing time
+            and value range, followed by one string per row of the view.
+  """
+  number_of_samples = len(one_channel_raw_data.samples)
+  sampling_rate = one_channel_raw_data.sampling_rate
+  if number_of_samples < options.width:
+    raise SnapshotError('Only %r samples for width %r' % (
+        number_of_samples, options.width))
+
+  time_scale = options.time_scale
+  if options.end_time is not None:
+    duration = float(number_of_samples) / sampling_rate
+    time_scale = duration / (options.end_time - options.start_time)
+  max_time_scale = float(number_of_samples) / options.width
+  time_scale = min(max(time_scale, 1.0), max_time_scale)
+  sample_length = min(int(round(time_scale * options.width)),
+                      number_of_samples)
+  quantize_levels = int(round(max(options.value_scale, 1.0) * options.height))
+
+  wave = waveform.Waveform(one_channel_raw_data, sample_length,
+                           quantize_levels)
+  view = waveview.WaveView(wave.wave_samples, options.width, options.height)
+  start_x = (int(options.start_time * sampling_rate) /
+             wave.down_sample_factor)
+  view.draw_view(start_x, 0)
+
+  min_time_index, max_time_index = view.get_time_index_range(start_x)
+  min_level, max_level = view.get_level_range(0)
+  header = 'time %.6f - %.6f s, value %.1f - %.1f, zoom %.3g x' % (
+      float(min_time_index * wave.down_sample_factor) / sampling_rate,
+      float(max_time_index * wave.down_sample_factor) / sampling_rate,
+      min_level * wave.quantization_factor,
+      max_level * wave.quantization_factor,
+      time_scale)
+  return [header] + [''.join(row) for row in view.get_view()]
+
+
+def render_file(path, data_format, channel_index, options):
+  """Reads a file and renders a wave view of one channel.
+
+  @param path: The path to the raw data file.
+  @param data_format: A data.DataFormat object.
+  @param channel_index: The selected channel. 0 for the first channel.
+  @param options: A SnapshotOptions object.
+
+  @returns: A string containing the file name and the rendered lines.
+  """
+  raw_data = data.read_file(path, data_format)
+  one_channel_raw_data = data.OneChannelRawData(raw_data, channel_index)
+  lines = render(one_channel_raw_data, options)
+  return '\n'.join(['== %s' % path] + lines) + '\n'
+
+
+def _render_file_task(task):
+  """Renders a file in a worker process.
+
+  @param task: A tuple of arguments to render_file.
+
+  @returns: The result of render_file, or an error message.
+  """
+  path = task[0]
+  try:
+    return render_file(*task)
+  except (IOError, SnapshotError, waveform.WaveformError) as error:
+    logging.error('Can not render %s: %s', path, error)
+    return '== %s\nerror: %s\n' % (path, error)
+
+
+def snapshot(path, data_format, channel_index, options, output, jobs=None):
+  """Renders snapshots of a file or all files in a directory.
+
+  Files are rendered in parallel by a pool of worker processes, and the
+  results are written to output in the order of file names.
+
+  @param path: A path to a file or a directory.
+  @param data_format: A data.DataFormat object.
+  @param channel_index: The selected channel. 0 for the first channel.
+  @param options: A SnapshotOptions object.
+  @param output: A file object to write to.
+  @param jobs: Number of worker processes. Default is number of CPUs.
+  """
+  tasks = [(input_file, data_format, channel_index, options)
+           for input_file in data.find_input_files(path)]
+  logging.info('Render snapshots of %r files', len(tasks))
+  if len(tasks) == 1 or jobs == 1:
+    results = (_render_file_task(task) for task in tasks)
+    for result in results:
+      output.write(result)
+    return
+  pool = multiprocessing.Pool(jobs)
+  try:
+    for result in pool.imap(_render_file_task, tasks):
+      output.write(result)
+  finally:
+    pool.close()
+    pool.join()
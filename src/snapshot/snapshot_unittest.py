@@ -0,0 +1,118 @@
+#!/usr/bin/python
+"""Unit tests for snapshot."""
+
+from __future__ import absolute_import
+
+import array
+import os
+import shutil
+import StringIO
+import sys
+import tempfile
+import unittest
+
+from data import data
+from snapshot import snapshot
+
+
+_DATA_FORMAT = data.DataFormat(1, 16, 1000)
+
+
+def _make_square(length):
+  """Makes samples of one period of a square wave.
+
+  @param length: The number of samples.
+
+  @returns: An array.array of samples, high in the first half.
+  """
+  half = length / 2
+  return array.array('h', [30000] * half + [-30000] * (length - half))
+
+
+def _to_binary(samples):
+  """Converts samples to the binary of a raw data file.
+
+  @param samples: An array.array of samples.
+
+  @returns: A string in little endian.
+  """
+  samples = array.array('h', samples)
+  if sys.byteorder == 'big':
+    samples.byteswap()
+  return samples.tostring()
+
+
+class RenderTest(unittest.TestCase):
+  """Tests rendering a square wave."""
+
+  def setUp(self):
+    raw_data = data.RawData(_to_binary(_make_square(1000)), _DATA_FORMAT)
+    self.trace = data.OneChannelRawData(raw_data, 0)
+
+
+  def test_render(self):
+    """Tests the marks are on the top, then on the bottom."""
+    lines = snapshot.render(self.trace, snapshot.SnapshotOptions(20, 6))
+    self.assertTrue(lines[0].startswith('time 0.000000 - '))
+    # The height is made odd so that zero is on the middle row.
+    self.assertEqual(len(lines), 1 + 5)
+    self.assertEqual(lines[1], '*' * 10 + ' ' * 10)
+    self.assertEqual(lines[-1], ' ' * 10 + '*' * 10)
+    for line in lines[2:-1]:
+      self.assertEqual(line, ' ' * 20)
+
+
+  def test_time_range(self):
+    """Tests start and end times zoom in on a part of the trace."""
+    options = snapshot.SnapshotOptions(20, 5, start_time=0.25, end_time=0.75)
+    lines = snapshot.render(self.trace, options)
+    self.assertTrue(lines[0].startswith('time 0.250000 - '))
+    self.assertTrue(lines[0].endswith('zoom 2 x'))
+    self.assertEqual(lines[1], '*' * 10 + ' ' * 10)
+    self.assertEqual(lines[-1], ' ' * 10 + '*' * 10)
+
+
+  def test_invalid_options(self):
+    """Tests invalid options raise SnapshotError."""
+    for args, kwargs in (((1, 5), {}), ((20, 0), {}),
+                         ((20, 5), {'start_time': 1.0, 'end_time': 1.0})):
+      with self.assertRaises(snapshot.SnapshotError):
+        snapshot.SnapshotOptions(*args, **kwargs)
+    with self.assertRaises(snapshot.SnapshotError):
+      snapshot.render(self.trace, snapshot.SnapshotOptions(2000, 5))
+
+
+class SnapshotTest(unittest.TestCase):
+  """Tests rendering all files in a directory."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    for name, length in (('b.raw', 1000), ('a.raw', 500), ('c.raw', 3)):
+      with open(os.path.join(self.directory, name), 'wb') as raw_file:
+        raw_file.write(_to_binary(_make_square(length)))
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_snapshot(self):
+    """Tests the results are in the order of file names with any jobs."""
+    options = snapshot.SnapshotOptions(20, 5)
+    results = []
+    for jobs in (1, 2):
+      output = StringIO.StringIO()
+      snapshot.snapshot(self.directory, _DATA_FORMAT, 0, options, output,
+                        jobs=jobs)
+      results.append(output.getvalue())
+    self.assertEqual(results[0], results[1])
+    names = [line[3:] for line in results[0].splitlines()
+             if line.startswith('== ')]
+    self.assertEqual(names, [os.path.join(self.directory, name)
+                             for name in ('a.raw', 'b.raw', 'c.raw')])
+    self.assertIn('error: Only 3 samples for width 20', results[0])
+    self.assertEqual(results[0].count('*' * 10), 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
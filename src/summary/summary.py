@@ -0,0 +1,329 @@
+"""Summarize samples in blocks for fast search and overview."""
+
+import array
+import logging
+
+from tracing import tracing
+
+
+class SummaryError(Exception):
+  """Error in summary."""
+  pass
+
+
+class BlockSummary(object):
+  """Minimum and maximum of samples in blocks, in a hierarchy of levels.
+
+  Level 0 has the minimum and maximum of each block of samples. Each node
+  in level k + 1 summarizes fanout nodes in level k. Searching the first
+  block which may contain an event climbs up the levels to skip nodes which
+  can not contain the event, so a search takes O(fanout * number of levels)
+  steps instead of checking every block.
+
+  The summary is built chunk by chunk, so samples of a mapped file are not
+  all decoded at once. It can also be built by a scan which reads the
+  samples for other purposes, by add_samples and finish. Level 0 can be read
+  while it is being built.
+  """
+  _CHUNK_BLOCKS = 64
+
+  def __init__(self, samples=None, block_length=4096, fanout=64):
+    """Creates a BlockSummary.
+
+    @param samples: A sequence of samples, e.g. array.array. The summary is
+                    built from it. If it is None, the summary is built by
+                    add_samples and finish.
+    @param block_length: Number of samples in a block.
+    @param fanout: Number of nodes summarized by a node in the next level.
+
+    """
+    if block_length < 1 or fanout < 2:
+      raise SummaryError('Invalid block length %r or fanout %r' %
+                         (block_length, fanout))
+    self.block_length = block_length
+    self._fanout = fanout
+    self._number_of_samples = 0
+    # Minimums and maximums of level 0.
+    self._minimums, self._maximums = array.array('l'), array.array('l')
+    # A list of samples of the last block which is not complete.
+    self._partial = []
+    # A list of (minimums, maximums) of each level from level 0. It is
+    # filled by finish.
+    self._levels = []
+    if samples is not None:
+      with tracing.span('summary'):
+        chunk_length = self.block_length * self._CHUNK_BLOCKS
+        for chunk_start in xrange(0, len(samples), chunk_length):
+          self.add_samples(samples[chunk_start:chunk_start + chunk_length])
+        self.finish()
+
+
+  @property
+  def number_of_blocks(self):
+    """The number of complete blocks in level 0."""
+    # Minimums are appended before maximums, so a reader in another thread
+    # may see a block with a minimum only.
+    return min(len(self._minimums), len(self._maximums))
+
+
+  @property
+  def is_complete(self):
+    """True if all the samples are added and the levels are built."""
+    return bool(self._levels)
+
+
+  def add_samples(self, samples):
+    """Adds the next samples to level 0.
+
+    @param samples: A sequence of samples following the added samples.
+
+    """
+    self._number_of_samples += len(samples)
+    start = 0
+    if self._partial:
+      start = self.block_length - len(self._partial)
+      self._partial.extend(samples[:start])
+      if len(self._partial) < self.block_length:
+        return
+      self._minimums.append(min(self._partial))
+      self._maximums.append(max(self._partial))
+      self._partial = []
+    for block_start in xrange(start, len(samples), self.block_length):
+      block = samples[block_start:block_start + self.block_length]
+      if len(block) < self.block_length:
+        self._partial = list(block)
+        break
+      self._minimums.append(min(block))
+      self._maximums.append(max(block))
+
+
+  def finish(self):
+    """Adds the last block and builds the levels above level 0."""
+    if self._partial:
+      self._minimums.append(min(self._partial))
+      self._maximums.append(max(self._partial))
+      self._partial = []
+    minimums, maximums = self._minimums, self._maximums
+    levels = [(minimums, maximums)]
+    while len(minimums) > 1:
+      minimums = array.array('l', [
+          min(minimums[start:start + self._fanout])
+          for start in xrange(0, len(minimums), self._fanout)])
+      maximums = array.array('l', [
+          max(maximums[start:start + self._fanout])
+          for start in xrange(0, len(maximums), self._fanout)])
+      levels.append((minimums, maximums))
+    # Assign at last since the summary may be read by another thread.
+    self._levels = levels
+    logging.debug('Summary of %r blocks in %r levels', self.number_of_blocks,
+                  len(self._levels))
+
+
+  def get_block_range(self, block_index):
+    """Gets the samples in a block.
+
+    @param block_index: The index of the block.
+
+    @returns: (first_sample_index, stop_sample_index).
+    """
+    start = block_index * self.block_length
+    return start, min(start + self.block_length, self._number_of_samples)
+
+
+  def get_block_values(self, block_index):
+    """Gets the minimum and maximum of a block.
+
+    @param block_index: The index of the block.
+
+    @returns: (minimum, maximum).
+    """
+    return self._minimums[block_index], self._maximums[block_index]
+
+
+  def get_values(self, first_block, stop_block):
+    """Gets the minimum and maximum of consecutive blocks.
+
+    @param first_block: The index of the first block.
+    @param stop_block: The index after the last block.
+
+    @returns: (minimum, maximum).
+    """
+    return (min(self._minimums[first_block:stop_block]),
+            max(self._maximums[first_block:stop_block]))
+
+
+  def get_envelope(self, number_of_samples, columns):
+    """Gets the minimum and maximum of equal parts of samples.
+
+    It can be used while the summary is being built. A part is accurate to
+    blocks.
+
+    @param number_of_samples: The total number of samples.
+    @param columns: The number of parts.
+
+    @returns: A list of (minimum, maximum) of each part. It is None for a
+              part whose blocks are not complete yet.
+    """
+    envelope = []
+    number_of_blocks = self.number_of_blocks
+    for column in xrange(columns):
+      first = column * number_of_samples / columns / self.block_length
+      stop = max(first + 1, -(-(column + 1) * number_of_samples / columns /
+                              self.block_length))
+      if stop > number_of_blocks:
+        envelope.append(None)
+        continue
+      envelope.append((min(self._minimums[first:stop]),
+                       max(self._maximums[first:stop])))
+    return envelope
+
+
+  def find_block(self, first_block, predicate):
+    """Finds the first block which may contain an event.
+
+    @param first_block: The index of the block to start with.
+    @param predicate: A function of (minimum, maximum) of a node. It returns
+                      False if the samples in the node can not contain the
+                      event. If it returns False for a node, it must return
+                      False for all the nodes below it.
+
+    @returns: The index of the block. None if no block may contain the
+              event.
+
+    @raises: SummaryError if the summary is not complete.
+    """
+    if not self.is_complete:
+      raise SummaryError('Summary is not complete')
+    level, index = 0, first_block
+    while True:
+      minimums, maximums = self._levels[level]
+      if index >= len(minimums):
+        return None
+      if predicate(minimums[index], maximums[index]):
+        if level == 0:
+          return index
+        # Search the nodes below from the first one.
+        level, index = level - 1, index * self._fanout
+        continue
+      index += 1
+      # Climb up when all the nodes below the parent are checked.
+      while index % self._fanout == 0 and level + 1 < len(self._levels):
+        level, index = level + 1, index / self._fanout
+
+
+class SparseEnvelope(object): # pylint:disable=R0903
+  """A coarse envelope of samples by seek sampling.
+
+  For each part, only one block of samples at its start is read, so the
+  envelope of a file of any length is ready after a few reads. It has
+  get_envelope of BlockSummary. Envelopes are cached by size.
+  """
+  def __init__(self, samples, block_length=1024):
+    """Creates a SparseEnvelope.
+
+    @param samples: A sequence of samples, e.g. data.MappedChannel.
+    @param block_length: Number of samples read for each part.
+
+    """
+    self._samples = samples
+    self._block_length = block_length
+    self._envelopes = {}
+
+
+  def get_envelope(self, number_of_samples, columns):
+    """Gets the minimum and maximum of a block at the start of each part.
+
+    @param number_of_samples: The total number of samples.
+    @param columns: The number of parts.
+
+    @returns: A list of (minimum, maximum) of each part.
+    """
+    size = (number_of_samples, columns)
+    if size not in self._envelopes:
+      with tracing.span('preview'):
+        envelope = []
+        for column in xrange(columns):
+          first = column * number_of_samples / columns
+          stop = max(first + 1, min(first + self._block_length,
+                                    (column + 1) * number_of_samples /
+                                    columns))
+          values = self._samples[first:stop]
+          envelope.append((min(values), max(values)) if values else None)
+        self._envelopes[size] = envelope
+    return self._envelopes[size]
+
+
+class RefiningEnvelope(object): # pylint:disable=R0903
+  """An envelope which refines a coarse one while a summary is built.
+
+  Parts whose blocks are complete in the summary are taken from it, and the
+  others from the coarse envelope. It has get_envelope of BlockSummary.
+  """
+  def __init__(self, coarse, block_summary):
+    """Creates a RefiningEnvelope.
+
+    @param coarse: An object with get_envelope, e.g. a SparseEnvelope.
+    @param block_summary: A BlockSummary being built.
+
+    """
+    self._coarse = coarse
+    self._block_summary = block_summary
+
+
+  def get_envelope(self, number_of_samples, columns):
+    """Gets the minimum and maximum of equal parts of samples.
+
+    @param number_of_samples: The total number of samples.
+    @param columns: The number of parts.
+
+    @returns: A list of (minimum, maximum) of each part.
+    """
+    envelope = self._block_summary.get_envelope(number_of_samples, columns)
+    if None not in envelope:
+      return envelope
+    return [fine or coarse for fine, coarse in zip(
+        envelope, self._coarse.get_envelope(number_of_samples, columns))]
+
+
+def get_envelope(samples, start, stop, columns, block_summary=None):
+  """Gets the minimum and maximum of samples in columns.
+
+  Whole blocks in a column are read from the summary, and only the samples
+  at the ends of a column are read from samples. Without a summary, the
+  samples in the range are read at once.
+
+  @param samples: A sequence of samples, e.g. array.array.
+  @param start: The first sample index.
+  @param stop: The sample index after the range.
+  @param columns: The number of columns.
+  @param block_summary: A complete BlockSummary of samples, or None.
+
+  @returns: A list of (minimum, maximum) of each column. It is None for a
+            column without samples.
+  """
+  start, stop = max(0, start), min(len(samples), stop)
+  block_length = block_summary.block_length if block_summary else None
+  if not block_summary:
+    samples, start, stop = samples[start:stop], 0, max(0, stop - start)
+  envelope = []
+  for column in xrange(columns):
+    first = start + (stop - start) * column / columns
+    last = start + (stop - start) * (column + 1) / columns
+    if first >= last:
+      envelope.append(None)
+      continue
+    if block_summary:
+      first_block = -(-first / block_length)
+      stop_block = last / block_length
+    if not block_summary or first_block >= stop_block:
+      values = samples[first:last]
+      envelope.append((min(values), max(values)))
+      continue
+    minimum, maximum = block_summary.get_values(first_block, stop_block)
+    for values in (samples[first:first_block * block_length],
+                   samples[stop_block * block_length:last]):
+      if values:
+        minimum, maximum = min(minimum, min(values)), max(maximum,
+                                                          max(values))
+    envelope.append((minimum, maximum))
+  return envelope
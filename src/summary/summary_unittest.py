@@ -0,0 +1,151 @@
+#!/usr/bin/python
+"""Unit tests for summary."""
+
+from __future__ import absolute_import
+
+import array
+import random
+import unittest
+
+from summary import summary
+
+
+def _make_samples(seed, length):
+  """Makes random samples.
+
+  @param seed: The seed of random numbers.
+  @param length: The number of samples.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(seed)
+  return array.array('h', (generator.randint(-32768, 32767)
+                           for _ in xrange(length)))
+
+
+class BlockSummaryTest(unittest.TestCase):
+  """Compares BlockSummary with minimums and maximums of samples."""
+
+  def setUp(self):
+    self.samples = _make_samples(1, 10000)
+    self.block_length = 37
+    self.block_summary = summary.BlockSummary(
+        self.samples, block_length=self.block_length, fanout=3)
+
+
+  def test_blocks(self):
+    """Tests the values of each block, including the last partial one."""
+    number_of_blocks = -(-len(self.samples) / self.block_length)
+    self.assertEqual(self.block_summary.number_of_blocks, number_of_blocks)
+    for block in xrange(number_of_blocks):
+      start, stop = self.block_summary.get_block_range(block)
+      values = self.samples[start:stop]
+      self.assertEqual(self.block_summary.get_block_values(block),
+                       (min(values), max(values)))
+
+
+  def test_add_samples(self):
+    """Tests a summary built from chunks of any length."""
+    generator = random.Random(2)
+    block_summary = summary.BlockSummary(block_length=self.block_length,
+                                         fanout=3)
+    position = 0
+    while position < len(self.samples):
+      length = generator.randint(0, 100)
+      block_summary.add_samples(self.samples[position:position + length])
+      position += length
+    block_summary.finish()
+    for first in xrange(0, block_summary.number_of_blocks, 7):
+      for stop in (first + 1, first + 5, block_summary.number_of_blocks):
+        self.assertEqual(block_summary.get_values(first, stop),
+                         self.block_summary.get_values(first, stop))
+
+
+  def test_get_values(self):
+    """Tests get_values of consecutive blocks."""
+    for first, stop in ((0, 1), (3, 4), (5, 80), (0, 271), (260, 271)):
+      values = self.samples[first * self.block_length:
+                            stop * self.block_length]
+      self.assertEqual(self.block_summary.get_values(first, stop),
+                       (min(values), max(values)))
+
+
+  def test_find_block(self):
+    """Tests find_block against a check of every block."""
+    for value in (-32000, 0, 32000, 32767):
+      predicate = lambda _, maximum, value=value: maximum >= value
+      for first in xrange(0, self.block_summary.number_of_blocks, 11):
+        expected = None
+        for block in xrange(first, self.block_summary.number_of_blocks):
+          if predicate(*self.block_summary.get_block_values(block)):
+            expected = block
+            break
+        self.assertEqual(self.block_summary.find_block(first, predicate),
+                         expected)
+
+
+  def test_find_block_incomplete(self):
+    """Tests find_block raises while the summary is built."""
+    block_summary = summary.BlockSummary(block_length=self.block_length)
+    block_summary.add_samples(self.samples)
+    with self.assertRaises(summary.SummaryError):
+      block_summary.find_block(0, lambda minimum, maximum: True)
+
+
+  def test_get_envelope_while_building(self):
+    """Tests get_envelope of a summary being built."""
+    block_summary = summary.BlockSummary(block_length=100)
+    block_summary.add_samples(self.samples[:5050])
+    # A reader may see the minimum of a block before its maximum.
+    block_summary._minimums.append(0) # pylint:disable=W0212
+    envelope = block_summary.get_envelope(len(self.samples), 100)
+    for column, values in enumerate(envelope):
+      if column < 50:
+        part = self.samples[column * 100:(column + 1) * 100]
+        self.assertEqual(values, (min(part), max(part)))
+      else:
+        self.assertIsNone(values)
+
+
+class GetEnvelopeTest(unittest.TestCase):
+  """Compares get_envelope with minimums and maximums of columns."""
+
+  def setUp(self):
+    self.samples = _make_samples(3, 20000)
+
+
+  def _get_expected(self, start, stop, columns):
+    """Gets the envelope by reading every sample.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+    @param columns: The number of columns.
+
+    @returns: A list of (minimum, maximum), or None for an empty column.
+    """
+    start, stop = max(0, start), min(len(self.samples), stop)
+    envelope = []
+    for column in xrange(columns):
+      values = self.samples[start + (stop - start) * column / columns:
+                            start + (stop - start) * (column + 1) / columns]
+      envelope.append((min(values), max(values)) if values else None)
+    return envelope
+
+
+  def test_get_envelope(self):
+    """Tests get_envelope with and without a summary."""
+    block_summary = summary.BlockSummary(self.samples, block_length=64)
+    for start, stop, columns in ((0, 20000, 80), (-5, 30000, 7),
+                                 (123, 4567, 100), (1000, 1010, 20),
+                                 (19990, 20000, 3)):
+      expected = self._get_expected(start, stop, columns)
+      self.assertEqual(
+          summary.get_envelope(self.samples, start, stop, columns), expected)
+      self.assertEqual(
+          summary.get_envelope(self.samples, start, stop, columns,
+                               block_summary),
+          expected)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,142 @@
+"""Low-overhead tracing of pipeline stages.
+
+Code marks a stage by
+
+  with tracing.span('rasterize'):
+    ...
+
+A span is timed only when a sink is added. Without sinks, span returns a
+shared object whose __enter__ and __exit__ do nothing, so tracing costs one
+function call per span when it is disabled.
+
+A sink is an object with method add_span(name, start, end), where start and
+end are from time.time(). ChromeTraceRecorder is a sink which exports
+Chrome trace-event JSON, which can be loaded in chrome://tracing or
+Perfetto to inspect a session on a timeline.
+"""
+
+import json
+import os
+import thread
+import time
+
+
+_SINKS = []
+
+
+class _NullSpan(object):
+  """A span which does nothing. Used when tracing is disabled."""
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, exc_traceback):
+    return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+  """A span which reports its duration to the sinks."""
+  __slots__ = ('_name', '_start')
+
+  def __init__(self, name):
+    self._name = name
+    self._start = None
+
+  def __enter__(self):
+    self._start = time.time()
+    return self
+
+  def __exit__(self, exc_type, exc_value, exc_traceback):
+    end = time.time()
+    for sink in _SINKS:
+      sink.add_span(self._name, self._start, end)
+    return False
+
+
+def span(name):
+  """Returns a context manager which traces a with block.
+
+  @param name: The name of the stage.
+
+  """
+  if not _SINKS:
+    return _NULL_SPAN
+  return _Span(name)
+
+
+def is_enabled():
+  """Returns True if there is a sink."""
+  return bool(_SINKS)
+
+
+def add_sink(sink):
+  """Adds a sink which receives all the spans.
+
+  @param sink: An object with method add_span(name, start, end).
+
+  """
+  if sink not in _SINKS:
+    _SINKS.append(sink)
+
+
+def remove_sink(sink):
+  """Removes a sink added by add_sink.
+
+  @param sink: The sink.
+
+  """
+  if sink in _SINKS:
+    _SINKS.remove(sink)
+
+
+class ChromeTraceRecorder(object):
+  """Records spans as Chrome trace events.
+
+  Each span is recorded as a complete event ('ph': 'X') with the time stamp
+  and duration in microseconds since the recorder is created.
+  """
+  def __init__(self):
+    """Creates a ChromeTraceRecorder."""
+    self._origin = time.time()
+    self._pid = os.getpid()
+    self._events = []
+
+
+  def add_span(self, name, start, end):
+    """Records a span.
+
+    @param name: The name of the stage.
+    @param start: The start time from time.time().
+    @param end: The end time from time.time().
+
+    """
+    self._events.append((name, start, end, thread.get_ident()))
+
+
+  def get_trace(self):
+    """Gets the trace.
+
+    @returns: A dict in Chrome trace-event format.
+    """
+    events = [{
+        'name': name,
+        'cat': 'wave-view',
+        'ph': 'X',
+        'ts': (start - self._origin) * 1e6,
+        'dur': (end - start) * 1e6,
+        'pid': self._pid,
+        'tid': tid,
+    } for name, start, end, tid in self._events]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+  def save(self, path):
+    """Saves the trace to a JSON file.
+
+    @param path: The path to the output file.
+
+    """
+    with open(path, 'w') as handle:
+      json.dump(self.get_trace(), handle)
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+"""Unit tests for tracing."""
+
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tracing import tracing
+
+
+class _ListSink(object):
+  """A sink which keeps the names of spans."""
+  def __init__(self):
+    self.names = []
+
+
+  def add_span(self, name, start, end):
+    """Keeps the name of a span.
+
+    @param name: The name of the stage.
+    @param start: The start time from time.time().
+    @param end: The end time from time.time().
+
+    """
+    self.names.append(name)
+    assert start <= end
+
+
+class SpanTest(unittest.TestCase):
+  """Tests spans are reported to sinks only while they are added."""
+
+  def test_sinks(self):
+    """Tests adding and removing sinks, also twice."""
+    sink = _ListSink()
+    self.assertFalse(tracing.is_enabled())
+    with tracing.span('disabled'):
+      pass
+    tracing.add_sink(sink)
+    tracing.add_sink(sink)
+    try:
+      self.assertTrue(tracing.is_enabled())
+      with tracing.span('outer'):
+        with tracing.span('inner'):
+          pass
+      with self.assertRaises(ValueError):
+        with tracing.span('raised'):
+          raise ValueError
+    finally:
+      tracing.remove_sink(sink)
+    tracing.remove_sink(sink)
+    with tracing.span('removed'):
+      pass
+    self.assertFalse(tracing.is_enabled())
+    self.assertEqual(sink.names, ['inner', 'outer', 'raised'])
+
+
+class ChromeTraceRecorderTest(unittest.TestCase):
+  """Tests the exported trace events."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def test_save(self):
+    """Tests a saved span is a complete event in microseconds."""
+    recorder = tracing.ChromeTraceRecorder()
+    origin = recorder.get_trace()
+    self.assertEqual(origin['traceEvents'], [])
+    start = recorder._origin + 1.0 # pylint:disable=W0212
+    recorder.add_span('render', start, start + 0.0025)
+    path = os.path.join(self.directory, 'trace.json')
+    recorder.save(path)
+    with open(path) as handle:
+      trace = json.load(handle)
+    self.assertEqual(trace['displayTimeUnit'], 'ms')
+    event, = trace['traceEvents']
+    self.assertEqual((event['name'], event['ph'], event['pid']),
+                     ('render', 'X', os.getpid()))
+    self.assertAlmostEqual(event['ts'], 1e6, delta=1)
+    self.assertAlmostEqual(event['dur'], 2500, delta=1)
+
+
+if __name__ == '__main__':
+  unittest.main()
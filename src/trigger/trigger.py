@@ -0,0 +1,241 @@
+"""Index trigger edges of samples like an oscilloscope."""
+
+import array
+import bisect
+import functools
+import itertools
+import logging
+import operator
+
+from tracing import tracing
+
+
+class TriggerError(Exception):
+  """Error in trigger."""
+  pass
+
+
+class Edge(object): # pylint:disable=R0903
+  """Edges of a trigger."""
+  def __init__(self):
+    pass
+
+  RISING = 'rising'
+  FALLING = 'falling'
+
+
+# The pair of mask bytes before and at an edge. A mask byte is 1 if the
+# sample is above the level.
+_PATTERNS = {
+    Edge.RISING: '\x00\x01',
+    Edge.FALLING: '\x01\x00',
+}
+
+
+def parse_trigger(text):
+  """Parses a trigger setting.
+
+  @param text: LEVEL [r|f] [HYSTERESIS], e.g. '0 r 100' for rising edges at
+               0 which trigger again after samples go below -100.
+
+  @returns: A tuple (level, edge, hysteresis).
+
+  @raises: TriggerError if the text can not be parsed.
+  """
+  fields = text.split()
+  if not 1 <= len(fields) <= 3:
+    raise TriggerError('Invalid trigger %r' % text)
+  try:
+    level = int(float(fields[0]))
+    hysteresis = int(float(fields[2])) if len(fields) > 2 else 0
+  except (ValueError, OverflowError):
+    # int raises ValueError for nan and OverflowError for inf.
+    raise TriggerError('Invalid trigger %r' % text)
+  edge_text = fields[1].lower() if len(fields) > 1 else 'r'
+  for edge in (Edge.RISING, Edge.FALLING):
+    if edge.startswith(edge_text):
+      return level, edge, hysteresis
+  raise TriggerError('Invalid trigger edge %r' % fields[1])
+
+
+class _EdgeFinder(object): # pylint:disable=R0903
+  """Finds the samples where samples cross a level on an edge.
+
+  A sample i is a rising edge if sample i - 1 is not above the level and
+  sample i is above it, and a falling edge if the other way around. Edges
+  are found in one pass: each chunk is converted to a mask by itertools.imap
+  and searched by bytearray.find, so no Python-level loop runs per sample.
+  With a complete BlockSummary, blocks whose samples are all above or all
+  not above the level are not read.
+  """
+  _CHUNK_BLOCKS = 16
+
+  def __init__(self, samples, level, edge, block_summary, chunk_length):
+    """Creates an _EdgeFinder and finds the edges.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param level: The level.
+    @param edge: An edge defined in Edge.
+    @param block_summary: A summary.BlockSummary of the samples, or None.
+    @param chunk_length: Number of samples read at a time without a
+                         summary.
+
+    """
+    self._samples = samples
+    self._level = level
+    self._edge = edge
+    self._pattern = _PATTERNS[edge]
+    self._is_above = functools.partial(operator.lt, level)
+    self.edges = array.array('l')
+    if block_summary and block_summary.is_complete:
+      self._find_with_summary(block_summary)
+    else:
+      self._find_range(0, len(samples), chunk_length, None)
+
+
+  def _find_range(self, start, stop, chunk_length, above):
+    """Finds edges in a range of samples.
+
+    @param start: The first sample index.
+    @param stop: The sample index after the range.
+    @param chunk_length: Number of samples read at a time.
+    @param above: True if the sample before start is above the level, None
+                  if there is no sample before start.
+
+    @returns: True if the last sample in the range is above the level.
+    """
+    for chunk_start in xrange(start, stop, chunk_length):
+      chunk = self._samples[chunk_start:min(stop,
+                                            chunk_start + chunk_length)]
+      mask = bytearray(itertools.imap(self._is_above, chunk))
+      if above is None:
+        offset = chunk_start + 1
+      else:
+        mask[0:0] = chr(above)
+        offset = chunk_start
+      position = mask.find(self._pattern)
+      while position >= 0:
+        self.edges.append(offset + position)
+        position = mask.find(self._pattern, position + 1)
+      above = bool(mask[-1])
+    return above
+
+
+  def _find_with_summary(self, block_summary):
+    """Finds edges, reading only blocks which may cross the level.
+
+    @param block_summary: A complete summary.BlockSummary of the samples.
+
+    """
+    above = None
+    # The first sample of consecutive blocks which cross the level.
+    crossing_start = None
+    chunk_length = block_summary.block_length * self._CHUNK_BLOCKS
+    for block in xrange(block_summary.number_of_blocks):
+      minimum, maximum = block_summary.get_block_values(block)
+      block_start, _ = block_summary.get_block_range(block)
+      if minimum <= self._level < maximum:
+        if crossing_start is None:
+          crossing_start = block_start
+        continue
+      if crossing_start is not None:
+        above = self._find_range(crossing_start, block_start, chunk_length,
+                                 above)
+        crossing_start = None
+      block_above = minimum > self._level
+      if above is not None and above != block_above:
+        if block_above == (self._edge == Edge.RISING):
+          self.edges.append(block_start)
+      above = block_above
+    if crossing_start is not None:
+      self._find_range(crossing_start, len(self._samples), chunk_length,
+                       above)
+
+
+class TriggerIndex(object):
+  """Sorted sample indices of trigger points.
+
+  A trigger point is an edge at the level, like an oscilloscope. With
+  hysteresis, an edge triggers only if the samples went beyond the level by
+  the hysteresis on the other side since the last trigger point, so noise
+  around the level does not trigger again. That is checked against a
+  second edge index at the level shifted by the hysteresis. Stepping
+  between trigger points is a bisection.
+  """
+  def __init__(self, samples, level, edge, hysteresis=0, block_summary=None,
+               chunk_length=65536):
+    """Creates a TriggerIndex.
+
+    @param samples: A sequence of samples, e.g. array.array.
+    @param level: The trigger level.
+    @param edge: An edge defined in Edge.
+    @param hysteresis: The distance from the level to arm the trigger again.
+    @param block_summary: A complete summary.BlockSummary of the samples, or
+                          None to read all the samples.
+    @param chunk_length: Number of samples read at a time without a
+                         summary.
+
+    @raises: TriggerError if the edge is unknown.
+    """
+    if edge not in _PATTERNS:
+      raise TriggerError('Unknown edge %r' % edge)
+    self.level = level
+    self.edge = edge
+    with tracing.span('trigger'):
+      edges = _EdgeFinder(samples, level, edge, block_summary,
+                          chunk_length).edges
+      if hysteresis > 0:
+        if edge == Edge.RISING:
+          arming = _EdgeFinder(samples, level - hysteresis, Edge.FALLING,
+                               block_summary, chunk_length).edges
+        else:
+          arming = _EdgeFinder(samples, level + hysteresis, Edge.RISING,
+                               block_summary, chunk_length).edges
+        edges = self._remove_unarmed(edges, arming)
+    self.edges = edges
+    logging.info('Found %r %s edges at %r', len(self.edges), edge, level)
+
+
+  @staticmethod
+  def _remove_unarmed(edges, arming):
+    """Removes edges which are not armed since the last trigger point.
+
+    @param edges: An array.array of sorted edges.
+    @param arming: An array.array of sorted edges which arm the trigger.
+
+    @returns: An array.array of the trigger points.
+    """
+    triggers = array.array('l')
+    for edge in edges:
+      if triggers:
+        index = bisect.bisect_right(arming, triggers[-1])
+        if index == len(arming) or arming[index] > edge:
+          continue
+      triggers.append(edge)
+    return triggers
+
+
+  def __len__(self):
+    return len(self.edges)
+
+
+  def get_next(self, sample_index):
+    """Finds the first trigger point after a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the trigger point. None if there is none.
+    """
+    index = bisect.bisect_right(self.edges, sample_index)
+    return index if index < len(self.edges) else None
+
+
+  def get_previous(self, sample_index):
+    """Finds the last trigger point before a sample.
+
+    @param sample_index: The sample index.
+
+    @returns: The index of the trigger point. None if there is none.
+    """
+    index = bisect.bisect_left(self.edges, sample_index) - 1
+    return index if index >= 0 else None
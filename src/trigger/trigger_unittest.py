@@ -0,0 +1,110 @@
+#!/usr/bin/python
+"""Unit tests for trigger."""
+
+from __future__ import absolute_import
+
+import array
+import math
+import random
+import unittest
+
+from summary import summary
+from trigger import trigger
+
+
+def _make_samples(seed, length):
+  """Makes a noisy sine wave with flat parts.
+
+  @param seed: The seed of random numbers.
+  @param length: The number of samples.
+
+  @returns: An array.array of samples.
+  """
+  generator = random.Random(seed)
+  samples = array.array('h')
+  for index in xrange(length):
+    if index / 3000 % 3 == 2:
+      samples.append(-8000 if index / 1000 % 2 else 8000)
+    else:
+      samples.append(int(10000 * math.sin(index / 40.0) +
+                         generator.randint(-500, 500)))
+  return samples
+
+
+def _scan(samples, level, edge, hysteresis):
+  """Finds trigger points by checking every sample.
+
+  @param samples: A sequence of samples.
+  @param level: The trigger level.
+  @param edge: An edge defined in trigger.Edge.
+  @param hysteresis: The distance from the level to arm the trigger again.
+
+  @returns: A list of sample indices.
+  """
+  sign = 1 if edge == trigger.Edge.RISING else -1
+  arming_level = level - sign * hysteresis
+  armed = True
+  points = []
+  for index in xrange(1, len(samples)):
+    last, sample = samples[index - 1], samples[index]
+    if hysteresis > 0:
+      if sign > 0 and last > arming_level >= sample:
+        armed = True
+      elif sign < 0 and last <= arming_level < sample:
+        armed = True
+    if (last > level) != (sample > level) and (sample > level) == (sign > 0):
+      if armed or hysteresis <= 0:
+        points.append(index)
+        armed = False
+  return points
+
+
+class TriggerIndexTest(unittest.TestCase):
+  """Compares TriggerIndex with a scan of every sample."""
+
+  def setUp(self):
+    self.samples = _make_samples(1, 30000)
+    self.block_summary = summary.BlockSummary(self.samples, block_length=64,
+                                              fanout=4)
+
+
+  def test_edges(self):
+    """Tests edges with and without a summary and hysteresis."""
+    for level in (0, 5000, -8000, 8000, 20000):
+      for edge in (trigger.Edge.RISING, trigger.Edge.FALLING):
+        for hysteresis in (0, 700):
+          expected = _scan(self.samples, level, edge, hysteresis)
+          for block_summary in (None, self.block_summary):
+            index = trigger.TriggerIndex(self.samples, level, edge,
+                                         hysteresis, block_summary,
+                                         chunk_length=1000)
+            self.assertEqual(list(index.edges), expected)
+
+
+  def test_step(self):
+    """Tests get_next and get_previous."""
+    index = trigger.TriggerIndex(self.samples, 0, trigger.Edge.RISING, 700)
+    edges = list(index.edges)
+    for sample_index in range(0, len(self.samples), 113) + edges[:5]:
+      following = [i for i, edge in enumerate(edges) if edge > sample_index]
+      preceding = [i for i, edge in enumerate(edges) if edge < sample_index]
+      self.assertEqual(index.get_next(sample_index),
+                       following[0] if following else None)
+      self.assertEqual(index.get_previous(sample_index),
+                       preceding[-1] if preceding else None)
+
+
+  def test_parse_trigger(self):
+    """Tests parse_trigger."""
+    self.assertEqual(trigger.parse_trigger('100'),
+                     (100, trigger.Edge.RISING, 0))
+    self.assertEqual(trigger.parse_trigger('-5.5 f 20'),
+                     (-5, trigger.Edge.FALLING, 20))
+    for text in ('', 'x', '0 up', '0 r 1 2', 'inf', '-inf', 'nan',
+                 '0 r inf', '0 f nan'):
+      with self.assertRaises(trigger.TriggerError):
+        trigger.parse_trigger(text)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+"""Generates test data."""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..'))
+
+from signals import signals # pylint:disable=F0401,C0413
+
+
+def parse_args():
+  """Parse command line arguments.
+
+  @returns: The populated namespace.
+  """
+  parser = argparse.ArgumentParser(
+      description='Generate 1 channel signed 16 bit test data.')
+  parser.add_argument('--output-dir', '-o', action='store', default='/tmp',
+                      help='Directory of the generated files. '
+                           'Default is /tmp.')
+  parser.add_argument('--seconds', '-s', action='store', default=5.0,
+                      type=float,
+                      help='Duration in seconds. Default is 5.')
+  parser.add_argument('--rate', '-r', action='store', default=48000,
+                      type=int,
+                      help='Sampling rate. Default is 48000.')
+  parser.add_argument('--debug', '-d', action='store_true', default=False,
+                      help='Print debug messages.')
+
+  args = parser.parse_args()
+  level = logging.DEBUG if args.debug else logging.INFO
+  logging.basicConfig(level=level)
+  return args
+
+
+def get_test_data(seconds, rate):
+  """Gets test data to generate.
+
+  @param seconds: Duration in seconds.
+  @param rate: Sampling rate.
+
+  @returns: A list of (file name, description, samples).
+  """
+  return [
+      ('1hz.raw', '1 Hz, amplitude = full amplitude',
+       signals.sine(1, seconds, rate, 1.0)),
+      ('1hz_half.raw', '1 Hz, amplitude = 0.5 * full amplitude',
+       signals.sine(1, seconds, rate, 0.5)),
+      ('10hz.raw', '10 Hz, amplitude = full amplitude',
+       signals.sine(10, seconds, rate, 1.0)),
+      ('10hz_small.raw', '10 Hz, amplitude = 0.001 * full amplitude',
+       signals.sine(10, seconds, rate, 0.001)),
+      ('1khz_square.raw', '1K Hz square, amplitude = 0.5 * full amplitude',
+       signals.square(1000, seconds, rate, 0.5)),
+      ('noise.raw', 'white noise, amplitude = 0.5 * full amplitude',
+       signals.noise(seconds, rate, 0.5)),
+      ('50hz_clipped.raw', '50 Hz, amplitude = 2 * full amplitude, clipped',
+       signals.clipped_sine(50, seconds, rate, 2.0)),
+  ]
+
+
+def main():
+  """The main entry point."""
+  args = parse_args()
+  for name, description, samples in get_test_data(args.seconds, args.rate):
+    path = os.path.join(args.output_dir, name)
+    logging.info('Generating %s: 1 channel signed 16 bit %r sampling rate '
+                 '%r seconds %s', path, args.rate, args.seconds, description)
+    signals.write_raw(path, samples)
+
+
+if __name__ == '__main__':
+  main()
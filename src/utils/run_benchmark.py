@@ -0,0 +1,100 @@
+#!/usr/bin/python
+"""Benchmark runner."""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..'))
+
+from benchmark import benchmark # pylint:disable=F0401,C0413
+from signals import signals # pylint:disable=F0401,C0413
+
+
+def _comma_list(choices):
+  """Returns an argparse type parsing a comma separated list of choices."""
+  def parse(text):
+    """Parses a comma separated list of choices."""
+    names = text.split(',')
+    for name in names:
+      if name not in choices:
+        raise argparse.ArgumentTypeError(
+            '%r is not one of %s' % (name, ', '.join(sorted(choices))))
+    return names
+  return parse
+
+
+def parse_args():
+  """Parse command line arguments.
+
+  @returns: The populated namespace.
+  """
+  stage_names = [name for name, _, _ in benchmark.STAGES]
+  parser = argparse.ArgumentParser(description='Benchmark runner')
+  parser.add_argument('--signals', action='store',
+                      default=sorted(signals.SIGNALS),
+                      type=_comma_list(signals.SIGNALS),
+                      help='Comma separated signals. Default is all of %s.' %
+                           ', '.join(sorted(signals.SIGNALS)))
+  parser.add_argument('--sizes', action='store', default=['short', 'medium'],
+                      type=_comma_list(benchmark.SIZES),
+                      help='Comma separated sizes in %s. '
+                           'Default is short,medium.' %
+                           ', '.join(sorted(benchmark.SIZES)))
+  parser.add_argument('--stages', action='store', default=stage_names,
+                      type=_comma_list(stage_names),
+                      help='Comma separated stages. Default is all of %s.' %
+                           ', '.join(stage_names))
+  parser.add_argument('--repeat', action='store', default=5, type=int,
+                      help='Number of runs of each stage. Default is 5.')
+  parser.add_argument('--width', action='store', default=200, type=int,
+                      help='Width of wave view. Default is 200.')
+  parser.add_argument('--height', action='store', default=51, type=int,
+                      help='Height of wave view. Default is 51.')
+  parser.add_argument('--zoom', action='store', default=1.0, type=float,
+                      help='Time scale of wave view. Default is 1.')
+  parser.add_argument('--baseline', action='store', default=None,
+                      help='Compare with a baseline file.')
+  parser.add_argument('--save-baseline', action='store', default=None,
+                      help='Save the result as a baseline file.')
+  parser.add_argument('--threshold', action='store', default=1.2,
+                      type=float,
+                      help='Best time ratio to baseline counted as a '
+                           'regression. Default is 1.2.')
+  parser.add_argument('--debug', '-d', action='store_true', default=False,
+                      help='Print debug messages.')
+
+  args = parser.parse_args()
+  level = logging.DEBUG if args.debug else logging.INFO
+  logging.basicConfig(level=level)
+  return args
+
+
+def main():
+  """The main entry point.
+
+  @returns: 1 if there is regression compared to baseline. 0 otherwise.
+  """
+  args = parse_args()
+  options = benchmark.BenchmarkOptions(
+      width=args.width, height=args.height | 1, time_scale=args.zoom,
+      repeat=args.repeat)
+  report = benchmark.run_benchmark(args.signals, args.sizes, args.stages,
+                                   options)
+  ratios, regressions = {}, []
+  if args.baseline:
+    baseline = benchmark.load_baseline(args.baseline)
+    ratios, regressions = benchmark.compare(report, baseline, args.threshold)
+  for line in benchmark.format_report(report, ratios):
+    print line
+  for key in regressions:
+    logging.error('Regression in %s: %.2fx of baseline', key, ratios[key])
+  if args.save_baseline:
+    benchmark.save_baseline(report, args.save_baseline)
+  return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
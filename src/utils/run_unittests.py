@@ -0,0 +1,49 @@
+#!/usr/bin/python
+"""Unit test runner."""
+
+import argparse
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                '..'))
+
+
+def parse_args():
+  """Parse command line arguments.
+
+  @returns: The populated namespace.
+  """
+  parser = argparse.ArgumentParser(description='Unit test runner')
+  parser.add_argument('pattern', action='store', default='*_unittest.py',
+                      nargs='?',
+                      help='Run test files matching the pattern. Default is '
+                           'all *_unittest.py files.')
+
+  parser.add_argument('--debug', '-d', action='store_true', default=False,
+                      help='Print debug messages.')
+
+  parser.add_argument('--verbose', '-v', action='store_true', default=False,
+                      help='Print each test.')
+
+  args = parser.parse_args()
+  level = logging.DEBUG if args.debug else logging.CRITICAL
+  logging.basicConfig(level=level)
+  return args
+
+
+def main():
+  """The main entry point."""
+  args = parse_args()
+  src_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+  suite = unittest.defaultTestLoader.discover(src_path, pattern=args.pattern,
+                                              top_level_dir=src_path)
+  result = unittest.TextTestRunner(verbosity=2 if args.verbose else 1).run(
+      suite)
+  sys.exit(0 if result.wasSuccessful() else 1)
+
+
+if __name__ == '__main__':
+  main()
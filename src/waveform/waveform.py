@@ -2,12 +2,26 @@
 
 import logging
 
+from tracing import tracing
+
 
 class WaveformError(Exception):
   """Error in Waveform."""
   pass
 
 
+def get_down_sample_factor(number_of_samples, number_of_subsamples):
+  """Gets the down-sample factor used by Waveform.
+
+  @param number_of_samples: Number of samples in the original data.
+  @param number_of_subsamples: Number of subsamples.
+
+  @returns: The down-sample factor. Check docstring of
+            Waveform._compute_down_sample_factor.
+  """
+  return (number_of_samples - 1) / (number_of_subsamples - 1)
+
+
 class Waveform(object): # pylint:disable=R0903
   """Waveform is a 1-channel raw data processed by down-sample and quantization.
 
@@ -45,32 +59,48 @@ class Waveform(object): # pylint:disable=R0903
   as full range divided by number of intervals, that is, 20 / 4 = 5.
   The quantized value is the original value divided by quantization factor
   and rounded to the nearest integer.
+
+  Down-sampling and quantization are done lazily. Only the blocks of
+  subsamples that are accessed through wave_samples are computed, so
+  creating a Waveform takes constant time no matter how long the original
+  raw data is.
   """
   def __init__(self, one_channel_raw_data, number_of_subsamples,
-               number_of_levels):
+               number_of_levels, down_sample_factor=None):
     """Creates a Waveform object from OneChannelRawData object.
 
 
     @param one_channel_raw_data: A OneChannelRawData object.
     @param number_of_subsamples: Number of subsamples.
     @param number_of_levels: Number of levels.
+    @param down_sample_factor: Use this down-sample factor instead of
+                               computing it from number of subsamples. This
+                               lets traces of different lengths share a time
+                               axis. Number of subsamples is reduced to fit
+                               the original samples.
     """
     self._raw_data = one_channel_raw_data
     self._number_of_subsamples = None
     self._number_of_levels = None
     self._down_sample_factor = None
     self._quantization_factor = None
-    self._subsamples = None
     self._quantized_subsamples = None
 
-    self._set_number_of_subsamples(number_of_subsamples)
+    if down_sample_factor:
+      self._set_down_sample_factor(down_sample_factor, number_of_subsamples)
+    else:
+      self._set_number_of_subsamples(number_of_subsamples)
     self._set_number_of_levels(number_of_levels)
-    self._compute_quantized_subsamples()
+    self._quantized_subsamples = QuantizedSubsamples(self)
 
 
   @property
   def wave_samples(self):
-    """Returns the down-sampled and quantized subsamples."""
+    """Returns the down-sampled and quantized subsamples.
+
+    @returns: A QuantizedSubsamples object which can be indexed like a list.
+
+    """
     return self._quantized_subsamples
 
 
@@ -103,6 +133,22 @@ class Waveform(object): # pylint:disable=R0903
     self._compute_down_sample_factor()
 
 
+  def _set_down_sample_factor(self, down_sample_factor,
+                              max_number_of_subsamples):
+    """Sets the down-sample factor and computes number of subsamples.
+
+    @param down_sample_factor: The down-sample factor.
+    @param max_number_of_subsamples: The maximum number of subsamples.
+
+    """
+    self._down_sample_factor = down_sample_factor
+    self._number_of_subsamples = min(
+        max_number_of_subsamples,
+        (self._number_of_samples - 1) / down_sample_factor + 1)
+    logging.debug('down-sample factor: %r, number of subsamples: %r',
+                  self._down_sample_factor, self._number_of_subsamples)
+
+
   def _set_number_of_levels(self, number_of_levels):
     """Sets the number of levels and computes the level factor.
 
@@ -133,6 +179,10 @@ class Waveform(object): # pylint:disable=R0903
         'number of samples: %r, number of subsamples: %r',
         self._number_of_samples, self._number_of_subsamples)
 
+    if self._number_of_subsamples < 2:
+      raise WaveformError(
+          'Too few number of subsamples: %r' % self._number_of_subsamples)
+
     max_factor = (float(self._number_of_samples - 1) /
                        (self._number_of_subsamples - 1))
 
@@ -145,7 +195,8 @@ class Waveform(object): # pylint:disable=R0903
       raise WaveformError(
           'Too much number of subsamples: %r' % self._number_of_subsamples)
 
-    self._down_sample_factor = int(max_factor)
+    self._down_sample_factor = get_down_sample_factor(
+        self._number_of_samples, self._number_of_subsamples)
     logging.debug('down-sample factor: %r', self._down_sample_factor)
 
 
@@ -159,31 +210,42 @@ class Waveform(object): # pylint:disable=R0903
     logging.debug('quantization factor: %r', self._quantization_factor)
 
 
-  def _compute_quantized_subsamples(self):
-    """Computes the quantized subsamples."""
-    self._down_sample()
-    self._quantize()
+  def get_quantized_subsamples(self, start, stop):
+    """Down-samples and quantizes subsamples in a range.
 
+    @param start: The index of the first subsample.
+    @param stop: The index after the last subsample.
+
+    @returns: A list of integers. The quantized subsamples.
+
+    """
+    return self._quantize(self._down_sample(start, stop))
+
+
+  def _down_sample(self, start, stop):
+    """Down-samples original samples using down-sample factor.
+
+    @param start: The index of the first subsample.
+    @param stop: The index after the last subsample.
+
+    @returns: A sequence of the original samples at the subsamples.
+
+    """
+    with tracing.span('downsample'):
+      factor = self._down_sample_factor
+      return self._raw_data.samples[start * factor:stop * factor:factor]
 
-  def _down_sample(self):
-    """Down-samples original samples using down-sample factor."""
-    self._subsamples = self._raw_data.samples[::self._down_sample_factor]
-    # Neglects the redundant subsamples in the tails.
-    if len(self._subsamples) >= self._number_of_subsamples:
-      self._subsamples = self._subsamples[:self._number_of_subsamples]
-    if not len(self._subsamples) == self._number_of_subsamples:
-      raise WaveformError(
-          'Number of subsample is %r, while %r is expected' % (
-              len(self._subsamples), self._number_of_subsamples))
-    logging.debug('down-samples: %r', self._subsamples)
 
+  def _quantize(self, subsamples):
+    """Quantizes the down-sampled subsamples.
 
-  def _quantize(self):
-    """Quantizes the down-sampled subsamples."""
-    self._quantized_subsamples = [0] * self._number_of_subsamples
-    for index, value in enumerate(self._subsamples):
-      self._quantized_subsamples[index] = self._quantize_one_value(value)
-    logging.debug('quantized down-samples: %r', self._quantized_subsamples)
+    @param subsamples: A sequence of down-sampled subsamples.
+
+    @returns: A list of integers. The quantized subsamples.
+
+    """
+    with tracing.span('quantize'):
+      return [self._quantize_one_value(value) for value in subsamples]
 
 
   def _quantize_one_value(self, value):
@@ -216,3 +278,83 @@ class Waveform(object): # pylint:disable=R0903
 
     """
     return self._down_sample_factor
+
+
+class QuantizedSubsamples(object):
+  """A read-only list-like view of the quantized subsamples of a Waveform.
+
+  Subsamples are down-sampled and quantized in blocks of _BLOCK_LENGTH when
+  a block is accessed for the first time, and the block is cached for the
+  following accesses. Accessing a slice fetches whole blocks at once.
+
+  @property hits: Number of block accesses found in the cache.
+  @property misses: Number of block accesses which computed the block.
+  """
+  _BLOCK_LENGTH = 256
+
+  def __init__(self, wave):
+    """Creates a QuantizedSubsamples object.
+
+    @param wave: A Waveform object.
+
+    """
+    self._wave = wave
+    self._cache = {}
+    self.hits = 0
+    self.misses = 0
+
+
+  def __len__(self):
+    """Returns the number of subsamples."""
+    return self._wave._number_of_subsamples # pylint:disable=W0212
+
+
+  def _get_block(self, block_index):
+    """Gets a block of quantized subsamples.
+
+    @param block_index: The index of the block.
+
+    @returns: A list of quantized subsamples in the block.
+
+    """
+    block = self._cache.get(block_index)
+    if block is None:
+      self.misses += 1
+      start = block_index * self._BLOCK_LENGTH
+      stop = min(start + self._BLOCK_LENGTH, len(self))
+      block = self._wave.get_quantized_subsamples(start, stop)
+      self._cache[block_index] = block
+    else:
+      self.hits += 1
+    return block
+
+
+  def __getitem__(self, index):
+    """Gets the quantized subsample at index, or a list for a slice.
+
+    @param index: The index of the subsample, or a slice.
+
+    @returns: An integer, or a list of integers for a slice.
+
+    @raises: IndexError if index is out of range.
+
+    """
+    if isinstance(index, slice):
+      start, stop, step = index.indices(len(self))
+      if step < 0:
+        return self[stop + 1:start + 1][::step]
+      if start >= stop:
+        return []
+      first_block = start / self._BLOCK_LENGTH
+      last_block = (stop - 1) / self._BLOCK_LENGTH
+      values = []
+      for block_index in xrange(first_block, last_block + 1):
+        values.extend(self._get_block(block_index))
+      offset = first_block * self._BLOCK_LENGTH
+      return values[start - offset:stop - offset:step]
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError('Subsample index %r out of range' % index)
+    block = self._get_block(index / self._BLOCK_LENGTH)
+    return block[index % self._BLOCK_LENGTH]
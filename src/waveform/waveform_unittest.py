@@ -0,0 +1,88 @@
+#!/usr/bin/python
+"""Unit tests for waveform."""
+
+from __future__ import absolute_import
+
+import array
+import random
+import unittest
+
+from data import data
+from waveform import waveform
+
+
+def _make_trace(length):
+  """Makes a trace of random samples.
+
+  @param length: The number of samples.
+
+  @returns: A data.OneChannelRawData object.
+  """
+  generator = random.Random(1)
+  samples = array.array('h', (generator.randint(-32768, 32767)
+                              for _ in xrange(length)))
+  raw_data = data.RawData(samples.tostring(), data.DataFormat(1, 16, 8000))
+  return data.OneChannelRawData(raw_data, 0)
+
+
+class QuantizedSubsamplesTest(unittest.TestCase):
+  """Compares the cached blocks with quantizing each subsample."""
+
+  def setUp(self):
+    self.trace = _make_trace(10000)
+    self.wave = waveform.Waveform(self.trace, 1000, 21)
+    factor = self.wave.down_sample_factor
+    quantization_factor = self.wave.quantization_factor
+    self.expected = [
+        int(round(self.trace.samples[index * factor] / quantization_factor))
+        for index in xrange(len(self.wave.wave_samples))]
+
+
+  def test_index(self):
+    """Tests indices in and around blocks."""
+    samples = self.wave.wave_samples
+    self.assertEqual(len(samples), len(self.expected))
+    for index in (0, 1, 255, 256, 257, len(samples) - 1, -1, -len(samples)):
+      self.assertEqual(samples[index], self.expected[index])
+    for index in (len(samples), -len(samples) - 1):
+      with self.assertRaises(IndexError):
+        samples[index] # pylint:disable=W0104
+
+
+  def test_slice(self):
+    """Tests slices across blocks, with steps and out of range."""
+    samples = self.wave.wave_samples
+    for key in (slice(None), slice(0, 256), slice(255, 257),
+                slice(100, 900, 7), slice(300, 300), slice(500, 100),
+                slice(-10, None), slice(None, None, -1),
+                slice(700, 200, -3), slice(200, 700, -3),
+                slice(990, 2000), slice(-5000, 5)):
+      self.assertEqual(samples[key], self.expected[key], msg=repr(key))
+
+
+  def test_cache(self):
+    """Tests blocks are computed once."""
+    samples = self.wave.wave_samples
+    samples[0:512] # pylint:disable=W0104
+    self.assertEqual((samples.hits, samples.misses), (0, 2))
+    samples[10] # pylint:disable=W0104
+    samples[256:600] # pylint:disable=W0104
+    self.assertEqual((samples.hits, samples.misses), (2, 3))
+
+
+class WaveformTest(unittest.TestCase):
+  """Tests down-sample factors."""
+
+  def test_down_sample_factor(self):
+    """Tests the factor fits the number of subsamples in the samples."""
+    trace = _make_trace(12)
+    self.assertEqual(waveform.Waveform(trace, 4, 5).down_sample_factor, 3)
+    wave = waveform.Waveform(trace, 10, 5, down_sample_factor=5)
+    self.assertEqual(len(wave.wave_samples), 3)
+    for number_of_subsamples in (1, 13):
+      with self.assertRaises(waveform.WaveformError):
+        waveform.Waveform(trace, number_of_subsamples, 5)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -2,6 +2,8 @@
 
 import logging
 
+from tracing import tracing
+
 
 class WaveViewError(Exception):
   """Error in WaveView."""
@@ -35,6 +37,9 @@ class WaveView(object):  # pylint:disable=R0903
 
   (5, 2) is the starting point of the view in sample coordinate.
 
+  More samples can be added by add_samples to overlay several traces in the
+  same view. Each trace is drawn with its own mark.
+
   View coordinate:
 
   |--------|--------|--------|--------|
@@ -68,21 +73,32 @@ class WaveView(object):  # pylint:disable=R0903
     logging.debug('Create a view of width %r, height %r', width, height)
 
     self._view_content = ViewContent(width, height)
-    self._samples = samples
+    # A list of (samples, mark) of traces in drawing order.
+    self._traces = [(samples, '*')]
     self._width = width
     self._height = height
     # There are in total 2 * self._half_height + 1 levels.
     self._half_height = height >> 1
-    self._samples_length = len(samples)
 
 
-  def _draw_point(self, view_x, view_y):
+  def add_samples(self, samples, mark):
+    """Adds samples of another trace drawn over the previous ones.
+
+    @param samples: A list containing samples. Each element in the list
+                    should be an integer.
+    @param mark: A one-length string to draw the samples.
+    """
+    self._traces.append((samples, mark))
+
+
+  def _draw_point(self, view_x, view_y, mark='*'):
     """Draws a point at (view_x, view_y) in view coordinate.
 
     @param view_x: x coordinate in view coordinate.
     @param view_y: y coordinate in view coordinate.
+    @param mark: A one-length string to draw.
     """
-    self._view_content.set(view_x, view_y, '*')
+    self._view_content.set(view_x, view_y, mark)
 
 
   def draw_view(self, start_x, start_y):
@@ -94,23 +110,32 @@ class WaveView(object):  # pylint:disable=R0903
     logging.debug('Draw view at (%r, %r) in sample coordinate',
                   start_x, start_y)
     self._view_content.clear()
-    for view_x in xrange(self._width):
-      sample_x = view_x + start_x
-
-      # No sample to show at this point.
-      if sample_x < 0:
-        continue
+    for samples, mark in self._traces:
+      self._draw_samples(samples, mark, start_x, start_y)
 
-      # No sample to show after this point.
-      if sample_x >= self._samples_length:
-        break
 
-      view_y = self._samples[sample_x] - start_y
-      # Too high or too low so the point is not in the view.
-      if abs(view_y) > self._half_height:
-        continue
+  def _draw_samples(self, samples, mark, start_x, start_y):
+    """Draws the samples of a trace.
 
-      self._draw_point(view_x, view_y)
+    @param samples: A list containing samples.
+    @param mark: A one-length string to draw the samples.
+    @param start_x: x coordinate in start coordinate.
+    @param start_y: y coordinate in start coordinate.
+    """
+    # No sample to show before 0 and after the end of samples.
+    first_x = max(start_x, 0)
+    last_x = min(start_x + self._width, len(samples))
+    if first_x >= last_x:
+      return
+    visible_samples = samples[first_x:last_x]
+    with tracing.span('rasterize'):
+      for sample_x, sample in enumerate(visible_samples, first_x):
+        view_y = sample - start_y
+        # Too high or too low so the point is not in the view.
+        if abs(view_y) > self._half_height:
+          continue
+
+        self._draw_point(sample_x - start_x, view_y, mark)
 
 
   def get_view(self):